@@ -6,7 +6,7 @@ Interface do usuário com assistente guiado
 
 import os
 import tempfile
-from qgis.PyQt import uic
+from qgis.PyQt import uic, sip
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication, Qt, pyqtSignal, QUrl, QTimer
 from qgis.PyQt.QtGui import QIcon, QPixmap, QFont, QColor
 from qgis.PyQt.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, 
@@ -14,12 +14,13 @@ from qgis.PyQt.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGridLayout,
                                  QGroupBox, QRadioButton, QButtonGroup, 
                                  QScrollArea, QWidget, QSizePolicy, QFrame,
                                  QProgressBar, QMessageBox, QCheckBox, QSpacerItem)
-from qgis.PyQt.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
 from qgis.core import (QgsProject, QgsVectorLayer, QgsWkbTypes, QgsGeometry, 
-                       QgsRectangle, QgsCoordinateReferenceSystem, QgsFeature,
-                       QgsPointXY, QgsApplication, QgsFeatureRequest)
+                       QgsRectangle, QgsCoordinateReferenceSystem,
+                       QgsPointXY, QgsApplication, QgsFeatureRequest, QgsTask)
 from qgis.gui import QgsMapTool, QgsRubberBand, QgsMapToolEmitPoint
 
+from .pipeline import DesagregaBiomasBRPipeline, PipelineJob
+
 class DrawRectangleTool(QgsMapTool):
     """Ferramenta para desenhar retângulo no canvas"""
     rectangleDrawn = pyqtSignal(QgsRectangle)
@@ -52,7 +53,36 @@ class DrawRectangleTool(QgsMapTool):
                 self.rubber_band.reset()
                 self.rubber_band = None
 
-class DesagregaBiomasBRDialog(QDialog):
+
+class PipelineTask(QgsTask):
+    """Tarefa do gerenciador de tarefas do QGIS para um processamento (PipelineJob.run)
+    
+    function(task) roda fora da thread da interface; on_finished(resultado) é
+    chamado na thread principal ao final (None se falhou ou foi cancelada).
+    """
+    
+    def __init__(self, description, function, on_finished):
+        super().__init__(description, QgsTask.CanCancel)
+        self.function = function
+        self.on_finished = on_finished
+        self.result = None
+        self.error = None
+    
+    def run(self):
+        try:
+            self.result = self.function(self)
+            return not self.isCanceled()
+        except Exception as e:
+            self.error = str(e)
+            return False
+    
+    def finished(self, success):
+        if self.error:
+            print(f"❌ ERROR PipelineTask ({self.description()}): {self.error}")
+        self.on_finished(self.result if success else None)
+
+
+class DesagregaBiomasBRDialog(QDialog, DesagregaBiomasBRPipeline):
     """Dialog principal do DesagregaBiomasBR"""
 
     def __init__(self):
@@ -87,110 +117,9 @@ class DesagregaBiomasBRDialog(QDialog):
         self.ibge_shapefile_name = None
         self.ibge_shapefile_path = None
         
-        # Configurações dos temas
-        self.biome_options = {
-            'DETER': ['Cerrado', 'Amazônia Legal'],
-            'PRODES': ['Amazônia', 'Amazônia Legal', 'Cerrado', 'Caatinga', 'Pantanal', 'Pampa', 'Mata Atlântica'],
-            'TERRACLASS': ['Amazônia', 'Cerrado'],
-            'ÁREA QUEIMADA': ['Amazônia', 'Amazônia Legal', 'Cerrado', 'Caatinga', 'Pantanal', 'Pampa', 'Mata Atlântica']
-        }
-        
-        # Anos disponíveis por bioma para TERRACLASS
-        self.terraclass_years = {
-            'Amazônia': [2008, 2010, 2012, 2014, 2018, 2020, 2022],
-            'Cerrado': [2018, 2020, 2022]
-        }
-        
-        # Configurações ÁREA QUEIMADA
-        # Base URL para downloads
-        self.queimadas_base_url = "https://dataserver-coids.inpe.br/queimadas/queimadas/area_queimada/AQ1km/shp/"
-        
-        # Data de início das área queimada (setembro 2002)
-        self.queimadas_start_date = "2002-09-01"
-        
-        # Gera anos disponíveis dinamicamente (2002 até ano atual)
-        import datetime
-        current_year = datetime.datetime.now().year
-        self.queimadas_years = list(range(2002, current_year + 1))
-        
-        # Gera meses disponíveis dinamicamente (09/2002 até mês atual -1)
-        self.queimadas_months = self.generate_queimadas_months()
-        
-        # Anos disponíveis por bioma para PRODES (incrementais)
-        self.prodes_years = {
-            'Cerrado': [2002,2004,2006,2007,2008,2010,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
-            'Pantanal': [2004,2006,2007,2008,2010,2011,2013,2014,2016,2017,2018,2019,2020,2021,2022,2023],
-            'Pampa': [2004,2006,2007,2008,2010,2011,2013,2014,2016,2017,2018,2019,2020,2021,2022,2023],
-            'Mata Atlântica': [2004,2006,2008,2010,2011,2013,2014,2016,2017,2018,2019,2020,2021,2022,2023],
-            'Caatinga': [2004,2006,2008,2010,2011,2013,2014,2016,2017,2018,2019,2020,2021,2022,2023],
-            'Amazônia': [2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024,2025],
-            'Amazônia Legal': [2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023]
-        }
-        
-        # Anos disponíveis para dados acumulados (incluem os anos dos prodes_base_years)
-        self.prodes_years_acumulado = {
-            'Cerrado': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
-            'Pantanal': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
-            'Pampa': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
-            'Mata Atlântica': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
-            'Caatinga': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
-            'Amazônia': [2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024,2025],
-            'Amazônia Legal': [2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024]
-        }
-        
-        # Anos iniciais para dados acumulados por bioma
-        self.prodes_base_years = {
-            'Cerrado': 2000,
-            'Pantanal': 2000,
-            'Pampa': 2000,
-            'Mata Atlântica': 2000,
-            'Caatinga': 2000,
-            'Amazônia': 2007,
-            'Amazônia Legal': 2007
-        }
-        
-        # Ferramenta de desenho
-        self.draw_tool = None
-        
-        # URLs e configurações DETER
-        self.deter_urls = {
-            'Cerrado': 'https://terrabrasilis.dpi.inpe.br/geoserver/deter-cerrado-nb/deter_cerrado/ows',
-            'Amazônia Legal': 'https://terrabrasilis.dpi.inpe.br/geoserver/deter-amz/deter_amz/ows'
-        }
-        
-        # Classes DETER por bioma
-        self.deter_classes = {
-            'Cerrado': ['DESMATAMENTO_CR'],
-            'Amazônia Legal': [
-                'CICATRIZ_DE_QUEIMADA', 
-                'CORTE_SELETIVO', 
-                'CS_DESORDENADO', 
-                'CS_GEOMETRICO', 
-                'DEGRADACAO', 
-                'DESMATAMENTO_CR', 
-                'DESMATAMENTO_VEG', 
-                'MINERACAO'
-            ]
-        }
-        
-        # Datas de início DETER por bioma
-        self.deter_start_dates = {
-            'Cerrado': '2018-05-01',      # 01/05/2018
-            'Amazônia Legal': '2016-08-02'  # 02/08/2016
-        }
-        
-        # TypeNames DETER
-        self.deter_typenames = {
-            'Cerrado': 'deter-cerrado-nb:deter_cerrado',
-            'Amazônia Legal': 'deter-amz:deter_amz'
-        }
-
-        # Network manager
-        self.network_manager = QNetworkAccessManager()
-        
-        # Sistema de configuração dinâmica
-        self.config_data = None
-        self.load_dynamic_config()
+        # Configurações dos temas, serviços e parâmetros de download (também usadas sem interface)
+        self.init_pipeline_settings()
+        self.pipeline_job = None  # Processamento em andamento (PipelineJob)
         
         # Shapefile - inicialização básica (será verificado em background)
         self.ibge_shapefile_name = None
@@ -205,536 +134,6 @@ class DesagregaBiomasBRDialog(QDialog):
         # Usar QTimer para fazer downloads assíncronos
         QTimer.singleShot(100, self.background_downloads)
 
-    def load_dynamic_config(self):
-        """Carrega configurações dinâmicas do JSON online com cache local"""
-        try:
-            import json
-            import os
-            import tempfile
-            from datetime import datetime, timedelta
-            
-            # URL do JSON no GitHub
-            json_url = "https://raw.githubusercontent.com/geodenilson/DesagregaBiomasBR/main/listas.json"
-            
-            # Cache local
-            cache_dir = os.path.join(tempfile.gettempdir(), 'DesagregaBiomasBR')
-            os.makedirs(cache_dir, exist_ok=True)
-            cache_file = os.path.join(cache_dir, 'config_cache.json')
-            
-            # Verifica validade do cache (24 horas)
-            cache_valid = False
-            if os.path.exists(cache_file):
-                cache_time = datetime.fromtimestamp(os.path.getmtime(cache_file))
-                if datetime.now() - cache_time < timedelta(hours=24):
-                    cache_valid = True
-            
-            if cache_valid:
-                # Usa cache local
-                print("🔧 DEBUG: Usando configurações do cache local")
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    self.config_data = json.load(f)
-            else:
-                # Tenta baixar nova versão
-                print("🌐 DEBUG: Baixando configurações atualizadas...")
-                self.config_data = self.download_config_json(json_url, cache_file)
-            
-            if self.config_data:
-                print(f"✅ DEBUG: Configurações carregadas (versão {self.config_data.get('version', 'N/A')})")
-                self.apply_dynamic_config()
-            else:
-                print("⚠️ DEBUG: Usando configurações hardcoded como fallback")
-                
-        except Exception as e:
-            print(f"❌ DEBUG: Erro ao carregar configurações dinâmicas: {e}")
-            print("⚠️ DEBUG: Usando configurações hardcoded como fallback")
-
-    def download_config_json(self, url, cache_file):
-        """Baixa JSON de configuração e salva no cache"""
-        try:
-            import json
-            from qgis.PyQt.QtCore import QUrl, QEventLoop, QTimer
-            from qgis.PyQt.QtNetwork import QNetworkRequest, QNetworkReply
-            
-            request = QNetworkRequest(QUrl(url))
-            request.setRawHeader(b"User-Agent", b"DesagregaBiomasBR-Plugin/1.0")
-            
-            # Timeout de 10 segundos
-            loop = QEventLoop()
-            timer = QTimer()
-            timer.setSingleShot(True)
-            timer.timeout.connect(loop.quit)
-            
-            reply = self.network_manager.get(request)
-            reply.finished.connect(loop.quit)
-            
-            timer.start(10000)  # 10 segundos
-            loop.exec_()
-            
-            if timer.isActive():
-                timer.stop()
-                
-                if reply.error() == QNetworkReply.NoError:
-                    data = reply.readAll().data().decode('utf-8')
-                    config_data = json.loads(data)
-                    
-                    # Salva no cache
-                    with open(cache_file, 'w', encoding='utf-8') as f:
-                        json.dump(config_data, f, indent=2, ensure_ascii=False)
-                    
-                    reply.deleteLater()
-                    return config_data
-                else:
-                    print(f"❌ DEBUG: Erro na requisição: {reply.errorString()}")
-            else:
-                print("❌ DEBUG: Timeout no download do JSON")
-                reply.abort()
-            
-            reply.deleteLater()
-            return None
-            
-        except Exception as e:
-            print(f"❌ DEBUG: Erro no download do JSON: {e}")
-            return None
-
-    def apply_dynamic_config(self):
-        """Aplica configurações dinâmicas carregadas do JSON"""
-        if not self.config_data:
-            return
-            
-        try:
-            # Atualiza biomas
-            if 'biomas' in self.config_data:
-                self.biome_options = self.config_data['biomas']
-                print("✅ DEBUG: Biomas atualizados dinamicamente")
-            
-            # Atualiza PRODES
-            if 'prodes' in self.config_data:
-                prodes_config = self.config_data['prodes']
-                if 'anos_incrementais' in prodes_config:
-                    self.prodes_years = prodes_config['anos_incrementais']
-                if 'anos_acumulados' in prodes_config:
-                    self.prodes_years_acumulado = prodes_config['anos_acumulados']
-                if 'anos_base' in prodes_config:
-                    self.prodes_base_years = prodes_config['anos_base']
-                print("✅ DEBUG: PRODES atualizado dinamicamente")
-            
-            # Atualiza DETER
-            if 'deter' in self.config_data:
-                deter_config = self.config_data['deter']
-                if 'urls' in deter_config:
-                    self.deter_urls = deter_config['urls']
-                if 'classes' in deter_config:
-                    self.deter_classes = deter_config['classes']
-                if 'datas_inicio' in deter_config:
-                    self.deter_start_dates = deter_config['datas_inicio']
-                if 'typenames' in deter_config:
-                    self.deter_typenames = deter_config['typenames']
-                print("✅ DEBUG: DETER atualizado dinamicamente")
-            
-            # Atualiza TERRACLASS
-            if 'terraclass' in self.config_data:
-                terraclass_config = self.config_data['terraclass']
-                if 'anos' in terraclass_config:
-                    self.terraclass_years = terraclass_config['anos']
-                print("✅ DEBUG: TERRACLASS atualizado dinamicamente")
-            
-            # Atualiza QUEIMADAS
-            if 'queimadas' in self.config_data:
-                queimadas_config = self.config_data['queimadas']
-                if 'base_url' in queimadas_config:
-                    self.queimadas_base_url = queimadas_config['base_url']
-                if 'data_inicio' in queimadas_config:
-                    self.queimadas_start_date = queimadas_config['data_inicio']
-                print("✅ DEBUG: QUEIMADAS atualizado dinamicamente")
-                
-        except Exception as e:
-            print(f"❌ DEBUG: Erro ao aplicar configurações dinâmicas: {e}")
-
-    def get_dynamic_prodes_urls(self, biome):
-        """Retorna URLs do PRODES usando configuração dinâmica
-        
-        NOTA: Para o bioma Amazônia, usa-se o WFS da Amazônia Legal pois:
-        1. O WFS do bioma Amazônia tem problemas de limitação de polígonos (para em ~200k)
-        2. A Amazônia Legal cobre completamente o bioma Amazônia
-        3. O corte pelo limite do bioma será aplicado depois se necessário
-        """
-        import unicodedata
-        
-        # DEBUG DETALHADO: Verifica encoding do bioma recebido
-        print(f"🔍 DEBUG get_dynamic_prodes_urls: biome recebido = '{biome}'")
-        print(f"🔍 DEBUG: repr(biome) = {repr(biome)}")
-        print(f"🔍 DEBUG: len(biome) = {len(biome) if biome else 'None'}")
-        
-        # CORREÇÃO: Para Amazônia, usar sempre WFS da Amazônia Legal (mais estável)
-        # Normaliza strings para NFC para garantir comparação correta
-        effective_biome = biome
-        biome_normalized = unicodedata.normalize('NFC', biome) if biome else biome
-        amazonia_check = unicodedata.normalize('NFC', 'Amazônia')
-        
-        print(f"🔍 DEBUG: biome_normalized = '{biome_normalized}'")
-        print(f"🔍 DEBUG: amazonia_check = '{amazonia_check}'")
-        print(f"🔍 DEBUG: biome_normalized == amazonia_check = {biome_normalized == amazonia_check}")
-        
-        if biome_normalized == amazonia_check:
-            effective_biome = 'Amazônia Legal'
-            print(f"🔄 DEBUG: Bioma Amazônia selecionado - usando WFS da Amazônia Legal (mais estável)")
-            # Marca que precisa aplicar corte do bioma depois
-            self._needs_amazonia_biome_cut = True
-        else:
-            self._needs_amazonia_biome_cut = False
-            print(f"🔍 DEBUG: Bioma NÃO é Amazônia, usando: {effective_biome}")
-        
-        if self.config_data and 'prodes' in self.config_data and 'urls' in self.config_data['prodes']:
-            return self.config_data['prodes']['urls'].get(effective_biome)
-        
-        # Fallback para URLs hardcoded
-        fallback_urls = {
-            'Pantanal': {
-                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-pantanal-nb/accumulated_deforestation_2000/ows',
-                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-pantanal-nb/yearly_deforestation/ows'
-            },
-            'Cerrado': {
-                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-cerrado-nb/accumulated_deforestation_2000/ows',
-                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-cerrado-nb/yearly_deforestation/ows'
-            },
-            'Pampa': {
-                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-pampa-nb/accumulated_deforestation_2000/ows',
-                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-pampa-nb/yearly_deforestation/ows'
-            },
-            'Caatinga': {
-                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-caatinga-nb/accumulated_deforestation_2000/ows',
-                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-caatinga-nb/yearly_deforestation/ows'
-            },
-            'Mata Atlântica': {
-                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-mata-atlantica-nb/accumulated_deforestation_2000/ows',
-                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-mata-atlantica-nb/yearly_deforestation/ows'
-            },
-            'Amazônia Legal': {
-                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-legal-amz/accumulated_deforestation_2007/ows',
-                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-legal-amz/yearly_deforestation/ows'
-            }
-        }
-        return fallback_urls.get(effective_biome)
-
-    def get_dynamic_terraclass_urls(self):
-        """Retorna templates de URL do TERRACLASS usando configuração dinâmica"""
-        if self.config_data and 'terraclass' in self.config_data and 'urls' in self.config_data['terraclass']:
-            return self.config_data['terraclass']['urls']
-        
-        # Fallback para URLs hardcoded
-        return {
-            "base": "https://www.terraclass.gov.br/helpers/terraclass_data4download_2024/V/",
-            "municipal": "municipal/{uf_lower}/{bioma}.{ano}.{municipio_normalizado}.{UF}.{geocodigo_munic}.V.zip",
-            "estadual": "estadual/{bioma}.{ano}.{estado_normalizado}.{geocodigo_uf}.V.zip"
-        }
-
-    def ensure_ibge_shapefile_available(self):
-        """Garante que o shapefile IBGE esteja disponível (local ou cache)"""
-        try:
-            import os
-            import tempfile
-            from datetime import datetime, timedelta
-            import zipfile
-            import shutil
-            from qgis.core import QgsMessageLog, Qgis
-            
-            print("🔧 DEBUG: Verificando disponibilidade do shapefile IBGE...")
-            QgsMessageLog.logMessage("🔧 Verificando disponibilidade do shapefile IBGE...", "DesagregaBiomasBR", Qgis.Info)
-            
-            # Verifica se existe shapefile local primeiro
-            local_shapefile_dir = os.path.join(self.plugin_dir, 'shapefile')
-            if os.path.exists(local_shapefile_dir):
-                shp_files = [f for f in os.listdir(local_shapefile_dir) if f.endswith('.shp')]
-                if shp_files:
-                    print("✅ DEBUG: Shapefile IBGE local encontrado - usando local")
-                    QgsMessageLog.logMessage("✅ Shapefile IBGE local encontrado - usando local", "DesagregaBiomasBR", Qgis.Info)
-                    self.ibge_shapefile_name = shp_files[0][:-4]
-                    self.ibge_shapefile_path = os.path.join(local_shapefile_dir, shp_files[0])
-                    return True
-                else:
-                    print("🔧 DEBUG: Pasta shapefile existe mas está vazia")
-                    QgsMessageLog.logMessage("🔧 Pasta shapefile existe mas está vazia", "DesagregaBiomasBR", Qgis.Warning)
-            else:
-                print("🔧 DEBUG: Pasta shapefile local não existe")
-                QgsMessageLog.logMessage("🔧 Pasta shapefile local não existe", "DesagregaBiomasBR", Qgis.Info)
-            
-            # Se não existe local, usa sistema de cache
-            cache_dir = os.path.join(tempfile.gettempdir(), 'DesagregaBiomasBR', 'shapefile')
-            print(f"🔧 DEBUG: Cache dir: {cache_dir}")
-            QgsMessageLog.logMessage(f"🔧 Cache dir: {cache_dir}", "DesagregaBiomasBR", Qgis.Info)
-            os.makedirs(cache_dir, exist_ok=True)
-            
-            # Verifica cache do shapefile
-            cache_shapefile_dir = os.path.join(cache_dir, 'extracted')
-            print(f"🔧 DEBUG: Cache shapefile dir: {cache_shapefile_dir}")
-            cache_valid = False
-            
-            if os.path.exists(cache_shapefile_dir):
-                print("🔧 DEBUG: Cache dir existe, verificando conteúdo...")
-                QgsMessageLog.logMessage("🔧 Cache dir existe, verificando conteúdo...", "DesagregaBiomasBR", Qgis.Info)
-                # Verifica se tem .shp e se cache é válido (30 dias)
-                shp_files = [f for f in os.listdir(cache_shapefile_dir) if f.endswith('.shp')]
-                print(f"🔧 DEBUG: Arquivos .shp no cache: {shp_files}")
-                
-                if shp_files:
-                    cache_time = datetime.fromtimestamp(os.path.getmtime(cache_shapefile_dir))
-                    age_days = (datetime.now() - cache_time).days
-                    print(f"🔧 DEBUG: Cache idade: {age_days} dias (limite: 30)")
-                    
-                    if age_days < 30:
-                        cache_valid = True
-                        print("✅ DEBUG: Usando shapefile IBGE do cache (válido)")
-                        QgsMessageLog.logMessage("✅ Usando shapefile IBGE do cache (válido)", "DesagregaBiomasBR", Qgis.Info)
-                        # Atualiza o caminho para o cache
-                        self.ibge_shapefile_name = shp_files[0][:-4]  # Remove .shp
-                        self.ibge_shapefile_path = os.path.join(cache_shapefile_dir, shp_files[0])
-                        return True
-                    else:
-                        print("⚠️ DEBUG: Cache expirado (>30 dias)")
-                        QgsMessageLog.logMessage("⚠️ Cache expirado (>30 dias)", "DesagregaBiomasBR", Qgis.Warning)
-                else:
-                    print("⚠️ DEBUG: Cache dir existe mas sem arquivos .shp")
-                    QgsMessageLog.logMessage("⚠️ Cache dir existe mas sem arquivos .shp", "DesagregaBiomasBR", Qgis.Warning)
-            else:
-                print("🔧 DEBUG: Cache dir não existe")
-                QgsMessageLog.logMessage("🔧 Cache dir não existe", "DesagregaBiomasBR", Qgis.Info)
-            
-            if not cache_valid:
-                print("🌐 DEBUG: Iniciando download do shapefile IBGE...")
-                QgsMessageLog.logMessage("🌐 Iniciando download do shapefile IBGE...", "DesagregaBiomasBR", Qgis.Info)
-                success = self.download_ibge_shapefile(cache_dir)
-                if success:
-                    print("✅ DEBUG: Shapefile IBGE baixado e extraído com sucesso")
-                    QgsMessageLog.logMessage("✅ Shapefile IBGE baixado e extraído com sucesso", "DesagregaBiomasBR", Qgis.Info)
-                    return True
-                else:
-                    print("❌ DEBUG: Falha no download do shapefile IBGE")
-                    QgsMessageLog.logMessage("❌ Falha no download do shapefile IBGE", "DesagregaBiomasBR", Qgis.Critical)
-                    return False
-            
-            return cache_valid
-            
-        except Exception as e:
-            print(f"❌ DEBUG: Erro ao garantir shapefile IBGE: {e}")
-            return False
-
-    def download_ibge_shapefile(self, cache_dir):
-        """Baixa e extrai o shapefile IBGE - COPIADO DA ESTRATÉGIA DO JSON"""
-        try:
-            import zipfile
-            import shutil
-            from qgis.PyQt.QtCore import QUrl, QEventLoop, QTimer
-            from qgis.PyQt.QtNetwork import QNetworkRequest, QNetworkReply
-            from qgis.core import QgsMessageLog, Qgis
-            
-            QgsMessageLog.logMessage(f"🔧 Iniciando download do shapefile IBGE, cache_dir: {cache_dir}", "DesagregaBiomasBR", Qgis.Info)
-            print(f"🔧 DEBUG: Iniciando download_ibge_shapefile, cache_dir: {cache_dir}")
-            
-            # Obtém URL do shapefile do JSON
-            shapefile_url = None
-            if self.config_data and 'ibge_shapefile' in self.config_data:
-                shapefile_url = self.config_data['ibge_shapefile'].get('url')
-                QgsMessageLog.logMessage(f"🔧 URL do JSON: {shapefile_url}", "DesagregaBiomasBR", Qgis.Info)
-                print(f"🔧 DEBUG: URL do JSON: {shapefile_url}")
-            else:
-                QgsMessageLog.logMessage(f"🔧 config_data não disponível ou sem ibge_shapefile", "DesagregaBiomasBR", Qgis.Warning)
-                print(f"🔧 DEBUG: config_data não disponível ou sem ibge_shapefile")
-            
-            if not shapefile_url:
-                # Fallback para URL hardcoded (NOME LIMPO SEM CARACTERES ESPECIAIS)
-                shapefile_url = "https://github.com/geodenilson/DesagregaBiomasBR/raw/main/BC250_2023.zip"
-                QgsMessageLog.logMessage(f"🔧 Usando URL fallback: {shapefile_url}", "DesagregaBiomasBR", Qgis.Info)
-                print(f"🔧 DEBUG: Usando URL fallback: {shapefile_url}")
-            
-            # **ESTRATÉGIA EXATA DO JSON - SEM CARACTERES ESPECIAIS NA URL**
-            print(f"🌐 DEBUG: Baixando de (URL limpa): {shapefile_url}")
-            QgsMessageLog.logMessage(f"🌐 Baixando shapefile de: {shapefile_url}", "DesagregaBiomasBR", Qgis.Info)
-            
-            # EXATAMENTE como o JSON funciona (URL limpa, sem caracteres especiais)
-            request = QNetworkRequest(QUrl(shapefile_url))
-            request.setRawHeader(b"User-Agent", b"DesagregaBiomasBR-Plugin/1.0")
-            
-            # Timeout igual ao JSON que funciona (10 segundos APENAS PARA TESTE)
-            loop = QEventLoop()
-            timer = QTimer()
-            timer.setSingleShot(True)
-            timer.timeout.connect(loop.quit)
-            
-            reply = self.network_manager.get(request)
-            reply.finished.connect(loop.quit)
-            
-            timer.start(10000)  # IGUAL AO JSON - 10 segundos
-            loop.exec_()
-            
-            if timer.isActive():
-                timer.stop()
-                
-                # DEBUG: Mostra status HTTP independente do erro
-                http_status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
-                redirect_url = reply.attribute(QNetworkRequest.RedirectionTargetAttribute)
-                print(f"🔧 DEBUG: HTTP Status: {http_status}")
-                QgsMessageLog.logMessage(f"🔧 HTTP Status: {http_status}", "DesagregaBiomasBR", Qgis.Info)
-                
-                # SUPORTE A REDIRECIONAMENTOS (302, 301, etc)
-                if http_status in [301, 302, 303, 307, 308] and redirect_url:
-                    redirect_url_str = redirect_url.toString()
-                    print(f"🔄 DEBUG: Redirecionamento para: {redirect_url_str}")
-                    QgsMessageLog.logMessage(f"🔄 Seguindo redirecionamento: {redirect_url_str}", "DesagregaBiomasBR", Qgis.Info)
-                    
-                    # Tenta o download na URL de redirecionamento
-                    reply.deleteLater()
-                    return self.download_with_redirect(redirect_url_str, cache_dir)
-                
-                if reply.error() == QNetworkReply.NoError:
-                    zip_data = reply.readAll().data()
-                    print(f"✅ DEBUG: Dados recebidos: {len(zip_data)} bytes ({len(zip_data)/1024/1024:.1f}MB)")
-                    QgsMessageLog.logMessage(f"✅ Dados recebidos: {len(zip_data)/1024/1024:.1f}MB", "DesagregaBiomasBR", Qgis.Info)
-                    
-                    if len(zip_data) == 0:
-                        print("❌ DEBUG: Arquivo baixado está vazio!")
-                        reply.deleteLater()
-                        return False
-                    
-                    # Salva ZIP
-                    original_filename = shapefile_url.split('/')[-1]
-                    zip_path = os.path.join(cache_dir, original_filename)
-                    with open(zip_path, 'wb') as f:
-                        f.write(zip_data)
-                    
-                    print(f"✅ DEBUG: ZIP salvo: {zip_path}")
-                    QgsMessageLog.logMessage(f"✅ ZIP salvo: {original_filename}", "DesagregaBiomasBR", Qgis.Info)
-                    
-                    # Extrai ZIP
-                    extract_dir = os.path.join(cache_dir, 'extracted')
-                    if os.path.exists(extract_dir):
-                        shutil.rmtree(extract_dir)
-                    os.makedirs(extract_dir)
-                    
-                    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                        zip_ref.extractall(extract_dir)
-                    
-                    # Remove ZIP
-                    os.remove(zip_path)
-                    
-                    # Configura shapefile
-                    shp_files = [f for f in os.listdir(extract_dir) if f.endswith('.shp')]
-                    if shp_files:
-                        self.ibge_shapefile_name = shp_files[0][:-4]
-                        self.ibge_shapefile_path = os.path.join(extract_dir, shp_files[0])
-                        print(f"✅ DEBUG: Shapefile configurado: {self.ibge_shapefile_path}")
-                        QgsMessageLog.logMessage(f"✅ Shapefile configurado com sucesso", "DesagregaBiomasBR", Qgis.Info)
-                        
-                        reply.deleteLater()
-                        return True
-                    else:
-                        print("❌ DEBUG: Nenhum .shp encontrado no ZIP")
-                else:
-                    print(f"❌ DEBUG: Erro na requisição: {reply.errorString()}")
-                    QgsMessageLog.logMessage(f"❌ Erro na requisição: {reply.errorString()}", "DesagregaBiomasBR", Qgis.Critical)
-            else:
-                print("❌ DEBUG: Timeout no download do shapefile")
-                reply.abort()
-            
-            reply.deleteLater()
-            return False
-            
-        except Exception as e:
-            print(f"❌ DEBUG: Erro no download do shapefile: {e}")
-            QgsMessageLog.logMessage(f"❌ Erro no download: {e}", "DesagregaBiomasBR", Qgis.Critical)
-            return False
-
-    def download_with_redirect(self, redirect_url, cache_dir):
-        """Baixa shapefile seguindo redirecionamento"""
-        try:
-            import zipfile
-            import shutil
-            from qgis.PyQt.QtCore import QUrl, QEventLoop, QTimer
-            from qgis.PyQt.QtNetwork import QNetworkRequest, QNetworkReply
-            from qgis.core import QgsMessageLog, Qgis
-            
-            print(f"🔄 DEBUG: Baixando da URL de redirecionamento: {redirect_url}")
-            QgsMessageLog.logMessage(f"🔄 Baixando da URL de redirecionamento", "DesagregaBiomasBR", Qgis.Info)
-            
-            # Mesmo processo, mas com URL de redirecionamento
-            request = QNetworkRequest(QUrl(redirect_url))
-            request.setRawHeader(b"User-Agent", b"DesagregaBiomasBR-Plugin/1.0")
-            
-            # Timeout maior para redirecionamento (60 segundos)
-            loop = QEventLoop()
-            timer = QTimer()
-            timer.setSingleShot(True)
-            timer.timeout.connect(loop.quit)
-            
-            reply = self.network_manager.get(request)
-            reply.finished.connect(loop.quit)
-            
-            timer.start(60000)  # 60 segundos para redirecionamento
-            loop.exec_()
-            
-            if timer.isActive():
-                timer.stop()
-                
-                http_status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
-                print(f"🔄 DEBUG: HTTP Status redirecionamento: {http_status}")
-                QgsMessageLog.logMessage(f"🔄 HTTP Status redirecionamento: {http_status}", "DesagregaBiomasBR", Qgis.Info)
-                
-                if reply.error() == QNetworkReply.NoError:
-                    zip_data = reply.readAll().data()
-                    print(f"✅ DEBUG: Dados recebidos do redirecionamento: {len(zip_data)} bytes ({len(zip_data)/1024/1024:.1f}MB)")
-                    QgsMessageLog.logMessage(f"✅ Dados recebidos: {len(zip_data)/1024/1024:.1f}MB", "DesagregaBiomasBR", Qgis.Info)
-                    
-                    if len(zip_data) == 0:
-                        print("❌ DEBUG: Arquivo redirecionado está vazio!")
-                        reply.deleteLater()
-                        return False
-                    
-                    # Salva ZIP
-                    zip_path = os.path.join(cache_dir, "BC250_2023.zip")
-                    with open(zip_path, 'wb') as f:
-                        f.write(zip_data)
-                    
-                    print(f"✅ DEBUG: ZIP redirecionado salvo: {zip_path}")
-                    QgsMessageLog.logMessage(f"✅ ZIP salvo com sucesso", "DesagregaBiomasBR", Qgis.Info)
-                    
-                    # Extrai ZIP
-                    extract_dir = os.path.join(cache_dir, 'extracted')
-                    if os.path.exists(extract_dir):
-                        shutil.rmtree(extract_dir)
-                    os.makedirs(extract_dir)
-                    
-                    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                        zip_ref.extractall(extract_dir)
-                    
-                    # Remove ZIP
-                    os.remove(zip_path)
-                    
-                    # Configura shapefile
-                    shp_files = [f for f in os.listdir(extract_dir) if f.endswith('.shp')]
-                    if shp_files:
-                        self.ibge_shapefile_name = shp_files[0][:-4]
-                        self.ibge_shapefile_path = os.path.join(extract_dir, shp_files[0])
-                        print(f"✅ DEBUG: Shapefile redirecionado configurado: {self.ibge_shapefile_path}")
-                        QgsMessageLog.logMessage(f"✅ Shapefile configurado com sucesso", "DesagregaBiomasBR", Qgis.Info)
-                        
-                        reply.deleteLater()
-                        return True
-                    else:
-                        print("❌ DEBUG: Nenhum .shp encontrado no ZIP redirecionado")
-                else:
-                    print(f"❌ DEBUG: Erro no redirecionamento: {reply.errorString()}")
-                    QgsMessageLog.logMessage(f"❌ Erro no redirecionamento: {reply.errorString()}", "DesagregaBiomasBR", Qgis.Critical)
-            else:
-                print("❌ DEBUG: Timeout no redirecionamento")
-                reply.abort()
-            
-            reply.deleteLater()
-            return False
-            
-        except Exception as e:
-            print(f"❌ DEBUG: Erro no download redirecionado: {e}")
-            QgsMessageLog.logMessage(f"❌ Erro no redirecionamento: {e}", "DesagregaBiomasBR", Qgis.Critical)
-            return False
-
     def setupUi(self):
         """Configuração da interface do usuário"""
         # Layout principal
@@ -812,104 +211,8 @@ class DesagregaBiomasBRDialog(QDialog):
         
         print(f"✅ DEBUG: Reset completo realizado - voltou ao passo 1")
     
-    def reset_all_variables(self):
-        """Reset COMPLETO de todas as variáveis para garantir estado limpo"""
-        print("🧹 DEBUG: Executando reset_all_variables - zerando todas as variáveis")
-        
-        # Estado do assistente
-        self.current_step = 1
-        self.max_steps = 3
-        
-        # Sistema de notas inteligente
-        self.config_note = ""
-        self.status_note = ""
-        self.final_note = ""
-        
-        # Dados do assistente principal
-        self.selected_theme = None
-        self.selected_biome = None
-        self.cut_option = None
-        self.selected_layer = None
-        self.selected_field = None
-        self.selected_element = None
-        self.drawn_rectangle = None
-        
-        # Flag para corte automático do bioma Amazônia
-        self._needs_amazonia_biome_cut = False
-        
-        # Dados IBGE
-        self.ibge_layer = None
-        self.ibge_field = None
-        self.ibge_element = None
-        self.ibge_biome_region = None
-        self.ibge_state = None
-        self.ibge_municipality = None
-        
-        # Dados temporais (PRODES)
-        self.data_type = None
-        self.start_year = None
-        self.end_year = None
-        
-        # Dados temporais (DETER)
-        self.deter_start_year = None
-        self.deter_end_year = None
-        self.deter_selected_classes = []
-        
-        # Dados temporais (TERRACLASS)
-        self.terraclass_year = None
-        self.terraclass_state = None
-        self.terraclass_municipality = None
-        
-        # Dados WFS (para opção 3)
-        self.wfs_type = None
-        self.wfs_field = None
-        self.wfs_element = None
-        self.wfs_layer = None
-        
-        # Ferramentas de desenho
-        self.draw_tool = None
-        
-        # Listas de processamento
-        self.processing_layers = []
-        self.urls_and_filters = {}
-        
-        # Sistema de rastreamento de processamentos para metadados
-        self.processing_log = []
-        
-        # Sistema de abortar download
-        self.abort_download = False  # Flag para abortar download
-        self.download_in_progress = False  # Flag para controlar estado do download
-        
         # Estado completamente limpo
 
-    def add_processing_log(self, operation, details):
-        """Registra um processamento realizado para incluir nos metadados"""
-        try:
-            import datetime
-            timestamp = datetime.datetime.now().strftime('%H:%M:%S')
-            
-            log_entry = {
-                'timestamp': timestamp,
-                'operation': operation,
-                'details': details
-            }
-            
-            self.processing_log.append(log_entry)
-            
-        except Exception as e:
-            pass  # Falha silenciosa no log não deve interromper processamento
-    
-    def get_processing_summary(self):
-        """Retorna resumo dos processamentos para metadados"""
-        if not self.processing_log:
-            return ["Nenhum processamento especial realizado (dados utilizados como baixados)"]
-        
-        summary = []
-        for entry in self.processing_log:
-            summary.append(f"{entry['timestamp']} - {entry['operation']}: {entry['details']}")
-        
-        return summary
-
     def create_header(self):
         """Cria o cabeçalho dinâmico baseado na etapa atual"""
         header_layout = QHBoxLayout()
@@ -1338,6 +641,36 @@ class DesagregaBiomasBRDialog(QDialog):
         
         save_layout.addLayout(dest_layout)
         save_layout.addLayout(format_layout)
+        
+        # Atributos baixados do WFS (propertyName) - só para temas WFS
+        if self.selected_theme in ['PRODES', 'DETER']:
+            attributes_layout = QHBoxLayout()
+            attributes_label = QLabel("Atributos:")
+            self.attributes_edit = QTextEdit()
+            self.attributes_edit.setMaximumHeight(25)
+            self.attributes_edit.setMinimumWidth(300)
+            self.attributes_edit.setPlaceholderText(self.get_attribute_profile_hint())
+            self.attributes_edit.setText(self.wfs_attribute_override)
+            self.attributes_edit.textChanged.connect(self.on_attributes_changed)
+            
+            attributes_layout.addWidget(attributes_label)
+            attributes_layout.addWidget(self.attributes_edit)
+            save_layout.addLayout(attributes_layout)
+            
+            # Precisão das coordenadas na transferência (numDecimals / simplificação)
+            precision_layout = QHBoxLayout()
+            precision_label = QLabel("Precisão:")
+            self.transfer_profile_combo = QComboBox()
+            for profile_key, profile in self.wfs_transfer_profiles.items():
+                self.transfer_profile_combo.addItem(profile['label'], profile_key)
+            self.transfer_profile_combo.setCurrentIndex(max(0, self.transfer_profile_combo.findData(self.wfs_transfer_profile)))
+            self.transfer_profile_combo.currentIndexChanged.connect(self.on_transfer_profile_changed)
+            
+            precision_layout.addWidget(precision_label)
+            precision_layout.addWidget(self.transfer_profile_combo)
+            precision_layout.addStretch()
+            save_layout.addLayout(precision_layout)
+        
         save_layout.addWidget(options_label)
         save_layout.addWidget(self.checkbox_add_to_map)
         save_layout.addWidget(self.checkbox_generate_metadata)
@@ -1374,6 +707,22 @@ class DesagregaBiomasBRDialog(QDialog):
         self.adjustSize()
         QTimer.singleShot(10, self.force_resize)
 
+    def get_attribute_profile_hint(self):
+        """Texto de ajuda do campo de atributos com o perfil padrão do tema"""
+        if self.selected_theme == 'DETER':
+            profile = self.wfs_attribute_profiles.get('deter_alerts', [])
+        else:
+            profile = self.wfs_attribute_profiles.get('yearly_deforestation', [])
+        return f"Padrão: {', '.join(profile)}" if profile else "Todos os atributos"
+
+    def on_attributes_changed(self):
+        """Guarda a lista de atributos informada pelo usuário"""
+        self.wfs_attribute_override = self.attributes_edit.toPlainText().strip()
+
+    def on_transfer_profile_changed(self):
+        """Guarda o perfil de transferência escolhido"""
+        self.wfs_transfer_profile = self.transfer_profile_combo.currentData() or 'completo'
+
     def browse_destination_folder(self):
         """Abre diálogo para escolher pasta de destino"""
         from qgis.PyQt.QtWidgets import QFileDialog
@@ -1601,860 +950,146 @@ class DesagregaBiomasBRDialog(QDialog):
         
         self.start_download_mode()  # Ativa modo download com botão abortar
         
-        # Inicia processamento baseado no tema
-        if self.selected_theme == "PRODES":
-            QTimer.singleShot(100, self.process_prodes_data)
-        elif self.selected_theme == "DETER":
-            QTimer.singleShot(100, self.process_deter_data)
-        elif self.selected_theme == "TERRACLASS":
-            QTimer.singleShot(100, self.process_terraclass_data)
-        elif self.selected_theme == "ÁREA QUEIMADA":
-            QTimer.singleShot(100, self.process_queimadas_data)
-        else:
-            self.update_notes(f"❌ ERRO: Processamento para {self.selected_theme} não implementado!")
-            self.end_download_mode(success=False)
+        # Processamento do tema inteiro em uma QgsTask (PipelineJob)
+        QTimer.singleShot(100, self.start_pipeline_job)
+
+    def schedule_next_stage(self, stage):
+        """Encadeia a próxima etapa do processamento sem espera fixa
+        
+        A etapa roda assim que o laço de eventos do Qt volta (interface
+        redesenhada, clique em abortar tratado), em vez de após 0,5-1 s.
+        Com abortar solicitado, a etapa não é chamada.
+        """
+        QTimer.singleShot(self.stage_delay_ms, lambda: self.run_scheduled_stage(stage))
+
+    def run_scheduled_stage(self, stage):
+        """Executa uma etapa agendada, respeitando o pedido de abortar"""
+        if self.check_abort_signal():
+            print(f"🛑 DEBUG: Processamento abortado antes da etapa {stage.__name__}")
+            return
+        stage()
 
-    def process_prodes_data(self):
-        """Processa os dados PRODES conforme configurações - VERSÃO REAL"""
+    def start_pipeline_job(self):
+        """Roda o tema selecionado em uma PipelineJob dentro de uma QgsTask
+        
+        A tarefa recebe uma cópia das seleções (não lê widgets) e faz download,
+        correção, corte, mesclagem, salvamento e metadados. Aqui ficam só as
+        notas (QTimer lendo get_progress_text) e, ao final, o mapa e a
+        interface. Com background_tasks desligado, roda na thread principal.
+        """
         try:
-            print(f"🚀 DEBUG: === INICIANDO PROCESSAMENTO REAL PRODES ===")
-            
-            # NOVO: Reseta log de processamentos para nova operação
-            self.processing_log = []
-            
-            # Gera nome do arquivo baseado nas seleções
-            self.output_filename = self.generate_output_filename()
-            print(f"📁 DEBUG: Nome do arquivo: {self.output_filename}")
+            print(f"🚀 DEBUG: === INICIANDO PROCESSAMENTO REAL {self.selected_theme} ===")
             
-            # Constrói URLs e filtros CQL
-            self.urls_and_filters = self.build_urls_and_filters()
-            print(f"🌐 DEBUG: URLs e filtros: {self.urls_and_filters}")
-            
-            # Inicia processamento REAL
-            self.current_step_index = 0
-            self.processing_layers = []  # Para armazenar layers baixadas
+            if self.radio_shapefile.isChecked():
+                format_name, extension = "ESRI Shapefile", ".shp"
+            else:
+                format_name, extension = "GPKG", ".gpkg"
             
-            # Etapa 1: Conectar aos serviços PRODES
-            self.real_step_connect_services()
+            job = PipelineJob(self, self.dest_path_edit.toPlainText().strip(), format_name, extension,
+                              self.checkbox_generate_metadata.isChecked())
+            self.pipeline_job = job
             
         except Exception as e:
-            print(f"❌ ERROR process_prodes_data: {str(e)}")
+            print(f"❌ ERROR start_pipeline_job: {str(e)}")
             self.status_label.setText(f"❌ Erro no processamento: {str(e)}")
             self.end_download_mode(success=False)
+            return
+        
+        progress_timer = QTimer(self)
+        shown = {'text': None}
+        
+        def show_progress():
+            progress = job.get_progress_text()
+            if progress and progress != shown['text']:
+                self.update_notes(progress, "status")
+                shown['text'] = progress
+        
+        progress_timer.timeout.connect(show_progress)
+        progress_timer.start(300)
+        
+        if not self.background_tasks:
+            try:
+                path, error = job.run(), None
+            except Exception as e:
+                path, error = None, str(e)
+            progress_timer.stop()
+            self.on_pipeline_job_finished(job, path, error)
+            return
+        
+        add_to_map = self.checkbox_add_to_map.isChecked()
+        
+        def finished(path):
+            if sip.isdeleted(self):
+                # Diálogo fechado durante o processamento: o arquivo salvo ainda vai para o mapa
+                if path and add_to_map:
+                    job.add_result_to_map()
+                return
+            progress_timer.stop()
+            show_progress()
+            self.on_pipeline_job_finished(job, path, task.error)
+        
+        task = PipelineTask(f"DesagregaBiomasBR: {self.selected_theme} {self.selected_biome}", job.run, finished)
+        job.background_task = task
+        self.background_task = task
+        QgsApplication.taskManager().addTask(task)
+
+    def on_pipeline_job_finished(self, job, path, error=None):
+        """Fim da PipelineJob (thread principal): abortar, erro ou mapa e notas finais"""
+        if self.pipeline_job is job:
+            self.pipeline_job = None
+            self.background_task = None
+        
+        if job.check_abort_signal():
+            job.cleanup_temp_files()
+            self.abort_download = True
+            self.check_abort_signal()
+            return
+        
+        if not path:
+            self.status_label.setText(f"❌ Erro no processamento: {error or 'processamento não concluído'}")
+            self.end_download_mode(success=False)
+            return
+        
+        # Resultado da tarefa para as notas finais e os metadados exibidos
+        self.output_filename = job.output_filename
+        self.final_file_path = job.final_file_path
+        self.processing_layers = job.processing_layers
+        self.processing_log = job.processing_log
+        if job.metadata_file_path:
+            self.metadata_file_path = job.metadata_file_path
+        
+        self.schedule_next_stage(self.real_step_add_to_qgis)
 
-    def process_deter_data(self):
-        """Processa os dados DETER conforme configurações"""
+    def apply_temporal_filter(self, layer, qgis_expression, layer_name):
+        """Aplica filtro usando expressões nativas do QGIS - ESTRATÉGIA SIMPLIFICADA"""
         try:
-            print(f"🚀 DEBUG: === INICIANDO PROCESSAMENTO REAL DETER ===")
-            
-            # NOVO: Reseta log de processamentos para nova operação
-            self.processing_log = []
+            print(f"⏰ DEBUG: Aplicando filtro QGIS: {qgis_expression}")
+            print(f"📊 DEBUG: Layer original: {layer.featureCount()} feições")
             
-            # Gera nome do arquivo baseado nas seleções DETER
-            self.output_filename = self.generate_deter_output_filename()
-            print(f"📁 DEBUG: Nome do arquivo DETER: {self.output_filename}")
+            # Lista campos disponíveis para debug
+            field_names = [field.name() for field in layer.fields()]
+            print(f"🔍 DEBUG: Campos disponíveis na layer: {field_names}")
             
-            # Constrói URLs e filtros CQL para DETER
-            self.urls_and_filters = self.build_deter_urls_and_filters()
-            print(f"🌐 DEBUG: URLs e filtros DETER: {self.urls_and_filters}")
+            # Cria layer em memória para o resultado filtrado
+            memory_layer = QgsVectorLayer(f"Polygon?crs=EPSG:4674", f"{layer_name}_filtered", "memory")
+            memory_provider = memory_layer.dataProvider()
             
-            # Inicia processamento REAL
-            self.current_step_index = 0
-            self.processing_layers = []  # Para armazenar layers baixadas
+            # Adiciona campos da layer original
+            memory_provider.addAttributes(layer.fields())
+            memory_layer.updateFields()
             
-            # Etapa 1: Conectar aos serviços
-            self.real_step_connect_services()
+            # NOVA ESTRATÉGIA: Usa QgsFeatureRequest com expressão nativa do QGIS
+            request = QgsFeatureRequest()
+            request.setFilterExpression(qgis_expression)
             
-        except Exception as e:
-            print(f"❌ ERROR process_deter_data: {str(e)}")
-            self.status_label.setText(f"❌ Erro no processamento DETER: {str(e)}")
-            self.end_download_mode(success=False)
-
-    def real_step_connect_services(self):
-        """Etapa 1: Conecta aos serviços WFS (PRODES ou DETER)"""
-        try:
-            self.status_label.setText(f"🔄 Conectando aos serviços {self.selected_theme}...")
-            self.update_notes(f"📊 Conectando ao servidor TerraBrasilis | Bioma: {self.selected_biome} | Tema: {self.selected_theme}", "status")
-            
-            # Testa conectividade com os serviços
-            urls = self.urls_and_filters['urls']
-            all_connected = True
-            
-            for i, url in enumerate(urls):
-                print(f"🌐 DEBUG: Testando conectividade com {url[:60]}...")
-                if not self.test_wfs_connectivity(url):
-                    print(f"❌ DEBUG: Falha na conectividade com URL {i+1}")
-                    all_connected = False
-                    break
-                else:
-                    print(f"✅ DEBUG: Conectividade OK com URL {i+1}")
+            # Aplica filtro e copia feições filtradas
+            filtered_features = []
+            for feature in layer.getFeatures(request):
+                filtered_features.append(feature)
             
-            if all_connected:
-                print(f"✅ DEBUG: Todas as conexões WFS estão funcionais")
-                # Agenda próxima etapa
-                QTimer.singleShot(1000, self.real_step_download_data)
-            else:
-                raise Exception(f"Falha na conectividade com serviços {self.selected_theme}")
-                
-        except Exception as e:
-            print(f"❌ ERROR real_step_connect_services: {str(e)}")
-            self.status_label.setText(f"❌ Erro na conexão: {str(e)}")
-            self.progress_bar.setVisible(False)
-            self.btn_process.setEnabled(True)
-
-    def real_step_download_data(self):
-        """Etapa 2: Baixa dados do servidor"""
-        try:
-            self.status_label.setText("📥 Baixando dados do servidor...")
-            
-            urls = self.urls_and_filters['urls']
-            filters = self.urls_and_filters['filters']
-            layer_names = self.urls_and_filters['layer_names']
-            
-            self.update_notes(f"📥 Baixando {len(urls)} camada(s) | {' + '.join(layer_names)}", "status")
-            
-            self.processing_layers = []
-            
-            for i, (url, filter_str, layer_name) in enumerate(zip(urls, filters, layer_names)):
-                print(f"🔄 DEBUG: Baixando camada {i+1}/{len(urls)}: {layer_name}")
-                
-                # NOVA IMPLEMENTAÇÃO: Constrói URL simples com filtro
-                if filter_str:
-                    # Adiciona apenas o filtro CQL à URL base
-                    download_url = f"{url}?CQL_FILTER={filter_str}"
-                else:
-                    # URL base sem filtro para accumulated_deforestation
-                    download_url = url
-                
-                print(f"🌐 DEBUG: URL de download: {download_url[:100]}...")
-                
-                # Baixa a camada usando a nova implementação
-                layer = self.download_wfs_layer(download_url, f"{layer_name}_{self.selected_biome}")
-                
-                if layer and layer.isValid() and layer.featureCount() > 0:
-                    # CORREÇÃO DETER: Aplica memory_filter se for DETER
-                    if self.selected_theme == 'DETER' and 'memory_filter' in self.urls_and_filters and self.urls_and_filters['memory_filter']:
-                        memory_filter = self.urls_and_filters['memory_filter']
-                        print(f"⏰ DEBUG: Aplicando filtro DETER na memória: {memory_filter}")
-                        print(f"📊 DEBUG: Layer original DETER: {layer.featureCount()} feições")
-                        
-                        # Lista campos disponíveis para debug
-                        field_names = [field.name() for field in layer.fields()]
-                        print(f"🔍 DEBUG: Campos disponíveis na layer: {field_names}")
-                        
-                        # Aplica filtro temporal/classes do DETER
-                        filtered_layer = self.apply_temporal_filter(layer, memory_filter, f"{layer_name}_filtered")
-                        if filtered_layer and filtered_layer.isValid():
-                            original_count = layer.featureCount()
-                            layer = filtered_layer
-                            filtered_count = layer.featureCount()
-                            print(f"✅ DEBUG: Filtro DETER aplicado: {filtered_count} feições (de {original_count} originais)")
-                            
-                            # Debug adicional: verifica se restaram feições após filtro
-                            if filtered_count == 0:
-                                print(f"⚠️ WARNING: Filtro DETER resultou em 0 feições - pode haver problema no filtro")
-                                print(f"⚠️ DEBUG: Filtro aplicado: {memory_filter}")
-                        else:
-                            print(f"⚠️ DEBUG: Falha no filtro DETER, usando dados completos")
-                    
-                    self.processing_layers.append(layer)
-                    print(f"✅ DEBUG: Camada {layer_name} processada: {layer.featureCount()} feições")
-                else:
-                    raise Exception(f"Falha ao baixar camada {layer_name}")
-            
-            print(f"✅ DEBUG: Todas as camadas baixadas com sucesso")
-            
-            # Agenda próxima etapa
-            QTimer.singleShot(1000, self.real_step_apply_spatial_cut)
-            
-        except Exception as e:
-            print(f"❌ ERROR real_step_download_data: {str(e)}")
-            self.status_label.setText(f"❌ Erro no download: {str(e)}")
-            self.end_download_mode(success=False)
-
-    def download_wfs_layer(self, url, layer_name):
-        """Baixa uma camada WFS com paginação automática - ESTRATÉGIA SIMPLIFICADA
-        
-        ESTRATÉGIA: 
-        - Sempre usa CQL_FILTER para filtros temporais (quando disponível)
-        - NUNCA usa BBOX no WFS (cortes espaciais são feitos depois via geoprocessamento)
-        - Isso garante que o filtro temporal seja aplicado no servidor, reduzindo volume de download
-        """
-        try:
-            print(f"🔄 DEBUG: Baixando dados WFS com paginação: {layer_name}")
-            print(f"🔄 DEBUG: ESTRATÉGIA SIMPLIFICADA - CQL_FILTER no WFS, cortes espaciais depois")
-            
-            # Extrai typename da URL base
-            typename = self.extract_typename_from_url(url, layer_name)
-            if not typename:
-                print(f"❌ DEBUG: Não foi possível extrair typename")
-                return None
-            
-            # Separa URL base dos parâmetros
-            base_url = url.split('?')[0]
-            
-            # Extrai filtro CQL da URL (será aplicado no WFS)
-            cql_filter = None
-            if 'CQL_FILTER=' in url:
-                cql_filter = url.split('CQL_FILTER=')[1].split('&')[0]
-                cql_filter = cql_filter.replace('%20', ' ').replace('%27', "'")
-                print(f"📅 DEBUG: Filtro CQL extraído: {cql_filter}")
-            
-            # Configuração de paginação
-            page_size = 50000  # Tamanho de cada página
-            start_index = 0
-            all_temp_files = []
-            total_features = 0
-            
-            if cql_filter:
-                print(f"📅 DEBUG: Download com CQL_FILTER: {cql_filter}")
-            else:
-                print(f"🌍 DEBUG: Download sem filtros - dados completos do bioma")
-            print(f"📊 DEBUG: Iniciando download paginado (páginas de {page_size} feições)")
-            
-            import requests
-            import tempfile
-            temp_dir = tempfile.gettempdir()
-            
-            # Loop de paginação
-            page_number = 1
-            while True:
-                # VERIFICAÇÃO DE ABORT: Para interromper download se solicitado
-                if self.check_abort_signal():
-                    print(f"🛑 DEBUG: Download abortado pelo usuário na página {page_number}")
-                    return None
-                
-                print(f"📄 DEBUG: Baixando página {page_number} (índice {start_index})...")
-                
-                # Parâmetros WFS - sempre inclui CQL_FILTER quando disponível
-                params = {
-                    "service": "WFS",
-                    "version": "2.0.0",
-                    "request": "GetFeature",
-                    "typeName": typename,
-                    "outputFormat": "GML2",
-                    "srsName": "EPSG:4674",
-                    "count": page_size,
-                    "startIndex": start_index
-                }
-                
-                # Adiciona CQL_FILTER se disponível
-                if cql_filter:
-                    params["CQL_FILTER"] = cql_filter
-                
-                # Atualiza notas com progresso
-                if hasattr(self, 'update_notes'):
-                    self.update_notes(f"📄 Baixando página {page_number} ({total_features} feições baixadas)", "status")
-                
-                # Processa eventos da interface para detectar clique no botão abortar
-                QgsApplication.processEvents()
-                
-                # Verificação de abort adicional antes da requisição HTTP
-                if self.check_abort_signal():
-                    print(f"🛑 DEBUG: Download abortado antes da requisição da página {page_number}")
-                    return None
-                
-                # Faz requisição
-                response = requests.get(base_url, params=params, timeout=120)
-                
-                if response.status_code != 200:
-                    print(f"❌ DEBUG: Erro HTTP {response.status_code} na página {page_number}")
-                    if page_number == 1:
-                        # Se a primeira página falha, tenta com WFS 1.0
-                        print(f"🔄 DEBUG: Tentando com WFS 1.0 sem paginação...")
-                        return self.download_wfs_layer_fallback(url, layer_name)
-                    else:
-                        break  # Para o loop se páginas subsequentes falham
-                
-                # Salva arquivo temporário desta página
-                temp_file = os.path.join(temp_dir, f"{layer_name}_page_{page_number}_{id(self)}.gml")
-                
-                with open(temp_file, 'wb') as f:
-                    f.write(response.content)
-                
-                # Verifica se a página tem dados válidos
-                if len(response.content) < 1000:
-                    print(f"⚠️ DEBUG: Página {page_number} muito pequena, verificando...")
-                    with open(temp_file, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read(500)
-                        if 'ows:ExceptionReport' in content or 'ServiceException' in content:
-                            print(f"❌ DEBUG: Erro no servidor na página {page_number}")
-                            break
-                        elif 'numberOfFeatures="0"' in content or ('<wfs:FeatureCollection' in content and '</wfs:FeatureCollection>' in content and 'gml:featureMember' not in content):
-                            print(f"✅ DEBUG: Página {page_number} vazia - fim dos dados")
-                            break
-                
-                # Testa se a página tem feições
-                test_layer = QgsVectorLayer(temp_file, f"test_page_{page_number}", "ogr")
-                if test_layer.isValid():
-                    page_features = test_layer.featureCount()
-                    if page_features == 0:
-                        print(f"✅ DEBUG: Página {page_number} sem feições - fim dos dados")
-                        break
-                    else:
-                        print(f"✅ DEBUG: Página {page_number}: {page_features} feições")
-                        all_temp_files.append(temp_file)
-                        total_features += page_features
-                        
-                        # Se esta página tem menos feições que o tamanho da página, é a última
-                        if page_features < page_size:
-                            print(f"✅ DEBUG: Última página detectada ({page_features} < {page_size})")
-                            break
-                else:
-                    print(f"❌ DEBUG: Página {page_number} inválida")
-                    break
-                
-                # Prepara próxima página
-                start_index += page_size
-                page_number += 1
-                
-                # Atualiza interface
-                QgsApplication.processEvents()
-                
-                # Verificação final de abort entre páginas
-                if self.check_abort_signal():
-                    print(f"🛑 DEBUG: Download abortado entre páginas {page_number-1} e {page_number}")
-                    return None
-                
-                # Proteção contra loop infinito
-                if page_number > 100:  # Máximo 100 páginas = 5 milhões de feições
-                    print(f"⚠️ DEBUG: Limite de páginas atingido (100)")
-                    break
-            
-            print(f"📊 DEBUG: Download concluído - {total_features} feições em {len(all_temp_files)} páginas")
-            
-            if not all_temp_files:
-                print(f"❌ DEBUG: Nenhuma página válida baixada")
-                return None
-            
-            # Atualiza notas finais
-            if hasattr(self, 'update_notes'):
-                self.update_notes(f"🔗 Combinando {len(all_temp_files)} páginas ({total_features} feições)...", "status")
-            
-            # Se apenas uma página, usa ela diretamente
-            if len(all_temp_files) == 1:
-                final_layer = QgsVectorLayer(all_temp_files[0], layer_name, "ogr")
-            else:
-                # Combina múltiplas páginas em uma layer única
-                print(f"🔗 DEBUG: Combinando {len(all_temp_files)} páginas...")
-                final_layer = self.merge_wfs_pages(all_temp_files, layer_name)
-            
-            if final_layer and final_layer.isValid():
-                QgsApplication.processEvents()
-                final_count = final_layer.featureCount()
-                print(f"✅ DEBUG: Layer final carregada com {final_count} feições")
-                
-                # CORREÇÃO 2: Força projeção SIRGAS 2000 (EPSG:4674)
-                target_crs = QgsCoordinateReferenceSystem("EPSG:4674")
-                if final_layer.crs() != target_crs:
-                    print(f"🗺️ DEBUG: Corrigindo projeção para SIRGAS 2000 (EPSG:4674)")
-                    final_layer.setCrs(target_crs)
-                
-                # CORREÇÃO 3: Aplica fix geometry nos dados PRODES baixados
-                print(f"🔧 DEBUG: Aplicando fix geometry nos dados PRODES baixados...")
-                fixed_final_layer = self.auto_fix_geometries(final_layer, "prodes_downloaded")
-                if fixed_final_layer and fixed_final_layer.isValid():
-                    print(f"✅ DEBUG: Fix geometry aplicado nos dados PRODES: {fixed_final_layer.featureCount()} feições")
-                    final_layer = fixed_final_layer
-                    # Força projeção novamente na layer corrigida
-                    if final_layer.crs() != target_crs:
-                        final_layer.setCrs(target_crs)
-                else:
-                    print(f"⚠️ DEBUG: Fix geometry falhou nos dados PRODES, usando layer original")
-                
-                # Filtro temporal já foi aplicado no WFS via CQL_FILTER (se havia filtro)
-                # Cortes espaciais serão aplicados depois via geoprocessamento
-                if cql_filter:
-                    print(f"✅ DEBUG: Filtro temporal aplicado no WFS via CQL_FILTER")
-                    if hasattr(self, 'update_notes'):
-                        self.update_notes(f"✅ WFS baixado com filtro: {final_count} feições ({len(all_temp_files)} páginas)", "status")
-                else:
-                    print(f"✅ DEBUG: Download completo (sem filtro temporal)")
-                    if hasattr(self, 'update_notes'):
-                        self.update_notes(f"✅ WFS baixado: {final_count} feições ({len(all_temp_files)} páginas)", "status")
-                
-                return final_layer
-            else:
-                print(f"❌ DEBUG: Falha ao criar layer final")
-                return None
-                
-        except Exception as e:
-            print(f"❌ ERROR download_wfs_layer: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
-
-    def download_wfs_layer_fallback(self, url, layer_name):
-        """Fallback para WFS 1.0 sem paginação - ESTRATÉGIA SIMPLIFICADA
-        
-        ESTRATÉGIA: 
-        - Sempre usa CQL_FILTER para filtros temporais (quando disponível)
-        - NUNCA usa BBOX no WFS (cortes espaciais são feitos depois via geoprocessamento)
-        """
-        try:
-            print(f"🔄 DEBUG: Fallback - Baixando dados WFS sem paginação: {layer_name}")
-            print(f"🔄 DEBUG: ESTRATÉGIA SIMPLIFICADA - CQL_FILTER no WFS, cortes espaciais depois")
-            
-            # Extrai typename da URL base
-            typename = self.extract_typename_from_url(url, layer_name)
-            base_url = url.split('?')[0]
-            
-            # Extrai filtro CQL da URL (será aplicado no WFS)
-            cql_filter = None
-            if 'CQL_FILTER=' in url:
-                cql_filter = url.split('CQL_FILTER=')[1].split('&')[0]
-                cql_filter = cql_filter.replace('%20', ' ').replace('%27', "'")
-                print(f"📅 DEBUG: Filtro CQL extraído: {cql_filter}")
-            
-            # Parâmetros WFS - sempre inclui CQL_FILTER quando disponível
-            params = {
-                "service": "WFS",
-                "version": "1.0.0", 
-                "request": "GetFeature",
-                "typeName": typename,
-                "outputFormat": "GML2",
-                "srsName": "EPSG:4674"
-            }
-            
-            # Adiciona CQL_FILTER se disponível
-            if cql_filter:
-                params["CQL_FILTER"] = cql_filter
-                print(f"📅 DEBUG: FALLBACK com CQL_FILTER: {cql_filter}")
-            else:
-                print(f"🌍 DEBUG: FALLBACK sem filtros - dados completos")
-            
-            print(f"🌐 DEBUG: URL base: {base_url}")
-            print(f"📋 DEBUG: Parâmetros: {params}")
-            
-            # Faz download usando requests
-            import requests
-            response = requests.get(base_url, params=params, timeout=120)
-            
-            if response.status_code != 200:
-                print(f"❌ DEBUG: Erro HTTP {response.status_code}: {response.text[:200]}")
-                return None
-            
-            # Salva arquivo temporário
-            import tempfile
-            temp_dir = tempfile.gettempdir()
-            temp_file = os.path.join(temp_dir, f"{layer_name}_{id(self)}.gml")
-            
-            with open(temp_file, 'wb') as f:
-                f.write(response.content)
-            
-            print(f"📁 DEBUG: Arquivo temporário salvo: {temp_file}")
-            print(f"📊 DEBUG: Tamanho do arquivo: {len(response.content)} bytes")
-            
-            # Carrega como layer do QGIS
-            layer = QgsVectorLayer(temp_file, layer_name, "ogr")
-            
-            if not layer.isValid():
-                print(f"❌ DEBUG: Layer inválida: {layer.error().message()}")
-                layer = QgsVectorLayer(f"{temp_file}|encoding=UTF-8", layer_name, "ogr")
-                
-                if not layer.isValid():
-                    print(f"❌ DEBUG: Layer ainda inválida mesmo com UTF-8")
-                    return None
-            
-            QgsApplication.processEvents()
-            feature_count = layer.featureCount()
-            print(f"✅ DEBUG: Layer fallback carregada com {feature_count} feições")
-            
-            # CORREÇÃO 2: Força projeção SIRGAS 2000 (EPSG:4674) no fallback
-            target_crs = QgsCoordinateReferenceSystem("EPSG:4674")
-            if layer.crs() != target_crs:
-                print(f"🗺️ DEBUG: Corrigindo projeção fallback para SIRGAS 2000 (EPSG:4674)")
-                layer.setCrs(target_crs)
-            
-            # CORREÇÃO 3: Aplica fix geometry nos dados PRODES baixados (fallback)
-            print(f"🔧 DEBUG: Aplicando fix geometry nos dados PRODES baixados (fallback)...")
-            fixed_layer = self.auto_fix_geometries(layer, "prodes_downloaded_fallback")
-            if fixed_layer and fixed_layer.isValid():
-                print(f"✅ DEBUG: Fix geometry aplicado nos dados PRODES (fallback): {fixed_layer.featureCount()} feições")
-                layer = fixed_layer
-                # Força projeção novamente na layer corrigida
-                if layer.crs() != target_crs:
-                    layer.setCrs(target_crs)
-            else:
-                print(f"⚠️ DEBUG: Fix geometry falhou nos dados PRODES (fallback), usando layer original")
-            
-            # Filtro temporal já foi aplicado no WFS via CQL_FILTER (se havia filtro)
-            # Cortes espaciais serão aplicados depois via geoprocessamento
-            if cql_filter:
-                print(f"✅ DEBUG: Filtro temporal aplicado no WFS via CQL_FILTER (fallback)")
-            else:
-                print(f"✅ DEBUG: Download completo (sem filtro temporal) - fallback")
-            
-            return layer
-            
-        except Exception as e:
-            print(f"❌ ERROR download_wfs_layer_fallback: {str(e)}")
-            return None
-
-    def merge_wfs_pages(self, temp_files, layer_name):
-        """Combina múltiplas páginas WFS em uma layer única"""
-        try:
-            print(f"🔗 DEBUG: Mesclando {len(temp_files)} páginas WFS...")
-            
-            # Carrega primeira página como base
-            first_layer = QgsVectorLayer(temp_files[0], "first_page", "ogr")
-            if not first_layer.isValid():
-                print(f"❌ DEBUG: Primeira página inválida")
-                return None
-            
-            # Cria layer em memória para combinar todas
-            memory_layer = QgsVectorLayer(f"Polygon?crs={first_layer.crs().authid()}", layer_name, "memory")
-            memory_provider = memory_layer.dataProvider()
-            
-            # Adiciona campos da primeira layer
-            memory_provider.addAttributes(first_layer.fields())
-            memory_layer.updateFields()
-            
-            total_added = 0
-            
-            # Adiciona feições de todas as páginas
-            for i, temp_file in enumerate(temp_files):
-                print(f"🔗 DEBUG: Processando página {i+1}/{len(temp_files)}...")
-                
-                # Atualiza interface periodicamente
-                if i % 5 == 0:
-                    QgsApplication.processEvents()
-                    if hasattr(self, 'update_notes'):
-                        self.update_notes(f"🔗 Combinando página {i+1}/{len(temp_files)} ({total_added} feições)", "status")
-                
-                page_layer = QgsVectorLayer(temp_file, f"page_{i+1}", "ogr")
-                if page_layer.isValid():
-                    features = list(page_layer.getFeatures())
-                    if features:
-                        memory_provider.addFeatures(features)
-                        total_added += len(features)
-                        print(f"✅ DEBUG: Adicionadas {len(features)} feições da página {i+1}")
-                else:
-                    print(f"⚠️ DEBUG: Página {i+1} inválida, pulando...")
-            
-            memory_layer.updateExtents()
-            print(f"✅ DEBUG: Mesclagem concluída - {total_added} feições totais")
-            
-            return memory_layer
-            
-        except Exception as e:
-            print(f"❌ ERROR merge_wfs_pages: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
-
-    def extract_typename_from_url(self, url, layer_name):
-        """Extrai o typename correto baseado na URL e nome da layer
-        
-        NOTA: Para Amazônia, usa typenames da Amazônia Legal (WFS mais estável)
-        """
-        try:
-            # Mapeamento de typenames corretos por bioma
-            typename_mapping = {
-                'Pantanal': {
-                    'accumulated_deforestation': 'prodes-pantanal-nb:accumulated_deforestation_2000',
-                    'yearly_deforestation': 'prodes-pantanal-nb:yearly_deforestation',
-                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'  # DETER Pantanal usa mesmo endpoint do Cerrado
-                },
-                'Cerrado': {
-                    'accumulated_deforestation': 'prodes-cerrado-nb:accumulated_deforestation_2000',
-                    'yearly_deforestation': 'prodes-cerrado-nb:yearly_deforestation',
-                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'
-                },
-                'Pampa': {
-                    'accumulated_deforestation': 'prodes-pampa-nb:accumulated_deforestation_2000',
-                    'yearly_deforestation': 'prodes-pampa-nb:yearly_deforestation',
-                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'  # DETER Pampa usa mesmo endpoint do Cerrado
-                },
-                'Caatinga': {
-                    'accumulated_deforestation': 'prodes-caatinga-nb:accumulated_deforestation_2000',
-                    'yearly_deforestation': 'prodes-caatinga-nb:yearly_deforestation',
-                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'  # DETER Caatinga usa mesmo endpoint do Cerrado
-                },
-                'Mata Atlântica': {
-                    'accumulated_deforestation': 'prodes-mata-atlantica-nb:accumulated_deforestation_2000',
-                    'yearly_deforestation': 'prodes-mata-atlantica-nb:yearly_deforestation',
-                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'  # DETER Mata Atlântica usa mesmo endpoint do Cerrado
-                },
-                'Amazônia Legal': {
-                    'accumulated_deforestation': 'prodes-legal-amz:accumulated_deforestation_2007',
-                    'yearly_deforestation': 'prodes-legal-amz:yearly_deforestation',
-                    'deter_alerts': 'deter-amz:deter_amz'
-                }
-            }
-            
-            # Determina tipo de layer
-            if 'accumulated' in layer_name.lower():
-                layer_type = 'accumulated_deforestation'
-            elif 'deter' in layer_name.lower() or layer_name == 'deter_alerts':
-                layer_type = 'deter_alerts'
-            else:
-                layer_type = 'yearly_deforestation'
-            
-            # CORREÇÃO: Para Amazônia, usar typenames da Amazônia Legal
-            import unicodedata
-            effective_biome = self.selected_biome
-            biome_normalized = unicodedata.normalize('NFC', self.selected_biome) if self.selected_biome else self.selected_biome
-            amazonia_check = unicodedata.normalize('NFC', 'Amazônia')
-            
-            print(f"🔍 DEBUG extract_typename: selected_biome = '{self.selected_biome}'")
-            print(f"🔍 DEBUG extract_typename: biome_normalized == amazonia_check = {biome_normalized == amazonia_check}")
-            
-            if biome_normalized == amazonia_check:
-                effective_biome = 'Amazônia Legal'
-                print(f"🔄 DEBUG extract_typename: Convertendo Amazônia → Amazônia Legal")
-            
-            # Busca typename correto
-            biome_mapping = typename_mapping.get(effective_biome, {})
-            typename = biome_mapping.get(layer_type)
-            
-            if typename:
-                print(f"✅ DEBUG: Typename encontrado: {typename}")
-                return typename
-            else:
-                print(f"❌ DEBUG: Typename não encontrado para {self.selected_biome} - {layer_type}")
-                # Fallback: extrai da URL
-                if '/geoserver/' in url:
-                    parts = url.split('/geoserver/')[1].split('/')[0:2]
-                    if len(parts) >= 2:
-                        namespace = parts[0]
-                        layer_part = parts[1]
-                        fallback_typename = f"{namespace}:{layer_part}"
-                        print(f"🔄 DEBUG: Usando fallback typename: {fallback_typename}")
-                        return fallback_typename
-                        
-                return None
-                
-        except Exception as e:
-            print(f"❌ ERROR extract_typename_from_url: {str(e)}")
-            return None
-
-    def get_cut_geometry_bbox(self):
-        """
-        Extrai bounding box da geometria de corte para otimização WFS
-        NOVA VERSÃO: Usa a mesma lógica dos testes de BBOX que funcionaram
-        """
-        try:
-            print(f"🗺️ DEBUG: === EXTRAÇÃO DE BBOX PARA WFS ===")
-            print(f"🔍 DEBUG: Verificando variáveis disponíveis...")
-            
-            # DEBUG COMPLETO: Verifica todas as variáveis
-            print(f"🔍 DEBUG: hasattr selected_layer: {hasattr(self, 'selected_layer')}")
-            print(f"🔍 DEBUG: selected_layer value: {getattr(self, 'selected_layer', 'N/A')}")
-            print(f"🔍 DEBUG: hasattr selected_field: {hasattr(self, 'selected_field')}")
-            print(f"🔍 DEBUG: selected_field value: {getattr(self, 'selected_field', 'N/A')}")
-            print(f"🔍 DEBUG: hasattr selected_element: {hasattr(self, 'selected_element')}")
-            print(f"🔍 DEBUG: selected_element value: {getattr(self, 'selected_element', 'N/A')}")
-            
-            # ESTRATÉGIA 1: Se tem layer + campo + elemento selecionados (já testado e funcionando)
-            if (hasattr(self, 'selected_layer') and self.selected_layer and 
-                hasattr(self, 'selected_field') and self.selected_field and 
-                hasattr(self, 'selected_element') and self.selected_element):
-                
-                print(f"                ✅ DEBUG: TODAS as variáveis estão disponíveis!")
-                print(f"🎯 DEBUG: Usando layer específico: {self.selected_layer.name()}")
-                print(f"🎯 DEBUG: Campo: {self.selected_field}, Elemento: {self.selected_element}")
-                
-                # CORREÇÃO: Fix geometries antes de aplicar filtro
-                print(f"🔧 DEBUG: Aplicando fix geometry no layer de corte...")
-                fixed_layer = self.auto_fix_geometries(self.selected_layer, "corte")
-                if fixed_layer and fixed_layer.isValid():
-                    print(f"✅ DEBUG: Layer com geometrias corrigidas: {fixed_layer.featureCount()} feições")
-                    layer_to_filter = fixed_layer
-                else:
-                    print(f"⚠️ DEBUG: Fix geometry falhou, usando layer original")
-                    layer_to_filter = self.selected_layer
-                
-                # Aplica filtro (igual ao teste que funcionou)
-                from qgis.core import QgsFeatureRequest
-                
-                # CORREÇÃO: Testa diferentes formatos de expressão
-                element_clean = str(self.selected_element).strip()
-                field_clean = str(self.selected_field).strip()
-                
-                print(f"🔍 DEBUG: Campo limpo: '{field_clean}'")
-                print(f"🔍 DEBUG: Elemento limpo: '{element_clean}'")
-                
-                # Testa expressões com diferentes formatos
-                expressions_to_try = [
-                    f'"{field_clean}" = \'{element_clean}\'',  # Formato original
-                    f"{field_clean} = '{element_clean}'",      # Sem aspas duplas no campo
-                    f'"{field_clean}" = "{element_clean}"',    # Aspas duplas no valor
-                    f'{field_clean} = "{element_clean}"',      # Sem aspas no campo, duplas no valor
-                ]
-                
-                filtered_layer = None
-                working_expression = None
-                
-                for i, expression in enumerate(expressions_to_try):
-                     print(f"🔍 DEBUG: Tentativa {i+1}: {expression}")
-                     try:
-                         request = QgsFeatureRequest().setFilterExpression(expression)
-                         test_layer = layer_to_filter.materialize(request)
-                         
-                         if test_layer and test_layer.isValid() and test_layer.featureCount() > 0:
-                             print(f"✅ DEBUG: SUCESSO na tentativa {i+1}! {test_layer.featureCount()} feições encontradas")
-                             filtered_layer = test_layer
-                             working_expression = expression
-                             break
-                         else:
-                             print(f"❌ DEBUG: Tentativa {i+1} falhou - {test_layer.featureCount() if test_layer else 0} feições")
-                     except Exception as e:
-                         print(f"❌ DEBUG: Erro na tentativa {i+1}: {e}")
-                
-                print(f"🔍 DEBUG: Expressão final que funcionou: {working_expression}")
-                print(f"🔍 DEBUG: Layer filtrado final: {filtered_layer.featureCount() if filtered_layer else 0} feições")
-                
-                # Se nenhuma expressão funcionou, lista valores reais do campo
-                if not filtered_layer:
-                    print(f"🔍 DEBUG: NENHUMA expressão funcionou! Listando valores reais do campo '{field_clean}':")
-                    try:
-                        unique_values = []
-                        for feature in self.selected_layer.getFeatures():
-                            value = feature[field_clean]
-                            if value and value not in unique_values:
-                                unique_values.append(str(value))
-                                if len(unique_values) <= 10:  # Mostra só os primeiros 10
-                                    print(f"   📋 Valor real: '{value}' (tipo: {type(value).__name__})")
-                        
-                        print(f"🔍 DEBUG: Total de valores únicos encontrados: {len(unique_values)}")
-                        print(f"🔍 DEBUG: Elemento procurado: '{element_clean}' (tipo: {type(element_clean).__name__})")
-                        
-                        # Verifica se há match exato (case insensitive)
-                        element_lower = element_clean.lower()
-                        matches = [v for v in unique_values if v.lower() == element_lower]
-                        if matches:
-                            print(f"✅ DEBUG: Match encontrado (case insensitive): '{matches[0]}'")
-                            # Tenta novamente com o valor exato encontrado
-                            exact_expression = f'"{field_clean}" = \'{matches[0]}\''
-                            print(f"🔍 DEBUG: Tentando com valor exato: {exact_expression}")
-                            request = QgsFeatureRequest().setFilterExpression(exact_expression)
-                            filtered_layer = self.selected_layer.materialize(request)
-                            working_expression = exact_expression
-                            
-                    except Exception as e:
-                        print(f"❌ DEBUG: Erro ao listar valores: {e}")
-                
-                print(f"🔍 DEBUG: Layer original: {self.selected_layer.featureCount()} feições")
-                print(f"🔍 DEBUG: Filtered layer válido: {filtered_layer.isValid() if filtered_layer else 'None'}")
-                print(f"🔍 DEBUG: Filtered layer count: {filtered_layer.featureCount() if filtered_layer else 'N/A'}")
-                
-                if filtered_layer and filtered_layer.isValid() and filtered_layer.featureCount() > 0:
-                    extent = filtered_layer.extent()
-                    print(f"✅ DEBUG: SUCESSO - {filtered_layer.featureCount()} feições filtradas")
-                    print(f"📍 DEBUG: BBOX do elemento '{self.selected_element}' extraído")
-                    print(f"📍 DEBUG: Extent filtrado: {extent.xMinimum():.6f},{extent.yMinimum():.6f},{extent.xMaximum():.6f},{extent.yMaximum():.6f}")
-                else:
-                    # FALLBACK: Se filtro falhou, usa layer completo
-                    extent = self.selected_layer.extent()
-                    print(f"❌ DEBUG: FILTRO FALHOU - usando layer completo")
-                    print(f"❌ DEBUG: Razão: filtered_layer={filtered_layer}, valid={filtered_layer.isValid() if filtered_layer else 'N/A'}, count={filtered_layer.featureCount() if filtered_layer else 'N/A'}")
-                    print(f"📍 DEBUG: Extent completo: {extent.xMinimum():.6f},{extent.yMinimum():.6f},{extent.xMaximum():.6f},{extent.yMaximum():.6f}")
-                    
-                    # ADICIONA mensagem específica nas Notas sobre o erro
-                    current_text = self.notes_text.toPlainText()
-                    self.notes_text.setPlainText(current_text + f"\n❌ FALHA NO FILTRO: Usando BBOX do layer completo")
-                    self.notes_text.setPlainText(self.notes_text.toPlainText() + f"\n🔍 Expressão testada: {expression}")
-                    
-            # ESTRATÉGIA 2: Se tem cut_layer (fallback para outras opções)
-            elif hasattr(self, 'cut_option') and self.cut_option is not None and self.cut_option != 0:
-                cut_layer = self.get_cut_layer()
-                if cut_layer and cut_layer.isValid():
-                    extent = cut_layer.extent()
-                    print(f"📊 DEBUG: Usando cut_layer com {cut_layer.featureCount()} feições")
-                else:
-                    print(f"❌ DEBUG: cut_layer inválido")
-                    return None
-                    
-            # ESTRATÉGIA 3: Se tem retângulo desenhado
-            elif hasattr(self, 'drawn_rectangle') and self.drawn_rectangle:
-                extent = self.drawn_rectangle
-                print(f"📊 DEBUG: Usando retângulo desenhado")
-                
-            else:
-                print(f"❌ DEBUG: NENHUMA geometria de corte encontrada!")
-                print(f"❌ DEBUG: Verificar se usuário fez as seleções corretas:")
-                print(f"   📋 Layer carregado: {hasattr(self, 'selected_layer') and self.selected_layer}")
-                print(f"   📋 Campo selecionado: {hasattr(self, 'selected_field') and self.selected_field}")
-                print(f"   📋 Elemento selecionado: {hasattr(self, 'selected_element') and self.selected_element}")
-                print(f"   📋 Cut option definida: {hasattr(self, 'cut_option') and self.cut_option is not None}")
-                print(f"   📋 Retângulo desenhado: {hasattr(self, 'drawn_rectangle') and self.drawn_rectangle}")
-                
-                # Adiciona informações nas Notas sobre o que falta
-                current_text = self.notes_text.toPlainText()
-                self.notes_text.setPlainText(current_text + f"\n❌ SEM BBOX: Nenhuma geometria de corte encontrada")
-                
-                if not (hasattr(self, 'selected_layer') and self.selected_layer):
-                    self.notes_text.setPlainText(self.notes_text.toPlainText() + f"\n   ❌ Falta: Selecionar layer")
-                if not (hasattr(self, 'selected_field') and self.selected_field):
-                    self.notes_text.setPlainText(self.notes_text.toPlainText() + f"\n   ❌ Falta: Selecionar campo")
-                if not (hasattr(self, 'selected_element') and self.selected_element):
-                    self.notes_text.setPlainText(self.notes_text.toPlainText() + f"\n   ❌ Falta: Selecionar elemento")
-                
-                return None
-            
-            if extent.isEmpty():
-                print(f"⚠️ DEBUG: Extent vazio")
-                return None
-            
-            # Converte para EPSG:4674 se necessário (simplificado)
-            if (hasattr(self, 'selected_layer') and self.selected_layer and 
-                self.selected_layer.crs() != QgsCoordinateReferenceSystem("EPSG:4674")):
-                
-                from qgis.core import QgsCoordinateTransform, QgsProject
-                layer_crs = self.selected_layer.crs()
-                target_crs = QgsCoordinateReferenceSystem("EPSG:4674")
-                transform = QgsCoordinateTransform(layer_crs, target_crs, QgsProject.instance())
-                extent = transform.transformBoundingBox(extent)
-                print(f"🔄 DEBUG: Convertido de {layer_crs.authid()} para EPSG:4674")
-            
-            # Formata BBOX para WFS
-            bbox_str = f"{extent.xMinimum():.6f},{extent.yMinimum():.6f},{extent.xMaximum():.6f},{extent.yMaximum():.6f},EPSG:4674"
-            
-            print(f"✅ DEBUG: BBOX extraído para WFS: {bbox_str}")
-            
-            # Adiciona à caixa de Notas também
-            current_text = self.notes_text.toPlainText()
-            self.notes_text.setPlainText(current_text + f"\n🌐 BBOX WFS: {bbox_str}")
-            
-            return bbox_str
-            
-        except Exception as e:
-            print(f"❌ DEBUG: Erro ao extrair BBOX: {str(e)}")
-            current_text = self.notes_text.toPlainText()
-            self.notes_text.setPlainText(current_text + f"\n❌ ERRO BBOX WFS: {e}")
-            return None
-
-    def apply_temporal_filter(self, layer, qgis_expression, layer_name):
-        """Aplica filtro usando expressões nativas do QGIS - ESTRATÉGIA SIMPLIFICADA"""
-        try:
-            print(f"⏰ DEBUG: Aplicando filtro QGIS: {qgis_expression}")
-            print(f"📊 DEBUG: Layer original: {layer.featureCount()} feições")
-            
-            # Lista campos disponíveis para debug
-            field_names = [field.name() for field in layer.fields()]
-            print(f"🔍 DEBUG: Campos disponíveis na layer: {field_names}")
-            
-            # Cria layer em memória para o resultado filtrado
-            memory_layer = QgsVectorLayer(f"Polygon?crs=EPSG:4674", f"{layer_name}_filtered", "memory")
-            memory_provider = memory_layer.dataProvider()
-            
-            # Adiciona campos da layer original
-            memory_provider.addAttributes(layer.fields())
-            memory_layer.updateFields()
-            
-            # NOVA ESTRATÉGIA: Usa QgsFeatureRequest com expressão nativa do QGIS
-            request = QgsFeatureRequest()
-            request.setFilterExpression(qgis_expression)
-            
-            # Aplica filtro e copia feições filtradas
-            filtered_features = []
-            for feature in layer.getFeatures(request):
-                filtered_features.append(feature)
-            
-            if filtered_features:
-                memory_provider.addFeatures(filtered_features)
-                memory_layer.updateExtents()
+            if filtered_features:
+                memory_provider.addFeatures(filtered_features)
+                memory_layer.updateExtents()
                 
                 filtered_count = len(filtered_features)
                 total_count = layer.featureCount()
@@ -2472,1614 +1107,62 @@ class DesagregaBiomasBRDialog(QDialog):
 
 
 
-    def real_step_apply_spatial_cut(self):
-        """Etapa 3: Aplica corte espacial"""
+    def real_step_add_to_qgis(self):
+        """Etapa 7: Adiciona arquivo ao QGIS"""
         try:
-            self.status_label.setText("✂️ Realizando corte espacial...")
-            
-            # CORREÇÃO 1: Verifica se realmente precisa fazer corte espacial
-            # DEBUG: Mostra valor atual de cut_option
-            cut_option_value = getattr(self, 'cut_option', None)
-            print(f"🔧 DEBUG: cut_option atual = {cut_option_value}")
-            print(f"🔧 DEBUG: type(cut_option) = {type(cut_option_value)}")
-            
-            # CORREÇÃO MELHORADA: Verifica se realmente precisa fazer corte espacial
-            # Considera None, 0 ou atributo não existente como "sem corte"
-            needs_cut = (
-                hasattr(self, 'cut_option') and 
-                self.cut_option is not None and 
-                self.cut_option != 0
-            )
-            
-            # CORREÇÃO AMAZÔNIA: Se usuário selecionou Amazônia e não pediu corte,
-            # ainda precisa cortar pelo limite do bioma (pois usamos WFS da Amazônia Legal)
-            needs_amazonia_biome_cut = (
-                self.selected_biome == 'Amazônia' and 
-                not needs_cut and
-                hasattr(self, '_needs_amazonia_biome_cut') and 
-                self._needs_amazonia_biome_cut
-            )
-            
-            if not needs_cut and not needs_amazonia_biome_cut:
-                # Sem corte espacial - pula esta etapa
-                self.update_notes(f"🌍 Sem recorte espacial | Usando bioma completo: {self.selected_biome}", "status")
-                print(f"🌍 DEBUG: Sem corte espacial - pulando etapa")
-                
-                # Agenda próxima etapa diretamente
-                QTimer.singleShot(1000, self.real_step_merge_layers)
-                return
+            self.status_label.setText("🗺️ Adicionando ao QGIS...")
             
-            # CORREÇÃO AMAZÔNIA: Aplica corte pelo bioma quando necessário
-            if needs_amazonia_biome_cut and not needs_cut:
-                print(f"🌳 DEBUG: Aplicando corte automático pelo bioma Amazônia")
-                self.update_notes(f"🌳 Aplicando recorte pelo bioma Amazônia | Dados vieram da Amazônia Legal", "status")
-                
-                # Obtém layer do bioma Amazônia do shapefile IBGE
-                cut_layer = self.get_amazonia_biome_cut_layer()
-                
-                if not cut_layer:
-                    print(f"⚠️ DEBUG: Não foi possível obter limite do bioma Amazônia - usando dados completos")
-                    self.update_notes(f"⚠️ Limite do bioma não disponível | Usando dados da Amazônia Legal", "warning")
-                    QTimer.singleShot(1000, self.real_step_merge_layers)
-                    return
-                
-                print(f"🔄 DEBUG: Aplicando corte pelo bioma Amazônia com {cut_layer.featureCount()} feições")
-                
-                # Fix geometries na layer de corte
-                fixed_cut_layer = self.auto_fix_geometries(cut_layer, "bioma_amazonia")
-                if not fixed_cut_layer:
-                    fixed_cut_layer = cut_layer
-                
-                # Aplica corte em cada layer processada
-                clipped_layers = []
-                
-                for i, layer in enumerate(self.processing_layers):
-                    print(f"🌳 DEBUG: Cortando layer {i+1}/{len(self.processing_layers)} pelo bioma Amazônia...")
-                    
-                    fixed_data_layer = self.auto_fix_geometries(layer, f"dados_{i}")
-                    if not fixed_data_layer:
-                        fixed_data_layer = layer
-                    
-                    clipped_layer = self.clip_layer(fixed_data_layer, fixed_cut_layer)
-                    
-                    if clipped_layer:
-                        clipped_layers.append(clipped_layer)
-                        print(f"✅ DEBUG: Layer cortada pelo bioma: {clipped_layer.featureCount()} feições")
-                    else:
-                        print(f"❌ DEBUG: Falha ao cortar layer pelo bioma")
-                
-                if clipped_layers:
-                    self.processing_layers = clipped_layers
+            if self.checkbox_add_to_map.isChecked() and hasattr(self, 'final_file_path'):
+                self.update_notes(f"🗺️ Carregando no QGIS | Arquivo: {os.path.basename(self.final_file_path)}", "status")
                 
-                # Agenda próxima etapa
-                QTimer.singleShot(1000, self.real_step_merge_layers)
-                return
-            
-            # Se chegou aqui, precisa fazer corte espacial
-            self.update_notes(f"✂️ Aplicando recorte espacial | Opção: {self.get_cut_option_name()}", "status")
-            
-            # Obtém layer de corte
-            cut_layer = self.get_cut_layer()
-            
-            if not cut_layer:
-                raise Exception("Falha ao obter layer de corte espacial")
+                # Nome real do arquivo, CRS original preservado; TERRACLASS com simbologia
+                self.add_result_to_map()
+            else:
+                self.update_notes(f"🗺️ Adição ao QGIS desabilitada pelo usuário", "status")
+                print(f"🗺️ DEBUG: Adição ao QGIS desabilitada")
             
-            print(f"🔄 DEBUG: Aplicando corte espacial com {cut_layer.name()}")
-            
-            # CORREÇÃO 2: Aplica fixgeometries automaticamente em ambas as layers
-            print(f"🔧 DEBUG: Aplicando fixgeometries nas layers...")
-            
-            # Fix geometries na layer de corte
-            fixed_cut_layer = self.auto_fix_geometries(cut_layer, "corte")
-            if not fixed_cut_layer:
-                print(f"⚠️ DEBUG: Falha no fix da layer de corte, usando original")
-                fixed_cut_layer = cut_layer
-            
-            # Aplica corte em cada layer processada
-            clipped_layers = []
-            
-            for i, layer in enumerate(self.processing_layers):
-                print(f"✂️ DEBUG: Cortando layer {i+1}/{len(self.processing_layers)}: {layer.name()}...")
-                
-                # Fix geometries na layer de dados
-                fixed_data_layer = self.auto_fix_geometries(layer, f"dados_{i}")
-                if not fixed_data_layer:
-                    print(f"⚠️ DEBUG: Falha no fix da layer de dados {i}, usando original")
-                    fixed_data_layer = layer
-                
-                # Aplica corte com layers corrigidas
-                clipped_layer = self.clip_layer(fixed_data_layer, fixed_cut_layer)
-                
-                if clipped_layer:
-                    clipped_layers.append(clipped_layer)
-                    print(f"✅ DEBUG: Layer cortada: {clipped_layer.featureCount()} feições")
-                else:
-                    print(f"❌ DEBUG: Falha ao cortar layer {layer.name()}")
-            
-            if not clipped_layers:
-                raise Exception("Nenhuma layer foi cortada com sucesso")
-            
-            self.processing_layers = clipped_layers
-            
-            # Agenda próxima etapa
-            QTimer.singleShot(1000, self.real_step_merge_layers)
-            
-        except Exception as e:
-            print(f"❌ ERROR real_step_apply_spatial_cut: {str(e)}")
-            self.status_label.setText(f"❌ Erro no corte espacial: {str(e)}")
-            self.progress_bar.setVisible(False)
-            self.btn_process.setEnabled(True)
-
-    def auto_fix_geometries(self, layer, layer_type):
-        """Aplica fixgeometries automaticamente sem avisar o usuário"""
-        try:
-            import processing
-            
-            print(f"🔧 DEBUG: Aplicando fixgeometries na layer {layer_type}...")
-            
-            # Executa fixgeometries
-            fixed_result = processing.run("native:fixgeometries", {
-                'INPUT': layer,
-                'OUTPUT': 'memory:'
-            })
-            
-            fixed_layer = fixed_result['OUTPUT']
-            
-            if fixed_layer and fixed_layer.isValid():
-                original_count = layer.featureCount()
-                fixed_count = fixed_layer.featureCount()
-                
-                # NOVO: Registra processamento com detalhes sobre perda
-                if fixed_count < original_count:
-                    loss_count = original_count - fixed_count
-                    loss_percent = (loss_count / original_count) * 100
-                    self.add_processing_log(
-                        "CORREÇÃO DE GEOMETRIAS",
-                        f"{original_count} feições antes e {fixed_count} feições depois (PERDA: {loss_count} polígonos inválidos removidos - {loss_percent:.1f}%)"
-                    )
-                elif fixed_count > original_count:
-                    gain_count = fixed_count - original_count
-                    self.add_processing_log(
-                        "CORREÇÃO DE GEOMETRIAS",
-                        f"{original_count} feições antes e {fixed_count} feições depois (GANHO: {gain_count} polígonos corrigidos/divididos)"
-                    )
-                else:
-                    self.add_processing_log(
-                        "CORREÇÃO DE GEOMETRIAS",
-                        f"{original_count} feições antes e {fixed_count} feições depois (SEM PERDA: todas as geometrias já eram válidas)"
-                    )
-                
-                print(f"✅ DEBUG: Fixgeometries aplicado na layer {layer_type}")
-                print(f"   Feições: {original_count} → {fixed_count}")
-                
-                # Define nome para a layer corrigida
-                fixed_layer.setName(f"{layer.name()}_fixed")
-                
-                return fixed_layer
-            else:
-                print(f"⚠️ DEBUG: Fixgeometries falhou para layer {layer_type}")
-                return None
-                
-        except Exception as e:
-            print(f"⚠️ DEBUG: Erro no fixgeometries da layer {layer_type}: {str(e)}")
-            return None
-
-    def clip_layer(self, input_layer, clip_layer, log_processing=True):
-        """Aplica corte espacial usando processing"""
-        try:
-            import processing
-            
-            # Verifica se as layers são válidas
-            if not input_layer.isValid() or not clip_layer.isValid():
-                return None
-            
-            # Verifica se há geometrias
-            if input_layer.featureCount() == 0 or clip_layer.featureCount() == 0:
-                return None
-            
-            # Executa algoritmo de clip
-            result = processing.run("native:clip", {
-                'INPUT': input_layer,
-                'OVERLAY': clip_layer,
-                'OUTPUT': 'memory:'
-            })
-            
-            if not result or 'OUTPUT' not in result:
-                return None
-            
-            clipped_layer = result['OUTPUT']
-            
-            if not clipped_layer or not clipped_layer.isValid():
-                return None
-            
-            feature_count = clipped_layer.featureCount()
-            original_count = input_layer.featureCount()
-            
-            # NOVO: Registra processamento apenas se solicitado
-            if log_processing:
-                if feature_count == 0:
-                    self.add_processing_log(
-                        "CORTE ESPACIAL",
-                        f"{original_count} feições → 0 feições (área fora do polígono de corte)"
-                    )
-                else:
-                    reduction_percent = ((original_count - feature_count) / original_count) * 100 if original_count > 0 else 0
-                    self.add_processing_log(
-                        "CORTE ESPACIAL",
-                        f"{original_count} feições → {feature_count} feições (redução de {reduction_percent:.1f}%)"
-                    )
-            
-            if feature_count == 0:
-                # Retorna layer vazia mas válida
-                clipped_layer.setName(f"{input_layer.name()}_clipped_empty")
-                return clipped_layer
-            
-            clipped_layer.setName(f"{input_layer.name()}_clipped")
-            return clipped_layer
-                
-        except Exception as e:
-            from qgis.core import QgsMessageLog, Qgis
-            error_msg = f"❌ ERRO clip_layer: {str(e)}"
-            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
-            return None
-
-
-    
-    def reproject_layer(self, layer, target_crs):
-        """
-        Reprojeta uma layer para o CRS de destino
-        """
-        try:
-            import processing
-            
-            # Parâmetros para reprojeção
-            params = {
-                'INPUT': layer,
-                'TARGET_CRS': target_crs,
-                'OUTPUT': 'memory:'
-            }
-            
-            # Executa o algoritmo de reprojeção
-            result = processing.run("native:reprojectlayer", params)
-            
-            if result and 'OUTPUT' in result:
-                reprojected_layer = result['OUTPUT']
-                
-                if reprojected_layer and reprojected_layer.isValid():
-                    # NOVO: Registra processamento
-                    original_crs = layer.crs().authid()
-                    target_crs_id = target_crs if isinstance(target_crs, str) else target_crs.authid()
-                    self.add_processing_log(
-                        "REPROJEÇÃO DE COORDENADAS",
-                        f"{original_crs} → {target_crs_id}"
-                    )
-                    return reprojected_layer
-                else:
-                    return None
-            else:
-                return None
-                
-        except Exception as e:
-            from qgis.core import QgsMessageLog, Qgis
-            error_msg = f"❌ ERRO reproject_layer: {str(e)}"
-            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
-            return None
-
-    def real_step_merge_layers(self):
-        """Etapa 4: Mescla layers se necessário (para tipo acumulado)"""
-        try:
-            self.status_label.setText("🔄 Mesclando dados...")
-            
-            if self.data_type == "acumulado" and len(self.processing_layers) > 1:
-                # Para acumulado, precisa mesclar accumulated + yearly
-                self.update_notes(f"🔄 Mesclando camadas | accumulated_deforestation + yearly_deforestation", "status")
-                
-                print(f"🔄 DEBUG: Mesclando {len(self.processing_layers)} layers para tipo acumulado")
-                
-                merged_layer = self.merge_layers(self.processing_layers)
-                
-                if merged_layer:
-                    self.processing_layers = [merged_layer]
-                    print(f"✅ DEBUG: Layers mescladas: {merged_layer.featureCount()} feições")
-                else:
-                    raise Exception("Falha ao mesclar layers")
-                    
-            else:
-                # Para incremental, usa apenas uma layer
-                self.update_notes(f"📊 Processando dados incrementais | {self.processing_layers[0].featureCount()} feições", "status")
-                print(f"📊 DEBUG: Tipo incremental - usando layer única")
-            
-            # Agenda próxima etapa
-            QTimer.singleShot(1000, self.real_step_save_file)
-            
-        except Exception as e:
-            print(f"❌ ERROR real_step_merge_layers: {str(e)}")
-            self.status_label.setText(f"❌ Erro na mesclagem: {str(e)}")
-            self.end_download_mode(success=False)
-
-    def merge_layers(self, layers):
-        """Mescla múltiplas layers em uma só"""
-        try:
-            import processing
-            
-            print(f"🔄 DEBUG: Mesclando {len(layers)} layers")
-            
-            if len(layers) == 1:
-                return layers[0]
-            
-            # Executa merge
-            result = processing.run("native:mergevectorlayers", {
-                'LAYERS': layers,
-                'CRS': layers[0].crs(),
-                'OUTPUT': 'memory:'
-            })
-            
-            merged_layer = result['OUTPUT']
-            
-            if merged_layer and merged_layer.isValid():
-                merged_layer.setName(f"PRODES_{self.selected_biome}_merged")
-                
-                # NOVO: Registra processamento
-                total_features = sum(layer.featureCount() for layer in layers)
-                merged_count = merged_layer.featureCount()
-                self.add_processing_log(
-                    "UNIÃO DE CAMADAS",
-                    f"{len(layers)} camadas unidas → {merged_count} feições totais"
-                )
-                
-                print(f"✅ DEBUG: Merge executado com sucesso")
-                return merged_layer
-            else:
-                print(f"❌ DEBUG: Resultado do merge inválido")
-                return None
-                
-        except Exception as e:
-            print(f"❌ ERROR merge_layers: {str(e)}")
-            return None
-
-    def real_step_save_file(self):
-        """Etapa 5: Salva arquivo no formato escolhido"""
-        try:
-            self.status_label.setText("💾 Salvando arquivo...")
-            
-            if not self.processing_layers:
-                raise Exception("Nenhuma layer para salvar")
-            
-            final_layer = self.processing_layers[0]
-            
-            # Determina formato e extensão
-            if self.radio_shapefile.isChecked():
-                format_name = "ESRI Shapefile"
-                extension = ".shp"
-            else:
-                format_name = "GPKG"
-                extension = ".gpkg"
-            
-            # Monta caminho completo
-            dest_path = self.dest_path_edit.toPlainText().strip()
-            full_path = os.path.join(dest_path, f"{self.output_filename}{extension}")
-            
-            self.update_notes(f"💾 Salvando arquivo | Formato: {format_name} | Destino: {full_path}", "status")
-            
-            print(f"💾 DEBUG: Salvando em {full_path}")
-            
-            # Salva o arquivo
-            success = self.save_layer_to_file(final_layer, full_path, format_name)
-            
-            if success:
-                self.final_file_path = full_path
-                print(f"✅ DEBUG: Arquivo salvo com sucesso")
-                
-                # Agenda próxima etapa
-                QTimer.singleShot(1000, self.real_step_generate_metadata)
-            else:
-                raise Exception("Falha ao salvar arquivo")
-                
-        except Exception as e:
-            print(f"❌ ERROR real_step_save_file: {str(e)}")
-            self.status_label.setText(f"❌ Erro ao salvar: {str(e)}")
-            self.end_download_mode(success=False)
-
-    def save_layer_to_file(self, layer, file_path, format_name):
-        """Salva layer em arquivo"""
-        try:
-            from qgis.core import QgsVectorFileWriter
-            
-            print(f"💾 DEBUG: Salvando layer {layer.name()} em {file_path}")
-            
-            # Cria pasta se não existir
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            
-            # Configura opções de salvamento
-            options = QgsVectorFileWriter.SaveVectorOptions()
-            options.driverName = format_name
-            options.fileEncoding = "UTF-8"
-            
-            # Salva o arquivo
-            error = QgsVectorFileWriter.writeAsVectorFormatV3(
-                layer,
-                file_path,
-                layer.transformContext(),
-                options
-            )
-            
-            if error[0] == QgsVectorFileWriter.NoError:
-                print(f"✅ DEBUG: Arquivo salvo com sucesso")
-                return True
-            else:
-                print(f"❌ DEBUG: Erro ao salvar: {error[1]}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ ERROR save_layer_to_file: {str(e)}")
-            return False
-
-    def real_step_generate_metadata(self):
-        """Etapa 6: Gera arquivo de metadados"""
-        try:
-            self.status_label.setText("📄 Gerando metadados...")
-            
-            if self.checkbox_generate_metadata.isChecked():
-                self.update_notes(f"📄 Gerando metadados | Arquivo: {self.output_filename}.txt", "status")
-                
-                metadata_path = os.path.join(
-                    self.dest_path_edit.toPlainText().strip(),
-                    f"{self.output_filename}.txt"
-                )
-                
-                print(f"📄 DEBUG: Gerando metadados em {metadata_path}")
-                
-                success = self.generate_metadata_file(metadata_path)
-                
-                if success:
-                    self.metadata_file_path = metadata_path
-                    print(f"✅ DEBUG: Metadados gerados com sucesso")
-                else:
-                    print(f"⚠️ DEBUG: Falha ao gerar metadados (continuando...)")
-            else:
-                self.update_notes(f"📄 Metadados desabilitados pelo usuário", "status")
-                print(f"📄 DEBUG: Geração de metadados desabilitada")
-            
-            # Agenda próxima etapa
-            QTimer.singleShot(1000, self.real_step_add_to_qgis)
-            
-        except Exception as e:
-            print(f"❌ ERROR real_step_generate_metadata: {str(e)}")
-            # Não falha o processo por causa dos metadados
-            QTimer.singleShot(1000, self.real_step_add_to_qgis)
-
-    def generate_metadata_file(self, metadata_path):
-        """Gera arquivo de metadados em formato texto"""
-        try:
-            from datetime import datetime
-            
-            metadata_content = []
-            metadata_content.append("=" * 60)
-            metadata_content.append(f"METADADOS DO PROCESSAMENTO {self.selected_theme}")
-            metadata_content.append("Plugin DesagregaBiomasBR")
-            metadata_content.append("=" * 60)
-            metadata_content.append("")
-            
-            # Texto introdutório específico por tema
-            if self.selected_theme == "PRODES":
-                period_text = ""
-                if hasattr(self, 'data_type') and self.data_type and hasattr(self, 'start_year') and hasattr(self, 'end_year'):
-                    if self.data_type == "incremental" and self.start_year and self.end_year:
-                        if self.start_year == self.end_year:
-                            period_text = f"no ano de {self.start_year}"
-                        else:
-                            period_text = f"no período de {self.start_year} a {self.end_year}"
-                    elif self.data_type == "acumulado" and self.end_year:
-                        base_year = self.prodes_base_years.get(self.selected_biome, 2000)
-                        period_text = f"acumuladas de {base_year} até {self.end_year}"
-                
-                intro_text = f"Áreas desmatadas {period_text}. O mapeamento utiliza imagens do satélite "
-                intro_text += "Landsat ou similares, para registrar e quantificar as áreas desmatadas maiores que "
-                intro_text += "6,25 hectares. O PRODES considera como desmatamento a supressão da vegetação nativa, "
-                intro_text += "independentemente da futura utilização destas áreas."
-                
-            elif self.selected_theme == "ÁREA QUEIMADA":
-                intro_text = "O shapefile refere-se ao produto AQ1Km, que apresenta uma estimativa das áreas queimadas nos biomas brasileiros, "
-                intro_text += "gerado a partir de dados MODIS (coleção 6) dos satélites AQUA e TERRA. Trata-se de um produto de baixa resolução "
-                intro_text += "espacial (1 km), com cobertura diária e abordagem sinótica, voltado à identificação e ao monitoramento contínuo "
-                intro_text += "de áreas afetadas por queimadas."
-                
-            else:
-                intro_text = f"Processamento de dados {self.selected_theme} para análise ambiental."
-            
-            metadata_content.append("DESCRIÇÃO:")
-            metadata_content.append(intro_text)
-            metadata_content.append("")
-            
-            # Informações gerais
-            metadata_content.append("INFORMAÇÕES GERAIS:")
-            metadata_content.append(f"Data/Hora do processamento: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-            metadata_content.append(f"Tema: {self.selected_theme}")
-            metadata_content.append(f"Bioma: {self.selected_biome}")
-            metadata_content.append("")
-            
-            # Configurações temporais específicas por tema
-            metadata_content.append("CONFIGURAÇÕES TEMPORAIS:")
-            
-            if self.selected_theme == "PRODES":
-                metadata_content.append(f"Unidade temporal: Baseado na coluna 'year' dos dados")
-                metadata_content.append(f"Tipo de dados: {getattr(self, 'data_type', 'N/A')}")
-                
-                if hasattr(self, 'start_year') and hasattr(self, 'end_year'):
-                    if self.data_type == "incremental":
-                        metadata_content.append(f"Período: {self.start_year} - {self.end_year}")
-                    elif self.data_type == "acumulado":
-                        base_year = self.prodes_base_years.get(self.selected_biome, 2000)
-                        metadata_content.append(f"Período: {base_year} - {self.end_year} (acumulado)")
-                        
-            elif self.selected_theme == "ÁREA QUEIMADA":
-                metadata_content.append(f"Unidade temporal: Dados mensais")
-                metadata_content.append(f"Tipo de dados: {getattr(self, 'queimadas_data_type', 'N/A')}")
-                
-                if hasattr(self, 'queimadas_data_type') and self.queimadas_data_type:
-                    if self.queimadas_data_type == "anual" and hasattr(self, 'queimadas_year') and self.queimadas_year:
-                        metadata_content.append(f"Período: Janeiro de {self.queimadas_year} a Dezembro de {self.queimadas_year}")
-                        # Calcula quantos meses foram processados
-                        months_count = len([m for m in self.queimadas_months if m.startswith(f"{self.queimadas_year:04d}_")])
-                        metadata_content.append(f"Arquivos processados: {months_count} meses unidos")
-                    elif self.queimadas_data_type == "mensal" and hasattr(self, 'queimadas_month') and self.queimadas_month:
-                        year, month, _ = self.queimadas_month.split('_')
-                        metadata_content.append(f"Período: {month}/{year}")
-                        metadata_content.append(f"Arquivos processados: 1 arquivo mensal")
-                        
-            elif self.selected_theme == "DETER":
-                metadata_content.append(f"Unidade temporal: Baseado na coluna 'view_date' dos dados")
-                if hasattr(self, 'deter_start_year') and hasattr(self, 'deter_end_year'):
-                    metadata_content.append(f"Período: {self.deter_start_year} - {self.deter_end_year}")
-                if hasattr(self, 'deter_selected_classes') and self.deter_selected_classes:
-                    metadata_content.append(f"Classes selecionadas: {', '.join(self.deter_selected_classes)}")
-                    
-            elif self.selected_theme == "TERRACLASS":
-                metadata_content.append(f"Unidade temporal: Anual")
-                if hasattr(self, 'terraclass_year') and self.terraclass_year:
-                    metadata_content.append(f"Ano: {self.terraclass_year}")
-                    
-            metadata_content.append("")
-            
-            # Filtros aplicados - específico por tema
-            metadata_content.append("FILTROS APLICADOS:")
-            if self.selected_theme == "ÁREA QUEIMADA":
-                # Para ÁREA QUEIMADA, os filtros são automáticos (bioma + período)
-                metadata_content.append(f"Filtro espacial automático: Bioma {self.selected_biome}")
-                metadata_content.append("Observação: Dados originais cobrem todo o Brasil, corte por bioma aplicado automaticamente")
-                if hasattr(self, 'queimadas_download_info_metadata') and self.queimadas_download_info_metadata:
-                    if self.queimadas_download_info_metadata['data_type'] == 'anual':
-                        metadata_content.append(f"Filtro temporal: Ano {self.queimadas_download_info_metadata['year']}")
-                    else:
-                        metadata_content.append(f"Filtro temporal: Mês específico")
-            else:
-                # Para PRODES, DETER, TERRACLASS usa o formato original
-                if hasattr(self, 'urls_and_filters') and self.urls_and_filters:
-                    for i, filter_str in enumerate(self.urls_and_filters['filters']):
-                        if filter_str:
-                            clean_filter = filter_str.replace('%20', ' ').replace('%27', "'")
-                            metadata_content.append(f"Camada {i+1}: {clean_filter}")
-                        else:
-                            metadata_content.append(f"Camada {i+1}: Sem filtro")
-                else:
-                    metadata_content.append("Nenhum filtro específico aplicado")
-            metadata_content.append("")
-            
-            # NOVO: Corte espacial detalhado
-            metadata_content.append("CORTE ESPACIAL:")
-            
-            if self.selected_theme == "ÁREA QUEIMADA":
-                # Para ÁREA QUEIMADA sempre há corte por bioma
-                metadata_content.append("1. Corte automático por bioma (sempre aplicado):")
-                metadata_content.append(f"   - Bioma selecionado: {self.selected_biome}")
-                metadata_content.append(f"   - Shapefile de referência: {self.ibge_shapefile_name}")
-                if self.selected_biome == 'Amazônia Legal':
-                    metadata_content.append(f"   - Coluna utilizada: regiao = 'Amazônia Legal'")
-                else:
-                    metadata_content.append(f"   - Coluna utilizada: bioma = '{self.selected_biome}'")
-                
-                # Verifica se há corte adicional
-                if hasattr(self, 'cut_option') and self.cut_option is not None and self.cut_option != 0:
-                    metadata_content.append("")
-                    metadata_content.append("2. Corte adicional (configurado pelo usuário):")
-                    if self.cut_option == 1:
-                        metadata_content.append("   - Tipo: Layer do QGIS")
-                        if hasattr(self, 'selected_layer') and self.selected_layer:
-                            metadata_content.append(f"   - Nome da layer: {self.selected_layer.name()}")
-                            metadata_content.append(f"   - Número de feições: {self.selected_layer.featureCount()}")
-                            metadata_content.append(f"   - Sistema de coordenadas da layer: {self.selected_layer.crs().authid()} - {self.selected_layer.crs().description()}")
-                            
-                            if hasattr(self, 'selected_field') and self.selected_field:
-                                metadata_content.append(f"   - Campo utilizado: {self.selected_field}")
-                                if hasattr(self, 'selected_element') and self.selected_element:
-                                    metadata_content.append(f"   - Elemento selecionado: {self.selected_element}")
-                    elif self.cut_option == 2:
-                        metadata_content.append("   - Tipo: Retângulo desenhado")
-                        if hasattr(self, 'drawn_rectangle') and self.drawn_rectangle:
-                            metadata_content.append(f"   - Coordenadas: ({self.drawn_rectangle.xMinimum():.6f}, {self.drawn_rectangle.yMinimum():.6f}) - ({self.drawn_rectangle.xMaximum():.6f}, {self.drawn_rectangle.yMaximum():.6f})")
-                    elif self.cut_option == 3:
-                        metadata_content.append("   - Tipo: IBGE")
-                        metadata_content.append(f"   - Shapefile: {self.ibge_shapefile_name}")
-                        if self.ibge_state:
-                            metadata_content.append(f"   - Estado: {self.ibge_state}")
-                            if self.ibge_municipality:
-                                metadata_content.append(f"   - Município: {self.ibge_municipality}")
-                else:
-                    metadata_content.append("")
-                    metadata_content.append("2. Corte adicional: Nenhum (apenas corte por bioma aplicado)")
-                    
-            else:
-                # Para outros temas (PRODES, DETER, TERRACLASS) mantém lógica original
-                if hasattr(self, 'cut_option'):
-                    if self.cut_option == 0:
-                        metadata_content.append("Tipo: Sem corte (bioma completo)")
-                    elif self.cut_option == 1:
-                        metadata_content.append("Tipo: Layer do QGIS")
-                        if hasattr(self, 'selected_layer') and self.selected_layer:
-                            metadata_content.append(f"Nome da layer: {self.selected_layer.name()}")
-                            metadata_content.append(f"Número de feições: {self.selected_layer.featureCount()}")
-                            metadata_content.append(f"Sistema de coordenadas da layer: {self.selected_layer.crs().authid()} - {self.selected_layer.crs().description()}")
-                            
-                            if hasattr(self, 'selected_field') and self.selected_field:
-                                metadata_content.append(f"Campo utilizado: {self.selected_field}")
-                                if hasattr(self, 'selected_element') and self.selected_element:
-                                    metadata_content.append(f"Elemento selecionado: {self.selected_element}")
-                    elif self.cut_option == 2:
-                        metadata_content.append("Tipo: Retângulo desenhado")
-                        if hasattr(self, 'drawn_rectangle') and self.drawn_rectangle:
-                            metadata_content.append(f"Coordenadas: ({self.drawn_rectangle.xMinimum():.6f}, {self.drawn_rectangle.yMinimum():.6f}) - ({self.drawn_rectangle.xMaximum():.6f}, {self.drawn_rectangle.yMaximum():.6f})")
-                    elif self.cut_option == 3:
-                        metadata_content.append("Tipo: IBGE")
-                        metadata_content.append(f"Shapefile: {self.ibge_shapefile_name}")
-                        metadata_content.append(f"Bioma/Região: {self.selected_biome} (já filtrado)")
-                        if self.ibge_state:
-                            metadata_content.append(f"Estado: {self.ibge_state}")
-                            if self.ibge_municipality:
-                                metadata_content.append(f"Município: {self.ibge_municipality}")
-                                
-            metadata_content.append("")
-            
-            # URLs utilizadas - específico por tema
-            metadata_content.append("URLS DOS SERVIÇOS:")
-            
-            if self.selected_theme == "ÁREA QUEIMADA":
-                # Para ÁREA QUEIMADA, lista as URLs dos ZIPs baixados
-                if hasattr(self, 'queimadas_download_info_metadata') and self.queimadas_download_info_metadata:
-                    metadata_content.append(f"Servidor base: {self.queimadas_download_info_metadata['base_url']}")
-                    metadata_content.append(f"Arquivos baixados: {len(self.queimadas_download_info_metadata['urls'])} ZIPs")
-                    # Lista alguns exemplos das URLs
-                    for i, url in enumerate(self.queimadas_download_info_metadata['urls'][:3]):  # Primeiros 3
-                        month = self.queimadas_download_info_metadata['months'][i]
-                        metadata_content.append(f"  Exemplo {i+1}: {url}")
-                    if len(self.queimadas_download_info_metadata['urls']) > 3:
-                        metadata_content.append(f"  ... e mais {len(self.queimadas_download_info_metadata['urls']) - 3} arquivos")
-            else:
-                # Para PRODES, DETER, TERRACLASS usa o formato original
-                if hasattr(self, 'urls_and_filters') and self.urls_and_filters:
-                    for i, (url, layer_name) in enumerate(zip(self.urls_and_filters['urls'], self.urls_and_filters['layer_names'])):
-                        metadata_content.append(f"{layer_name}: {url}")
-                        
-            metadata_content.append("")
-            
-            # NOVO: Informações do arquivo final com sistema de coordenadas
-            metadata_content.append("ARQUIVO RESULTANTE:")
-            metadata_content.append(f"Nome: {self.output_filename}")
-            metadata_content.append(f"Caminho: {getattr(self, 'final_file_path', 'N/A')}")
-            metadata_content.append(f"Formato: {'Shapefile' if self.radio_shapefile.isChecked() else 'GeoPackage'}")
-            
-            if hasattr(self, 'processing_layers') and self.processing_layers:
-                final_layer = self.processing_layers[0]
-                metadata_content.append(f"Número de feições: {final_layer.featureCount()}")
-                metadata_content.append(f"Sistema de coordenadas: EPSG:4674 - SIRGAS 2000")
-                metadata_content.append(f"Tipo de geometria: {QgsWkbTypes.displayString(final_layer.wkbType())}")
-                
-                # Extensão geográfica
-                extent = final_layer.extent()
-                if not extent.isEmpty():
-                    metadata_content.append(f"Extensão geográfica:")
-                    metadata_content.append(f"  Longitude mínima: {extent.xMinimum():.6f}")
-                    metadata_content.append(f"  Longitude máxima: {extent.xMaximum():.6f}")
-                    metadata_content.append(f"  Latitude mínima: {extent.yMinimum():.6f}")
-                    metadata_content.append(f"  Latitude máxima: {extent.yMaximum():.6f}")
-                    
-                # Campos da tabela
-                fields = final_layer.fields()
-                if len(fields) > 0:
-                    metadata_content.append(f"Campos da tabela:")
-                    for field in fields:
-                        metadata_content.append(f"  {field.name()}: {field.typeName()}")
-            
-            # Informações específicas por tema
-            if self.selected_theme == "ÁREA QUEIMADA":
-                metadata_content.append("")  # NOVO: Linha em branco antes da seção específica
-                metadata_content.append("INFORMAÇÕES ESPECÍFICAS DO PRODUTO AQ1KM:")
-                metadata_content.append("")
-                
-                metadata_content.append("Título:")
-                metadata_content.append("Produto AQ1Km – Áreas Queimadas com Resolução Espacial de 1 km")
-                metadata_content.append("")
-                
-                # Adiciona período específico baseado no processamento
-                periodo_temporal = "Dados mensais"
-                if hasattr(self, 'queimadas_download_info_metadata') and self.queimadas_download_info_metadata:
-                    if self.queimadas_download_info_metadata['data_type'] == 'anual':
-                        ano = self.queimadas_download_info_metadata['year']
-                        periodo_temporal = f"Janeiro de {ano} a Dezembro de {ano}"
-                    elif self.queimadas_download_info_metadata['data_type'] == 'mensal':
-                        mes_data = self.queimadas_download_info_metadata.get('month', '')
-                        if mes_data:
-                            year, month, _ = mes_data.split('_')
-                            periodo_temporal = f"{month}/{year}"
-                
-                metadata_content.append("Cobertura Temporal:")
-                metadata_content.append(periodo_temporal)
-                metadata_content.append("")
-                
-                metadata_content.append("Fonte e Parceria:")
-                metadata_content.append("O desenvolvimento do produto AQ1Km é fruto da parceria entre o Instituto Nacional de Pesquisas Espaciais (INPE) e o Laboratório de Aplicações de Satélites Ambientais (LASA/UFRJ), no âmbito de pesquisas voltadas ao monitoramento ambiental por sensoriamento remoto.")
-                metadata_content.append("")
-                
-                metadata_content.append("Metodologia:")
-                metadata_content.append("A detecção das áreas queimadas é realizada com base em algoritmos que utilizam bandas térmicas (4 µm) dos sensores MODIS, com foco na identificação de alterações na resposta espectral associadas a queimadas recentes. A metodologia está descrita em detalhes no artigo científico:")
-                metadata_content.append("")
-                metadata_content.append("LIBONATI, R.; DACAMARA, C.; SETZER, A.; MORELLI, F.; MELCHIORI, A. An Algorithm for Burned Area Detection in the Brazilian Cerrado Using 4 µm MODIS Imagery. Remote Sensing, v. 7, p. 15782–15803, 2015. https://doi.org/10.3390/rs71215803")
-                metadata_content.append("")
-                
-                metadata_content.append("Características Técnicas:")
-                metadata_content.append("- Resolução Espacial: 1 km")
-                metadata_content.append("- Sistema de Referência: SIRGAS 2000 – EPSG:4674")
-                metadata_content.append("- Formato: Shapefile (vetorial)")
-                metadata_content.append("- Cobertura: Diária com abordagem sinótica")
-                metadata_content.append("")
-                
-                metadata_content.append("Uso Recomendado:")
-                metadata_content.append("O produto é indicado para análises de caráter regional ou nacional, avaliação de tendências temporais de queimadas, estudos ambientais e suporte à formulação de políticas públicas relacionadas à conservação dos biomas brasileiros.")
-                metadata_content.append("")
-                
-                metadata_content.append("Limitações de Uso:")
-                metadata_content.append("Devido à sua resolução espacial de 1 km, não é recomendado para análises locais ou de pequena escala.")
-                metadata_content.append("")
-            
-            # NOVO: Seção de processamentos realizados
-            metadata_content.append("=" * 60)
-            metadata_content.append("PROCESSAMENTOS REALIZADOS:")
-            metadata_content.append("=" * 60)
-            processing_summary = self.get_processing_summary()
-            
-            if len(processing_summary) == 1 and "Nenhum processamento" in processing_summary[0]:
-                metadata_content.append("Dados utilizados conforme baixados da fonte original, sem processamentos adicionais.")
-            else:
-                metadata_content.append("Os seguintes processamentos foram aplicados aos dados originais:")
-                metadata_content.append("")
-                
-                for i, process in enumerate(processing_summary, 1):
-                    metadata_content.append(f"{i:2d}. {process}")
-                
-                metadata_content.append("")
-                metadata_content.append("NOTA: Todos os processamentos utilizaram algoritmos nativos do QGIS.")
-                metadata_content.append("Os dados de saída preservam a qualidade e integridade dos dados originais.")
-            
-            metadata_content.append("")
-            metadata_content.append("=" * 60)
-            metadata_content.append("Gerado pelo plugin DesagregaBiomasBR")
-            metadata_content.append(f"Desenvolvido para processamento de dados {self.selected_theme}")
-            metadata_content.append("=" * 60)
-            
-            # Salva arquivo
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(metadata_content))
-            
-            print(f"✅ DEBUG: Metadados salvos com {len(metadata_content)} linhas")
-            return True
-            
-        except Exception as e:
-            print(f"❌ ERROR generate_metadata_file: {str(e)}")
-            return False
-
-    def real_step_add_to_qgis(self):
-        """Etapa 7: Adiciona arquivo ao QGIS"""
-        try:
-            self.status_label.setText("🗺️ Adicionando ao QGIS...")
-            
-            if self.checkbox_add_to_map.isChecked() and hasattr(self, 'final_file_path'):
-                self.update_notes(f"🗺️ Carregando no QGIS | Arquivo: {os.path.basename(self.final_file_path)}", "status")
-                
-                print(f"🗺️ DEBUG: Adicionando {self.final_file_path} ao QGIS")
-                
-                # CORREÇÃO 1: Nome real do shapefile (baseado no filename)
-                real_filename = os.path.splitext(os.path.basename(self.final_file_path))[0]
-                layer_name = real_filename  # Usa o nome real do arquivo
-                
-                print(f"📋 DEBUG: Nome da layer: {layer_name}")
-                
-                # Carrega layer no QGIS
-                layer = QgsVectorLayer(self.final_file_path, layer_name, "ogr")
-                
-                if layer.isValid():
-                    # CORREÇÃO 2: Define CRS como 4674 (SIRGAS 2000)
-                    from qgis.core import QgsCoordinateReferenceSystem
-                    
-                    
-                    # CORREÇÃO: Não força CRS, preserva projeção original dos dados
-                    # DEBUG: setCrs removido - preserva CRS original
-                    print(f"✅ DEBUG: Preservando CRS original: {layer.crs().authid()}")
-                    
-                    print(f"✅ DEBUG: Preservando CRS original: {layer.crs().authid()}")
-                    print(f"📍 DEBUG: Extensão da layer: {layer.extent()}")
-                    # Adiciona ao projeto
-                    QgsProject.instance().addMapLayer(layer)
-                    print(f"✅ DEBUG: Layer '{layer_name}' adicionada ao projeto")
-                    
-                    # Zoom para a extensão da layer
-                    try:
-                        from qgis.utils import iface
-                        iface.mapCanvas().setExtent(layer.extent())
-                        iface.mapCanvas().refresh()
-                        print(f"🎯 DEBUG: Zoom ajustado para a extensão da layer")
-                    except:
-                        print(f"✅ DEBUG: Layer adicionada (zoom não ajustado)")
-                        
-                else:
-                    print(f"⚠️ DEBUG: Falha ao carregar layer no QGIS (arquivo foi salvo)")
-            else:
-                self.update_notes(f"🗺️ Adição ao QGIS desabilitada pelo usuário", "status")
-                print(f"🗺️ DEBUG: Adição ao QGIS desabilitada")
-            
-            # Agenda finalização
-            QTimer.singleShot(1000, self.real_step_finish)
+            # Agenda finalização
+            self.schedule_next_stage(self.real_step_finish)
             
         except Exception as e:
             print(f"❌ ERROR real_step_add_to_qgis: {str(e)}")
             # Não falha o processo por causa do QGIS
-            QTimer.singleShot(1000, self.real_step_finish)
+            self.schedule_next_stage(self.real_step_finish)
 
     def real_step_finish(self):
-        """Etapa 8: Finaliza processamento"""
-        try:
-            self.status_label.setText("✅ Processamento concluído com sucesso!")
-            self.status_label.setStyleSheet("color: #2e7c3f; font-weight: bold;")
-            
-            # Finaliza modo download com sucesso
-            self.end_download_mode(success=True)
-            
-            # Atualiza notas finais
-            final_notes = []
-            
-            if hasattr(self, 'final_file_path'):
-                final_notes.append(f"✅ Arquivo salvo: {self.final_file_path}")
-            
-            final_notes.append(f"📊 Dados: {self.selected_theme} - {self.selected_biome}")
-            
-            if hasattr(self, 'data_type'):
-                final_notes.append(f"📈 Tipo: {self.data_type}")
-            
-            if hasattr(self, 'start_year') and hasattr(self, 'end_year'):
-                final_notes.append(f"🗓️ Período: {self.start_year}-{self.end_year}")
-            
-            if hasattr(self, 'processing_layers') and self.processing_layers:
-                final_notes.append(f"📊 Feições: {self.processing_layers[0].featureCount()}")
-            
-            if hasattr(self, 'metadata_file_path'):
-                final_notes.append(f"📄 Metadados: {os.path.basename(self.metadata_file_path)}")
-            
-            if self.checkbox_add_to_map.isChecked():
-                final_notes.append(f"🗺️ Adicionado ao QGIS")
-            
-            # Adiciona resultado final à linha de configuração (contínua)
-            final_part = f"✅ Arquivo salvo: {os.path.basename(self.final_file_path)}"
-            
-            # Obtém a configuração atual e adiciona o resultado
-            if hasattr(self, 'config_note') and self.config_note:
-                complete_line = f"{self.config_note} | {final_part}"
-            else:
-                complete_line = final_part
-            
-            self.update_notes(complete_line, "config")
-            # Limpa status para mostrar só a linha completa
-            self.status_note = ""
-            self._update_notes_display()
-            
-            print(f"🎉 DEBUG: === PROCESSAMENTO REAL CONCLUÍDO COM SUCESSO! ===")
-            
-        except Exception as e:
-            print(f"❌ ERROR real_step_finish: {str(e)}")
-            self.status_label.setText(f"❌ Erro na finalização: {str(e)}")
-            self.btn_process.setEnabled(True)
-
-    def generate_output_filename(self):
-        """Gera nome do arquivo baseado nas seleções"""
-        try:
-            # Base do nome
-            parts = [
-                self.selected_theme.lower(),
-                self.selected_biome.lower().replace(' ', '_').replace('ã', 'a').replace('ô', 'o'),
-                self.data_type
-            ]
-            
-            # Adiciona informações temporais
-            if self.data_type == "incremental" and hasattr(self, 'start_year') and hasattr(self, 'end_year'):
-                parts.append(f"{self.start_year}_{self.end_year}")
-            elif self.data_type == "acumulado" and hasattr(self, 'end_year'):
-                base_year = self.prodes_base_years.get(self.selected_biome, 2000)
-                parts.append(f"{base_year}_{self.end_year}")
-            
-            # NOVO: Adiciona informações de corte espacial com nome do arquivo
-            if hasattr(self, 'cut_option') and self.cut_option != 0:
-                if self.cut_option == 1 and hasattr(self, 'selected_layer') and self.selected_layer:
-                    # Layer carregado - usa nome da layer
-                    layer_name = self.selected_layer.name()
-                    # Remove caracteres especiais e limita tamanho
-                    clean_name = layer_name.replace(' ', '_').replace('-', '_').replace('.', '_')
-                    clean_name = ''.join(c for c in clean_name if c.isalnum() or c == '_')[:20]
-                    parts.append(f"corte_{clean_name}")
-                    
-                    # Se tem campo e elemento específico, adiciona também
-                    if hasattr(self, 'selected_field') and self.selected_field and hasattr(self, 'selected_element') and self.selected_element:
-                        clean_element = str(self.selected_element).replace(' ', '_').replace('-', '_')
-                        clean_element = ''.join(c for c in clean_element if c.isalnum() or c == '_')[:15]
-                        parts.append(clean_element)
-                        
-                elif self.cut_option == 2:
-                    # Retângulo desenhado
-                    parts.append("corte_retangulo")
-                    
-                elif self.cut_option == 3:
-                    # IBGE - inclui informações da seleção
-                    parts.append("corte_ibge")
-                    if self.ibge_state:
-                        clean_state = self.ibge_state.replace(' ', '_')
-                        clean_state = ''.join(c for c in clean_state if c.isalnum() or c == '_')[:10]
-                        parts.append(clean_state.lower())
-                        
-                        if self.ibge_municipality:
-                            clean_municipality = self.ibge_municipality.replace(' ', '_')
-                            clean_municipality = ''.join(c for c in clean_municipality if c.isalnum() or c == '_')[:15]
-                            parts.append(clean_municipality.lower())
-            
-            filename = "_".join(parts)
-            
-            # Limita tamanho total do nome (alguns sistemas têm limite)
-            if len(filename) > 100:
-                filename = filename[:100]
-                
-            print(f"📁 DEBUG: Nome do arquivo gerado: {filename}")
-            return filename
-            
-        except Exception as e:
-            print(f"❌ ERROR generate_output_filename: {str(e)}")
-            return "prodes_result"
-
-    def build_urls_and_filters(self):
-        """Constrói URLs e filtros CQL para o processamento"""
-        try:
-            result = {
-                'urls': [],
-                'filters': [],
-                'layer_names': []
-            }
-            
-            print(f"🔍 DEBUG build_urls_and_filters: selected_biome = '{self.selected_biome}'")
-            urls = self.get_dynamic_prodes_urls(self.selected_biome)
-            print(f"🔍 DEBUG build_urls_and_filters: URLs retornadas = {urls}")
-            
-            if self.data_type == "incremental":
-                # Só yearly_deforestation com filtro
-                result['urls'].append(urls['yearly'])
-                result['layer_names'].append('yearly_deforestation')
-                
-                # Constrói filtro CQL baseado na coluna 'year'
-                cql_filter = f"year BETWEEN {self.start_year} AND {self.end_year}"
-                
-                result['filters'].append(cql_filter)
-                
-            elif self.data_type == "acumulado":
-                # accumulated_deforestation (sem filtro) + yearly_deforestation (com filtro até ano final)
-                result['urls'].append(urls['accumulated'])
-                result['urls'].append(urls['yearly'])
-                result['layer_names'].append('accumulated_deforestation')
-                result['layer_names'].append('yearly_deforestation')
-                
-                # Filtro só para yearly (accumulated não precisa de filtro)
-                result['filters'].append("")  # Sem filtro para accumulated
-                
-                # Para yearly até o ano final, baseado na coluna 'year'
-                base_year = self.prodes_base_years.get(self.selected_biome, 2000)
-                cql_filter = f"year%20BETWEEN%20{base_year}%20AND%20{self.end_year}"
-                
-                result['filters'].append(cql_filter)
-            
-            return result
-            
-        except Exception as e:
-            print(f"❌ ERROR build_urls_and_filters: {str(e)}")
-            return {'urls': [], 'filters': [], 'layer_names': []}
-
-    def build_deter_urls_and_filters(self):
-        """Constrói URLs e filtros para processamento DETER - ESTRATÉGIA ROBUSTA"""
-        try:
-            result = {
-                'urls': [],
-                'filters': [],
-                'layer_names': []
-            }
-            
-            # URLs dos serviços DETER
-            deter_urls = {
-                'Cerrado': 'https://terrabrasilis.dpi.inpe.br/geoserver/deter-cerrado-nb/deter_cerrado/ows',
-                'Amazônia Legal': 'https://terrabrasilis.dpi.inpe.br/geoserver/deter-amz/deter_amz/ows'
-            }
-            
-            # URL única para DETER
-            url = deter_urls[self.selected_biome]
-            result['urls'].append(url)
-            result['layer_names'].append('deter_alerts')
-            
-            # ESTRATÉGIA ROBUSTA: Baixar primeiro só com filtro espacial
-            # Depois aplicar filtros temporais/classes na memória
-            
-            # Para "todo o bioma": SEM filtro na URL
-            # Para corte espacial: filtro BBOX na URL
-            # Filtros temporais/classes: aplicados na memória
-            
-            # CORREÇÃO: DETER usa a mesma estratégia que PRODES
-            # Não precisa construir BBOX aqui, a função download_wfs_layer() já faz isso
-            print(f"✅ INFO: DETER usará função download_wfs_layer() com suporte automático ao BBOX")
-            result['filters'].append('')  # Sem filtro na URL - filtros aplicados na memória
-            
-            # NOVA ESTRATÉGIA: Constrói expressão QGIS nativa
-            # Formato de data ISO para QGIS: YYYY-MM-DD
-            start_date = f"{self.deter_start_year}-01-01"
-            end_date = f"{self.deter_end_year}-12-31"
-            
-            # Expressão de data usando sintaxe QGIS
-            date_filter = f"\"view_date\" >= '{start_date}' AND \"view_date\" <= '{end_date}'"
-            
-            # Classes selecionadas
-            available_classes = self.deter_classes[self.selected_biome]
-            total_available = len(available_classes)
-            total_selected = len(self.deter_selected_classes)
-            
-            if total_selected == total_available:
-                # Todas as classes = só filtro temporal
-                qgis_expression = date_filter
-                print(f"✅ INFO: Todas as {total_selected} classes selecionadas - aplicando APENAS filtro temporal")
-            else:
-                # Algumas classes = filtro temporal + classes
-                if len(self.deter_selected_classes) == 1:
-                    class_filter = f"\"classname\" = '{self.deter_selected_classes[0]}'"
-                else:
-                    classes_str = "','".join(self.deter_selected_classes)
-                    class_filter = f"\"classname\" IN ('{classes_str}')"
-                
-                qgis_expression = f"{date_filter} AND {class_filter}"
-                print(f"✅ INFO: {total_selected}/{total_available} classes selecionadas - aplicando filtros temporal + classes")
-            
-            # ARMAZENA expressão QGIS para usar na função apply_temporal_filter
-            result['memory_filter'] = qgis_expression
-            
-            print(f"🔍 DEBUG: URL DETER: {url}")
-            print(f"🔍 DEBUG: Expressão QGIS: {qgis_expression}")
-            
-            return result
-            
-        except Exception as e:
-            print(f"❌ ERROR build_deter_urls_and_filters: {str(e)}")
-            return {'urls': [], 'filters': [], 'layer_names': [], 'memory_filter': ''}
-
-    def process_terraclass_data(self):
-        """Processa os dados TERRACLASS conforme configurações - VERSÃO REAL"""
-        try:
-            print(f"🚀 DEBUG: === INICIANDO PROCESSAMENTO REAL TERRACLASS ===")
-            
-            # NOVO: Reseta log de processamentos para nova operação
-            self.processing_log = []
-            
-            # Gera nome do arquivo baseado nas seleções TERRACLASS
-            self.output_filename = self.generate_terraclass_output_filename()
-            print(f"📁 DEBUG: Nome do arquivo TERRACLASS: {self.output_filename}")
-            
-            # Constrói URLs e informações para TERRACLASS
-            self.terraclass_download_info = self.build_terraclass_download_info()
-            print(f"🌐 DEBUG: Info de download TERRACLASS: {self.terraclass_download_info}")
-            
-            # Inicia processamento REAL
-            self.current_step_index = 0
-            self.processing_layers = []  # Para armazenar layers baixadas
-            
-            # Etapa 1: Baixar arquivo ZIP
-            self.terraclass_step_download_zip()
-            
-        except Exception as e:
-            print(f"❌ ERROR process_terraclass_data: {str(e)}")
-            self.status_label.setText(f"❌ Erro no processamento TERRACLASS: {str(e)}")
-            self.end_download_mode(success=False)
-
-    def generate_terraclass_output_filename(self):
-        """Gera nome do arquivo de saída para TERRACLASS"""
-        try:
-            # Componentes do nome
-            theme = self.selected_theme.lower()
-            biome = self.selected_biome.lower().replace(' ', '_').replace('ã', 'a').replace('ô', 'o')
-            year = str(self.terraclass_year)
-            
-            # Estado normalizado
-            state_normalized = self.normalize_terraclass_text(self.terraclass_state)
-            
-            # Tipo de download
-            if self.terraclass_municipality:
-                # Download municipal
-                municipality_normalized = self.normalize_terraclass_text(self.terraclass_municipality)
-                download_type = "municipal"
-                location_part = f"{state_normalized}_{municipality_normalized}"
-            else:
-                # Download estadual
-                download_type = "estadual"
-                location_part = state_normalized
-            
-            # Nome final
-            filename = f"{theme}_{biome}_{year}_{download_type}_{location_part}"
-            
-            # Limita tamanho do nome
-            if len(filename) > 100:
-                filename = f"{theme}_{biome}_{year}_{location_part}"
-            
-            print(f"📁 DEBUG: Nome TERRACLASS gerado: {filename}")
-            return filename
-            
-        except Exception as e:
-            print(f"❌ ERROR generate_terraclass_output_filename: {str(e)}")
-            return f"terraclass_{self.selected_biome.lower()}_{self.terraclass_year}_{self.terraclass_state.lower()}"
-
-    def build_terraclass_download_info(self):
-        """Constrói informações de download para TERRACLASS"""
-        try:
-            # Obtém dados do shapefile IBGE
-            shapefile_data = self.get_terraclass_shapefile_data()
-            if not shapefile_data:
-                raise Exception("Falha ao obter dados do shapefile IBGE")
-            
-            # Constrói URL baseada no tipo de download usando configuração dinâmica
-            url_templates = self.get_dynamic_terraclass_urls()
-            
-            if self.terraclass_municipality:
-                # Download municipal
-                url_template = url_templates['base'] + url_templates['municipal']
-                
-                url = url_template.format(
-                    uf_lower=shapefile_data['uf'].lower(),
-                    bioma='AMZ' if self.selected_biome == 'Amazônia' else 'CER',
-                    ano=self.terraclass_year,
-                    municipio_normalizado=self.normalize_terraclass_text(self.terraclass_municipality),
-                    UF=shapefile_data['uf'],
-                    geocodigo_munic=shapefile_data['geocodigo']
-                )
-                download_type = "Municipal"
-                location = f"{self.terraclass_state} - {self.terraclass_municipality}"
-            else:
-                # Download estadual
-                url_template = url_templates['base'] + url_templates['estadual']
-                
-                url = url_template.format(
-                    bioma='AMZ' if self.selected_biome == 'Amazônia' else 'CER',
-                    ano=self.terraclass_year,
-                    estado_normalizado=self.normalize_terraclass_text(self.terraclass_state),
-                    geocodigo_uf=shapefile_data['cod_uf']
-                )
-                download_type = "Estadual"
-                location = self.terraclass_state
-            
-            return {
-                'url': url,
-                'download_type': download_type,
-                'location': location,
-                'biome': self.selected_biome,
-                'year': self.terraclass_year,
-                'shapefile_data': shapefile_data
-            }
-            
-        except Exception as e:
-            print(f"❌ ERROR build_terraclass_download_info: {str(e)}")
-            return None
-
-    def get_terraclass_shapefile_data(self):
-        """Obtém dados necessários do shapefile IBGE para TERRACLASS"""
-        try:
-            if not self.ibge_layer:
-                return None
-            
-            # Constrói filtro para encontrar os dados necessários
-            if self.terraclass_municipality:
-                # Para município específico
-                expression = f'"bioma" = \'{self.selected_biome}\' AND "estado" = \'{self.terraclass_state}\' AND "nome" = \'{self.terraclass_municipality}\''
-            else:
-                # Para estado (pega qualquer município do estado para obter cod_uf)
-                expression = f'"bioma" = \'{self.selected_biome}\' AND "estado" = \'{self.terraclass_state}\''
-            
-            # Busca primeira feição que atende o critério
-            request = QgsFeatureRequest().setFilterExpression(expression)
-            features = list(self.ibge_layer.getFeatures(request))
-            
-            if not features:
-                print(f"❌ DEBUG: Nenhuma feição encontrada no shapefile para {self.terraclass_state}")
-                return None
-            
-            feature = features[0]  # Usa primeira feição encontrada
-            
-            data = {
-                'nome': feature['nome'],
-                'geocodigo': feature['geocodigo'], 
-                'uf': feature['uf'],
-                'estado': feature['estado'],
-                'bioma': feature['bioma'],
-                'cod_uf': feature['cod_uf']
-            }
-            
-            print(f"✅ DEBUG: Dados do shapefile obtidos: {data}")
-            return data
-            
-        except Exception as e:
-            print(f"❌ ERROR get_terraclass_shapefile_data: {str(e)}")
-            return None
-
-    def terraclass_step_download_zip(self):
-        """Etapa 1: Baixa arquivo ZIP do TERRACLASS"""
-        try:
-            self.status_label.setText("📥 Baixando arquivo TERRACLASS...")
-            self.update_notes(f"📥 Baixando {self.terraclass_download_info['download_type']} | {self.terraclass_download_info['location']}", "status")
-            
-            url = self.terraclass_download_info['url']
-            print(f"🌐 DEBUG: URL TERRACLASS: {url}")
-            
-            # Baixa arquivo ZIP
-            zip_file_path = self.download_terraclass_zip(url)
-            
-            if zip_file_path:
-                print(f"✅ DEBUG: ZIP baixado com sucesso: {zip_file_path}")
-                self.terraclass_zip_path = zip_file_path
-                
-                # Agenda próxima etapa
-                QTimer.singleShot(1000, self.terraclass_step_extract_zip)
-            else:
-                raise Exception("Falha ao baixar arquivo ZIP")
-                
-        except Exception as e:
-            print(f"❌ ERROR terraclass_step_download_zip: {str(e)}")
-            self.status_label.setText(f"❌ Erro no download: {str(e)}")
-            self.end_download_mode(success=False)
-
-    def download_terraclass_zip(self, url):
-        """Baixa arquivo ZIP do TERRACLASS"""
-        try:
-            from qgis.PyQt.QtCore import QUrl, QEventLoop
-            from qgis.PyQt.QtNetwork import QNetworkRequest, QNetworkReply
-            import tempfile
-            import os
-            
-            print(f"🌐 DEBUG: Iniciando download ZIP: {url}")
-            
-            # Verifica abort antes de iniciar download
-            if self.check_abort_signal():
-                print("🛑 DEBUG: Download TERRACLASS abortado antes do início")
-                return None
-            
-            # Cria request
-            request = QNetworkRequest(QUrl(url))
-            request.setRawHeader(b"User-Agent", b"QGIS-DesagregaBiomasBR")
-            reply = self.network_manager.get(request)
-            
-            # Aguarda resposta com verificações periódicas de abort
-            loop = QEventLoop()
-            reply.finished.connect(loop.quit)
-            
-            # Timer para verificar abort periodicamente durante download
-            abort_timer = QTimer()
-            abort_timer.timeout.connect(lambda: (
-                self.check_abort_signal() and (
-                    reply.abort(),
-                    loop.quit(),
-                    print("🛑 DEBUG: Download TERRACLASS abortado durante transferência")
-                )[-1]
-            ))
-            abort_timer.start(500)  # Verifica a cada 500ms
-            
-            loop.exec_()
-            abort_timer.stop()
-            
-            if reply.error() == QNetworkReply.NoError:
-                # Lê dados
-                data = reply.readAll()
-                
-                if len(data) > 1000:  # Verifica se é um arquivo válido
-                    # Salva arquivo temporário
-                    temp_dir = tempfile.gettempdir()
-                    zip_filename = f"terraclass_{self.terraclass_year}_{id(self)}.zip"
-                    zip_path = os.path.join(temp_dir, zip_filename)
-                    
-                    with open(zip_path, 'wb') as f:
-                        f.write(data.data())
-                    
-                    print(f"✅ DEBUG: ZIP salvo em: {zip_path}")
-                    print(f"📊 DEBUG: Tamanho do arquivo: {len(data)} bytes")
-                    
-                    reply.deleteLater()
-                    return zip_path
-                else:
-                    print(f"❌ DEBUG: Arquivo muito pequeno ({len(data)} bytes) - provavelmente erro")
-            else:
-                error_msg = reply.errorString()
-                print(f"❌ DEBUG: Erro no download: {error_msg}")
-            
-            reply.deleteLater()
-            return None
-            
-        except Exception as e:
-            print(f"❌ ERROR download_terraclass_zip: {str(e)}")
-            return None
-
-    def terraclass_step_extract_zip(self):
-        """Etapa 2: Extrai arquivo ZIP e processa shapefile"""
-        try:
-            self.status_label.setText("📦 Extraindo arquivo TERRACLASS...")
-            self.update_notes(f"📦 Extraindo ZIP | Processando shapefile", "status")
-            
-            # Extrai ZIP
-            extracted_files = self.extract_terraclass_zip(self.terraclass_zip_path)
-            
-            if extracted_files:
-                # Procura shapefile principal
-                shapefile_path = self.find_terraclass_shapefile(extracted_files)
-                
-                if shapefile_path:
-                    print(f"✅ DEBUG: Shapefile encontrado: {shapefile_path}")
-                    self.terraclass_shapefile_path = shapefile_path
-                    
-                    # Carrega shapefile
-                    layer = QgsVectorLayer(shapefile_path, f"TERRACLASS_{self.terraclass_year}", "ogr")
-                    
-                    if layer.isValid():
-                        self.processing_layers = [layer]
-                        
-                        # NOVO: Registra processamento específico TERRACLASS
-                        self.add_processing_log(
-                            "EXTRAÇÃO DE ARQUIVO",
-                            f"Arquivo ZIP extraído → Shapefile TERRACLASS carregado ({layer.featureCount()} feições)"
-                        )
-                        
-                        print(f"✅ DEBUG: Shapefile carregado: {layer.featureCount()} feições")
-                        
-                        # Agenda próxima etapa
-                        QTimer.singleShot(1000, self.terraclass_step_apply_style)
-                    else:
-                        raise Exception("Shapefile extraído é inválido")
-                else:
-                    raise Exception("Nenhum shapefile encontrado no ZIP")
-            else:
-                raise Exception("Falha ao extrair arquivo ZIP")
-                
-        except Exception as e:
-            print(f"❌ ERROR terraclass_step_extract_zip: {str(e)}")
-            self.status_label.setText(f"❌ Erro na extração: {str(e)}")
-            self.end_download_mode(success=False)
-
-    def extract_terraclass_zip(self, zip_path):
-        """Extrai arquivo ZIP do TERRACLASS"""
-        try:
-            import zipfile
-            import tempfile
-            import os
-            
-            # Cria diretório temporário para extração
-            extract_dir = os.path.join(tempfile.gettempdir(), f"terraclass_extract_{id(self)}")
-            os.makedirs(extract_dir, exist_ok=True)
-            
-            print(f"📦 DEBUG: Extraindo para: {extract_dir}")
-            
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-                
-                # Lista arquivos extraídos
-                extracted_files = []
-                for root, dirs, files in os.walk(extract_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        extracted_files.append(file_path)
-                        print(f"   📄 {file}")
-                
-                print(f"✅ DEBUG: {len(extracted_files)} arquivos extraídos")
-                return extracted_files
-                
-        except Exception as e:
-            print(f"❌ ERROR extract_terraclass_zip: {str(e)}")
-            return None
-
-    def find_terraclass_shapefile(self, extracted_files):
-        """Encontra o shapefile principal nos arquivos extraídos"""
-        try:
-            # Procura por arquivos .shp
-            shapefiles = [f for f in extracted_files if f.endswith('.shp')]
-            
-            if not shapefiles:
-                print(f"❌ DEBUG: Nenhum arquivo .shp encontrado")
-                return None
-            
-            # Se há apenas um, usa ele
-            if len(shapefiles) == 1:
-                print(f"✅ DEBUG: Shapefile único encontrado: {shapefiles[0]}")
-                return shapefiles[0]
-            
-            # Se há múltiplos, procura pelo principal (maior ou com padrão específico)
-            main_shapefile = None
-            
-            for shp in shapefiles:
-                filename = os.path.basename(shp).lower()
-                # Padrões que indicam arquivo principal
-                if any(pattern in filename for pattern in ['terraclass', 'principal', 'main']):
-                    main_shapefile = shp
-                    break
-            
-            # Se não encontrou por padrão, usa o primeiro
-            if not main_shapefile:
-                main_shapefile = shapefiles[0]
-            
-            print(f"✅ DEBUG: Shapefile principal selecionado: {main_shapefile}")
-            return main_shapefile
-            
-        except Exception as e:
-            print(f"❌ ERROR find_terraclass_shapefile: {str(e)}")
-            return None
-
-    def terraclass_step_apply_style(self):
-        """Etapa 3: Aplica estilo e finaliza processamento"""
-        try:
-            self.status_label.setText("🎨 Aplicando estilo TERRACLASS...")
-            self.update_notes(f"🎨 Aplicando simbologia | Finalizando processamento", "status")
-            
-            if self.processing_layers:
-                layer = self.processing_layers[0]
-                
-                # Aplica estilo TERRACLASS se arquivo existe
-                style_applied = self.apply_terraclass_style(layer)
-                
-                if style_applied:
-                    print(f"✅ DEBUG: Estilo TERRACLASS aplicado")
-                else:
-                    print(f"⚠️ DEBUG: Estilo padrão aplicado (arquivo QML não encontrado)")
-                
-                # Agenda finalização
-                QTimer.singleShot(1000, self.terraclass_step_finish)
-            else:
-                raise Exception("Nenhuma layer para aplicar estilo")
-                
-        except Exception as e:
-            print(f"❌ ERROR terraclass_step_apply_style: {str(e)}")
-            self.status_label.setText(f"❌ Erro ao aplicar estilo: {str(e)}")
-            self.progress_bar.setVisible(False)
-            self.btn_process.setEnabled(True)
-
-    def apply_terraclass_style(self, layer):
-        """Aplica estilo TERRACLASS conforme arquivo QML"""
-        try:
-            # Procura arquivo de estilo
-            style_path = os.path.join(self.plugin_dir, 'estilo_terraclass.qml')
-            
-            if os.path.exists(style_path):
-                print(f"🎨 DEBUG: Aplicando estilo: {style_path}")
-                
-                # Carrega estilo do arquivo QML
-                result = layer.loadNamedStyle(style_path)
-                
-                if result[1]:  # result[1] indica sucesso
-                    print(f"✅ DEBUG: Estilo QML aplicado com sucesso")
-                    layer.triggerRepaint()
-                    return True
-                else:
-                    print(f"⚠️ DEBUG: Falha ao carregar estilo QML: {result[0]}")
-            else:
-                print(f"⚠️ DEBUG: Arquivo de estilo não encontrado: {style_path}")
-            
-            # Aplica estilo padrão se QML falhar
-            self.apply_default_terraclass_style(layer)
-            return False
-            
-        except Exception as e:
-            print(f"❌ ERROR apply_terraclass_style: {str(e)}")
-            self.apply_default_terraclass_style(layer)
-            return False
-
-    def apply_default_terraclass_style(self, layer):
-        """Aplica estilo padrão para TERRACLASS"""
-        try:
-            from qgis.core import QgsSymbol, QgsSingleSymbolRenderer
-            from qgis.PyQt.QtGui import QColor
-            
-            # Cria símbolo padrão
-            symbol = QgsSymbol.defaultSymbol(layer.geometryType())
-            symbol.setColor(QColor(34, 139, 34, 180))  # Verde semi-transparente
-            symbol.symbolLayer(0).setStrokeColor(QColor(0, 100, 0, 255))  # Borda verde escura
-            symbol.symbolLayer(0).setStrokeWidth(0.5)
-            
-            # Aplica renderizador
-            renderer = QgsSingleSymbolRenderer(symbol)
-            layer.setRenderer(renderer)
-            layer.triggerRepaint()
-            
-            print(f"✅ DEBUG: Estilo padrão TERRACLASS aplicado")
-            
-        except Exception as e:
-            print(f"❌ ERROR apply_default_terraclass_style: {str(e)}")
-
-    def terraclass_step_finish(self):
-        """Etapa 4: Salva arquivo e finaliza processamento TERRACLASS"""
+        """Etapa 8: Finaliza processamento"""
         try:
-            # Salva arquivo na pasta escolhida pelo usuário
-            if not self.processing_layers:
-                raise Exception("Nenhuma layer para salvar")
+            self.status_label.setText("✅ Processamento concluído com sucesso!")
+            self.status_label.setStyleSheet("color: #2e7c3f; font-weight: bold;")
             
-            final_layer = self.processing_layers[0]
+            # Finaliza modo download com sucesso
+            self.end_download_mode(success=True)
             
-            # Determina formato e extensão
-            if self.radio_shapefile.isChecked():
-                format_name = "ESRI Shapefile"
-                extension = ".shp"
-            else:
-                format_name = "GPKG"
-                extension = ".gpkg"
+            # Atualiza notas finais
+            final_notes = []
             
-            # Monta caminho completo na pasta escolhida pelo usuário
-            dest_path = self.dest_path_edit.toPlainText().strip()
-            full_path = os.path.join(dest_path, f"{self.output_filename}{extension}")
+            if hasattr(self, 'final_file_path'):
+                final_notes.append(f"✅ Arquivo salvo: {self.final_file_path}")
             
-            self.status_label.setText("💾 Salvando arquivo TERRACLASS...")
+            final_notes.append(f"📊 Dados: {self.selected_theme} - {self.selected_biome}")
             
-            # Salva o arquivo
-            success = self.save_layer_to_file(final_layer, full_path, format_name)
+            if hasattr(self, 'data_type'):
+                final_notes.append(f"📈 Tipo: {self.data_type}")
             
-            if not success:
-                raise Exception("Falha ao salvar arquivo TERRACLASS")
+            if hasattr(self, 'start_year') and hasattr(self, 'end_year'):
+                final_notes.append(f"🗓️ Período: {self.start_year}-{self.end_year}")
             
-            self.final_file_path = full_path
+            if hasattr(self, 'processing_layers') and self.processing_layers:
+                final_notes.append(f"📊 Feições: {self.processing_layers[0].featureCount()}")
             
-            # Gera metadados se solicitado
-            if self.checkbox_generate_metadata.isChecked():
-                self.status_label.setText("📄 Gerando metadados TERRACLASS...")
-                
-                metadata_path = os.path.join(dest_path, f"{self.output_filename}.txt")
-                self.generate_terraclass_metadata_file(metadata_path)
-                self.metadata_file_path = metadata_path
+            if hasattr(self, 'metadata_file_path'):
+                final_notes.append(f"📄 Metadados: {os.path.basename(self.metadata_file_path)}")
             
-            # Adiciona layer ao QGIS se solicitado
             if self.checkbox_add_to_map.isChecked():
-                self.status_label.setText("🗺️ Adicionando TERRACLASS ao QGIS...")
-                
-                # Carrega layer salva no QGIS
-                layer_name = self.output_filename
-                layer = QgsVectorLayer(full_path, layer_name, "ogr")
-                
-                if layer.isValid():
-                    # Adiciona ao projeto
-                    QgsProject.instance().addMapLayer(layer)
-                    
-                    # 🎨 APLICA SIMBOLOGIA TERRACLASS
-                    self.status_label.setText("🎨 Aplicando simbologia TERRACLASS...")
-                    self.apply_terraclass_style(layer)
-                    
-                    # Zoom para a extensão da layer
-                    try:
-                        from qgis.utils import iface
-                        iface.mapCanvas().setExtent(layer.extent())
-                        iface.mapCanvas().refresh()
-                    except:
-                        pass
-            
-            # Atualiza status final
-            self.status_label.setText("✅ Processamento TERRACLASS concluído com sucesso!")
-            self.status_label.setStyleSheet("color: #2e7c3f; font-weight: bold;")
-            
-            # Finaliza modo download com sucesso
-            self.end_download_mode(success=True)
+                final_notes.append(f"🗺️ Adicionado ao QGIS")
             
-            # Atualiza notas finais
-            final_part = f"✅ Arquivo salvo: {os.path.basename(full_path)}"
+            # Adiciona resultado final à linha de configuração (contínua)
+            final_part = f"✅ Arquivo salvo: {os.path.basename(self.final_file_path)}"
             
             # Obtém a configuração atual e adiciona o resultado
             if hasattr(self, 'config_note') and self.config_note:
@@ -4092,234 +1175,12 @@ class DesagregaBiomasBRDialog(QDialog):
             self.status_note = ""
             self._update_notes_display()
             
-        except Exception as e:
-            from qgis.core import QgsMessageLog, Qgis
-            error_msg = f"❌ ERRO terraclass_step_finish: {str(e)}"
-            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
-            self.status_label.setText(f"❌ Erro na finalização: {str(e)}")
-            self.end_download_mode(success=False)
-
-    def generate_terraclass_metadata_file(self, metadata_path):
-        """Gera arquivo de metadados específico para TERRACLASS"""
-        try:
-            from datetime import datetime
-            
-            metadata_content = []
-            metadata_content.append("=" * 60)
-            metadata_content.append(f"METADADOS DO PROCESSAMENTO TERRACLASS")
-            metadata_content.append("Plugin DesagregaBiomasBR")
-            metadata_content.append("=" * 60)
-            metadata_content.append("")
-            
-            # Texto introdutório específico do TERRACLASS
-            intro_text = "O Projeto TerraClass tem como objetivo qualificar o desflorestamento da Amazônia Legal e Cerrado. "
-            intro_text += "A partir das áreas mapeadas pelo PRODES, o TerraClass produz mapas sistêmicos de uso e cobertura "
-            intro_text += "das terras desflorestadas nas regiões indicadas."
-            
-            metadata_content.append("DESCRIÇÃO:")
-            metadata_content.append(intro_text)
-            metadata_content.append("")
-            
-            # Informações gerais
-            metadata_content.append("INFORMAÇÕES GERAIS:")
-            metadata_content.append(f"Data/Hora do processamento: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-            metadata_content.append(f"Tema: TERRACLASS")
-            metadata_content.append(f"Bioma: {self.selected_biome}")
-            metadata_content.append(f"Ano: {self.terraclass_year}")
-            if hasattr(self, 'terraclass_state') and self.terraclass_state:
-                metadata_content.append(f"Estado: {self.terraclass_state}")
-            if hasattr(self, 'terraclass_municipality') and self.terraclass_municipality:
-                metadata_content.append(f"Município: {self.terraclass_municipality}")
-            metadata_content.append("")
-            
-            # Metodologia
-            metadata_content.append("METODOLOGIA:")
-            methodol_text = "A metodologia TerraClass, desenvolvida conjuntamente entre o INPE e a EMBRAPA, "
-            methodol_text += "baseia-se atualmente na análise da série temporal de imagens de satélite de média resolução (20 a 10m), "
-            methodol_text += "e técnicas de processamento de imagens, para identificar as diferentes classes de uso e cobertura: "
-            methodol_text += "vegetação natural – primária e secundária; cultura agrícola – perene, semiperene, temporária de um ciclo, "
-            methodol_text += "e de mais de um ciclo; pastagem; silvicultura; mineração; urbanizada; outras áreas edificadas; "
-            methodol_text += "outros usos; natural não-florestal e corpos d´água."
-            metadata_content.append(methodol_text)
-            metadata_content.append("")
-            
-            # Configurações temporais
-            metadata_content.append("CONFIGURAÇÕES TEMPORAIS:")
-            metadata_content.append(f"Unidade temporal: Anual")
-            metadata_content.append(f"Ano de referência: {self.terraclass_year}")
-            metadata_content.append("")
-            
-            # Configurações espaciais
-            metadata_content.append("CONFIGURAÇÕES ESPACIAIS:")
-            metadata_content.append(f"Bioma: {self.selected_biome}")
-            if hasattr(self, 'terraclass_state') and self.terraclass_state:
-                metadata_content.append(f"Estado: {self.terraclass_state}")
-                if hasattr(self, 'terraclass_municipality') and self.terraclass_municipality:
-                    metadata_content.append(f"Município: {self.terraclass_municipality}")
-                    metadata_content.append("Tipo de recorte: Municipal")
-                else:
-                    metadata_content.append("Tipo de recorte: Estadual")
-            else:
-                metadata_content.append("Tipo de recorte: Bioma completo")
-            metadata_content.append("")
-            
-            # URL do arquivo
-            metadata_content.append("ORIGEM DOS DADOS:")
-            if hasattr(self, 'terraclass_download_info') and self.terraclass_download_info:
-                metadata_content.append(f"Tipo de download: {self.terraclass_download_info['download_type']}")
-                metadata_content.append(f"Local: {self.terraclass_download_info['location']}")
-                metadata_content.append(f"URL: {self.terraclass_download_info['url']}")
-            metadata_content.append("")
-            
-            # Informações do arquivo final
-            metadata_content.append("ARQUIVO RESULTANTE:")
-            metadata_content.append(f"Nome: {self.output_filename}")
-            metadata_content.append(f"Caminho: {getattr(self, 'final_file_path', 'N/A')}")
-            metadata_content.append(f"Formato: {'Shapefile' if self.radio_shapefile.isChecked() else 'GeoPackage'}")
-            
-            if hasattr(self, 'processing_layers') and self.processing_layers:
-                final_layer = self.processing_layers[0]
-                metadata_content.append(f"Número de feições: {final_layer.featureCount()}")
-                metadata_content.append(f"Sistema de coordenadas: {final_layer.crs().authid()} - {final_layer.crs().description()}")
-                metadata_content.append(f"Tipo de geometria: {QgsWkbTypes.displayString(final_layer.wkbType())}")
-                
-                # Extensão geográfica
-                extent = final_layer.extent()
-                if not extent.isEmpty():
-                    metadata_content.append(f"Extensão geográfica:")
-                    metadata_content.append(f"  Longitude mínima: {extent.xMinimum():.6f}")
-                    metadata_content.append(f"  Longitude máxima: {extent.xMaximum():.6f}")
-                    metadata_content.append(f"  Latitude mínima: {extent.yMinimum():.6f}")
-                    metadata_content.append(f"  Latitude máxima: {extent.yMaximum():.6f}")
-                
-                metadata_content.append("")  # NOVO: Linha em branco antes dos campos da tabela
-                    
-                # Campos da tabela (classes de uso)
-                fields = final_layer.fields()
-                if len(fields) > 0:
-                    metadata_content.append(f"Campos da tabela:")
-                    for field in fields:
-                        metadata_content.append(f"  {field.name()}: {field.typeName()}")
-                        
-                    metadata_content.append("")  # NOVO: Linha em branco após campos da tabela
-                    
-                    # Análise das classes de uso presentes
-                    metadata_content.append("CLASSES DE USO E COBERTURA IDENTIFICADAS:")
-                    
-                    # Busca por campos que podem conter classes de uso
-                    class_fields = []
-                    for field in fields:
-                        field_name = field.name().lower()
-                        if any(keyword in field_name for keyword in ['class', 'uso', 'cover', 'terra']):
-                            class_fields.append(field.name())
-                    
-                    if class_fields:
-                        for class_field in class_fields[:2]:  # Primeiros 2 campos de classe
-                            unique_values = []
-                            for feature in final_layer.getFeatures():
-                                value = feature[class_field]
-                                if value and value not in unique_values:
-                                    unique_values.append(value)
-                            
-                            if unique_values:
-                                metadata_content.append(f"  Campo '{class_field}':")
-                                for value in sorted(unique_values)[:15]:  # Primeiras 15 classes
-                                    metadata_content.append(f"    - {value}")
-                                if len(unique_values) > 15:
-                                    metadata_content.append(f"    ... e mais {len(unique_values) - 15} classes")
-            
-            metadata_content.append("")
-            metadata_content.append("INFORMAÇÕES ADICIONAIS:")
-            metadata_content.append("O TerraClass é uma iniciativa conjunta do INPE (Instituto Nacional de Pesquisas Espaciais)")
-            metadata_content.append("e EMBRAPA (Empresa Brasileira de Pesquisa Agropecuária) para qualificação do uso da terra")
-            metadata_content.append("em áreas desflorestadas dos biomas brasileiros.")
-            metadata_content.append("")
-            metadata_content.append("Palavras-chave: uso da terra, cobertura da terra, desflorestamento, PRODES, sensoriamento remoto")
-            metadata_content.append("")
-            
-            # NOVO: Seção específica de processamentos TERRACLASS
-            metadata_content.append("=" * 60)
-            metadata_content.append("PROCESSAMENTOS REALIZADOS:")
-            metadata_content.append("=" * 60)
-            processing_summary = self.get_processing_summary()
-            
-            if len(processing_summary) == 1 and "Nenhum processamento" in processing_summary[0]:
-                metadata_content.append("Dados utilizados conforme baixados da fonte original (arquivo ZIP).")
-                metadata_content.append("Processamento realizado: Extração de arquivo ZIP + Aplicação de simbologia padrão.")
-            else:
-                metadata_content.append("Os seguintes processamentos foram aplicados aos dados originais:")
-                metadata_content.append("")
-                
-                for i, process in enumerate(processing_summary, 1):
-                    metadata_content.append(f"{i:2d}. {process}")
-                
-                metadata_content.append("")
-                metadata_content.append("NOTA: Todos os processamentos utilizaram algoritmos nativos do QGIS.")
-                metadata_content.append("Os dados TERRACLASS preservam a classificação original INPE/EMBRAPA.")
-                
-            metadata_content.append("")
-            metadata_content.append("=" * 60)
-            metadata_content.append("Gerado pelo plugin DesagregaBiomasBR")
-            metadata_content.append(f"Desenvolvido para processamento de dados TERRACLASS")
-            metadata_content.append("=" * 60)
-            
-            # Salva arquivo
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(metadata_content))
-            
-            return True
-            
-        except Exception as e:
-            from qgis.core import QgsMessageLog, Qgis
-            error_msg = f"❌ ERRO generate_terraclass_metadata_file: {str(e)}"
-            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
-            return False
-
-    def generate_deter_output_filename(self):
-        """Gera nome do arquivo de saída para DETER"""
-        try:
-            # Componentes do nome
-            theme = self.selected_theme.lower()
-            biome = self.selected_biome.lower().replace(' ', '_').replace('â', 'a').replace('ô', 'o')
-            period = f"{self.deter_start_year}_{self.deter_end_year}"
-            
-            # Classes selecionadas com lógica inteligente
-            if self.selected_biome and self.selected_biome in self.deter_classes:
-                available_classes = self.deter_classes[self.selected_biome]
-                total_available = len(available_classes)
-                total_selected = len(self.deter_selected_classes)
-                
-                if total_selected == total_available:
-                    # Todas as classes = sem filtro
-                    classes_part = "todas_classes"
-                elif total_selected == 1:
-                    # Uma classe específica
-                    classes_part = self.deter_selected_classes[0].lower().replace('_', '')
-                else:
-                    # Algumas classes
-                    classes_part = f"select_{total_selected}_de_{total_available}"
-            else:
-                # Fallback
-                classes_part = "classes_selecionadas"
-            
-            # Tipo de corte
-            cut_name = self.get_cut_option_name()
-            
-            # Nome final
-            filename = f"{theme}_{biome}_{period}_{classes_part}_{cut_name}"
-            
-            # Limita tamanho do nome
-            if len(filename) > 100:
-                filename = f"{theme}_{biome}_{period}_{cut_name}"
-            
-            print(f"📁 DEBUG: Nome DETER gerado: {filename}")
-            return filename
+            print(f"🎉 DEBUG: === PROCESSAMENTO REAL CONCLUÍDO COM SUCESSO! ===")
             
         except Exception as e:
-            print(f"❌ ERROR generate_deter_output_filename: {str(e)}")
-            return f"deter_{self.selected_biome.lower()}_{self.deter_start_year}_{self.deter_end_year}"
-
-
+            print(f"❌ ERROR real_step_finish: {str(e)}")
+            self.status_label.setText(f"❌ Erro na finalização: {str(e)}")
+            self.btn_process.setEnabled(True)
 
     def create_prodes_step2_content(self):
         """Cria o conteúdo específico para configuração temporal do PRODES"""
@@ -4969,7 +1830,7 @@ class DesagregaBiomasBRDialog(QDialog):
             if layer:
                 print(f"🔍 DEBUG: TESTANDO BBOX do layer completo...")
                 try:
-                    # Método direto: pega extent do layer sem usar get_cut_geometry_bbox 
+                    # Método direto: pega extent do layer
                     extent = layer.extent()
                     if extent and not extent.isEmpty():
                         # Formata como WFS BBOX
@@ -5316,12 +2177,8 @@ class DesagregaBiomasBRDialog(QDialog):
         # ESTRATÉGIA 5: Teste de conectividade básica
         print(f"🔍 Testando conectividade básica com {base_url}")
         try:
-            test_url = f"{base_url}?service=WFS&version=1.0.0&request=GetCapabilities"
-            print(f"🌐 Teste GetCapabilities: {test_url}")
-            
-            # Tenta criar uma layer apenas para testar conectividade
-            test_layer = QgsVectorLayer(test_url, "test_connectivity", "WFS")
-            if test_layer.isValid():
+            # GetCapabilities do cache de metadados (sem novo download se ainda válido)
+            if self.test_wfs_connectivity(base_url):
                 print(f"✅ Conectividade OK - servidor WFS responde")
             else:
                 print(f"❌ Problema de conectividade ou servidor indisponível")
@@ -5732,8 +2589,7 @@ class DesagregaBiomasBRDialog(QDialog):
         try:
             print(f"🔧 DEBUG: Tentando download HTTP direto...")
             
-            from qgis.PyQt.QtCore import QUrl, QEventLoop
-            from qgis.PyQt.QtNetwork import QNetworkRequest, QNetworkReply
+            session = self.get_http_session()
             
             wfs_type = self.wfs_type_combo.currentText()
             type_mapping = {
@@ -5758,10 +2614,11 @@ class DesagregaBiomasBRDialog(QDialog):
                 print(f"❌ DEBUG: Erro ao extrair namespace/layer")
                 return []
             
+            # Formatos disponíveis vêm do cache de GetCapabilities
+            print(f"📋 DEBUG: Formatos WFS disponíveis: {self.get_wfs_output_formats(base_url)}")
+            
             # Múltiplas URLs para testar
             test_urls = [
-                # GetCapabilities primeiro para verificar formatos disponíveis
-                f"{base_url}?service=WFS&request=GetCapabilities",
                 # Tenta pegar apenas 1 feature em diferentes formatos
                 f"{base_url}?service=WFS&version=1.0.0&request=GetFeature&typeName={namespace}:{layer_name}&srsName=EPSG:4674",
                 f"{base_url}?service=WFS&version=1.0.0&request=GetFeature&typeName={namespace}:{layer_name}&outputFormat=GML2&srsName=EPSG:4674",
@@ -5778,25 +2635,18 @@ class DesagregaBiomasBRDialog(QDialog):
                 try:
                     print(f"🌐 DEBUG: Tentativa HTTP {i+1}/{len(test_urls)}: {test_url[:80]}...")
                     
-                    # Cria request
-                    request = QNetworkRequest(QUrl(test_url))
-                    request.setRawHeader(b"User-Agent", b"QGIS")
-                    reply = self.network_manager.get(request)
-                    
-                    # Aguarda resposta
-                    loop = QEventLoop()
-                    reply.finished.connect(loop.quit)
-                    loop.exec_()
+                    # Faz a requisição pela sessão compartilhada
+                    response = session.get(test_url, timeout=60)
                     
-                    if reply.error() == QNetworkReply.NoError:
+                    if response.status_code == 200:
                         # Lê resposta
-                        data = reply.readAll()
+                        data = response.content
                         
                         # Tenta decodificar com diferentes encodings
                         text = ""
                         for encoding in ['utf-8', 'latin-1', 'iso-8859-1', 'windows-1252']:
                             try:
-                                text = data.data().decode(encoding, errors='ignore')
+                                text = data.decode(encoding, errors='ignore')
                                 break
                             except:
                                 continue
@@ -5806,14 +2656,6 @@ class DesagregaBiomasBRDialog(QDialog):
                         # Mostra primeiros caracteres para debug
                         print(f"🔍 DEBUG: Primeiros 200 caracteres: {text[:200]}")
                         
-                        # Se for GetCapabilities, apenas mostra formatos disponíveis
-                        if "GetCapabilities" in test_url:
-                            import re
-                            formats = re.findall(r'<Format>([^<]+)</Format>', text)
-                            if formats:
-                                print(f"📋 DEBUG: Formatos WFS disponíveis: {formats}")
-                            continue
-                        
                         # Procura valores do campo no texto
                         if field_name and len(text) > 0:
                             import re
@@ -5864,17 +2706,13 @@ class DesagregaBiomasBRDialog(QDialog):
                             
                             print(f"🔧 DEBUG: {len(unique_values)} valores únicos encontrados até agora")
                     else:
-                        error_string = reply.errorString()
-                        print(f"❌ DEBUG: Erro HTTP: {error_string}")
+                        print(f"❌ DEBUG: Erro HTTP: {response.status_code}")
                         
                         # Mesmo com erro, tenta ler conteúdo
-                        data = reply.readAll()
-                        if data.size() > 0:
-                            error_text = data.data().decode('utf-8', errors='ignore')
+                        if response.content:
+                            error_text = response.content.decode('utf-8', errors='ignore')
                             print(f"🔍 DEBUG: Resposta de erro: {error_text[:200]}")
                     
-                    reply.deleteLater()
-                    
                 except Exception as e:
                     print(f"❌ DEBUG: Erro na tentativa HTTP {i+1}: {str(e)}")
                     continue
@@ -5893,17 +2731,11 @@ class DesagregaBiomasBRDialog(QDialog):
                 print(f"🌐 DEBUG: REST URL: {rest_url[:80]}...")
                 
                 try:
-                    request = QNetworkRequest(QUrl(rest_url))
-                    reply = self.network_manager.get(request)
-                    loop = QEventLoop()
-                    reply.finished.connect(loop.quit)
-                    loop.exec_()
+                    response = session.get(rest_url, timeout=60)
                     
-                    if reply.error() == QNetworkReply.NoError:
-                        data = reply.readAll().data().decode('utf-8', errors='ignore')
+                    if response.status_code == 200:
+                        data = response.content.decode('utf-8', errors='ignore')
                         print(f"📋 DEBUG: DescribeFeatureType response: {data[:300]}")
-                    
-                    reply.deleteLater()
                 except:
                     pass
                 
@@ -5936,110 +2768,6 @@ class DesagregaBiomasBRDialog(QDialog):
             
         self.update_comprehensive_notes()
 
-    def get_cut_layer(self):
-        """Retorna a layer de corte baseada na opção selecionada"""
-        print(f"🔧 DEBUG get_cut_layer: Iniciando...")
-        print(f"🔧 DEBUG get_cut_layer: cut_option = {getattr(self, 'cut_option', 'UNDEFINED')}")
-        
-        if not hasattr(self, 'cut_option'):
-            print(f"❌ DEBUG get_cut_layer: cut_option não existe!")
-            return None
-            
-        if self.cut_option == 0:
-            # Sem limite de corte
-            print(f"🔧 DEBUG get_cut_layer: cut_option=0 (sem corte)")
-            return None
-            
-        elif self.cut_option == 1:
-            # Layer carregado no QGIS
-            print(f"🔧 DEBUG get_cut_layer: cut_option=1 (layer carregado)")
-            print(f"🔧 DEBUG get_cut_layer: selected_layer = {getattr(self, 'selected_layer', 'UNDEFINED')}")
-            print(f"🔧 DEBUG get_cut_layer: selected_field = {getattr(self, 'selected_field', 'UNDEFINED')}")
-            print(f"🔧 DEBUG get_cut_layer: selected_element = {getattr(self, 'selected_element', 'UNDEFINED')}")
-            
-            if self.selected_layer:
-                if self.selected_field and self.selected_element:
-                    # Cria layer filtrada
-                    try:
-                        print(f"🔧 DEBUG get_cut_layer: Tentando criar layer filtrada...")
-                        expression = f'"{self.selected_field}" = \'{self.selected_element}\''
-                        print(f"🔧 DEBUG get_cut_layer: Expression = {expression}")
-                        
-                        request = QgsFeatureRequest().setFilterExpression(expression)
-                        filtered_layer = self.selected_layer.materialize(request)
-                        
-                        if filtered_layer and filtered_layer.isValid():
-                            feature_count = filtered_layer.featureCount()
-                            print(f"✅ DEBUG get_cut_layer: Layer filtrada criada com {feature_count} feições")
-                            
-                            if feature_count > 0:
-                                filtered_layer.setName(f"{self.selected_layer.name()}_{self.selected_field}_{self.selected_element}")
-                                return filtered_layer
-                            else:
-                                print(f"⚠️ DEBUG get_cut_layer: Layer filtrada vazia - usando layer original")
-                                return self.selected_layer
-                        else:
-                            print(f"❌ DEBUG get_cut_layer: Falha ao criar layer filtrada - usando layer original")
-                            return self.selected_layer
-                            
-                    except Exception as e:
-                        print(f"❌ DEBUG get_cut_layer: Erro ao filtrar: {e}")
-                        print(f"🔧 DEBUG get_cut_layer: Retornando layer original")
-                        return self.selected_layer
-                else:
-                    print(f"🔧 DEBUG get_cut_layer: Sem filtro - retornando layer original")
-                    return self.selected_layer
-            else:
-                print(f"❌ DEBUG get_cut_layer: selected_layer é None!")
-                return None
-            
-        elif self.cut_option == 2:
-            # Desenho na tela
-            print(f"🔧 DEBUG get_cut_layer: cut_option=2 (desenho)")
-            print(f"🔧 DEBUG get_cut_layer: drawn_rectangle = {getattr(self, 'drawn_rectangle', 'UNDEFINED')}")
-            
-            if hasattr(self, 'drawn_rectangle') and self.drawn_rectangle:
-                try:
-                    print(f"🔧 DEBUG get_cut_layer: Criando layer de retângulo...")
-                    # Cria layer de memória com o retângulo
-                    rect_layer = QgsVectorLayer("Polygon?crs=EPSG:4674", "RetanguloDesenhado", "memory")
-                    provider = rect_layer.dataProvider()
-                    
-                    # Cria feição com geometria do retângulo
-                    rect_feature = QgsFeature()
-                    rect_geometry = QgsGeometry.fromRect(self.drawn_rectangle)
-                    rect_feature.setGeometry(rect_geometry)
-                    
-                    # Adiciona feição
-                    provider.addFeature(rect_feature)
-                    rect_layer.updateExtents()
-                    
-                    print(f"✅ DEBUG get_cut_layer: Layer de retângulo criada")
-                    return rect_layer
-                except Exception as e:
-                    print(f"❌ DEBUG get_cut_layer: Erro ao criar retângulo: {e}")
-                    return None
-            else:
-                print(f"❌ DEBUG get_cut_layer: drawn_rectangle não existe ou é None!")
-                return None
-            
-        elif self.cut_option == 3:
-            # IBGE
-            print(f"🔧 DEBUG get_cut_layer: cut_option=3 (IBGE)")
-            try:
-                ibge_layer = self.get_ibge_cut_layer()
-                if ibge_layer:
-                    print(f"✅ DEBUG get_cut_layer: Layer IBGE obtida: {ibge_layer.featureCount()} feições")
-                else:
-                    print(f"❌ DEBUG get_cut_layer: get_ibge_cut_layer retornou None")
-                return ibge_layer
-            except Exception as e:
-                print(f"❌ DEBUG get_cut_layer: Erro ao obter layer IBGE: {e}")
-                return None
-        
-        print(f"❌ DEBUG get_cut_layer: cut_option inválido: {self.cut_option}")
-        return None
-
     def get_wfs_cut_layer(self):
         """Retorna a layer de corte WFS configurada"""
         if not hasattr(self, 'wfs_layer') or not self.wfs_layer or not self.wfs_layer.isValid():
@@ -6120,6 +2848,11 @@ class DesagregaBiomasBRDialog(QDialog):
             message: Mensagem a ser exibida
             note_type: 'config' (linha fixa), 'status' (dinâmico), 'final' (resultado)
         """
+        if self.in_download_worker():
+            # Thread de download: a thread principal mostra o progresso de cada camada
+            self.worker_download_progress[self.download_worker_state.label] = message
+            return
+        
         if note_type == "config":
             # Linha de configuração fixa - substitui ou define a primeira linha
             self.config_note = message
@@ -6619,6 +3352,9 @@ class DesagregaBiomasBRDialog(QDialog):
             except:
                 pass
         
+        # Libera as conexões keep-alive da sessão HTTP
+        self.close_http_session()
+        
         # Força destruição da instância para garantir estado limpo na próxima abertura
         self.deleteLater()
         print("✅ DEBUG: Instância marcada para destruição - próxima abertura será com estado limpo")
@@ -7197,25 +3933,6 @@ class DesagregaBiomasBRDialog(QDialog):
             print(f"❌ DEBUG: Erro ao listar valores: {str(e)}")
             return []
 
-    def get_cut_option_name(self):
-        """Retorna o nome da opção de corte selecionada"""
-        if self.cut_option == 0:
-            return "SemCorte"
-        elif self.cut_option == 1:
-            return f"Layer_{self.selected_layer.name() if self.selected_layer else 'Indefinido'}"
-        elif self.cut_option == 2:
-            return "RetanguloDesenhado"
-        elif self.cut_option == 3:
-            # IBGE
-            parts = ["IBGE"]
-            if self.ibge_state:
-                parts.append(self.ibge_state.replace(" ", "_"))
-            if self.ibge_municipality:
-                parts.append(self.ibge_municipality.replace(" ", "_"))
-            return "_".join(parts)
-        else:
-            return "Desconhecido"
-
     def get_cut_option_details(self):
         """Retorna detalhes da opção de corte para exibição"""
         if self.cut_option == 0:
@@ -7251,54 +3968,6 @@ class DesagregaBiomasBRDialog(QDialog):
 
 
 
-    def test_wfs_connectivity(self, url):
-        """Testa conectividade WFS para dados PRODES/DETER"""
-        try:
-            print(f"🌐 DEBUG: Testando conectividade WFS: {url[:80]}...")
-            
-            # Extrai URL base sem parâmetros
-            base_url = url.split('?')[0]
-            
-            # Testa GetCapabilities simples
-            import requests
-            caps_url = f"{base_url}?service=WFS&request=GetCapabilities&version=2.0.0"
-            
-            response = requests.get(caps_url, timeout=10)
-            
-            if response.status_code == 200:
-                # Verifica se tem conteúdo WFS válido
-                content = response.text.lower()
-                if 'wfs_capabilities' in content or 'featurecollection' in content or 'wfs:wfs_capabilities' in content:
-                    print(f"✅ DEBUG: Conectividade WFS OK")
-                    return True
-                else:
-                    print(f"❌ DEBUG: Resposta inválida - não contém capabilities WFS")
-                    return False
-            else:
-                print(f"❌ DEBUG: Erro HTTP {response.status_code}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ DEBUG: Erro na conectividade WFS: {str(e)}")
-            return False
-
-    def normalize_terraclass_text(self, text):
-        """Normaliza texto para URLs TERRACLASS - remove acentos e caracteres especiais"""
-        import unicodedata
-        import re
-        
-        # Remove acentos
-        text_normalized = unicodedata.normalize('NFD', text)
-        text_ascii = ''.join(c for c in text_normalized if unicodedata.category(c) != 'Mn')
-        
-        # Converte para maiúsculo e substitui espaços por _
-        text_clean = text_ascii.upper().replace(' ', '_')
-        
-        # Remove outros caracteres especiais
-        text_clean = re.sub(r'[^A-Z0-9_]', '', text_clean)
-        
-        return text_clean
-
     def create_wfs_layer_simple(self, base_url, type_key):
         """Cria uma layer WFS com múltiplas estratégias"""
         try:
@@ -7607,26 +4276,6 @@ class DesagregaBiomasBRDialog(QDialog):
         print(f"✅ Shapefile IBGE encontrado: {shapefile_name}.shp")
         return shapefile_name
 
-    def load_ibge_shapefile(self):
-        """Carrega o shapefile IBGE dos limites"""
-        try:
-            if os.path.exists(self.ibge_shapefile_path):
-                self.ibge_layer = QgsVectorLayer(self.ibge_shapefile_path, "IBGE_Limites", "ogr")
-                if self.ibge_layer.isValid():
-                    print(f"✅ Shapefile IBGE carregado: {self.ibge_layer.featureCount()} feições")
-                    return True
-                else:
-                    print(f"❌ Shapefile IBGE inválido: {self.ibge_shapefile_path}")
-                    return False
-            else:
-                print(f"❌ Shapefile IBGE não encontrado: {self.ibge_shapefile_path}")
-                return False
-        except Exception as e:
-            print(f"❌ Erro ao carregar shapefile IBGE: {str(e)}")
-            return False
-
-
-
     def populate_states_combo(self, biome_region):
         """Popula o combo de estados baseado na seleção de bioma/região"""
         self.ibge_state_combo.clear()
@@ -7692,221 +4341,22 @@ class DesagregaBiomasBRDialog(QDialog):
         
         # Aplica filtro e obtém municípios únicos
         request = QgsFeatureRequest().setFilterExpression(expression)
-        municipalities = set()
-        
-        for feature in self.ibge_layer.getFeatures(request):
-            municipality = feature['nome']
-            if municipality:
-                municipalities.add(municipality)
-        
-        # Adiciona municípios ordenados ao combo
-        for municipality in sorted(municipalities):
-            self.ibge_municipality_combo.addItem(municipality)
-
-    def on_ibge_municipality_changed(self, selection):
-        """Callback para mudança de município"""
-        self.ibge_municipality = selection
-        self.update_comprehensive_notes()
-
-    def get_ibge_cut_layer(self):
-        """Obtém a camada de corte baseada na seleção IBGE"""
-        if not self.ibge_layer:
-            return None
-        
-        # Constrói filtro baseado na seleção hierárquica
-        filters = []
-        
-        # Filtro por bioma/região
-        if self.ibge_biome_region:
-            if self.ibge_biome_region == 'Amazônia Legal':
-                filters.append(f'"regiao" = \'Amazônia Legal\'')
-            else:
-                filters.append(f'"bioma" = \'{self.ibge_biome_region}\'')
-        
-        # Filtro por estado
-        if self.ibge_state:
-            filters.append(f'"estado" = \'{self.ibge_state}\'')
-        
-        # Filtro por município (se selecionado)
-        if self.ibge_municipality:
-            filters.append(f'"nome" = \'{self.ibge_municipality}\'')
-        
-        if not filters:
-            return None
-        
-        # Aplica filtros
-        expression = ' AND '.join(filters)
-        request = QgsFeatureRequest().setFilterExpression(expression)
-        
-        # Cria nova camada com as feições filtradas
-        filtered_layer = QgsVectorLayer(f"Polygon?crs={self.ibge_layer.crs().authid()}", "IBGE_Filtered", "memory")
-        provider = filtered_layer.dataProvider()
-        provider.addAttributes(self.ibge_layer.fields())
-        filtered_layer.updateFields()
-        
-        # Adiciona feições filtradas
-        features = []
-        for feature in self.ibge_layer.getFeatures(request):
-            features.append(feature)
-        
-        provider.addFeatures(features)
-        
-        if not self.ibge_municipality and self.ibge_state:
-            # Se não selecionou município, dissolve por estado
-            dissolved_layer = self.dissolve_layer(filtered_layer, 'estado')
-            return dissolved_layer if dissolved_layer else filtered_layer
-        
-        return filtered_layer
-
-    def get_amazonia_biome_cut_layer(self):
-        """Obtém a camada de corte do bioma Amazônia para recortar dados da Amazônia Legal
-        
-        Esta função é usada quando o usuário seleciona 'Amazônia' mas os dados vêm
-        do WFS da Amazônia Legal (que é mais estável). O corte garante que apenas
-        os polígonos dentro do bioma Amazônia sejam retornados.
-        """
-        try:
-            print(f"🌳 DEBUG: Obtendo limite do bioma Amazônia para corte...")
-            
-            # Verifica se o shapefile IBGE está disponível
-            if not hasattr(self, 'ibge_layer') or not self.ibge_layer:
-                # Tenta carregar o shapefile IBGE
-                self.load_ibge_shapefile()
-            
-            if not self.ibge_layer:
-                print(f"❌ DEBUG: Shapefile IBGE não disponível")
-                return None
-            
-            # Filtra pelo bioma Amazônia
-            expression = '"bioma" = \'Amazônia\''
-            request = QgsFeatureRequest().setFilterExpression(expression)
-            
-            # Cria nova camada com as feições do bioma Amazônia
-            filtered_layer = QgsVectorLayer(f"Polygon?crs={self.ibge_layer.crs().authid()}", "Bioma_Amazonia", "memory")
-            provider = filtered_layer.dataProvider()
-            provider.addAttributes(self.ibge_layer.fields())
-            filtered_layer.updateFields()
-            
-            # Adiciona feições filtradas
-            features = []
-            for feature in self.ibge_layer.getFeatures(request):
-                features.append(feature)
-            
-            if not features:
-                print(f"❌ DEBUG: Nenhuma feição encontrada para bioma Amazônia")
-                return None
-            
-            provider.addFeatures(features)
-            print(f"✅ DEBUG: {len(features)} feições do bioma Amazônia encontradas")
-            
-            # Dissolve para obter um único polígono do bioma
-            dissolved_layer = self.dissolve_layer(filtered_layer, 'bioma')
-            
-            if dissolved_layer and dissolved_layer.isValid():
-                print(f"✅ DEBUG: Layer do bioma Amazônia dissolvida: {dissolved_layer.featureCount()} feições")
-                return dissolved_layer
-            else:
-                print(f"⚠️ DEBUG: Dissolve falhou, usando layer não dissolvida")
-                return filtered_layer
-                
-        except Exception as e:
-            print(f"❌ ERROR get_amazonia_biome_cut_layer: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
-
-    def dissolve_layer(self, layer, field):
-        """Dissolve uma camada por um campo específico"""
-        try:
-            from qgis.analysis import QgsNativeAlgorithms
-            import processing
-            
-            # Configura parâmetros para dissolução
-            params = {
-                'INPUT': layer,
-                'FIELD': [field],
-                'OUTPUT': 'memory:'
-            }
-            
-            # Executa algoritmo de dissolução
-            result = processing.run("native:dissolve", params)
-            dissolved_layer = result['OUTPUT']
-            
-            if dissolved_layer and dissolved_layer.isValid():
-                original_count = layer.featureCount()
-                dissolved_count = dissolved_layer.featureCount()
-                
-                # NOVO: Registra processamento de dissolve
-                if dissolved_count < original_count:
-                    reduction_count = original_count - dissolved_count
-                    reduction_percent = (reduction_count / original_count) * 100
-                    self.add_processing_log(
-                        f"DISSOLUÇÃO POR CAMPO '{field}'",
-                        f"{original_count} feições → {dissolved_count} feições dissolvidas (união de {reduction_count} polígonos - {reduction_percent:.1f}% redução)"
-                    )
-                else:
-                    self.add_processing_log(
-                        f"DISSOLUÇÃO POR CAMPO '{field}'",
-                        f"{original_count} feições analisadas → {dissolved_count} feições (nenhum polígono foi unido)"
-                    )
-            
-            return dissolved_layer
-        except Exception as e:
-            print(f"❌ Erro ao dissolver camada: {str(e)}")
-            return None
-    def dissolve_queimadas_layer(self, layer):
-        """Dissolve áreas queimadas com tratamento de sobreposições"""
-        try:
-            import processing
-            
-            print(f"🔥 DEBUG: Aplicando dissolve em áreas queimadas...")
-            original_count = layer.featureCount()
-            
-            # ETAPA 1: Buffer 0 para limpar sobreposições
-            print(f"🔥 DEBUG: Limpando sobreposições com buffer 0...")
-            clean_params = {
-                'INPUT': layer,
-                'DISTANCE': 0,
-                'OUTPUT': 'memory:'
-            }
-            
-            clean_result = processing.run("native:buffer", clean_params)
-            clean_layer = clean_result['OUTPUT']
-            
-            if not clean_layer or not clean_layer.isValid():
-                print(f"❌ DEBUG: Buffer 0 falhou")
-                return None
-            
-            # ETAPA 2: Dissolve completo (une TODAS as geometrias adjacentes)
-            print(f"🔥 DEBUG: Aplicando dissolve completo...")
-            dissolve_params = {
-                'INPUT': clean_layer,
-                'FIELD': [],  # Sem campo = dissolve tudo
-                'OUTPUT': 'memory:'
-            }
-            
-            result = processing.run("native:dissolve", dissolve_params)
-            dissolved_layer = result['OUTPUT']
-            
-            if dissolved_layer and dissolved_layer.isValid():
-                dissolved_count = dissolved_layer.featureCount()
-                
-                print(f"✅ DEBUG: Dissolve concluído: {original_count} → {dissolved_count} feições")
-                
-                # LOGS REMOVIDOS: Evita duplicação com o novo log otimizado
-                # O log detalhado agora é feito na função queimadas_step_dissolve_after_cut
-                
-                dissolved_layer.setName(f"{layer.name()}_dissolved")
-                return dissolved_layer
-            else:
-                print(f"❌ DEBUG: Dissolve retornou layer inválida")
-                return None
-            
-        except Exception as e:
-            print(f"❌ ERROR dissolve_queimadas_layer: {str(e)}")
-            # LOGS REMOVIDOS: Evita duplicação com o novo log otimizado
-            # O log detalhado de erro agora é feito na função queimadas_step_dissolve_after_cut
-            return None
+        municipalities = set()
+        
+        for feature in self.ibge_layer.getFeatures(request):
+            municipality = feature['nome']
+            if municipality:
+                municipalities.add(municipality)
+        
+        # Adiciona municípios ordenados ao combo
+        for municipality in sorted(municipalities):
+            self.ibge_municipality_combo.addItem(municipality)
+
+    def on_ibge_municipality_changed(self, selection):
+        """Callback para mudança de município"""
+        self.ibge_municipality = selection
+        self.update_comprehensive_notes()
+
     # =====================================
     # FUNÇÕES DETER
     # =====================================
@@ -8132,46 +4582,6 @@ class DesagregaBiomasBRDialog(QDialog):
     # FUNÇÕES ÁREA QUEIMADA
     # =====================================
     
-    def generate_queimadas_months(self):
-        """Gera lista de meses disponíveis dinamicamente (09/2002 até mês atual -1)"""
-        try:
-            import datetime
-            
-            # Data atual
-            now = datetime.datetime.now()
-            
-            # Mês anterior (atual -1)
-            if now.month == 1:
-                end_year = now.year - 1
-                end_month = 12
-            else:
-                end_year = now.year
-                end_month = now.month - 1
-            
-            # Lista de meses no formato YYYY_MM_01
-            months = []
-            
-            # Começar em setembro de 2002
-            year = 2002
-            month = 9
-            
-            while year < end_year or (year == end_year and month <= end_month):
-                month_str = f"{year:04d}_{month:02d}_01"
-                months.append(month_str)
-                
-                # Próximo mês
-                month += 1
-                if month > 12:
-                    month = 1
-                    year += 1
-            
-            print(f"🔥 DEBUG: {len(months)} meses de área queimada disponíveis (2002-09 até {end_year:04d}-{end_month:02d})")
-            return months
-            
-        except Exception as e:
-            print(f"❌ ERROR generate_queimadas_months: {str(e)}")
-            return []
-    
     def create_queimadas_step2_content(self):
         """Cria o conteúdo específico para configuração ÁREA QUEIMADA"""
         
@@ -8418,658 +4828,6 @@ class DesagregaBiomasBRDialog(QDialog):
             print(f"❌ ERROR validate_queimadas_settings: {str(e)}")
             return False
     
-    def process_queimadas_data(self):
-        """Processa os dados ÁREA QUEIMADA conforme configurações"""
-        try:
-            print(f"🔥 DEBUG: === INICIANDO PROCESSAMENTO ÁREA QUEIMADA ===")
-            
-            # NOVO: Reseta log de processamentos para nova operação
-            self.processing_log = []
-            
-            # CORREÇÃO: Carrega shapefile IBGE para corte por bioma
-            print(f"🔥 DEBUG: Carregando shapefile IBGE para corte por bioma...")
-            if not hasattr(self, 'ibge_layer') or not self.ibge_layer:
-                success = self.load_ibge_shapefile()
-                if not success:
-                    print(f"⚠️ WARNING: Falha ao carregar shapefile IBGE - corte por bioma pode não funcionar")
-                else:
-                    print(f"✅ DEBUG: Shapefile IBGE carregado com sucesso: {self.ibge_layer.featureCount()} feições")
-            else:
-                print(f"✅ DEBUG: Shapefile IBGE já carregado: {self.ibge_layer.featureCount()} feições")
-            
-            # Gera nome do arquivo baseado nas seleções
-            self.output_filename = self.generate_queimadas_output_filename()
-            print(f"📁 DEBUG: Nome do arquivo ÁREA QUEIMADA: {self.output_filename}")
-            
-            # Constrói lista de URLs para download
-            self.queimadas_download_info = self.build_queimadas_download_info()
-            print(f"🌐 DEBUG: Info de download ÁREA QUEIMADA: {len(self.queimadas_download_info['urls'])} arquivos")
-            
-            # Inicia processamento REAL
-            self.current_step_index = 0
-            self.processing_layers = []  # Para armazenar layers baixadas
-            
-            # Etapa 1: Baixar arquivos ZIP
-            self.queimadas_step_download_files()
-            
-        except Exception as e:
-            print(f"❌ ERROR process_queimadas_data: {str(e)}")
-            self.status_label.setText(f"❌ Erro no processamento ÁREA QUEIMADA: {str(e)}")
-            self.end_download_mode(success=False)
-    
-    def generate_queimadas_output_filename(self):
-        """Gera nome do arquivo de saída para ÁREA QUEIMADA"""
-        try:
-            # Componentes do nome
-            theme = "area_queimada"
-            biome = self.selected_biome.lower().replace(' ', '_').replace('ã', 'a').replace('ô', 'o')
-            
-            # Período baseado no tipo
-            if self.queimadas_data_type == "anual":
-                period = f"{self.queimadas_year}"
-                data_type = "anual"
-            else:  # mensal
-                year, month, _ = self.queimadas_month.split('_')
-                period = f"{year}{month}"
-                data_type = "mensal"
-            
-            # Tipo de corte
-            cut_name = self.get_cut_option_name()
-            
-            # Nome final - ajustado para área queimada
-            if self.cut_option == 0:  # Todo o bioma
-                # Para área queimada, não adiciona "SemCorte" pois sempre há algum corte
-                filename = f"{theme}_{biome}_{period}_{data_type}"
-            else:
-                # Para outros tipos de corte, adiciona o nome do corte
-                filename = f"{theme}_{biome}_{period}_{data_type}_{cut_name}"
-            
-            # Limita tamanho do nome
-            if len(filename) > 100:
-                if self.cut_option == 0:
-                    filename = f"{theme}_{biome}_{period}"
-                else:
-                    filename = f"{theme}_{biome}_{period}_{cut_name}"
-            
-            print(f"📁 DEBUG: Nome ÁREA QUEIMADA gerado: {filename}")
-            return filename
-            
-        except Exception as e:
-            print(f"❌ ERROR generate_queimadas_output_filename: {str(e)}")
-            return f"area_queimada_{self.selected_biome.lower()}_{self.queimadas_data_type}"
-    
-    def build_queimadas_download_info(self):
-        """Constrói informações de download para ÁREA QUEIMADA"""
-        try:
-            result = {
-                'urls': [],
-                'months': [],
-                'data_type': self.queimadas_data_type
-            }
-            
-            if self.queimadas_data_type == "anual":
-                # Busca todos os meses do ano selecionado
-                year_months = [m for m in self.queimadas_months if m.startswith(f"{self.queimadas_year:04d}_")]
-                for month_str in year_months:
-                    url = self.build_queimadas_url(month_str)
-                    result['urls'].append(url)
-                    result['months'].append(month_str)
-                    
-                print(f"🔥 DEBUG: Ano {self.queimadas_year} - {len(year_months)} meses encontrados")
-                    
-            else:  # mensal (SIMPLIFICADO - apenas 1 mês)
-                month_str = self.queimadas_month
-                url = self.build_queimadas_url(month_str)
-                result['urls'].append(url)
-                result['months'].append(month_str)
-                    
-                print(f"🔥 DEBUG: Mês selecionado: {month_str}")
-            
-            if not result['urls']:
-                raise Exception("Nenhum arquivo encontrado para o período selecionado")
-                
-            return result
-            
-        except Exception as e:
-            print(f"❌ ERROR build_queimadas_download_info: {str(e)}")
-            return {'urls': [], 'months': [], 'data_type': self.queimadas_data_type}
-    
-    def build_queimadas_url(self, month_str):
-        """Constrói URL específica baseada no mês (resolve problema v/V)"""
-        try:
-            # Extrai ano e mês do formato YYYY_MM_01
-            year, month, day = month_str.split('_')
-            year_int = int(year)
-            month_int = int(month)
-            
-            # CORREÇÃO: Define padrão v/V baseado na data
-            # Até agosto de 2020 (2020_08_01): usa 'v' minúsculo
-            # A partir de setembro de 2020 (2020_09_01): usa 'V' maiúsculo
-            if year_int < 2020 or (year_int == 2020 and month_int <= 8):
-                version = "v6"  # minúsculo
-            else:
-                version = "V6"  # maiúsculo
-            
-            url = f"{self.queimadas_base_url}{month_str}_aq1km_{version}.zip"
-            print(f"🔥 DEBUG: URL construída: {url} (padrão: {version})")
-            
-            return url
-            
-        except Exception as e:
-            print(f"❌ ERROR build_queimadas_url: {str(e)}")
-            # Fallback para padrão antigo
-            return f"{self.queimadas_base_url}{month_str}_aq1km_v6.zip"
-    
-    def queimadas_step_download_files(self):
-        """Etapa 1: Baixa arquivos ZIP de área queimada"""
-        try:
-            self.status_label.setText("📥 Baixando arquivos de área queimada...")
-            
-            total_files = len(self.queimadas_download_info['urls'])
-            print(f"🔥 DEBUG: Iniciando download de {total_files} arquivos")
-            print(f"🔥 DEBUG: Salvando queimadas_download_info para metadados")
-            
-            # CORREÇÃO: Cria variável para metadados com informações detalhadas
-            # Esta variável será usada na função generate_metadata_file
-            self.queimadas_download_info_metadata = {
-                'urls': self.queimadas_download_info['urls'].copy(),
-                'months': self.queimadas_download_info['months'].copy(),
-                'base_url': self.queimadas_base_url,
-                'data_type': self.queimadas_data_type,
-                'year': getattr(self, 'queimadas_year', None),
-                'month': getattr(self, 'queimadas_month', None)
-            }
-            
-            self.queimadas_downloaded_files = []
-            self.queimadas_current_file = 0
-            
-            # Inicia download do primeiro arquivo
-            self.download_next_queimadas_file()
-            
-        except Exception as e:
-            print(f"❌ ERROR queimadas_step_download_files: {str(e)}")
-            self.status_label.setText(f"❌ Erro no download: {str(e)}")
-            self.end_download_mode(success=False)
-    
-    def download_next_queimadas_file(self):
-        """Baixa o próximo arquivo da lista"""
-        try:
-            if self.queimadas_current_file >= len(self.queimadas_download_info['urls']):
-                # Todos os arquivos baixados - próxima etapa
-                print(f"✅ DEBUG: Todos os {len(self.queimadas_downloaded_files)} arquivos baixados")
-                QTimer.singleShot(1000, self.queimadas_step_extract_files)
-                return
-            
-            url = self.queimadas_download_info['urls'][self.queimadas_current_file]
-            month_str = self.queimadas_download_info['months'][self.queimadas_current_file]
-            
-            file_num = self.queimadas_current_file + 1
-            total_files = len(self.queimadas_download_info['urls'])
-            
-            print(f"🔥 DEBUG: Baixando arquivo {file_num}/{total_files}: {month_str}")
-            self.status_label.setText(f"📥 Baixando área queimada {file_num}/{total_files}: {month_str}")
-            
-            # Aplica verificação de abort
-            if self.check_abort_signal():
-                return
-            
-            # Inicia download assíncrono
-            self.download_queimadas_zip(url, month_str)
-            
-        except Exception as e:
-            print(f"❌ ERROR download_next_queimadas_file: {str(e)}")
-            self.status_label.setText(f"❌ Erro no download: {str(e)}")
-            self.end_download_mode(success=False)
-    
-    def download_queimadas_zip(self, url, month_str):
-        """Baixa um arquivo ZIP específico de área queimada"""
-        try:
-            import os
-            import tempfile
-            from qgis.PyQt.QtNetwork import QNetworkRequest, QNetworkReply
-            from qgis.PyQt.QtCore import QUrl
-            
-            # Arquivo temporário para download
-            temp_dir = tempfile.gettempdir()
-            zip_filename = f"{month_str}_aq1km_v6.zip"
-            temp_zip_path = os.path.join(temp_dir, zip_filename)
-            
-            print(f"🔥 DEBUG: Baixando de {url}")
-            print(f"🔥 DEBUG: Salvando em {temp_zip_path}")
-            
-            # Inicia download
-            request = QNetworkRequest(QUrl(url))
-            request.setRawHeader(b'User-Agent', b'QGIS DesagregaBiomasBR')
-            
-            reply = self.network_manager.get(request)
-            
-            # Conecta sinais para este download específico
-            reply.finished.connect(lambda: self.on_queimadas_zip_downloaded(reply, temp_zip_path, month_str))
-            reply.errorOccurred.connect(lambda error: self.on_queimadas_download_error(error, month_str))
-            
-            # Armazena reply para possível cancelamento
-            self.current_queimadas_reply = reply
-            
-        except Exception as e:
-            print(f"❌ ERROR download_queimadas_zip: {str(e)}")
-            self.status_label.setText(f"❌ Erro no download {month_str}: {str(e)}")
-            self.end_download_mode(success=False)
-    
-    def on_queimadas_zip_downloaded(self, reply, temp_zip_path, month_str):
-        """Callback quando download do ZIP é concluído"""
-        try:
-            if reply.error() == QNetworkReply.NoError:
-                # Salva arquivo
-                with open(temp_zip_path, 'wb') as f:
-                    f.write(reply.readAll().data())
-                
-                file_size = os.path.getsize(temp_zip_path)
-                print(f"✅ DEBUG: Arquivo {month_str} baixado: {file_size} bytes")
-                
-                # Adiciona à lista de arquivos baixados
-                self.queimadas_downloaded_files.append({
-                    'path': temp_zip_path,
-                    'month': month_str
-                })
-                
-                # Próximo arquivo
-                self.queimadas_current_file += 1
-                QTimer.singleShot(500, self.download_next_queimadas_file)
-                
-            else:
-                error_msg = reply.errorString()
-                print(f"❌ DEBUG: Erro no download {month_str}: {error_msg}")
-                self.status_label.setText(f"❌ Erro no download {month_str}: {error_msg}")
-                self.end_download_mode(success=False)
-            
-            reply.deleteLater()
-            
-        except Exception as e:
-            print(f"❌ ERROR on_queimadas_zip_downloaded: {str(e)}")
-            self.status_label.setText(f"❌ Erro ao salvar {month_str}: {str(e)}")
-            self.end_download_mode(success=False)
-    
-    def on_queimadas_download_error(self, error, month_str):
-        """Callback para erro no download"""
-        print(f"❌ DEBUG: Erro de rede {month_str}: {error}")
-        self.status_label.setText(f"❌ Erro de rede {month_str}: {error}")
-        self.end_download_mode(success=False)
-    
-    def queimadas_step_extract_files(self):
-        """Etapa 2: Extrai arquivos ZIP e carrega shapefiles"""
-        try:
-            self.status_label.setText("📂 Extraindo arquivos de área queimada...")
-            
-            total_files = len(self.queimadas_downloaded_files)
-            print(f"🔥 DEBUG: Extraindo {total_files} arquivos ZIP")
-            
-            self.queimadas_extracted_layers = []
-            self.queimadas_current_extract = 0
-            
-            # Inicia extração do primeiro arquivo
-            self.extract_next_queimadas_file()
-            
-        except Exception as e:
-            print(f"❌ ERROR queimadas_step_extract_files: {str(e)}")
-            self.status_label.setText(f"❌ Erro na extração: {str(e)}")
-            self.end_download_mode(success=False)
-    
-    def extract_next_queimadas_file(self):
-        """Extrai o próximo arquivo ZIP e carrega o shapefile"""
-        try:
-            if self.queimadas_current_extract >= len(self.queimadas_downloaded_files):
-                # Todos os arquivos extraídos - próxima etapa
-                print(f"✅ DEBUG: Todas as {len(self.queimadas_extracted_layers)} layers carregadas")
-                QTimer.singleShot(1000, self.queimadas_step_process_layers)
-                return
-            
-            file_info = self.queimadas_downloaded_files[self.queimadas_current_extract]
-            zip_path = file_info['path']
-            month_str = file_info['month']
-            
-            file_num = self.queimadas_current_extract + 1
-            total_files = len(self.queimadas_downloaded_files)
-            
-            print(f"🔥 DEBUG: Extraindo arquivo {file_num}/{total_files}: {month_str}")
-            self.status_label.setText(f"📂 Extraindo área queimada {file_num}/{total_files}: {month_str}")
-            
-            # Aplica verificação de abort
-            if self.check_abort_signal():
-                return
-            
-            # Extrai ZIP e carrega shapefile
-            layer = self.extract_and_load_queimadas_shapefile(zip_path, month_str)
-            
-            if layer and layer.isValid():
-                self.queimadas_extracted_layers.append({
-                    'layer': layer,
-                    'month': month_str
-                })
-                print(f"✅ DEBUG: Layer {month_str} carregada: {layer.featureCount()} feições")
-            else:
-                print(f"⚠️ DEBUG: Falha ao carregar layer {month_str}")
-            
-            # Próximo arquivo
-            self.queimadas_current_extract += 1
-            QTimer.singleShot(500, self.extract_next_queimadas_file)
-            
-        except Exception as e:
-            print(f"❌ ERROR extract_next_queimadas_file: {str(e)}")
-            self.status_label.setText(f"❌ Erro na extração: {str(e)}")
-            self.end_download_mode(success=False)
-    
-    def extract_and_load_queimadas_shapefile(self, zip_path, month_str):
-        """Extrai ZIP e carrega o shapefile de área queimada"""
-        try:
-            import zipfile
-            import tempfile
-            import os
-            from qgis.core import QgsVectorLayer
-            
-            # Cria diretório temporário para extração
-            extract_dir = os.path.join(tempfile.gettempdir(), f"queimadas_{month_str}")
-            os.makedirs(extract_dir, exist_ok=True)
-            
-            # Extrai ZIP
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-                extracted_files = zip_ref.namelist()
-                print(f"🔥 DEBUG: Extraídos {len(extracted_files)} arquivos para {extract_dir}")
-            
-            # Procura arquivo .shp
-            shp_file = None
-            for file in extracted_files:
-                if file.endswith('.shp'):
-                    shp_file = os.path.join(extract_dir, file)
-                    break
-            
-            if not shp_file or not os.path.exists(shp_file):
-                print(f"❌ DEBUG: Arquivo .shp não encontrado em {zip_path}")
-                return None
-            
-            # Carrega shapefile
-            layer = QgsVectorLayer(shp_file, f"area_queimada_{month_str}", "ogr")
-            
-            if layer.isValid():
-                print(f"✅ DEBUG: Shapefile {month_str} carregado: {layer.featureCount()} feições")
-                return layer
-            else:
-                print(f"❌ DEBUG: Shapefile {month_str} inválido")
-                return None
-                
-        except Exception as e:
-            print(f"❌ ERROR extract_and_load_queimadas_shapefile: {str(e)}")
-            return None
-    
-    def queimadas_step_process_layers(self):
-        """Etapa 3: Processa layers (merge para anual ou mantém mensal) - OTIMIZADO"""
-        try:
-            if self.queimadas_data_type == "anual":
-                self.status_label.setText("🔄 Unindo dados anuais de área queimada...")
-                print(f"🔥 DEBUG: Modo anual - unindo {len(self.queimadas_extracted_layers)} layers")
-                
-                # Une todas as layers do ano (SEM dissolve ainda - será feito após corte)
-                layers = [item['layer'] for item in self.queimadas_extracted_layers]
-                merged_layer = self.merge_layers(layers)
-                
-                if merged_layer and merged_layer.isValid():
-                    print(f"✅ DEBUG: Layers anuais unidas: {merged_layer.featureCount()} feições")
-                    self.processing_layers = [merged_layer]
-                else:
-                    raise Exception("Falha ao unir layers anuais")
-                    
-            else:  # mensal
-                self.status_label.setText("📋 Processando dados mensais de área queimada...")
-                print(f"🔥 DEBUG: Modo mensal - mantendo {len(self.queimadas_extracted_layers)} layers separadas")
-                
-                # Mantém layers separadas
-                self.processing_layers = [item['layer'] for item in self.queimadas_extracted_layers]
-            
-            # CORTE AUTOMÁTICO POR BIOMA para ÁREA QUEIMADA
-            # Como os dados são sempre do Brasil todo, aplicamos corte automático pelo bioma
-            # OTIMIZAÇÃO: Dissolve será aplicado APÓS o corte para maior eficiência
-            QTimer.singleShot(1000, self.queimadas_step_apply_biome_cut)
-            
-        except Exception as e:
-            print(f"❌ ERROR queimadas_step_process_layers: {str(e)}")
-            self.status_label.setText(f"❌ Erro no processamento: {str(e)}")
-            self.end_download_mode(success=False)
-    
-    def queimadas_step_apply_biome_cut(self):
-        """Etapa específica para ÁREA QUEIMADA: Aplica corte automático por bioma"""
-        try:
-            self.status_label.setText("✂️ Aplicando corte por bioma...")
-            
-            # Lista feições originais antes do corte
-            total_original = sum([layer.featureCount() for layer in self.processing_layers])
-            
-            # Cria layer de corte baseada no bioma selecionado
-            cut_layer = self.get_queimadas_biome_cut_layer()
-            
-            if not cut_layer or not cut_layer.isValid():
-                from qgis.core import QgsMessageLog, Qgis
-                QgsMessageLog.logMessage(f"❌ FALHA: Corte por bioma não funcionou para {self.selected_biome}", "DesagregaBiomasBR", Qgis.Warning)
-                # Se não conseguir cortar, continua com dados originais mas ainda prossegue
-                QTimer.singleShot(1000, self.queimadas_check_additional_cut)
-                return
-            
-            # Aplica corte em todas as layers de processamento
-            cut_layers = []
-            total_cut = 0
-            
-            for i, layer in enumerate(self.processing_layers):
-                self.status_label.setText(f"✂️ Preparando layer {i+1}/{len(self.processing_layers)} para corte...")
-                
-                # ETAPA 1: Corrigir geometrias inválidas
-                fixed_layer = self.auto_fix_geometries(layer, f"queimadas_{i}")
-                
-                if not fixed_layer or not fixed_layer.isValid():
-                    fixed_layer = layer
-                
-                # ETAPA 2: Reprojetar para o mesmo CRS do shapefile IBGE
-                target_crs = cut_layer.crs()
-                
-                if fixed_layer.crs().authid() != target_crs.authid():
-                    reprojected_layer = self.reproject_layer(fixed_layer, target_crs)
-                    
-                    if not reprojected_layer or not reprojected_layer.isValid():
-                        prepared_layer = fixed_layer
-                    else:
-                        prepared_layer = reprojected_layer
-                else:
-                    prepared_layer = fixed_layer
-                
-                # ETAPA 3: Aplicar corte espacial (sem registro individual - será registrado em lote)
-                self.status_label.setText(f"✂️ Cortando layer {i+1}/{len(self.processing_layers)} por bioma...")
-                
-                # Temporariamente desativa registro para evitar duplicação
-                original_count = prepared_layer.featureCount()
-                
-                cut_result = self.clip_layer(prepared_layer, cut_layer, log_processing=False)
-                
-                if cut_result and cut_result.isValid():
-                    cut_count = cut_result.featureCount()
-                    cut_layers.append(cut_result)
-                    total_cut += cut_count
-                else:
-                    cut_layers.append(layer)  # Usa original se corte falhar
-                    total_cut += layer.featureCount()
-            
-            # Atualiza layers de processamento com versões cortadas por bioma
-            if total_cut < total_original:
-                reduction = total_original - total_cut
-                percentage = (reduction / total_original) * 100
-                from qgis.core import QgsMessageLog, Qgis
-                QgsMessageLog.logMessage(f"✅ SUCESSO: Corte por bioma aplicado! {total_original} → {total_cut} feições ({percentage:.1f}% redução)", "DesagregaBiomasBR", Qgis.Success)
-                
-                # NOVO: Registra processamento de corte por bioma
-                self.add_processing_log(
-                    "CORTE POR BIOMA",
-                    f"{total_original} feições → {total_cut} feições (redução de {percentage:.1f}%) - Bioma: {self.selected_biome}"
-                )
-            else:
-                # NOVO: Registra quando não houve redução
-                self.add_processing_log(
-                    "CORTE POR BIOMA",
-                    f"{total_original} feições mantidas - Bioma: {self.selected_biome} (dados já estavam dentro do bioma)"
-                )
-            
-            self.processing_layers = cut_layers
-            
-            # OTIMIZAÇÃO: Aplica dissolve APÓS o corte (só para modo anual e se checkbox marcada)
-            # Agora dissolve apenas os dados do bioma, não do Brasil todo!
-            should_dissolve = (
-                self.queimadas_data_type == "anual" and 
-                hasattr(self, 'queimadas_dissolve') and 
-                self.queimadas_dissolve and
-                len(self.processing_layers) == 1
-            )
-            
-            if should_dissolve:
-                print(f"🔥 DEBUG: Dissolve será aplicado (checkbox marcada)")
-                QTimer.singleShot(1000, self.queimadas_step_dissolve_after_cut)
-            else:
-                # Modo mensal ou checkbox desmarcada - continua sem dissolve
-                if self.queimadas_data_type == "anual" and not self.queimadas_dissolve:
-                    print(f"🔥 DEBUG: Dissolve NÃO será aplicado (checkbox desmarcada)")
-                QTimer.singleShot(1000, self.queimadas_check_additional_cut)
-            
-        except Exception as e:
-            from qgis.core import QgsMessageLog, Qgis
-            error_msg = f"❌ ERRO queimadas_step_apply_biome_cut: {str(e)}"
-            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
-            self.status_label.setText(f"❌ Erro no corte por bioma: {str(e)}")
-            # Continua mesmo com erro de corte
-            QTimer.singleShot(1000, self.queimadas_check_additional_cut)
-    
-    def queimadas_check_additional_cut(self):
-        """Verifica se ÁREA QUEIMADA precisa de corte espacial adicional além do bioma"""
-        try:
-            # Para ÁREA QUEIMADA:
-            # - SEMPRE aplicamos corte por bioma (já foi feito)
-            # - SE o usuário selecionou corte adicional (cut_option != 0 e != None), aplicamos também
-            # - SE não selecionou corte adicional, vamos direto para merge
-            
-            needs_additional_cut = (
-                hasattr(self, 'cut_option') and 
-                self.cut_option is not None and 
-                self.cut_option != 0
-            )
-            
-            if needs_additional_cut:
-                # Tem corte adicional configurado - aplicar
-                self.status_label.setText("✂️ Aplicando corte espacial adicional...")
-                QTimer.singleShot(1000, self.real_step_apply_spatial_cut)
-            else:
-                # Não tem corte adicional - só o corte por bioma é suficiente
-                self.status_label.setText("✅ Corte por bioma concluído")
-                QTimer.singleShot(1000, self.real_step_merge_layers)
-            
-        except Exception as e:
-            from qgis.core import QgsMessageLog, Qgis
-            QgsMessageLog.logMessage(f"❌ ERRO queimadas_check_additional_cut: {str(e)}", "DesagregaBiomasBR", Qgis.Critical)
-            # Em caso de erro, continua para merge
-            QTimer.singleShot(1000, self.real_step_merge_layers)
-
-    def get_queimadas_biome_cut_layer(self):
-        """Cria layer de corte baseada no bioma selecionado para ÁREA QUEIMADA"""
-        try:
-            if not self.ibge_layer:
-                return None
-            
-            # Constrói expressão de filtro baseada no bioma
-            if self.selected_biome == 'Amazônia Legal':
-                # Para Amazônia Legal, usa coluna 'regiao'
-                expression = f'"regiao" = \'Amazônia Legal\''
-            else:
-                # Para outros biomas, usa coluna 'bioma' (com b minúsculo)
-                expression = f'"bioma" = \'{self.selected_biome}\''
-            
-            # Aplica filtro
-            request = QgsFeatureRequest().setFilterExpression(expression)
-            
-            # Conta quantas feições correspondem ao filtro
-            filtered_features = list(self.ibge_layer.getFeatures(request))
-            
-            if not filtered_features:
-                return None
-            
-            # Cria layer filtrada em memória
-            filtered_layer = QgsVectorLayer(f"Polygon?crs={self.ibge_layer.crs().authid()}", f"corte_{self.selected_biome}", "memory")
-            provider = filtered_layer.dataProvider()
-            provider.addAttributes(self.ibge_layer.fields())
-            filtered_layer.updateFields()
-            
-            # Adiciona feições filtradas
-            provider.addFeatures(filtered_features)
-            filtered_layer.updateExtents()
-            
-            return filtered_layer
-                
-        except Exception as e:
-            from qgis.core import QgsMessageLog, Qgis
-            error_msg = f"❌ ERRO get_queimadas_biome_cut_layer: {str(e)}"
-            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
-            return None
-
-    def queimadas_step_dissolve_after_cut(self):
-        """NOVA ETAPA OTIMIZADA: Aplica dissolve APÓS o corte por bioma para maior eficiência"""
-        try:
-            self.status_label.setText("🔄 Dissolvendo áreas queimadas adjacentes (pós-corte)...")
-            print(f"🔥 DEBUG: Aplicando dissolve otimizado após corte por bioma...")
-            print(f"🔥 DEBUG: Dissolve ativado pela checkbox = {self.queimadas_dissolve}")
-            
-            # Pega a layer já cortada por bioma
-            cut_layer = self.processing_layers[0]
-            features_before = cut_layer.featureCount()
-            
-            print(f"🔥 DEBUG: Dissolve pós-corte - processando {features_before} feições do bioma {self.selected_biome}")
-            
-            # Aplica dissolve nas áreas queimadas já cortadas
-            dissolved_layer = self.dissolve_queimadas_layer(cut_layer)
-            
-            if dissolved_layer and dissolved_layer.isValid():
-                features_after = dissolved_layer.featureCount()
-                reduction = features_before - features_after
-                
-                self.processing_layers = [dissolved_layer]
-                print(f"✅ DEBUG: Dissolve pós-corte concluído: {features_before} → {features_after} feições")
-                
-                if reduction > 0:
-                    percentage = (reduction / features_before) * 100
-                    self.add_processing_log(
-                        "DISSOLUÇÃO DE ÁREAS QUEIMADAS",
-                        f"{features_before} feições → {features_after} feições (redução de {percentage:.1f}%) - Bioma: {self.selected_biome}"
-                    )
-                else:
-                    self.add_processing_log(
-                        "DISSOLUÇÃO DE ÁREAS QUEIMADAS",
-                        f"{features_before} feições mantidas (sem áreas adjacentes para unir) - Bioma: {self.selected_biome}"
-                    )
-                    
-                from qgis.core import QgsMessageLog, Qgis
-                QgsMessageLog.logMessage(f"✅ SUCESSO: Dissolve pós-corte - {features_before} → {features_after} feições", "DesagregaBiomasBR", Qgis.Success)
-                
-            else:
-                # Se dissolve falhar, usa layer cortada mesmo
-                print(f"⚠️ DEBUG: Dissolve pós-corte falhou, usando layer cortada")
-                self.add_processing_log(
-                    "DISSOLUÇÃO DE ÁREAS QUEIMADAS",
-                    f"Falha no dissolve - mantendo {features_before} feições cortadas do bioma {self.selected_biome}"
-                )
-            
-            # Continua para verificação de corte adicional
-            QTimer.singleShot(1000, self.queimadas_check_additional_cut)
-            
-        except Exception as e:
-            from qgis.core import QgsMessageLog, Qgis
-            error_msg = f"❌ ERRO queimadas_step_dissolve_after_cut: {str(e)}"
-            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
-            self.status_label.setText(f"❌ Erro no dissolve: {str(e)}")
-            
-            # Continua mesmo com erro no dissolve
-            QTimer.singleShot(1000, self.queimadas_check_additional_cut)
-
     # =====================================
     # FUNÇÕES TERRACLASS
     # =====================================
@@ -9261,6 +5019,10 @@ class DesagregaBiomasBRDialog(QDialog):
         
         # Define flag de abort
         self.abort_download = True
+        if self.pipeline_job:
+            self.pipeline_job.abort_download = True
+        if self.background_task:
+            self.background_task.cancel()
         
         # Atualiza interface imediatamente
         self.update_notes("🛑 Abortando download... Aguarde alguns segundos", "status")
@@ -9290,6 +5052,10 @@ class DesagregaBiomasBRDialog(QDialog):
 
     def check_abort_signal(self):
         """Verifica se foi solicitado abortar o download"""
+        if self.in_download_worker():
+            # Limpeza e interface ficam com a thread principal
+            return self.abort_download
+        
         if self.abort_download:
             # Limpa arquivos temporários se necessário
             self.cleanup_temp_files()
@@ -9304,32 +5070,6 @@ class DesagregaBiomasBRDialog(QDialog):
             return True
         return False
 
-    def cleanup_temp_files(self):
-        """Limpa arquivos temporários criados durante o download"""
-        try:
-            import tempfile
-            import glob
-            temp_dir = tempfile.gettempdir()
-            
-            # Remove arquivos temporários relacionados ao plugin
-            patterns = [
-                f"*{id(self)}*.gml",
-                f"*{id(self)}*.shp",
-                f"*{id(self)}*.zip"
-            ]
-            
-            for pattern in patterns:
-                files = glob.glob(os.path.join(temp_dir, pattern))
-                for file in files:
-                    try:
-                        os.remove(file)
-                    except:
-                        pass
-                        
-        except Exception as e:
-            from qgis.core import QgsMessageLog, Qgis
-            QgsMessageLog.logMessage(f"❌ ERRO ao limpar arquivos temporários: {str(e)}", "DesagregaBiomasBR", Qgis.Warning)
-
     def start_download_mode(self):
         """Ativa o modo de download com botão de abortar visível"""
         self.download_in_progress = True
@@ -0,0 +1,6474 @@
+# -*- coding: utf-8 -*-
+"""
+DesagregaBiomasBR Pipeline
+Etapas do processamento sem widgets: URLs e filtros, download WFS/ZIP,
+corte, mesclagem, salvamento e metadados. Usadas pelo diálogo e pelos
+algoritmos do Processing (processing_provider)
+"""
+
+import os
+import copy
+import tempfile
+import threading
+from qgis.PyQt.QtCore import QThread
+from qgis.core import (QgsProject, QgsVectorLayer, QgsWkbTypes, QgsGeometry,
+                       QgsCoordinateReferenceSystem, QgsFeature,
+                       QgsApplication, QgsFeatureRequest, QgsRectangle)
+
+_store_locks = {}
+_store_locks_guard = threading.Lock()
+
+
+def get_store_lock(key):
+    """Trava de um recurso em disco (armazenamento, checkpoint, pasta de etapa)
+    
+    Compartilhada por todos os processamentos do QGIS: tarefas simultâneas
+    (PipelineJob, algoritmos do Processing) não gravam o mesmo arquivo ao
+    mesmo tempo.
+    """
+    with _store_locks_guard:
+        return _store_locks.setdefault(key, threading.RLock())
+
+
+class WfsAdaptivePager:
+    """Ajusta o tamanho das páginas WFS (count) conforme o desempenho medido
+    
+    A página cresce quando as respostas chegam rápido e diminui quando ficam
+    lentas, grandes demais em bytes ou falham (ex.: timeout de 120 s).
+    """
+    
+    def __init__(self, initial_size, min_size=5000, max_size=200000,
+                 target_seconds=30.0, max_page_bytes=256 * 1024 * 1024):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.max_page_bytes = max_page_bytes
+        self.page_size = self._clamp(initial_size)
+        self.bytes_per_feature = None
+        self.pages = 0
+        self.failures = 0
+        
+    def _clamp(self, size):
+        return int(max(self.min_size, min(self.max_size, size)))
+    
+    def record_success(self, features, seconds, size_bytes):
+        """Registra uma página baixada e recalcula o tamanho da próxima"""
+        if features <= 0:
+            return
+        self.pages += 1
+        
+        # Média móvel de bytes por feição (limita o tamanho da página em bytes)
+        if size_bytes:
+            sample = size_bytes / features
+            if self.bytes_per_feature is None:
+                self.bytes_per_feature = sample
+            else:
+                self.bytes_per_feature = 0.7 * self.bytes_per_feature + 0.3 * sample
+        
+        if seconds <= 0:
+            return
+        
+        # Tamanho que levaria target_seconds no ritmo medido, variando no máximo 2x por página
+        ideal = features / seconds * self.target_seconds
+        new_size = max(self.page_size * 0.5, min(self.page_size * 2, ideal))
+        if self.bytes_per_feature:
+            new_size = min(new_size, self.max_page_bytes / self.bytes_per_feature)
+        self.page_size = self._clamp(new_size)
+    
+    def record_failure(self):
+        """Registra uma página com erro ou timeout e reduz o tamanho pela metade"""
+        self.failures += 1
+        self.page_size = self._clamp(self.page_size // 2)
+    
+    def can_split(self, count):
+        """Indica se uma janela com falha ainda pode ser dividida em duas menores"""
+        return count // 2 >= self.min_size
+
+
+class FeatureIdSet:
+    """Conjunto compacto de ids de feições para remover duplicatas entre páginas
+    
+    Ids inteiros não negativos ficam em um bitmap (1 bit por id, cresce sob
+    demanda); outros valores (texto, negativos, muito grandes) vão para um set.
+    """
+    
+    MAX_BITMAP_ID = 2 ** 28  # Bitmap de no máximo 32 MB
+    
+    def __init__(self):
+        self.bitmap = bytearray()
+        self.others = set()
+        self.count = 0
+        self.max_int = None  # Maior id inteiro visto (última chave na paginação por chave)
+        
+    def __len__(self):
+        return self.count
+    
+    def __contains__(self, value):
+        if isinstance(value, int) and 0 <= value < self.MAX_BITMAP_ID:
+            index = value >> 3
+            return index < len(self.bitmap) and bool(self.bitmap[index] & (1 << (value & 7)))
+        return value in self.others
+    
+    def add(self, value):
+        """Adiciona o id; retorna False se ele já estava no conjunto"""
+        if value in self:
+            return False
+        if isinstance(value, int) and (self.max_int is None or value > self.max_int):
+            self.max_int = value
+        if isinstance(value, int) and 0 <= value < self.MAX_BITMAP_ID:
+            index = value >> 3
+            if index >= len(self.bitmap):
+                self.bitmap.extend(bytes(max(index + 1 - len(self.bitmap), len(self.bitmap))))
+            self.bitmap[index] |= 1 << (value & 7)
+        else:
+            self.others.add(value)
+        self.count += 1
+        return True
+
+
+class DesagregaBiomasBRPipeline:
+    """Etapas do processamento compartilhadas pelo diálogo e pelo Processing
+
+    Não cria nem lê widgets: trabalha só com os atributos de estado
+    (reset_all_variables, init_pipeline_settings). update_notes e
+    check_abort_signal são os pontos de interface - o diálogo mostra as
+    notas no quadro e trata o botão abortar; sem interface, o Processing
+    envia as notas ao feedback e cancela pelo feedback.
+    """
+
+    def update_notes(self, message, note_type="status"):
+        """Nota de andamento do processamento (sem interface vai para o console)"""
+        if self.in_download_worker():
+            # Thread de download: a thread principal mostra o progresso de cada camada
+            self.worker_download_progress[self.download_worker_state.label] = message
+            return
+        print(message)
+
+    def check_abort_signal(self):
+        """Verifica se foi solicitado abortar o download"""
+        return self.abort_download
+
+    def cleanup_temp_files(self):
+        """Limpa arquivos temporários criados durante o download"""
+        try:
+            import tempfile
+            import glob
+            temp_dir = tempfile.gettempdir()
+            
+            # Remove arquivos temporários relacionados ao plugin
+            patterns = [
+                f"*{id(self)}*.gml",
+                f"*{id(self)}*.gfs",
+                f"*{id(self)}*.gpkg",
+                f"*{id(self)}*.json",
+                f"*{id(self)}*.shp",
+                f"*{id(self)}*.zip"
+            ]
+            
+            for pattern in patterns:
+                files = glob.glob(os.path.join(temp_dir, pattern))
+                for file in files:
+                    try:
+                        os.remove(file)
+                    except:
+                        pass
+                        
+        except Exception as e:
+            from qgis.core import QgsMessageLog, Qgis
+            QgsMessageLog.logMessage(f"❌ ERRO ao limpar arquivos temporários: {str(e)}", "DesagregaBiomasBR", Qgis.Warning)
+
+    def init_pipeline_settings(self):
+        """Inicializa temas, serviços e parâmetros de download (sem widgets)
+        
+        Chamado pelo construtor do diálogo e pelo processamento sem interface
+        (HeadlessPipeline em processing_provider).
+        """
+        # Configurações dos temas
+        self.biome_options = {
+            'DETER': ['Cerrado', 'Amazônia Legal'],
+            'PRODES': ['Amazônia', 'Amazônia Legal', 'Cerrado', 'Caatinga', 'Pantanal', 'Pampa', 'Mata Atlântica'],
+            'TERRACLASS': ['Amazônia', 'Cerrado'],
+            'ÁREA QUEIMADA': ['Amazônia', 'Amazônia Legal', 'Cerrado', 'Caatinga', 'Pantanal', 'Pampa', 'Mata Atlântica']
+        }
+        
+        # Anos disponíveis por bioma para TERRACLASS
+        self.terraclass_years = {
+            'Amazônia': [2008, 2010, 2012, 2014, 2018, 2020, 2022],
+            'Cerrado': [2018, 2020, 2022]
+        }
+        
+        # Configurações ÁREA QUEIMADA
+        # Base URL para downloads
+        self.queimadas_base_url = "https://dataserver-coids.inpe.br/queimadas/queimadas/area_queimada/AQ1km/shp/"
+        
+        # Data de início das área queimada (setembro 2002)
+        self.queimadas_start_date = "2002-09-01"
+        
+        # Gera anos disponíveis dinamicamente (2002 até ano atual)
+        import datetime
+        current_year = datetime.datetime.now().year
+        self.queimadas_years = list(range(2002, current_year + 1))
+        
+        # Gera meses disponíveis dinamicamente (09/2002 até mês atual -1)
+        self.queimadas_months = self.generate_queimadas_months()
+        
+        # Anos disponíveis por bioma para PRODES (incrementais)
+        self.prodes_years = {
+            'Cerrado': [2002,2004,2006,2007,2008,2010,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
+            'Pantanal': [2004,2006,2007,2008,2010,2011,2013,2014,2016,2017,2018,2019,2020,2021,2022,2023],
+            'Pampa': [2004,2006,2007,2008,2010,2011,2013,2014,2016,2017,2018,2019,2020,2021,2022,2023],
+            'Mata Atlântica': [2004,2006,2008,2010,2011,2013,2014,2016,2017,2018,2019,2020,2021,2022,2023],
+            'Caatinga': [2004,2006,2008,2010,2011,2013,2014,2016,2017,2018,2019,2020,2021,2022,2023],
+            'Amazônia': [2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024,2025],
+            'Amazônia Legal': [2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023]
+        }
+        
+        # Anos disponíveis para dados acumulados (incluem os anos dos prodes_base_years)
+        self.prodes_years_acumulado = {
+            'Cerrado': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
+            'Pantanal': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
+            'Pampa': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
+            'Mata Atlântica': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
+            'Caatinga': [2000,2001,2002,2003,2004,2005,2006,2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024],
+            'Amazônia': [2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024,2025],
+            'Amazônia Legal': [2007,2008,2009,2010,2011,2012,2013,2014,2015,2016,2017,2018,2019,2020,2021,2022,2023,2024]
+        }
+        
+        # Anos iniciais para dados acumulados por bioma
+        self.prodes_base_years = {
+            'Cerrado': 2000,
+            'Pantanal': 2000,
+            'Pampa': 2000,
+            'Mata Atlântica': 2000,
+            'Caatinga': 2000,
+            'Amazônia': 2007,
+            'Amazônia Legal': 2007
+        }
+        
+        # Ferramenta de desenho
+        self.draw_tool = None
+        
+        # URLs e configurações DETER
+        self.deter_urls = {
+            'Cerrado': 'https://terrabrasilis.dpi.inpe.br/geoserver/deter-cerrado-nb/deter_cerrado/ows',
+            'Amazônia Legal': 'https://terrabrasilis.dpi.inpe.br/geoserver/deter-amz/deter_amz/ows'
+        }
+        
+        # Classes DETER por bioma
+        self.deter_classes = {
+            'Cerrado': ['DESMATAMENTO_CR'],
+            'Amazônia Legal': [
+                'CICATRIZ_DE_QUEIMADA', 
+                'CORTE_SELETIVO', 
+                'CS_DESORDENADO', 
+                'CS_GEOMETRICO', 
+                'DEGRADACAO', 
+                'DESMATAMENTO_CR', 
+                'DESMATAMENTO_VEG', 
+                'MINERACAO'
+            ]
+        }
+        
+        # Datas de início DETER por bioma
+        self.deter_start_dates = {
+            'Cerrado': '2018-05-01',      # 01/05/2018
+            'Amazônia Legal': '2016-08-02'  # 02/08/2016
+        }
+        
+        # TypeNames DETER
+        self.deter_typenames = {
+            'Cerrado': 'deter-cerrado-nb:deter_cerrado',
+            'Amazônia Legal': 'deter-amz:deter_amz'
+        }
+
+        # Configurações de download WFS
+        self.wfs_page_size = 50000  # Tamanho inicial da página (GetFeature count)
+        self.wfs_page_size_min = 5000  # Limites do paginador adaptativo
+        self.wfs_page_size_max = 200000
+        self.wfs_page_target_seconds = 30  # Tempo de resposta alvo por página
+        self.wfs_sequential_feature_limit = 20000000  # Proteção quando o total não é conhecido
+        self.wfs_checkpoint_valid_hours = 24  # Validade dos checkpoints de download em disco
+        self.wfs_retry_attempts = 4  # Tentativas por requisição de página (erros temporários)
+        self.wfs_retry_base_delay = 2.0  # Espera base (s) do backoff exponencial
+        self.wfs_retry_max_delay = 60.0  # Espera máxima (s) entre tentativas
+        self.wfs_retryable_status = (408, 429, 500, 502, 503, 504)  # Erros HTTP temporários
+        self.prodes_store_valid_days = 30  # Validade dos anos PRODES guardados no armazenamento local
+        self.deter_sync_overlap_days = 30  # Janela re-sincronizada do DETER (alertas publicados com atraso)
+        self.deter_store_with_cut = True  # Execuções com corte também criam o armazenamento DETER do bioma
+        self.wfs_spatial_filter_max_chars = 4000  # Tamanho máximo do WKT enviado no CQL_FILTER
+        self.wfs_feature_schemas = {}  # Coluna geométrica e atributos por typename (DescribeFeatureType)
+        self.wfs_primary_key_candidates = ['uid', 'gid', 'fid', 'id', 'objectid']  # Chave para sortBy e duplicatas
+        self.wfs_keyset_min_features = 500000  # A partir deste total, pagina por chave (0 desliga)
+        self.wfs_tiled_download = False  # Download por blocos BBOX em paralelo (alternativa ao startIndex)
+        self.wfs_tile_min_degrees = 0.05  # Lado mínimo de um bloco (graus) antes de parar de dividir
+        self.wfs_streaming_clip = True  # Corrige e recorta cada página durante o download (só o que cai no corte é gravado)
+        
+        # Perfis de transferência: casas decimais pedidas ao GeoServer (format_options=numDecimals)
+        # e simplificação opcional (graus) aplicada a cada página gravada
+        self.wfs_transfer_profiles = {
+            'completo': {'label': 'Precisão completa', 'num_decimals': None, 'simplify': None},
+            'padrao': {'label': '6 casas decimais (~0,1 m)', 'num_decimals': 6, 'simplify': None},
+            'visao_geral': {'label': 'Visão geral (5 casas, simplificado ~30 m)', 'num_decimals': 5, 'simplify': 0.0003}
+        }
+        self.wfs_transfer_profile = 'completo'  # Perfil escolhido na etapa 3
+        
+        # Perfis de atributos (propertyName) por camada - listas.json pode sobrescrever
+        self.wfs_attribute_profiles = {
+            'yearly_deforestation': ['uid', 'state', 'main_class', 'class_name', 'image_date', 'year', 'area_km'],
+            'accumulated_deforestation': ['uid', 'state', 'main_class', 'class_name', 'image_date', 'year', 'area_km'],
+            'deter_alerts': ['gid', 'classname', 'view_date', 'areamunkm', 'municipality', 'uf', 'satellite', 'sensor']
+        }
+        self.wfs_max_workers = 4  # Downloads WFS simultâneos no total (camadas x páginas)
+        self.stage_delay_ms = 0  # Intervalo entre etapas do processamento (0 = assim que a anterior termina)
+        self.stage_memo_enabled = True  # Reaproveita o resultado de cada etapa do grafo (get_stage_graph) com as mesmas entradas
+        self.background_tasks = True  # Processamento do assistente em QgsTask (PipelineJob; interface livre)
+        self.background_task = None  # Tarefa em andamento (referência mantida até o fim)
+        self.parallel_layer_downloads = True  # Camadas independentes (ex.: PRODES acumulado) baixadas ao mesmo tempo
+        import threading
+        self.download_worker_state = threading.local()  # Camada baixada pela thread atual (download simultâneo)
+        self.worker_download_progress = {}  # Última nota de progresso de cada camada em download simultâneo
+        self.download_chunk_size = 256 * 1024  # Bloco de gravação dos downloads em disco
+        
+        # Formatos GetFeature em ordem de preferência (valor anunciado, extensão)
+        # Shapefile fica depois do GeoJSON: o DBF trunca nomes de campo em 10
+        # caracteres (ex.: 'municipality' do DETER). GML2 é o último recurso.
+        self.wfs_output_format_preferences = [
+            ('application/geopackage+sqlite3', '.gpkg'),
+            ('geopackage', '.gpkg'),
+            ('gpkg', '.gpkg'),
+            ('application/json', '.json'),
+            ('json', '.json'),
+            ('SHAPE-ZIP', '.zip'),
+        ]
+        self.wfs_metadata_cache = {}  # GetCapabilities/DescribeFeatureType já interpretados (espelho do cache em disco)
+        self.wfs_metadata_valid_hours = 24  # Validade do cache de metadados antes de revalidar (ETag/Last-Modified)
+        self.wfs_output_formats = {}  # Formato negociado por URL base
+        
+        # Sessão HTTP compartilhada (criada no primeiro uso)
+        self.http_session = None
+        self.http_max_connections_per_host = self.wfs_max_workers + 2  # Páginas + consultas auxiliares
+        
+        # Sistema de configuração dinâmica
+        self.config_data = None
+        self.load_dynamic_config()
+
+    def load_dynamic_config(self):
+        """Carrega configurações dinâmicas do JSON online com cache local"""
+        try:
+            import json
+            import os
+            import tempfile
+            from datetime import datetime, timedelta
+            
+            # URL do JSON no GitHub
+            json_url = "https://raw.githubusercontent.com/geodenilson/DesagregaBiomasBR/main/listas.json"
+            
+            # Cache local
+            cache_dir = os.path.join(tempfile.gettempdir(), 'DesagregaBiomasBR')
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_file = os.path.join(cache_dir, 'config_cache.json')
+            
+            # Verifica validade do cache (24 horas)
+            cache_valid = False
+            if os.path.exists(cache_file):
+                cache_time = datetime.fromtimestamp(os.path.getmtime(cache_file))
+                if datetime.now() - cache_time < timedelta(hours=24):
+                    cache_valid = True
+            
+            if cache_valid:
+                # Usa cache local
+                print("🔧 DEBUG: Usando configurações do cache local")
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    self.config_data = json.load(f)
+            else:
+                # Tenta baixar nova versão
+                print("🌐 DEBUG: Baixando configurações atualizadas...")
+                self.config_data = self.download_config_json(json_url, cache_file)
+            
+            if self.config_data:
+                print(f"✅ DEBUG: Configurações carregadas (versão {self.config_data.get('version', 'N/A')})")
+                self.apply_dynamic_config()
+            else:
+                print("⚠️ DEBUG: Usando configurações hardcoded como fallback")
+                
+        except Exception as e:
+            print(f"❌ DEBUG: Erro ao carregar configurações dinâmicas: {e}")
+            print("⚠️ DEBUG: Usando configurações hardcoded como fallback")
+
+    def download_config_json(self, url, cache_file):
+        """Baixa JSON de configuração e salva no cache"""
+        try:
+            import json
+            
+            # Timeout de 10 segundos
+            response = self.get_http_session().get(url, timeout=10)
+            
+            if response.status_code == 200:
+                config_data = json.loads(response.content.decode('utf-8'))
+                
+                # Salva no cache
+                with open(cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(config_data, f, indent=2, ensure_ascii=False)
+                
+                return config_data
+            else:
+                print(f"❌ DEBUG: Erro na requisição: HTTP {response.status_code}")
+            
+            return None
+            
+        except Exception as e:
+            print(f"❌ DEBUG: Erro no download do JSON: {e}")
+            return None
+
+    def apply_dynamic_config(self):
+        """Aplica configurações dinâmicas carregadas do JSON"""
+        if not self.config_data:
+            return
+            
+        try:
+            # Atualiza biomas
+            if 'biomas' in self.config_data:
+                self.biome_options = self.config_data['biomas']
+                print("✅ DEBUG: Biomas atualizados dinamicamente")
+            
+            # Atualiza PRODES
+            if 'prodes' in self.config_data:
+                prodes_config = self.config_data['prodes']
+                if 'anos_incrementais' in prodes_config:
+                    self.prodes_years = prodes_config['anos_incrementais']
+                if 'anos_acumulados' in prodes_config:
+                    self.prodes_years_acumulado = prodes_config['anos_acumulados']
+                if 'anos_base' in prodes_config:
+                    self.prodes_base_years = prodes_config['anos_base']
+                if 'atributos' in prodes_config:
+                    self.wfs_attribute_profiles.update(prodes_config['atributos'])
+                print("✅ DEBUG: PRODES atualizado dinamicamente")
+            
+            # Atualiza DETER
+            if 'deter' in self.config_data:
+                deter_config = self.config_data['deter']
+                if 'urls' in deter_config:
+                    self.deter_urls = deter_config['urls']
+                if 'classes' in deter_config:
+                    self.deter_classes = deter_config['classes']
+                if 'datas_inicio' in deter_config:
+                    self.deter_start_dates = deter_config['datas_inicio']
+                if 'typenames' in deter_config:
+                    self.deter_typenames = deter_config['typenames']
+                if 'atributos' in deter_config:
+                    self.wfs_attribute_profiles['deter_alerts'] = deter_config['atributos']
+                print("✅ DEBUG: DETER atualizado dinamicamente")
+            
+            # Atualiza TERRACLASS
+            if 'terraclass' in self.config_data:
+                terraclass_config = self.config_data['terraclass']
+                if 'anos' in terraclass_config:
+                    self.terraclass_years = terraclass_config['anos']
+                print("✅ DEBUG: TERRACLASS atualizado dinamicamente")
+            
+            # Atualiza QUEIMADAS
+            if 'queimadas' in self.config_data:
+                queimadas_config = self.config_data['queimadas']
+                if 'base_url' in queimadas_config:
+                    self.queimadas_base_url = queimadas_config['base_url']
+                if 'data_inicio' in queimadas_config:
+                    self.queimadas_start_date = queimadas_config['data_inicio']
+                print("✅ DEBUG: QUEIMADAS atualizado dinamicamente")
+            
+            # Atualiza parâmetros de download WFS
+            if 'configuracoes' in self.config_data:
+                download_config = self.config_data['configuracoes']
+                if 'wfs_tamanho_pagina_inicial' in download_config:
+                    self.wfs_page_size = int(download_config['wfs_tamanho_pagina_inicial'])
+                if 'cache_valido_horas' in download_config:
+                    self.wfs_checkpoint_valid_hours = download_config['cache_valido_horas']
+                if 'prodes_anos_validade_dias' in download_config:
+                    self.prodes_store_valid_days = download_config['prodes_anos_validade_dias']
+                if 'deter_sobreposicao_dias' in download_config:
+                    self.deter_sync_overlap_days = download_config['deter_sobreposicao_dias']
+                if 'deter_armazenamento_com_corte' in download_config:
+                    self.deter_store_with_cut = bool(download_config['deter_armazenamento_com_corte'])
+                if 'wfs_metadados_validade_horas' in download_config:
+                    self.wfs_metadata_valid_hours = download_config['wfs_metadados_validade_horas']
+                if 'wfs_paginacao_chave_minimo' in download_config:
+                    self.wfs_keyset_min_features = int(download_config['wfs_paginacao_chave_minimo'])
+                if 'wfs_download_por_blocos' in download_config:
+                    self.wfs_tiled_download = bool(download_config['wfs_download_por_blocos'])
+                if download_config.get('wfs_perfil_transferencia') in self.wfs_transfer_profiles:
+                    self.wfs_transfer_profile = download_config['wfs_perfil_transferencia']
+                if 'wfs_recorte_por_pagina' in download_config:
+                    self.wfs_streaming_clip = bool(download_config['wfs_recorte_por_pagina'])
+                if 'wfs_chaves_primarias' in download_config:
+                    self.wfs_primary_key_candidates = download_config['wfs_chaves_primarias']
+                if 'reaproveitar_etapas' in download_config:
+                    self.stage_memo_enabled = bool(download_config['reaproveitar_etapas'])
+                if 'tarefas_em_segundo_plano' in download_config:
+                    self.background_tasks = bool(download_config['tarefas_em_segundo_plano'])
+                if 'intervalo_etapas_ms' in download_config:
+                    self.stage_delay_ms = max(0, int(download_config['intervalo_etapas_ms']))
+                if 'wfs_camadas_simultaneas' in download_config:
+                    self.parallel_layer_downloads = bool(download_config['wfs_camadas_simultaneas'])
+                if 'wfs_downloads_simultaneos' in download_config:
+                    self.wfs_max_workers = max(1, int(download_config['wfs_downloads_simultaneos']))
+                    self.http_max_connections_per_host = self.wfs_max_workers + 2
+                print("✅ DEBUG: Parâmetros de download WFS atualizados dinamicamente")
+                
+        except Exception as e:
+            print(f"❌ DEBUG: Erro ao aplicar configurações dinâmicas: {e}")
+
+    def get_dynamic_prodes_urls(self, biome):
+        """Retorna URLs do PRODES usando configuração dinâmica
+        
+        NOTA: Para o bioma Amazônia, usa-se o WFS da Amazônia Legal pois:
+        1. O WFS do bioma Amazônia tem problemas de limitação de polígonos (para em ~200k)
+        2. A Amazônia Legal cobre completamente o bioma Amazônia
+        3. O corte pelo limite do bioma será aplicado depois se necessário
+        """
+        import unicodedata
+        
+        # DEBUG DETALHADO: Verifica encoding do bioma recebido
+        print(f"🔍 DEBUG get_dynamic_prodes_urls: biome recebido = '{biome}'")
+        print(f"🔍 DEBUG: repr(biome) = {repr(biome)}")
+        print(f"🔍 DEBUG: len(biome) = {len(biome) if biome else 'None'}")
+        
+        # CORREÇÃO: Para Amazônia, usar sempre WFS da Amazônia Legal (mais estável)
+        # Normaliza strings para NFC para garantir comparação correta
+        effective_biome = biome
+        biome_normalized = unicodedata.normalize('NFC', biome) if biome else biome
+        amazonia_check = unicodedata.normalize('NFC', 'Amazônia')
+        
+        print(f"🔍 DEBUG: biome_normalized = '{biome_normalized}'")
+        print(f"🔍 DEBUG: amazonia_check = '{amazonia_check}'")
+        print(f"🔍 DEBUG: biome_normalized == amazonia_check = {biome_normalized == amazonia_check}")
+        
+        if biome_normalized == amazonia_check:
+            effective_biome = 'Amazônia Legal'
+            print(f"🔄 DEBUG: Bioma Amazônia selecionado - usando WFS da Amazônia Legal (mais estável)")
+            # Marca que precisa aplicar corte do bioma depois
+            self._needs_amazonia_biome_cut = True
+        else:
+            self._needs_amazonia_biome_cut = False
+            print(f"🔍 DEBUG: Bioma NÃO é Amazônia, usando: {effective_biome}")
+        
+        if self.config_data and 'prodes' in self.config_data and 'urls' in self.config_data['prodes']:
+            return self.config_data['prodes']['urls'].get(effective_biome)
+        
+        # Fallback para URLs hardcoded
+        fallback_urls = {
+            'Pantanal': {
+                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-pantanal-nb/accumulated_deforestation_2000/ows',
+                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-pantanal-nb/yearly_deforestation/ows'
+            },
+            'Cerrado': {
+                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-cerrado-nb/accumulated_deforestation_2000/ows',
+                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-cerrado-nb/yearly_deforestation/ows'
+            },
+            'Pampa': {
+                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-pampa-nb/accumulated_deforestation_2000/ows',
+                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-pampa-nb/yearly_deforestation/ows'
+            },
+            'Caatinga': {
+                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-caatinga-nb/accumulated_deforestation_2000/ows',
+                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-caatinga-nb/yearly_deforestation/ows'
+            },
+            'Mata Atlântica': {
+                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-mata-atlantica-nb/accumulated_deforestation_2000/ows',
+                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-mata-atlantica-nb/yearly_deforestation/ows'
+            },
+            'Amazônia Legal': {
+                'accumulated': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-legal-amz/accumulated_deforestation_2007/ows',
+                'yearly': 'https://terrabrasilis.dpi.inpe.br/geoserver/prodes-legal-amz/yearly_deforestation/ows'
+            }
+        }
+        return fallback_urls.get(effective_biome)
+
+    def get_dynamic_terraclass_urls(self):
+        """Retorna templates de URL do TERRACLASS usando configuração dinâmica"""
+        if self.config_data and 'terraclass' in self.config_data and 'urls' in self.config_data['terraclass']:
+            return self.config_data['terraclass']['urls']
+        
+        # Fallback para URLs hardcoded
+        return {
+            "base": "https://www.terraclass.gov.br/helpers/terraclass_data4download_2024/V/",
+            "municipal": "municipal/{uf_lower}/{bioma}.{ano}.{municipio_normalizado}.{UF}.{geocodigo_munic}.V.zip",
+            "estadual": "estadual/{bioma}.{ano}.{estado_normalizado}.{geocodigo_uf}.V.zip"
+        }
+
+    def ensure_ibge_shapefile_available(self):
+        """Garante que o shapefile IBGE esteja disponível (local ou cache)"""
+        try:
+            import os
+            import tempfile
+            from datetime import datetime, timedelta
+            import zipfile
+            import shutil
+            from qgis.core import QgsMessageLog, Qgis
+            
+            print("🔧 DEBUG: Verificando disponibilidade do shapefile IBGE...")
+            QgsMessageLog.logMessage("🔧 Verificando disponibilidade do shapefile IBGE...", "DesagregaBiomasBR", Qgis.Info)
+            
+            # Verifica se existe shapefile local primeiro
+            local_shapefile_dir = os.path.join(self.plugin_dir, 'shapefile')
+            if os.path.exists(local_shapefile_dir):
+                shp_files = [f for f in os.listdir(local_shapefile_dir) if f.endswith('.shp')]
+                if shp_files:
+                    print("✅ DEBUG: Shapefile IBGE local encontrado - usando local")
+                    QgsMessageLog.logMessage("✅ Shapefile IBGE local encontrado - usando local", "DesagregaBiomasBR", Qgis.Info)
+                    self.ibge_shapefile_name = shp_files[0][:-4]
+                    self.ibge_shapefile_path = os.path.join(local_shapefile_dir, shp_files[0])
+                    return True
+                else:
+                    print("🔧 DEBUG: Pasta shapefile existe mas está vazia")
+                    QgsMessageLog.logMessage("🔧 Pasta shapefile existe mas está vazia", "DesagregaBiomasBR", Qgis.Warning)
+            else:
+                print("🔧 DEBUG: Pasta shapefile local não existe")
+                QgsMessageLog.logMessage("🔧 Pasta shapefile local não existe", "DesagregaBiomasBR", Qgis.Info)
+            
+            # Se não existe local, usa sistema de cache
+            cache_dir = os.path.join(tempfile.gettempdir(), 'DesagregaBiomasBR', 'shapefile')
+            print(f"🔧 DEBUG: Cache dir: {cache_dir}")
+            QgsMessageLog.logMessage(f"🔧 Cache dir: {cache_dir}", "DesagregaBiomasBR", Qgis.Info)
+            os.makedirs(cache_dir, exist_ok=True)
+            
+            # Verifica cache do shapefile
+            cache_shapefile_dir = os.path.join(cache_dir, 'extracted')
+            print(f"🔧 DEBUG: Cache shapefile dir: {cache_shapefile_dir}")
+            cache_valid = False
+            
+            if os.path.exists(cache_shapefile_dir):
+                print("🔧 DEBUG: Cache dir existe, verificando conteúdo...")
+                QgsMessageLog.logMessage("🔧 Cache dir existe, verificando conteúdo...", "DesagregaBiomasBR", Qgis.Info)
+                # Verifica se tem .shp e se cache é válido (30 dias)
+                shp_files = [f for f in os.listdir(cache_shapefile_dir) if f.endswith('.shp')]
+                print(f"🔧 DEBUG: Arquivos .shp no cache: {shp_files}")
+                
+                if shp_files:
+                    cache_time = datetime.fromtimestamp(os.path.getmtime(cache_shapefile_dir))
+                    age_days = (datetime.now() - cache_time).days
+                    print(f"🔧 DEBUG: Cache idade: {age_days} dias (limite: 30)")
+                    
+                    if age_days < 30:
+                        cache_valid = True
+                        print("✅ DEBUG: Usando shapefile IBGE do cache (válido)")
+                        QgsMessageLog.logMessage("✅ Usando shapefile IBGE do cache (válido)", "DesagregaBiomasBR", Qgis.Info)
+                        # Atualiza o caminho para o cache
+                        self.ibge_shapefile_name = shp_files[0][:-4]  # Remove .shp
+                        self.ibge_shapefile_path = os.path.join(cache_shapefile_dir, shp_files[0])
+                        return True
+                    else:
+                        print("⚠️ DEBUG: Cache expirado (>30 dias)")
+                        QgsMessageLog.logMessage("⚠️ Cache expirado (>30 dias)", "DesagregaBiomasBR", Qgis.Warning)
+                else:
+                    print("⚠️ DEBUG: Cache dir existe mas sem arquivos .shp")
+                    QgsMessageLog.logMessage("⚠️ Cache dir existe mas sem arquivos .shp", "DesagregaBiomasBR", Qgis.Warning)
+            else:
+                print("🔧 DEBUG: Cache dir não existe")
+                QgsMessageLog.logMessage("🔧 Cache dir não existe", "DesagregaBiomasBR", Qgis.Info)
+            
+            if not cache_valid:
+                print("🌐 DEBUG: Iniciando download do shapefile IBGE...")
+                QgsMessageLog.logMessage("🌐 Iniciando download do shapefile IBGE...", "DesagregaBiomasBR", Qgis.Info)
+                success = self.download_ibge_shapefile(cache_dir)
+                if success:
+                    print("✅ DEBUG: Shapefile IBGE baixado e extraído com sucesso")
+                    QgsMessageLog.logMessage("✅ Shapefile IBGE baixado e extraído com sucesso", "DesagregaBiomasBR", Qgis.Info)
+                    return True
+                else:
+                    print("❌ DEBUG: Falha no download do shapefile IBGE")
+                    QgsMessageLog.logMessage("❌ Falha no download do shapefile IBGE", "DesagregaBiomasBR", Qgis.Critical)
+                    return False
+            
+            return cache_valid
+            
+        except Exception as e:
+            print(f"❌ DEBUG: Erro ao garantir shapefile IBGE: {e}")
+            return False
+
+    def download_ibge_shapefile(self, cache_dir):
+        """Baixa e extrai o shapefile IBGE - COPIADO DA ESTRATÉGIA DO JSON"""
+        try:
+            import zipfile
+            import shutil
+            from qgis.core import QgsMessageLog, Qgis
+            
+            QgsMessageLog.logMessage(f"🔧 Iniciando download do shapefile IBGE, cache_dir: {cache_dir}", "DesagregaBiomasBR", Qgis.Info)
+            print(f"🔧 DEBUG: Iniciando download_ibge_shapefile, cache_dir: {cache_dir}")
+            
+            # Obtém URL do shapefile do JSON
+            shapefile_url = None
+            if self.config_data and 'ibge_shapefile' in self.config_data:
+                shapefile_url = self.config_data['ibge_shapefile'].get('url')
+                QgsMessageLog.logMessage(f"🔧 URL do JSON: {shapefile_url}", "DesagregaBiomasBR", Qgis.Info)
+                print(f"🔧 DEBUG: URL do JSON: {shapefile_url}")
+            else:
+                QgsMessageLog.logMessage(f"🔧 config_data não disponível ou sem ibge_shapefile", "DesagregaBiomasBR", Qgis.Warning)
+                print(f"🔧 DEBUG: config_data não disponível ou sem ibge_shapefile")
+            
+            if not shapefile_url:
+                # Fallback para URL hardcoded (NOME LIMPO SEM CARACTERES ESPECIAIS)
+                shapefile_url = "https://github.com/geodenilson/DesagregaBiomasBR/raw/main/BC250_2023.zip"
+                QgsMessageLog.logMessage(f"🔧 Usando URL fallback: {shapefile_url}", "DesagregaBiomasBR", Qgis.Info)
+                print(f"🔧 DEBUG: Usando URL fallback: {shapefile_url}")
+            
+            print(f"🌐 DEBUG: Baixando de (URL limpa): {shapefile_url}")
+            QgsMessageLog.logMessage(f"🌐 Baixando shapefile de: {shapefile_url}", "DesagregaBiomasBR", Qgis.Info)
+            
+            # Download em blocos direto para o disco (redirecionamentos 301/302 são seguidos)
+            original_filename = shapefile_url.split('/')[-1]
+            zip_path = os.path.join(cache_dir, original_filename)
+            status, zip_size = self.stream_download_to_file(
+                shapefile_url, zip_path, timeout=60,
+                progress_callback=self.create_download_progress_callback())
+            
+            print(f"🔧 DEBUG: HTTP Status: {status}")
+            QgsMessageLog.logMessage(f"🔧 HTTP Status: {status}", "DesagregaBiomasBR", Qgis.Info)
+            
+            if status != 200:
+                print(f"❌ DEBUG: Erro na requisição: HTTP {status}")
+                QgsMessageLog.logMessage(f"❌ Erro na requisição: HTTP {status}", "DesagregaBiomasBR", Qgis.Critical)
+                return False
+            
+            print(f"✅ DEBUG: Dados recebidos: {zip_size} bytes ({zip_size/1024/1024:.1f}MB)")
+            QgsMessageLog.logMessage(f"✅ Dados recebidos: {zip_size/1024/1024:.1f}MB", "DesagregaBiomasBR", Qgis.Info)
+            
+            if zip_size == 0:
+                print("❌ DEBUG: Arquivo baixado está vazio!")
+                os.remove(zip_path)
+                return False
+            
+            print(f"✅ DEBUG: ZIP salvo: {zip_path}")
+            QgsMessageLog.logMessage(f"✅ ZIP salvo: {original_filename}", "DesagregaBiomasBR", Qgis.Info)
+            
+            # Extrai ZIP
+            extract_dir = os.path.join(cache_dir, 'extracted')
+            if os.path.exists(extract_dir):
+                shutil.rmtree(extract_dir)
+            os.makedirs(extract_dir)
+            
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                zip_ref.extractall(extract_dir)
+            
+            # Remove ZIP
+            os.remove(zip_path)
+            
+            # Configura shapefile
+            shp_files = [f for f in os.listdir(extract_dir) if f.endswith('.shp')]
+            if shp_files:
+                self.ibge_shapefile_name = shp_files[0][:-4]
+                self.ibge_shapefile_path = os.path.join(extract_dir, shp_files[0])
+                print(f"✅ DEBUG: Shapefile configurado: {self.ibge_shapefile_path}")
+                QgsMessageLog.logMessage(f"✅ Shapefile configurado com sucesso", "DesagregaBiomasBR", Qgis.Info)
+                return True
+            
+            print("❌ DEBUG: Nenhum .shp encontrado no ZIP")
+            return False
+            
+        except Exception as e:
+            print(f"❌ DEBUG: Erro no download do shapefile: {e}")
+            QgsMessageLog.logMessage(f"❌ Erro no download: {e}", "DesagregaBiomasBR", Qgis.Critical)
+            return False
+
+    def stream_download_to_file(self, url, dest_path, params=None, timeout=120, progress_callback=None):
+        """Baixa uma URL direto para o disco em blocos - caminho único de download
+        
+        Usa a sessão compartilhada, que envia Accept-Encoding: gzip (o corpo é
+        descompactado durante a leitura), e nunca mantém a resposta inteira em memória. progress_callback(bytes)
+        é chamado a cada bloco; se retornar False o download é interrompido.
+        Retorna (status HTTP, bytes gravados); status None se interrompido.
+        """
+        session = self.get_http_session()
+        
+        with session.get(url, params=params, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                return response.status_code, 0
+            
+            bytes_received = 0
+            with open(dest_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.download_chunk_size):
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    bytes_received += len(chunk)
+                    
+                    if progress_callback and progress_callback(bytes_received) is False:
+                        print(f"🛑 DEBUG: Download interrompido após {bytes_received} bytes")
+                        return None, bytes_received
+            
+            # Bytes que trafegaram na rede (comprimidos) x bytes gravados
+            wire_bytes = response.raw.tell()
+            if wire_bytes and wire_bytes < bytes_received:
+                print(f"🗜️ DEBUG: {wire_bytes} bytes na rede → {bytes_received} bytes gravados ({bytes_received / wire_bytes:.1f}x)")
+            
+            return response.status_code, bytes_received
+
+    def create_download_progress_callback(self, label=None):
+        """Cria o callback de progresso dos downloads de arquivos
+        
+        Processa eventos da interface a cada bloco (só na thread principal),
+        mostra os MB recebidos nas notas (quando há rótulo) e interrompe o
+        download se o usuário abortar ou cancelar a tarefa.
+        """
+        state = {'last_mb': -1}
+        
+        def progress(bytes_received):
+            received_mb = bytes_received // (1024 * 1024)
+            if label and received_mb != state['last_mb']:
+                state['last_mb'] = received_mb
+                self.update_notes(f"📥 {label}: {bytes_received / 1024 / 1024:.1f} MB recebidos", "status")
+            
+            return self.process_ui_events()
+        
+        return progress
+
+    def get_http_session(self):
+        """Sessão HTTP compartilhada com pool de conexões keep-alive
+        
+        Usada por todos os acessos HTTP do plugin (configuração, conectividade,
+        GetCapabilities, páginas WFS, fallback e downloads de arquivos), evitando
+        repetir o handshake TCP/TLS a cada requisição. pool_block limita as
+        conexões simultâneas por host.
+        """
+        if self.http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            session = requests.Session()
+            session.headers.update({
+                "User-Agent": "DesagregaBiomasBR-Plugin/1.0",
+                "Accept-Encoding": "gzip, deflate"
+            })
+            
+            adapter = HTTPAdapter(pool_connections=10,
+                                  pool_maxsize=self.http_max_connections_per_host,
+                                  pool_block=True)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            
+            self.http_session = session
+            print(f"🔌 DEBUG: Sessão HTTP criada (máx. {self.http_max_connections_per_host} conexões por host)")
+        
+        return self.http_session
+
+    def get_http_session_stats(self):
+        """Contadores de reaproveitamento de conexões da sessão HTTP
+        
+        Retorna um dicionário com requisições feitas, conexões abertas e
+        requisições que reaproveitaram uma conexão keep-alive.
+        """
+        stats = {'requisicoes': 0, 'conexoes': 0, 'reutilizadas': 0}
+        if self.http_session is None:
+            return stats
+        
+        try:
+            adapters = {id(adapter): adapter for adapter in self.http_session.adapters.values()}
+            for adapter in adapters.values():
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    stats['requisicoes'] += pool.num_requests
+                    stats['conexoes'] += pool.num_connections
+            
+            stats['reutilizadas'] = max(0, stats['requisicoes'] - stats['conexoes'])
+        except Exception as e:
+            print(f"⚠️ DEBUG: Falha ao ler contadores da sessão HTTP: {str(e)}")
+        
+        return stats
+
+    def log_http_session_stats(self):
+        """Registra no log do QGIS o reaproveitamento de conexões da sessão HTTP"""
+        from qgis.core import QgsMessageLog, Qgis
+        stats = self.get_http_session_stats()
+        message = (f"🔌 HTTP: {stats['requisicoes']} requisições, {stats['conexoes']} conexões abertas, "
+                   f"{stats['reutilizadas']} reaproveitadas (keep-alive)")
+        print(f"{message}")
+        QgsMessageLog.logMessage(message, "DesagregaBiomasBR", Qgis.Info)
+
+    def close_http_session(self):
+        """Fecha a sessão HTTP e libera as conexões do pool"""
+        if self.http_session is not None:
+            self.log_http_session_stats()
+            self.http_session.close()
+            self.http_session = None
+
+    def reset_all_variables(self):
+        """Reset COMPLETO de todas as variáveis para garantir estado limpo"""
+        print("🧹 DEBUG: Executando reset_all_variables - zerando todas as variáveis")
+        
+        # Estado do assistente
+        self.current_step = 1
+        self.max_steps = 3
+        
+        # Sistema de notas inteligente
+        self.config_note = ""
+        self.status_note = ""
+        self.final_note = ""
+        
+        # Dados do assistente principal
+        self.selected_theme = None
+        self.selected_biome = None
+        self.cut_option = None
+        self.selected_layer = None
+        self.selected_field = None
+        self.selected_element = None
+        self.drawn_rectangle = None
+        
+        # Flag para corte automático do bioma Amazônia
+        self._needs_amazonia_biome_cut = False
+        
+        # Dados IBGE
+        self.ibge_layer = None
+        self.ibge_field = None
+        self.ibge_element = None
+        self.ibge_biome_region = None
+        self.ibge_state = None
+        self.ibge_municipality = None
+        
+        # Dados temporais (PRODES)
+        self.data_type = None
+        self.start_year = None
+        self.end_year = None
+        
+        # Dados temporais (DETER)
+        self.deter_start_year = None
+        self.deter_end_year = None
+        self.deter_selected_classes = []
+        
+        # Dados temporais (TERRACLASS)
+        self.terraclass_year = None
+        self.terraclass_state = None
+        self.terraclass_municipality = None
+        
+        # Dados WFS (para opção 3)
+        self.wfs_type = None
+        self.wfs_field = None
+        self.wfs_element = None
+        self.wfs_layer = None
+        
+        # Ferramentas de desenho
+        self.draw_tool = None
+        
+        # Listas de processamento
+        self.processing_layers = []
+        self.urls_and_filters = {}
+        self.wfs_work_stores = {}  # GeoPackages de trabalho do download WFS
+        self.wfs_cut_filter = None  # Geometria de corte enviada ao servidor (INTERSECTS/BBOX)
+        self.wfs_clip_geometry = None  # Geometria exata de corte (WKB, EPSG:4674) para o recorte por página
+        self.wfs_cut_key = None  # Hash da geometria exata de corte (parte das chaves das etapas)
+        self.stage_graph = None  # Execução atual do grafo de etapas (etapas, posição, chave da última etapa)
+        self.stage_store_path = None  # GeoPackage da etapa em andamento (saídas do processing)
+        self.wfs_attribute_override = ""  # Atributos informados pelo usuário na etapa 3 (vazio = perfil)
+        
+        # Sistema de rastreamento de processamentos para metadados
+        self.processing_log = []
+        
+        # Sistema de abortar download
+        self.abort_download = False  # Flag para abortar download
+        self.download_in_progress = False  # Flag para controlar estado do download
+
+    def add_processing_log(self, operation, details):
+        """Registra um processamento realizado para incluir nos metadados"""
+        try:
+            import datetime
+            timestamp = datetime.datetime.now().strftime('%H:%M:%S')
+            
+            log_entry = {
+                'timestamp': timestamp,
+                'operation': operation,
+                'details': details
+            }
+            
+            self.processing_log.append(log_entry)
+            
+        except Exception as e:
+            pass  # Falha silenciosa no log não deve interromper processamento
+
+    def get_processing_summary(self):
+        """Retorna resumo dos processamentos para metadados"""
+        if not self.processing_log:
+            return ["Nenhum processamento especial realizado (dados utilizados como baixados)"]
+        
+        summary = []
+        for entry in self.processing_log:
+            summary.append(f"{entry['timestamp']} - {entry['operation']}: {entry['details']}")
+        
+        return summary
+
+    def get_wfs_transfer_profile(self):
+        """Perfil de transferência ativo ({'label', 'num_decimals', 'simplify'})"""
+        return self.wfs_transfer_profiles.get(self.wfs_transfer_profile, self.wfs_transfer_profiles['completo'])
+
+    def describe_wfs_transfer_profile(self):
+        """Descrição do perfil de transferência para notas e metadados"""
+        profile = self.get_wfs_transfer_profile()
+        details = [profile['label']]
+        if profile['num_decimals']:
+            details.append(f"coordenadas com {profile['num_decimals']} casas decimais (format_options=numDecimals:{profile['num_decimals']})")
+        if profile['simplify']:
+            details.append(f"geometrias simplificadas com tolerância de {profile['simplify']}° (topologia preservada)")
+        return ' - '.join(details)
+
+    def get_wfs_transfer_key(self):
+        """Parte da chave de checkpoints/armazenamentos que depende do perfil de transferência
+        
+        Vazia na precisão completa (mantém as chaves já existentes em disco).
+        """
+        profile = self.get_wfs_transfer_profile()
+        if not profile['num_decimals'] and not profile['simplify']:
+            return []
+        return [profile['num_decimals'], profile['simplify']]
+
+    def show_worker_progress(self):
+        """Mostra nas notas o progresso das camadas/arquivos baixados em segundo plano"""
+        progress = ' | '.join(f"{name}: {message}" for name, message in self.worker_download_progress.items())
+        if progress and progress != getattr(self, 'shown_worker_progress', None):
+            self.update_notes(progress, "status")
+            self.shown_worker_progress = progress
+
+    def download_stage_layers(self, jobs, task=None):
+        """Baixa as camadas de urls_and_filters; retorna [(camada, correção pendente)]
+        
+        Com uma camada (ou sem downloads simultâneos), baixa em série na
+        própria thread: na thread principal como antes, dentro de uma QgsTask
+        na thread da tarefa (sem pool extra). Com várias camadas simultâneas,
+        cada uma roda na sua thread (run_layer_download_worker) e esta função
+        só acompanha: na thread principal processando eventos e mostrando o
+        progresso, dentro de uma QgsTask atualizando o progresso da tarefa.
+        O total de downloads simultâneos (camadas x páginas) não passa de
+        wfs_max_workers: as páginas são divididas entre as camadas. Em todos
+        os casos a correção de geometrias fica pendente para a etapa
+        'correcao' do grafo (auto_fix_geometries só marca a camada).
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait
+        
+        owner_thread = QThread.currentThread()  # Camadas baixadas ficam com a thread que chamou
+        if not (self.parallel_layer_downloads and len(jobs) > 1):
+            results = []
+            state = self.download_worker_state
+            for n, (i, (url, filter_str, layer_name)) in enumerate(jobs):
+                if task is None:
+                    state.fix_deferred = False
+                    try:
+                        result = (self.download_processing_layer(i, len(jobs), url, filter_str, layer_name), state.fix_deferred)
+                    finally:
+                        state.fix_deferred = None
+                else:
+                    result = self.run_layer_download_worker(i, len(jobs), url, filter_str, layer_name, owner_thread=owner_thread)
+                    task.setProgress(100.0 * (n + 1) / len(jobs))
+                results.append(result)
+                layer = result[0]
+                if not layer or not layer.isValid() or layer.featureCount() == 0:
+                    break  # Falha (ou abortar): não baixa as camadas seguintes
+            return results
+        
+        self.get_http_session()  # Sessão compartilhada criada antes das threads
+        self.worker_download_progress = {layer_name: "aguardando" for i, (url, filter_str, layer_name) in jobs}
+        
+        layer_workers = min(len(jobs), max(1, self.wfs_max_workers))
+        page_workers = max(1, self.wfs_max_workers // layer_workers)
+        print(f"📊 DEBUG: {layer_workers} camadas simultâneas x {page_workers} páginas simultâneas por camada")
+        
+        executor = ThreadPoolExecutor(max_workers=layer_workers)
+        futures = [executor.submit(self.run_layer_download_worker, i, len(jobs), url, filter_str, layer_name, page_workers, owner_thread)
+                   for i, (url, filter_str, layer_name) in jobs]
+        
+        try:
+            # Acompanha as camadas até todas terminarem (abortar é lido pelas próprias threads)
+            while not all(future.done() for future in futures):
+                wait(futures, timeout=0.2)
+                if task is None:
+                    self.process_ui_events()
+                    self.show_worker_progress()
+                else:
+                    task.setProgress(100.0 * sum(future.done() for future in futures) / len(futures))
+                    if task.isCanceled():
+                        self.abort_download = True
+        finally:
+            executor.shutdown(wait=False)
+        
+        results = []
+        for future, (i, (url, filter_str, layer_name)) in zip(futures, jobs):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"❌ ERROR download_stage_layers ({layer_name}): {str(e)}")
+                results.append((None, False))
+        return results
+
+    def download_processing_layer(self, i, total, url, filter_str, layer_name):
+        """Baixa uma camada de urls_and_filters (DETER, PRODES por ano ou WFS direto)"""
+        print(f"🔄 DEBUG: Baixando camada {i+1}/{total}: {layer_name}")
+        
+        # NOVA IMPLEMENTAÇÃO: Constrói URL simples com filtro
+        if filter_str:
+            # Adiciona apenas o filtro CQL à URL base
+            download_url = f"{url}?CQL_FILTER={filter_str}"
+        else:
+            # URL base sem filtro para accumulated_deforestation
+            download_url = url
+        
+        print(f"🌐 DEBUG: URL de download: {download_url[:100]}...")
+        
+        # Atributos solicitados ao servidor (perfil do tema ou escolha do usuário)
+        property_names = self.get_wfs_attribute_selection(layer_name)
+        
+        year_ranges = self.urls_and_filters.get('year_ranges') or []
+        year_range = year_ranges[i] if i < len(year_ranges) else None
+        
+        # Outro processamento simultâneo com o mesmo serviço/filtro termina antes e deixa o armazenamento pronto
+        if self.selected_theme == 'DETER':
+            # DETER: armazenamento local sincronizado, filtros de data/classes já aplicados
+            with get_store_lock(url):
+                return self.download_deter_layer(url, layer_name, property_names)
+        if year_range:
+            # PRODES anual: só os anos que ainda não estão no armazenamento local
+            with get_store_lock(url):
+                return self.download_prodes_year_range(url, layer_name, year_range, property_names)
+        # Baixa a camada usando a nova implementação
+        with get_store_lock(download_url):
+            return self.download_wfs_layer(download_url, f"{layer_name}_{self.selected_biome}", property_names)
+
+    def run_layer_download_worker(self, i, total, url, filter_str, layer_name, page_workers=None, owner_thread=None):
+        """Corpo da thread de download de uma camada
+        
+        Retorna (camada, correção de geometrias pendente). A camada criada
+        nesta thread é transferida para owner_thread (padrão: thread
+        principal). page_workers limita as páginas simultâneas desta camada
+        (get_page_workers).
+        """
+        state = self.download_worker_state
+        previous = (getattr(state, 'label', None), getattr(state, 'page_workers', None))
+        state.label = layer_name
+        state.page_workers = page_workers
+        state.fix_deferred = False
+        try:
+            layer = self.download_processing_layer(i, total, url, filter_str, layer_name)
+            owner_thread = owner_thread or QgsApplication.instance().thread()
+            if layer is not None and layer.thread() != owner_thread:
+                layer.moveToThread(owner_thread)
+            self.worker_download_progress[layer_name] = "✅ concluído" if layer else "❌ falhou"
+            return layer, state.fix_deferred
+        finally:
+            state.label, state.page_workers = previous
+            state.fix_deferred = None
+
+    def get_page_workers(self):
+        """Páginas baixadas ao mesmo tempo pela camada da thread atual
+        
+        wfs_max_workers é o limite total: com camadas simultâneas, cada uma
+        recebe a sua parte (run_layer_download_worker).
+        """
+        page_workers = getattr(self.download_worker_state, 'page_workers', None)
+        return max(1, page_workers or self.wfs_max_workers)
+
+    def process_ui_events(self):
+        """Processa eventos da interface sem sair das regras de thread do Qt
+        
+        Só a thread principal processa eventos (clique em abortar, notas). Em
+        QgsTask e threads de download apenas repassa o cancelamento da tarefa
+        para abort_download. Retorna False quando o processamento foi abortado.
+        """
+        if QThread.currentThread() == QgsApplication.instance().thread():
+            QgsApplication.processEvents()
+        elif self.background_task is not None and self.background_task.isCanceled():
+            self.abort_download = True
+        return not self.abort_download
+
+    def in_download_worker(self):
+        """Indica se a chamada vem de uma thread de download simultâneo de camadas"""
+        state = getattr(self, 'download_worker_state', None)
+        return getattr(state, 'label', None) is not None
+
+    def download_deter_layer(self, url, layer_name, property_names=None):
+        """Obtém os alertas DETER filtrados por data e classes
+        
+        Com armazenamento local do bioma, sincroniza só os alertas novos e lê o
+        filtro do armazenamento. Sem armazenamento, a primeira sincronização
+        baixa o histórico do bioma e cria o armazenamento - também em execuções
+        com corte espacial, para que as seguintes sejam incrementais. Com
+        deter_store_with_cut desligado, uma execução com corte e sem
+        armazenamento faz uma consulta avulsa com data, classes e corte no
+        CQL_FILTER (sem baixar o histórico nem criar o armazenamento).
+        """
+        try:
+            store = self.open_deter_store(url, property_names)
+            
+            if store['manifest']['last_view_date'] is None and self.wfs_cut_filter and not self.deter_store_with_cut:
+                server_filter = self.urls_and_filters.get('server_filter')
+                print(f"🎯 DEBUG: DETER sem armazenamento local - consulta avulsa no servidor: {server_filter}")
+                self.add_processing_log(
+                    "FILTRO DETER NO SERVIDOR",
+                    f"Datas e classes aplicadas no WFS junto com o corte espacial: {server_filter}"
+                )
+                download_url = f"{url}?CQL_FILTER={server_filter}" if server_filter else url
+                return self.download_wfs_layer(download_url, f"{layer_name}_{self.selected_biome}", property_names)
+            
+            if not self.sync_deter_store(url, layer_name, store, property_names):
+                return None
+            
+            return self.extract_deter_alerts(store, layer_name)
+            
+        except Exception as e:
+            print(f"❌ ERROR download_deter_layer: {str(e)}")
+            return None
+
+    def open_deter_store(self, url, property_names=None):
+        """Abre o armazenamento local DETER do bioma (GeoPackage + manifest.json)"""
+        import json
+        import hashlib
+        
+        service = url.split('/geoserver/')[-1].split('/')[0]
+        key_source = json.dumps([url, property_names or []] + self.get_wfs_transfer_key())
+        key = hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:12]
+        store_dir = os.path.join(tempfile.gettempdir(), 'DesagregaBiomasBR', 'deter', f"{service}_{key}")
+        os.makedirs(store_dir, exist_ok=True)
+        
+        store = {
+            'dir': store_dir,
+            'manifest_path': os.path.join(store_dir, 'manifest.json'),
+            'store_path': os.path.join(store_dir, 'alertas.gpkg'),
+            'store_layer': 'alertas',
+            'manifest': {'url': url, 'property_names': property_names, 'last_view_date': None, 'features': 0}
+        }
+        
+        if os.path.exists(store['manifest_path']) and os.path.exists(store['store_path']):
+            try:
+                with open(store['manifest_path'], 'r', encoding='utf-8') as f:
+                    store['manifest'] = json.load(f)
+                print(f"📚 DEBUG: Armazenamento DETER: {store['manifest']['features']} alertas até {store['manifest']['last_view_date']}")
+            except Exception as e:
+                print(f"⚠️ DEBUG: Manifest do armazenamento DETER ilegível: {str(e)}")
+        
+        return store
+
+    def sync_deter_store(self, url, layer_name, store, property_names=None):
+        """Sincroniza o armazenamento DETER com o servidor
+        
+        Alertas publicados com atraso entram na janela de sobreposição (última
+        data sincronizada menos deter_sync_overlap_days). A janela só é baixada
+        de novo quando o total do servidor nela difere do armazenamento; caso
+        contrário, só os alertas posteriores à última data. Os alertas baixados
+        substituem os do mesmo período no armazenamento, em uma única transação
+        (remoção + gravação); o manifest só é atualizado no final, então uma
+        falha repete a mesma sincronização.
+        """
+        from osgeo import gdal, ogr
+        import datetime
+        
+        manifest = store['manifest']
+        store_path, store_layer = store['store_path'], store['store_layer']
+        
+        cql_filter = None
+        if manifest['last_view_date']:
+            last_view_date = manifest['last_view_date']
+            last_date = datetime.datetime.strptime(last_view_date, '%Y-%m-%d')
+            since_date = last_date - datetime.timedelta(days=self.deter_sync_overlap_days)
+            since = since_date.strftime('%Y-%m-%d')
+            typename = self.extract_typename_from_url(url, layer_name)
+            
+            # Janela de sobreposição: mesmo total no servidor e no armazenamento = nada publicado com atraso
+            server_window = self.get_wfs_hits_count(url, typename, f"view_date >= '{since}' AND view_date <= '{last_view_date}'")
+            dataset = ogr.Open(store_path)
+            window_filter = self.build_deter_store_date_filter(since_date)
+            summary = dataset.ExecuteSQL(f"SELECT COUNT(*) AS total FROM \"{store_layer}\" WHERE {window_filter}")
+            local_window = summary.GetNextFeature().GetField('total')
+            dataset.ReleaseResultSet(summary)
+            dataset = None
+            
+            window_changed = server_window is None or server_window != local_window
+            if not window_changed:
+                cql_filter = f"view_date > '{last_view_date}'"
+                local_filter = self.build_deter_store_date_filter(last_date + datetime.timedelta(days=1))
+            else:
+                print(f"🔄 DEBUG: Janela DETER desde {since} mudou no servidor ({local_window} → {server_window} alertas)")
+                cql_filter = f"view_date >= '{since}'"
+                local_filter = window_filter
+            
+            new_count = self.get_wfs_hits_count(url, typename, cql_filter)
+            print(f"🔄 DEBUG: Sincronização DETER ({cql_filter}): {new_count} alertas no servidor")
+            if new_count == 0:
+                if window_changed:
+                    # Janela esvaziada no servidor: alertas removidos/reclassificados saem do armazenamento
+                    dataset = ogr.Open(store_path, 1)
+                    dataset.ExecuteSQL(f"DELETE FROM \"{store_layer}\" WHERE {local_filter}")
+                    summary = dataset.ExecuteSQL(f"SELECT COUNT(*) AS total FROM \"{store_layer}\"")
+                    manifest['features'] = summary.GetNextFeature().GetField('total')
+                    dataset.ReleaseResultSet(summary)
+                    dataset = None
+                    self.save_wfs_checkpoint(store)
+                    print(f"🧹 DEBUG: {local_window} alertas da janela desde {since} removidos do armazenamento DETER")
+                self.update_notes(f"✅ DETER já sincronizado até {last_view_date}", "status")
+                return True
+            self.update_notes(f"🔄 Sincronizando DETER ({cql_filter})", "status")
+        else:
+            print(f"📥 DEBUG: Primeira sincronização DETER - histórico completo do bioma")
+            self.update_notes(f"📥 Primeira sincronização DETER: baixando histórico do bioma", "status")
+        
+        download_url = f"{url}?CQL_FILTER={cql_filter}" if cql_filter else url
+        layer = self.download_wfs_layer(download_url, f"{layer_name}_{self.selected_biome}_sync", property_names, use_cut_filter=False)
+        if not layer or not layer.isValid():
+            return False
+        
+        source_path = layer.source().split('|')[0]
+        source_layers = [layer.source().split('layername=')[1].split('|')[0]] if 'layername=' in layer.source() else None
+        
+        if cql_filter:
+            # Alertas do mesmo período são substituídos pelos recém-baixados
+            if not self.replace_deter_store_window(store, source_path, source_layers, local_filter):
+                return False
+        else:
+            # Histórico completo: grava ao lado e só então substitui o armazenamento
+            new_store_path = store_path + '.novo.gpkg'
+            if os.path.exists(new_store_path):
+                os.remove(new_store_path)
+            options = gdal.VectorTranslateOptions(
+                format='GPKG', layers=source_layers, layerName=store_layer,
+                layerCreationOptions=['SPATIAL_INDEX=YES'], geometryType='PROMOTE_TO_MULTI')
+            result = gdal.VectorTranslate(new_store_path, source_path, options=options)
+            if result is None:
+                print(f"❌ DEBUG: Falha ao gravar alertas no armazenamento DETER")
+                return False
+            result = None
+            os.replace(new_store_path, store_path)
+        
+        # Índice de data para a sincronização e para os filtros de leitura
+        dataset = ogr.Open(store_path, 1)
+        dataset.ExecuteSQL(f"CREATE INDEX IF NOT EXISTS idx_{store_layer}_view_date ON \"{store_layer}\" (view_date)")
+        summary = dataset.ExecuteSQL(f"SELECT MAX(view_date) AS ultima, COUNT(*) AS total FROM \"{store_layer}\"")
+        feature = summary.GetNextFeature()
+        last_view_date = str(feature.GetField('ultima'))[:10].replace('/', '-') if feature and feature.GetField('ultima') else None
+        total = feature.GetField('total') if feature else 0
+        dataset.ReleaseResultSet(summary)
+        dataset = None
+        
+        manifest.update({
+            'last_view_date': last_view_date or manifest['last_view_date'],
+            'features': total
+        })
+        self.save_wfs_checkpoint(store)
+        
+        print(f"✅ DEBUG: Armazenamento DETER sincronizado: {total} alertas até {manifest['last_view_date']}")
+        self.add_processing_log(
+            "SINCRONIZAÇÃO DETER",
+            f"Alertas com {cql_filter} baixados" if cql_filter else "Histórico completo do bioma baixado"
+        )
+        return True
+
+    def build_deter_store_date_filter(self, since):
+        """Filtro SQLite do armazenamento DETER: view_date >= data (ISO AAAA-MM-DD)
+        
+        Montado à parte do CQL enviado ao servidor. O GeoPackage grava datas
+        como texto ISO, então a comparação de texto com a data ISO usa o índice
+        de view_date e vale também para valores com hora.
+        """
+        return f"view_date >= '{since.strftime('%Y-%m-%d')}'"
+
+    def replace_deter_store_window(self, store, source_path, source_layers, local_filter):
+        """Troca os alertas de local_filter pelos recém-baixados em uma única transação
+        
+        A remoção e a gravação são confirmadas juntas; em caso de falha nada
+        muda no armazenamento. Retorna False se a gravação falhar.
+        """
+        from osgeo import ogr
+        
+        source = ogr.Open(source_path)
+        source_layer = source.GetLayerByName(source_layers[0]) if source and source_layers else (source.GetLayer(0) if source else None)
+        if source_layer is None:
+            print(f"❌ DEBUG: Alertas baixados ilegíveis - armazenamento DETER mantido")
+            return False
+        
+        dataset = ogr.Open(store['store_path'], 1)
+        store_layer = dataset.GetLayerByName(store['store_layer'])
+        
+        # Atributos novos no servidor entram como colunas do armazenamento
+        store_fields = {store_layer.GetLayerDefn().GetFieldDefn(index).GetName() for index in range(store_layer.GetLayerDefn().GetFieldCount())}
+        source_definition = source_layer.GetLayerDefn()
+        for index in range(source_definition.GetFieldCount()):
+            if source_definition.GetFieldDefn(index).GetName() not in store_fields:
+                store_layer.CreateField(source_definition.GetFieldDefn(index))
+        store_definition = store_layer.GetLayerDefn()
+        
+        dataset.StartTransaction()
+        try:
+            dataset.ExecuteSQL(f"DELETE FROM \"{store['store_layer']}\" WHERE {local_filter}")
+            for feature in source_layer:
+                output = ogr.Feature(store_definition)
+                output.SetFrom(feature)
+                geometry = feature.GetGeometryRef()
+                if geometry is not None:
+                    output.SetGeometry(ogr.ForceToMultiPolygon(geometry))
+                if store_layer.CreateFeature(output) != 0:
+                    raise RuntimeError(f"falha ao gravar o alerta {feature.GetFID()}")
+            dataset.CommitTransaction()
+        except Exception as e:
+            dataset.RollbackTransaction()
+            print(f"❌ DEBUG: Falha ao gravar alertas no armazenamento DETER ({str(e)}) - nada foi alterado")
+            return False
+        finally:
+            dataset = None
+            source = None
+        
+        return True
+
+    def extract_deter_alerts(self, store, layer_name):
+        """Lê do armazenamento DETER os alertas do filtro de data/classes"""
+        from osgeo import gdal
+        
+        where = self.urls_and_filters.get('memory_filter') or None
+        work_path = os.path.join(tempfile.gettempdir(), f"{layer_name}_{id(self)}.gpkg")
+        if os.path.exists(work_path):
+            os.remove(work_path)
+        
+        # Com corte, só os alertas na extensão da área (índice espacial do armazenamento)
+        extent = list(self.wfs_cut_filter['extent']) if self.wfs_cut_filter else None
+        
+        print(f"⏰ DEBUG: Lendo alertas do armazenamento DETER: {where}")
+        options = gdal.VectorTranslateOptions(
+            format='GPKG', layers=[store['store_layer']], layerName='dados_wfs', where=where, spatFilter=extent,
+            layerCreationOptions=['SPATIAL_INDEX=YES'])
+        result = gdal.VectorTranslate(work_path, store['store_path'], options=options)
+        if result is None:
+            print(f"❌ DEBUG: Falha ao ler alertas do armazenamento DETER")
+            return None
+        total = result.GetLayerByName('dados_wfs').GetFeatureCount()
+        result = None
+        
+        print(f"✅ DEBUG: Filtro DETER aplicado: {total} alertas (de {store['manifest']['features']} no armazenamento)")
+        if not total:
+            self.update_notes(f"⚠️ Nenhum alerta DETER para o período/classes selecionados", "status")
+            return None
+        
+        # Etapas seguintes gravam suas tabelas no mesmo GeoPackage
+        self.wfs_work_stores[work_path] = 0
+        
+        layer = QgsVectorLayer(f"{work_path}|layername=dados_wfs", f"{layer_name}_{self.selected_biome}", "ogr")
+        if layer.isValid():
+            layer.setCrs(QgsCoordinateReferenceSystem("EPSG:4674"))
+        self.update_notes(f"✅ DETER: {total} alertas no período/classes selecionados", "status")
+        return layer
+
+    def download_prodes_year_range(self, url, layer_name, year_range, property_names=None):
+        """Monta o intervalo de anos PRODES a partir do armazenamento local por ano
+        
+        Baixa do WFS apenas os anos que ainda não estão guardados (ou expiraram),
+        sempre do bioma inteiro (sem corte), grava cada ano como uma camada do
+        GeoPackage do armazenamento e monta o intervalo pedido em um GeoPackage
+        de trabalho - só a extensão do corte, com o recorte exato feito depois
+        na etapa de corte. Retorna None se abortado
+        ou se não houver dados.
+        """
+        try:
+            import datetime
+            
+            store = self.open_prodes_year_store(url, property_names)
+            requested = list(range(year_range[0], year_range[1] + 1))
+            stored_years = store['manifest']['years']
+            missing = [year for year in requested if str(year) not in stored_years]
+            reused = [year for year in requested if str(year) in stored_years]
+            
+            print(f"📚 DEBUG: Anos {year_range[0]}-{year_range[1]}: {len(reused)} no armazenamento local, {len(missing)} a baixar")
+            
+            if missing:
+                cql_filter = self.build_year_list_cql(missing)
+                self.update_notes(f"📥 Baixando {len(missing)} ano(s) PRODES ausentes do armazenamento local", "status")
+                layer = self.download_wfs_layer(f"{url}?CQL_FILTER={cql_filter}", f"{layer_name}_{self.selected_biome}", property_names, use_cut_filter=False)
+                if not layer or not layer.isValid():
+                    return None
+                
+                if not self.split_prodes_years_into_store(layer, missing, store):
+                    return None
+
+                
+                now = datetime.datetime.now().isoformat()
+                for year in missing:
+                    stored_years[str(year)]['fetched_at'] = now
+                self.save_wfs_checkpoint(store)
+            else:
+                self.update_notes(f"♻️ Anos {year_range[0]}-{year_range[1]} reaproveitados do armazenamento local", "status")
+            
+            self.add_processing_log(
+                "ARMAZENAMENTO LOCAL PRODES",
+                f"{layer_name} {year_range[0]}-{year_range[1]}: {len(reused)} ano(s) reaproveitado(s), {len(missing)} baixado(s) do servidor"
+            )
+            
+            return self.assemble_prodes_years(store, requested, layer_name, year_range)
+            
+        except Exception as e:
+            print(f"❌ ERROR download_prodes_year_range: {str(e)}")
+            return None
+
+    def open_prodes_year_store(self, url, property_names=None):
+        """Abre o armazenamento local de anos PRODES do serviço
+        
+        Um GeoPackage (uma camada por ano) e um manifest.json por serviço,
+        atributos e perfil de transferência. Os anos são guardados sem corte,
+        então qualquer área de corte do mesmo bioma reaproveita o armazenamento. Anos mais antigos
+        que a validade configurada são descartados do manifest.
+        """
+        import json
+        import hashlib
+        import datetime
+        
+        service = url.split('/geoserver/')[-1].split('/')[0]
+        key_source = json.dumps([url, property_names or []] + self.get_wfs_transfer_key())
+        key = hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:12]
+        store_dir = os.path.join(tempfile.gettempdir(), 'DesagregaBiomasBR', 'prodes_anos', f"{service}_{key}")
+        os.makedirs(store_dir, exist_ok=True)
+        
+        store = {
+            'dir': store_dir,
+            'manifest_path': os.path.join(store_dir, 'manifest.json'),
+            'store_path': os.path.join(store_dir, 'anos.gpkg'),
+            'manifest': {'url': url, 'property_names': property_names, 'years': {}}
+        }
+        
+        if os.path.exists(store['manifest_path']) and os.path.exists(store['store_path']):
+            try:
+                with open(store['manifest_path'], 'r', encoding='utf-8') as f:
+                    store['manifest'] = json.load(f)
+            except Exception as e:
+                print(f"⚠️ DEBUG: Manifest do armazenamento PRODES ilegível: {str(e)}")
+        
+        # Descarta anos expirados (serão baixados de novo)
+        limit = datetime.datetime.now() - datetime.timedelta(days=self.prodes_store_valid_days)
+        years = store['manifest']['years']
+        for year in list(years):
+            if datetime.datetime.fromisoformat(years[year]['fetched_at']) < limit:
+                print(f"🧹 DEBUG: Ano {year} expirado no armazenamento PRODES")
+                del years[year]
+        
+        return store
+
+    def build_year_list_cql(self, years):
+        """Filtro CQL para uma lista de anos (sequências contínuas viram BETWEEN)"""
+        ranges = []
+        for year in sorted(years):
+            if ranges and year == ranges[-1][1] + 1:
+                ranges[-1][1] = year
+            else:
+                ranges.append([year, year])
+        
+        parts = [f"year = {first}" if first == last else f"year BETWEEN {first} AND {last}" for first, last in ranges]
+        return parts[0] if len(parts) == 1 else ' OR '.join(f"({part})" for part in parts)
+
+    def split_prodes_years_into_store(self, layer, years, store):
+        """Grava cada ano da camada baixada como uma camada 'ano_AAAA' do armazenamento"""
+        from osgeo import gdal
+        
+        source_path = layer.source().split('|')[0]
+        source_layers = [layer.source().split('layername=')[1].split('|')[0]] if 'layername=' in layer.source() else None
+        
+        for year in years:
+            # VERIFICAÇÃO DE ABORT: Anos já gravados ficam sem registro no manifest
+            if self.check_abort_signal():
+                return False
+            
+            table = f"ano_{year}"
+            options = gdal.VectorTranslateOptions(
+                format='GPKG', layers=source_layers, layerName=table, where=f"year = {year}",
+                accessMode='overwrite' if os.path.exists(store['store_path']) else None,
+                layerCreationOptions=['SPATIAL_INDEX=YES'], geometryType='PROMOTE_TO_MULTI')
+            result = gdal.VectorTranslate(store['store_path'], source_path, options=options)
+            if result is None:
+                print(f"❌ DEBUG: Falha ao gravar o ano {year} no armazenamento PRODES")
+                return False
+            features = result.GetLayerByName(table).GetFeatureCount()
+            result = None
+            
+            store['manifest']['years'][str(year)] = {'features': features, 'fetched_at': None}
+            print(f"📚 DEBUG: Ano {year}: {features} feições gravadas no armazenamento")
+            self.process_ui_events()
+        
+        return True
+
+    def assemble_prodes_years(self, store, years, layer_name, year_range):
+        """Junta os anos pedidos do armazenamento em um GeoPackage de trabalho"""
+        from osgeo import gdal
+        
+        work_path = os.path.join(tempfile.gettempdir(), f"{layer_name}_{year_range[0]}_{year_range[1]}_{id(self)}.gpkg")
+        if os.path.exists(work_path):
+            os.remove(work_path)
+        
+        # Com corte, só as feições na extensão da área (índice espacial do armazenamento)
+        extent = list(self.wfs_cut_filter['extent']) if self.wfs_cut_filter else None
+        
+        work_layer = 'dados_wfs'
+        total_features = 0
+        for year in years:
+            features = store['manifest']['years'][str(year)]['features']
+            if not features:
+                continue
+            
+            if os.path.exists(work_path):
+                options = gdal.VectorTranslateOptions(
+                    format='GPKG', layers=[f"ano_{year}"], layerName=work_layer, spatFilter=extent,
+                    accessMode='append', addFields=True)
+            else:
+                options = gdal.VectorTranslateOptions(
+                    format='GPKG', layers=[f"ano_{year}"], layerName=work_layer, spatFilter=extent,
+                    layerCreationOptions=['SPATIAL_INDEX=YES'])
+            result = gdal.VectorTranslate(work_path, store['store_path'], options=options)
+            if result is None:
+                print(f"❌ DEBUG: Falha ao montar o ano {year}")
+                return None
+            total_features = result.GetLayerByName(work_layer).GetFeatureCount()
+            result = None
+        
+        if not total_features:
+            print(f"⚠️ DEBUG: Nenhuma feição PRODES no intervalo {year_range[0]}-{year_range[1]}")
+            return None
+        
+        # Etapas seguintes gravam suas tabelas no mesmo GeoPackage
+        self.wfs_work_stores[work_path] = 0
+        
+        layer = QgsVectorLayer(f"{work_path}|layername={work_layer}", f"{layer_name}_{self.selected_biome}", "ogr")
+        if layer.isValid():
+            layer.setCrs(QgsCoordinateReferenceSystem("EPSG:4674"))
+        print(f"✅ DEBUG: Intervalo {year_range[0]}-{year_range[1]} montado: {total_features} feições")
+        self.update_notes(f"✅ {layer_name}: {total_features} feições ({year_range[0]}-{year_range[1]})", "status")
+        return layer
+
+    def download_wfs_layer(self, url, layer_name, property_names=None, use_cut_filter=True):
+        """Baixa uma camada WFS com paginação automática - ESTRATÉGIA SIMPLIFICADA
+        
+        ESTRATÉGIA: 
+        - Sempre usa CQL_FILTER para filtros temporais (quando disponível)
+        - Corte espacial enviado no mesmo CQL_FILTER: INTERSECTS com a geometria de
+          corte simplificada (com margem) ou BBOX quando ela é complexa demais
+        - Recorte por página (wfs_streaming_clip): cada página é corrigida e recortada
+          pela geometria exata antes de ir para o GeoPackage; sem ele, o recorte exato
+          é feito depois via geoprocessamento (clip_layer)
+        - Apenas os atributos de property_names (validados no DescribeFeatureType)
+        - Páginas planejadas pelo total do servidor (resultType=hits) e baixadas em paralelo
+        """
+        try:
+            print(f"🔄 DEBUG: Baixando dados WFS com paginação: {layer_name}")
+            print(f"🔄 DEBUG: CQL_FILTER no WFS (temporal + espacial), recorte exato depois")
+            
+            # Extrai typename da URL base
+            typename = self.extract_typename_from_url(url, layer_name)
+            if not typename:
+                print(f"❌ DEBUG: Não foi possível extrair typename")
+                return None
+            
+            # Separa URL base dos parâmetros
+            base_url = url.split('?')[0]
+            
+            # Extrai filtro CQL da URL (será aplicado no WFS)
+            cql_filter = None
+            if 'CQL_FILTER=' in url:
+                cql_filter = url.split('CQL_FILTER=')[1].split('&')[0]
+                cql_filter = cql_filter.replace('%20', ' ').replace('%27', "'")
+                print(f"📅 DEBUG: Filtro CQL extraído: {cql_filter}")
+            
+            # Corte espacial no servidor (desligado para sincronizar armazenamentos do bioma todo)
+            spatial_filter = self.get_wfs_spatial_cql(base_url, typename) if use_cut_filter else None
+            if spatial_filter:
+                cql_filter = f"({cql_filter}) AND {spatial_filter}" if cql_filter else spatial_filter
+                print(f"🗺️ DEBUG: Filtro espacial no WFS: {self.wfs_cut_filter['mode']} ({len(spatial_filter)} caracteres)")
+            
+            if cql_filter:
+                print(f"📅 DEBUG: Download com CQL_FILTER: {cql_filter}")
+            else:
+                print(f"🌍 DEBUG: Download sem filtros - dados completos do bioma")
+            print(f"📊 DEBUG: Iniciando download paginado (página inicial de {self.wfs_page_size} feições, tamanho adaptativo)")
+            
+            # Formato de saída mais compacto anunciado pelo servidor
+            output_format = self.negotiate_wfs_output_format(base_url)
+            print(f"📦 DEBUG: Formato GetFeature negociado: {output_format[0]}")
+            
+            # Atributos (propertyName) conferidos com o esquema do servidor
+            property_names = self.validate_wfs_property_names(base_url, typename, property_names, cql_filter)
+            
+            # Chave primária: ordenação estável das páginas (sortBy) e remoção de duplicatas
+            id_field = self.get_wfs_primary_key(base_url, typename)
+            
+            # Recorte por página: cada página é corrigida e recortada antes de ir para o GeoPackage
+            clip_wkb = self.wfs_clip_geometry if use_cut_filter and self.wfs_streaming_clip else None
+            
+            # Checkpoint em disco: GeoPackage de trabalho + manifest das páginas gravadas
+            checkpoint = self.open_wfs_checkpoint(base_url, typename, cql_filter, output_format, property_names, id_field, clip_wkb)
+            manifest = checkpoint['manifest']
+            store_path, store_layer = checkpoint['store_path'], checkpoint['store_layer']
+            
+            if manifest['complete']:
+                # Mesmo download já concluído dentro da validade do checkpoint
+                print(f"♻️ DEBUG: Checkpoint completo reaproveitado ({manifest['total_features']} feições)")
+                self.update_notes(f"♻️ Reaproveitando download anterior ({manifest['total_features']} feições)", "status")
+                result = (manifest['pages_appended'], manifest['total_features'], False)
+            else:
+                # Consulta o total de feições (resultType=hits) para planejar todas as páginas
+                total_matched = self.get_wfs_hits_count(base_url, typename, cql_filter)
+                
+                if manifest['total_matched'] is not None and manifest['total_matched'] != total_matched:
+                    # Dados mudaram no servidor: os offsets gravados não valem mais
+                    print(f"⚠️ DEBUG: Total mudou ({manifest['total_matched']} → {total_matched}) - checkpoint descartado")
+                    checkpoint = self.reset_wfs_checkpoint(checkpoint)
+                    manifest = checkpoint['manifest']
+                
+                if manifest['next_start'] > 0:
+                    print(f"♻️ DEBUG: Retomando download a partir da feição {manifest['next_start']}")
+                    self.update_notes(f"♻️ Retomando download: {manifest['total_features']} feições já gravadas", "status")
+                
+                manifest['total_matched'] = total_matched
+                
+                if self.wfs_tiled_download and id_field and total_matched:
+                    print(f"🧩 DEBUG: Servidor informou {total_matched} feições - download por blocos BBOX")
+                    result = self.download_wfs_tiles_concurrent(base_url, typename, cql_filter, layer_name, total_matched, output_format, checkpoint, property_names)
+                elif self.use_wfs_keyset(base_url, typename, id_field, total_matched):
+                    print(f"🔑 DEBUG: Servidor informou {total_matched} feições - paginação por chave ({id_field})")
+                    result = self.download_wfs_pages_sequential(base_url, typename, cql_filter, layer_name, output_format, checkpoint, property_names, total_matched, keyset=True)
+                elif total_matched is not None:
+                    print(f"📊 DEBUG: Servidor informou {total_matched} feições - download concorrente")
+                    result = self.download_wfs_pages_concurrent(base_url, typename, cql_filter, layer_name, total_matched, output_format, checkpoint, property_names)
+                else:
+                    print(f"⚠️ DEBUG: Total de feições indisponível - download sequencial")
+                    result = self.download_wfs_pages_sequential(base_url, typename, cql_filter, layer_name, output_format, checkpoint, property_names)
+            
+            if result is None:
+                # Download abortado ou interrompido: o checkpoint fica para a próxima execução
+                return None
+            
+            pages_appended, total_features, first_page_failed = result
+            
+            if first_page_failed:
+                # Se a primeira página falha, tenta com WFS 1.0
+                print(f"🔄 DEBUG: Tentando com WFS 1.0 sem paginação...")
+                return self.download_wfs_layer_fallback(url, layer_name, property_names, use_cut_filter)
+            
+            print(f"📊 DEBUG: Download concluído - {total_features} feições em {pages_appended} páginas")
+            
+            if not pages_appended:
+                print(f"❌ DEBUG: Nenhuma página válida baixada")
+                return None
+            
+            duplicates = manifest.get('duplicates', 0)
+            if duplicates:
+                print(f"🧹 DEBUG: {duplicates} feições duplicadas entre páginas descartadas ({id_field})")
+                self.update_notes(f"🧹 {duplicates} feições duplicadas entre páginas descartadas", "status")
+                self.add_processing_log("REMOÇÃO DE DUPLICATAS", f"{typename}: {duplicates} feições repetidas entre páginas descartadas (chave {id_field})")
+            
+            if clip_wkb:
+                outside_cut = manifest.get('outside_cut', 0)
+                print(f"✂️ DEBUG: Recorte por página: {total_features - outside_cut} feições na área de corte, {outside_cut} descartadas")
+                self.add_processing_log(
+                    "RECORTE POR PÁGINA",
+                    f"{typename}: geometrias corrigidas e recortadas página a página durante o download - "
+                    f"{total_features - outside_cut} feições na área de corte, {outside_cut} fora dela descartadas"
+                )
+            
+            # Verificação final: feições recebidas x total informado pelo servidor (resultType=hits)
+            if not self.verify_wfs_download_total(base_url, typename, cql_filter, manifest['total_matched'], total_features):
+                self.reset_wfs_checkpoint(checkpoint)
+                return None
+            
+            # Atualiza notas finais
+            if hasattr(self, 'update_notes'):
+                self.update_notes(f"🔗 Abrindo GeoPackage de trabalho ({total_features} feições)...", "status")
+            
+            # Camada final lida direto do GeoPackage (sem cópia em memória)
+            final_layer = QgsVectorLayer(f"{store_path}|layername={store_layer}", layer_name, "ogr")
+            
+            if final_layer and final_layer.isValid():
+                self.process_ui_events()
+                final_count = final_layer.featureCount()
+                print(f"✅ DEBUG: Layer final carregada com {final_count} feições")
+                
+                # CORREÇÃO 2: Força projeção SIRGAS 2000 (EPSG:4674)
+                target_crs = QgsCoordinateReferenceSystem("EPSG:4674")
+                if final_layer.crs() != target_crs:
+                    print(f"🗺️ DEBUG: Corrigindo projeção para SIRGAS 2000 (EPSG:4674)")
+                    final_layer.setCrs(target_crs)
+                
+                if clip_wkb:
+                    # Já corrigida e recortada página a página: a etapa de corte não repete o clip
+                    final_layer.setCustomProperty('desagrega_recortada', True)
+                    if hasattr(self, 'update_notes'):
+                        self.update_notes(f"✅ WFS baixado e recortado: {final_count} feições ({pages_appended} páginas)", "status")
+                    return final_layer
+                
+                # CORREÇÃO 3: Aplica fix geometry nos dados PRODES baixados
+                print(f"🔧 DEBUG: Aplicando fix geometry nos dados PRODES baixados...")
+                fixed_final_layer = self.auto_fix_geometries(final_layer, "prodes_downloaded")
+                if fixed_final_layer and fixed_final_layer.isValid():
+                    print(f"✅ DEBUG: Fix geometry aplicado nos dados PRODES: {fixed_final_layer.featureCount()} feições")
+                    final_layer = fixed_final_layer
+                    # Força projeção novamente na layer corrigida
+                    if final_layer.crs() != target_crs:
+                        final_layer.setCrs(target_crs)
+                else:
+                    print(f"⚠️ DEBUG: Fix geometry falhou nos dados PRODES, usando layer original")
+                
+                # Filtro temporal já foi aplicado no WFS via CQL_FILTER (se havia filtro)
+                # Cortes espaciais serão aplicados depois via geoprocessamento
+                if cql_filter:
+                    print(f"✅ DEBUG: Filtro temporal aplicado no WFS via CQL_FILTER")
+                    if hasattr(self, 'update_notes'):
+                        self.update_notes(f"✅ WFS baixado com filtro: {final_count} feições ({pages_appended} páginas)", "status")
+                else:
+                    print(f"✅ DEBUG: Download completo (sem filtro temporal)")
+                    if hasattr(self, 'update_notes'):
+                        self.update_notes(f"✅ WFS baixado: {final_count} feições ({pages_appended} páginas)", "status")
+                
+                return final_layer
+            else:
+                print(f"❌ DEBUG: Falha ao criar layer final")
+                return None
+                
+        except Exception as e:
+            print(f"❌ ERROR download_wfs_layer: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def verify_wfs_download_total(self, base_url, typename, cql_filter, total_matched, total_features):
+        """Confere o total de feições gravadas com o resultType=hits do servidor
+        
+        Uma divergência é conferida com uma nova consulta de hits (os dados podem
+        ter sido atualizados durante o download). Se continuar divergente, o
+        download não é aceito - evita gerar um resultado truncado sem aviso.
+        """
+        if total_matched is None or total_features == total_matched:
+            if total_matched is not None:
+                self.add_processing_log("VERIFICAÇÃO DO DOWNLOAD", f"{typename}: {total_features} feições recebidas = total informado pelo servidor")
+            return True
+        
+        current_total = self.get_wfs_hits_count(base_url, typename, cql_filter)
+        if current_total == total_features:
+            print(f"⚠️ DEBUG: Total do servidor mudou durante o download ({total_matched} → {current_total}) - download confere com o total atual")
+            self.add_processing_log("VERIFICAÇÃO DO DOWNLOAD", f"{typename}: {total_features} feições recebidas = total atual do servidor (era {total_matched} no início)")
+            return True
+        
+        print(f"❌ DEBUG: Download divergente: {total_features} feições recebidas, servidor informa {current_total if current_total is not None else total_matched}")
+        self.update_notes(f"❌ Download incompleto de {typename}: {total_features} de {total_matched} feições - processe novamente", "status")
+        return False
+
+    def build_wfs_page_params(self, typename, cql_filter, page_size, start_index, output_format, property_names=None, sort_by=None):
+        """Monta os parâmetros GetFeature de uma página WFS 2.0
+        
+        sort_by (chave primária) garante a mesma ordem em todas as páginas - sem
+        ela o PostGIS pode devolver páginas sobrepostas ou pular linhas.
+        """
+        params = {
+            "service": "WFS",
+            "version": "2.0.0",
+            "request": "GetFeature",
+            "typeName": typename,
+            "outputFormat": output_format[0],
+            "srsName": "EPSG:4674",
+            "count": page_size,
+            "startIndex": start_index
+        }
+        
+        # Adiciona CQL_FILTER se disponível
+        if cql_filter:
+            params["CQL_FILTER"] = cql_filter
+        
+        # Restringe os atributos transferidos
+        if property_names:
+            params["propertyName"] = ','.join(property_names)
+        
+        # Ordem estável entre páginas
+        if sort_by:
+            params["sortBy"] = f"{sort_by} ASC"
+        
+        # Casas decimais das coordenadas (perfil de transferência)
+        num_decimals = self.get_wfs_transfer_profile()['num_decimals']
+        if num_decimals:
+            params["format_options"] = f"numDecimals:{num_decimals}"
+        
+        return params
+
+    def get_wfs_hits_count(self, base_url, typename, cql_filter=None):
+        """Consulta o total de feições do filtro (resultType=hits) para planejar a paginação
+        
+        Retorna None quando o servidor não informa o total.
+        """
+        try:
+            import re
+            
+            params = {
+                "service": "WFS",
+                "version": "2.0.0",
+                "request": "GetFeature",
+                "typeName": typename,
+                "resultType": "hits"
+            }
+            if cql_filter:
+                params["CQL_FILTER"] = cql_filter
+            
+            response = self.get_http_session().get(base_url, params=params, timeout=60)
+            if response.status_code != 200:
+                print(f"⚠️ DEBUG: resultType=hits retornou HTTP {response.status_code}")
+                return None
+            
+            # WFS 2.0 usa numberMatched; WFS 1.x usa numberOfFeatures
+            match = re.search(r'numberMatched="(\d+)"', response.text)
+            if not match:
+                match = re.search(r'numberOfFeatures="(\d+)"', response.text)
+            if not match:
+                print(f"⚠️ DEBUG: resultType=hits sem total de feições na resposta")
+                return None
+            
+            return int(match.group(1))
+            
+        except Exception as e:
+            print(f"⚠️ DEBUG: Falha ao consultar total de feições: {str(e)}")
+            return None
+
+    def fetch_wfs_page(self, base_url, params, temp_file):
+        """Baixa uma página WFS para um arquivo temporário
+        
+        Executado nas threads do pool de download: não acessa a interface,
+        apenas faz a requisição HTTP e grava o arquivo. Erros temporários
+        (5xx, 408/429, timeout, conexão interrompida) são repetidos com backoff
+        exponencial com jitter; erros definitivos retornam na hora.
+        Retorna (status HTTP, bytes, segundos); status None após falhas de rede.
+        """
+        import time
+        import random
+        import requests
+        
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.monotonic()
+            try:
+                status, size = self.stream_download_to_file(base_url, temp_file, params=params, timeout=120)
+                error = None
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                status, size, error = None, 0, e
+            seconds = time.monotonic() - started
+            
+            if not self.is_retryable_wfs_failure(status) or attempt >= self.wfs_retry_attempts:
+                if error is not None:
+                    print(f"❌ DEBUG: Falha de rede após {attempt} tentativa(s): {str(error)}")
+                return status, size, seconds
+            
+            # Backoff exponencial com jitter total: espalha as novas tentativas das threads
+            delay = random.uniform(0, min(self.wfs_retry_max_delay, self.wfs_retry_base_delay * 2 ** (attempt - 1)))
+            reason = str(error) if error is not None else f"HTTP {status}"
+            print(f"🔁 DEBUG: startIndex {params.get('startIndex')}: {reason} - nova tentativa {attempt + 1}/{self.wfs_retry_attempts} em {delay:.1f}s")
+            if not self.wait_wfs_retry(delay):
+                return status, size, seconds
+
+    def is_retryable_wfs_failure(self, status):
+        """Indica se a falha de uma página é temporária (vale repetir ou dividir a janela)"""
+        return status is None or status in self.wfs_retryable_status
+
+    def wait_wfs_retry(self, delay):
+        """Espera antes de repetir uma página; retorna False se o usuário abortar
+        
+        Na thread principal (download sequencial) mantém a interface respondendo.
+        """
+        import time
+        
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline:
+            if not self.process_ui_events():
+                return False
+            time.sleep(min(0.2, max(0, deadline - time.monotonic())))
+        return not self.abort_download
+
+    def create_wfs_pager(self):
+        """Cria o paginador adaptativo com os parâmetros configurados"""
+        return WfsAdaptivePager(self.wfs_page_size,
+                                min_size=self.wfs_page_size_min,
+                                max_size=self.wfs_page_size_max,
+                                target_seconds=self.wfs_page_target_seconds)
+
+    def get_wfs_metadata_root(self):
+        """Pasta do cache de GetCapabilities/DescribeFeatureType (no cache do plugin)"""
+        return os.path.join(tempfile.gettempdir(), 'DesagregaBiomasBR', 'wfs_metadados')
+
+    def fetch_wfs_metadata(self, base_url, params, parser):
+        """Documento de metadados WFS já interpretado, com cache em disco
+        
+        Cada endpoint + parâmetros guarda em disco apenas a estrutura gerada por
+        parser(conteúdo), com ETag e Last-Modified. Dentro da validade
+        (wfs_metadata_valid_hours) não há requisição; depois dela o servidor é
+        consultado com If-None-Match/If-Modified-Since e um 304 só renova a
+        validade. Sem resposta do servidor, usa a cópia vencida.
+        Retorna a estrutura interpretada ou None.
+        """
+        import json
+        import hashlib
+        import time
+        
+        key = hashlib.sha1(json.dumps([base_url, params], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        if key in self.wfs_metadata_cache:
+            return self.wfs_metadata_cache[key]
+        
+        cache_path = os.path.join(self.get_wfs_metadata_root(), f"{key}.json")
+        entry = None
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except Exception as e:
+                print(f"⚠️ DEBUG: Cache de metadados ilegível: {str(e)}")
+        
+        if entry and time.time() - entry['fetched_at'] < self.wfs_metadata_valid_hours * 3600:
+            print(f"♻️ DEBUG: {params['request']} lido do cache ({base_url})")
+            self.wfs_metadata_cache[key] = entry['parsed']
+            return entry['parsed']
+        
+        # Requisição condicional: servidor responde 304 se o documento não mudou
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        parsed = None
+        try:
+            response = self.get_http_session().get(base_url, params=params, headers=headers, timeout=10)
+            if response.status_code == 304 and entry:
+                print(f"♻️ DEBUG: {params['request']} não mudou no servidor (304) - cache revalidado")
+                parsed = entry['parsed']
+            elif response.status_code == 200:
+                parsed = parser(response.content)
+                if parsed is not None:
+                    entry = {
+                        'url': base_url,
+                        'params': params,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'parsed': parsed
+                    }
+            else:
+                print(f"❌ DEBUG: {params['request']} retornou HTTP {response.status_code}")
+        except Exception as e:
+            print(f"❌ DEBUG: Falha no {params['request']}: {str(e)}")
+        
+        if parsed is None:
+            if not entry:
+                return None
+            print(f"⚠️ DEBUG: Servidor indisponível - usando {params['request']} em cache vencido")
+            parsed = entry['parsed']
+        else:
+            entry['fetched_at'] = time.time()
+            try:
+                os.makedirs(self.get_wfs_metadata_root(), exist_ok=True)
+                temp_path = cache_path + '.tmp'
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(temp_path, cache_path)
+            except OSError as e:
+                print(f"⚠️ DEBUG: Não foi possível gravar o cache de metadados: {str(e)}")
+        
+        self.wfs_metadata_cache[key] = parsed
+        return parsed
+
+    def get_wfs_capabilities(self, base_url):
+        """GetCapabilities WFS 2.0 interpretado (cache em disco com validade)
+        
+        Retorna {'typenames': [...], 'output_formats': [...], 'extents':
+        {typename sem namespace: [xmin, ymin, xmax, ymax] WGS84}} ou None se o
+        servidor não responder com um WFS_Capabilities válido.
+        """
+        params = {'service': 'WFS', 'request': 'GetCapabilities', 'version': '2.0.0'}
+        return self.fetch_wfs_metadata(base_url, params, self.parse_wfs_capabilities)
+
+    def test_wfs_connectivity(self, url):
+        """Testa conectividade WFS para dados PRODES/DETER"""
+        try:
+            print(f"🌐 DEBUG: Testando conectividade WFS: {url[:80]}...")
+            
+            # Extrai URL base sem parâmetros
+            base_url = url.split('?')[0]
+            
+            # GetCapabilities do cache em disco (revalidado após a validade) - também negocia o formato de saída
+            capabilities = self.get_wfs_capabilities(base_url)
+            
+            if capabilities:
+                print(f"✅ DEBUG: Conectividade WFS OK")
+                return True
+            else:
+                return False
+                
+        except Exception as e:
+            print(f"❌ DEBUG: Erro na conectividade WFS: {str(e)}")
+            return False
+
+    def parse_wfs_capabilities(self, content):
+        """Extrai typenames, formatos de GetFeature e extensões do GetCapabilities"""
+        try:
+            import xml.etree.ElementTree as ET
+            
+            root = ET.fromstring(content)
+            local_name = lambda element: element.tag.split('}')[-1]
+            if local_name(root) != 'WFS_Capabilities':
+                print(f"❌ DEBUG: Resposta inválida - não contém capabilities WFS")
+                return None
+            
+            capabilities = {'typenames': [], 'output_formats': [], 'extents': {}}
+            for operation in root.iter():
+                if local_name(operation) != 'Operation' or operation.get('name') != 'GetFeature':
+                    continue
+                for parameter in operation.iter():
+                    if local_name(parameter) == 'Parameter' and parameter.get('name') == 'outputFormat':
+                        capabilities['output_formats'].extend(value.text.strip() for value in parameter.iter() if local_name(value) == 'Value' and value.text)
+            
+            for feature_type in root.iter():
+                if local_name(feature_type) != 'FeatureType':
+                    continue
+                names = [child.text for child in feature_type if local_name(child) == 'Name' and child.text]
+                if not names:
+                    continue
+                capabilities['typenames'].append(names[0])
+                corners = {local_name(corner): corner.text.split() for corner in feature_type.iter()
+                           if local_name(corner) in ('LowerCorner', 'UpperCorner') and corner.text}
+                if len(corners) == 2:
+                    capabilities['extents'][names[0].split(':')[-1]] = [
+                        float(corners['LowerCorner'][0]), float(corners['LowerCorner'][1]),
+                        float(corners['UpperCorner'][0]), float(corners['UpperCorner'][1])]
+            
+            return capabilities
+            
+        except Exception as e:
+            print(f"⚠️ DEBUG: Falha ao ler o GetCapabilities: {str(e)}")
+            return None
+
+    def get_wfs_output_formats(self, base_url):
+        """Lista os outputFormat de GetFeature anunciados no GetCapabilities"""
+        capabilities = self.get_wfs_capabilities(base_url)
+        return capabilities['output_formats'] if capabilities else []
+
+    def negotiate_wfs_output_format(self, base_url):
+        """Escolhe o formato GetFeature mais compacto que o servidor oferece
+        
+        Retorna (outputFormat, extensão do arquivo). Usa GML2 apenas quando
+        nenhum formato da lista de preferência é anunciado.
+        """
+        if base_url in self.wfs_output_formats:
+            return self.wfs_output_formats[base_url]
+        
+        advertised = [value.lower() for value in self.get_wfs_output_formats(base_url)]
+        output_format = ('GML2', '.gml')
+        for value, extension in self.wfs_output_format_preferences:
+            if value.lower() in advertised:
+                output_format = (value, extension)
+                break
+        
+        self.wfs_output_formats[base_url] = output_format
+        return output_format
+
+    def get_wfs_feature_schema(self, base_url, typename):
+        """Esquema do typename via DescribeFeatureType (cache em disco com validade)
+        
+        Retorna {'geometry': coluna geométrica, 'fields': [atributos],
+        'types': {atributo: tipo xsd}}. Sem
+        resposta do servidor, assume 'geom' e lista de atributos vazia.
+        """
+        key = (base_url, typename)
+        if key in self.wfs_feature_schemas:
+            return self.wfs_feature_schemas[key]
+        
+        params = {
+            'service': 'WFS',
+            'version': '2.0.0',
+            'request': 'DescribeFeatureType',
+            'typeNames': typename
+        }
+        schema = self.fetch_wfs_metadata(base_url, params, self.parse_wfs_feature_schema)
+        if schema is None:
+            schema = {'geometry': 'geom', 'fields': [], 'types': {}}
+        
+        print(f"🗺️ DEBUG: Esquema de {typename}: geometria {schema['geometry']}, {len(schema['fields'])} atributos")
+        self.wfs_feature_schemas[key] = schema
+        return schema
+
+    def parse_wfs_feature_schema(self, content):
+        """Extrai coluna geométrica, atributos e tipos do DescribeFeatureType"""
+        try:
+            import xml.etree.ElementTree as ET
+            
+            schema = {'geometry': 'geom', 'fields': [], 'types': {}}
+            root = ET.fromstring(content)
+            geometry_found = False
+            for element in root.iter():
+                if element.tag.split('}')[-1] != 'element' or not element.get('type'):
+                    continue
+                if element.get('type').startswith('gml:') and not geometry_found:
+                    schema['geometry'] = element.get('name')
+                    geometry_found = True
+                elif element.get('name'):
+                    schema['fields'].append(element.get('name'))
+                    schema['types'][element.get('name')] = element.get('type').split(':')[-1]
+            return schema
+            
+        except Exception as e:
+            print(f"⚠️ DEBUG: Falha no DescribeFeatureType: {str(e)}")
+            return None
+
+    def get_wfs_geometry_column(self, base_url, typename):
+        """Nome da coluna geométrica do typename (padrão: geom)"""
+        return self.get_wfs_feature_schema(base_url, typename)['geometry']
+
+    def get_wfs_primary_key(self, base_url, typename):
+        """Primeiro candidato a chave primária presente no esquema (None se nenhum)"""
+        fields_by_lower = {field.lower(): field for field in self.get_wfs_feature_schema(base_url, typename)['fields']}
+        for candidate in self.wfs_primary_key_candidates:
+            if candidate in fields_by_lower:
+                return fields_by_lower[candidate]
+        print(f"⚠️ DEBUG: Nenhuma chave primária conhecida em {typename} - páginas sem sortBy")
+        return None
+
+    def use_wfs_keyset(self, base_url, typename, id_field, total_matched):
+        """Indica se o download deve paginar por chave (id > último) em vez de startIndex
+        
+        Com startIndex alto o PostGIS percorre e descarta todas as linhas
+        anteriores a cada página; por chave, cada página custa o mesmo. Usado
+        em camadas grandes com chave primária inteira.
+        """
+        if not id_field or not self.wfs_keyset_min_features or total_matched is None:
+            return False
+        if total_matched < self.wfs_keyset_min_features:
+            return False
+        
+        id_type = self.get_wfs_feature_schema(base_url, typename)['types'].get(id_field, '')
+        return id_type in ('int', 'integer', 'long', 'short', 'nonNegativeInteger', 'positiveInteger', 'unsignedInt', 'unsignedLong')
+
+    def get_wfs_attribute_selection(self, layer_name):
+        """Atributos pedidos ao servidor para a camada
+        
+        Usa a lista informada na etapa 3 quando houver; caso contrário, o
+        perfil do listas.json. None significa todos os atributos.
+        """
+        if self.wfs_attribute_override:
+            names = [name.strip() for name in self.wfs_attribute_override.replace(';', ',').split(',')]
+            return [name for name in names if name] or None
+        return self.wfs_attribute_profiles.get(layer_name) or None
+
+    def validate_wfs_property_names(self, base_url, typename, property_names, cql_filter=None):
+        """Confere os atributos pedidos com o DescribeFeatureType
+        
+        Descarta nomes inexistentes e inclui sempre a coluna geométrica e os
+        atributos usados nos filtros (CQL no servidor e filtro em memória do
+        DETER). Retorna None (todos os atributos) se o esquema não puder ser lido.
+        """
+        import re
+        
+        if not property_names:
+            return None
+        
+        schema = self.get_wfs_feature_schema(base_url, typename)
+        if not schema['fields']:
+            print(f"⚠️ DEBUG: Esquema indisponível - baixando todos os atributos")
+            return None
+        
+        fields_by_lower = {field.lower(): field for field in schema['fields']}
+        selected = []
+        ignored = []
+        for name in property_names:
+            field = fields_by_lower.get(name.lower())
+            if field and field not in selected:
+                selected.append(field)
+            elif not field:
+                ignored.append(name)
+        
+        # Chave primária (sortBy e remoção de duplicatas) sempre incluída
+        id_field = self.get_wfs_primary_key(base_url, typename)
+        if id_field and id_field not in selected:
+            selected.insert(0, id_field)
+        
+        # Atributos usados nos filtros precisam chegar na camada
+        filter_text = ' '.join([cql_filter or '', self.urls_and_filters.get('memory_filter') or ''])
+        filter_words = set(word.lower() for word in re.findall(r'[A-Za-z_][A-Za-z0-9_]*', filter_text))
+        for field in schema['fields']:
+            if field.lower() in filter_words and field not in selected:
+                selected.append(field)
+        
+        if ignored:
+            print(f"⚠️ DEBUG: Atributos inexistentes em {typename} ignorados: {ignored}")
+            self.update_notes(f"⚠️ Atributos ignorados (não existem no serviço): {', '.join(ignored)}", "status")
+        
+        if not selected or selected == [id_field]:
+            return None
+        
+        selected.append(schema['geometry'])
+        print(f"🏷️ DEBUG: propertyName: {selected}")
+        self.add_processing_log(
+            "SELEÇÃO DE ATRIBUTOS",
+            f"{typename}: {len(selected) - 1} de {len(schema['fields'])} atributos ({', '.join(selected[:-1])})"
+        )
+        return selected
+
+    def build_wfs_cut_filter(self):
+        """Resolve a geometria de corte para envio ao servidor WFS
+        
+        Usa a mesma camada de corte da etapa de recorte (layer carregada,
+        retângulo desenhado, seleção IBGE ou limite do bioma Amazônia),
+        unida e convertida para EPSG:4674. A geometria recebe uma margem igual
+        à tolerância e é simplificada até caber no CQL_FILTER; se não couber,
+        usa o BBOX. A margem garante que nenhuma feição da área de corte fique
+        de fora - o recorte exato continua no clip_layer.
+        Retorna {'mode': 'INTERSECTS'|'BBOX', ...} ou None quando não há corte.
+        """
+        self.wfs_clip_geometry = None
+        self.wfs_cut_key = None
+        try:
+            import hashlib
+            
+            needs_cut = getattr(self, 'cut_option', None) not in (None, 0)
+            if needs_cut:
+                cut_layer = self.get_cut_layer()
+            elif self.selected_biome == 'Amazônia' and self._needs_amazonia_biome_cut:
+                cut_layer = self.get_amazonia_biome_cut_layer()
+            else:
+                return None
+            
+            geometry = self.get_cut_geometry(cut_layer)
+            if geometry is None:
+                print(f"⚠️ DEBUG: Geometria de corte indisponível - download sem filtro espacial")
+                return None
+            
+            self.wfs_cut_key = hashlib.sha1(bytes(geometry.asWkb())).hexdigest()
+            
+            # Geometria exata (corrigida) para o recorte página a página
+            if self.wfs_streaming_clip:
+                valid_geometry = geometry.makeValid()
+                if not valid_geometry.isEmpty():
+                    self.wfs_clip_geometry = bytes(valid_geometry.asWkb())
+            
+            # Extensão da área de corte (usada também no download por blocos)
+            bounds = geometry.boundingBox()
+            extent = [round(bounds.xMinimum(), 6), round(bounds.yMinimum(), 6), round(bounds.xMaximum(), 6), round(bounds.yMaximum(), 6)]
+            
+            # Simplifica com tolerância crescente (graus) até o WKT caber no filtro
+            tolerance = 0.0005
+            while tolerance <= 0.5:
+                simplified = geometry.buffer(tolerance, 4).simplify(tolerance)
+                if not simplified.isEmpty():
+                    wkt = simplified.asWkt(6)
+                    if len(wkt) <= self.wfs_spatial_filter_max_chars:
+                        print(f"✅ DEBUG: Geometria de corte simplificada (tolerância {tolerance}°, {len(wkt)} caracteres)")
+                        self.add_processing_log(
+                            "FILTRO ESPACIAL NO SERVIDOR",
+                            f"INTERSECTS com a geometria de corte simplificada (tolerância e margem de {tolerance}°) - recorte exato feito localmente"
+                        )
+                        return {'mode': 'INTERSECTS', 'wkt': wkt, 'tolerance': tolerance, 'extent': extent}
+                tolerance *= 2
+            
+            bbox = ','.join(f"{value:.6f}" for value in extent)
+            print(f"⚠️ DEBUG: Geometria de corte complexa demais - usando BBOX {bbox}")
+            self.add_processing_log(
+                "FILTRO ESPACIAL NO SERVIDOR",
+                f"BBOX da geometria de corte ({bbox}, EPSG:4674) - recorte exato feito localmente"
+            )
+            return {'mode': 'BBOX', 'bbox': bbox, 'extent': extent}
+            
+        except Exception as e:
+            print(f"❌ ERROR build_wfs_cut_filter: {str(e)}")
+            return None
+
+    def get_cut_geometry(self, cut_layer):
+        """União das geometrias da camada de corte em EPSG:4674 (None se vazia)"""
+        from qgis.core import QgsCoordinateTransform
+        
+        if not cut_layer or not cut_layer.isValid() or cut_layer.featureCount() == 0:
+            return None
+        
+        geometries = [feature.geometry() for feature in cut_layer.getFeatures() if feature.hasGeometry()]
+        if not geometries:
+            return None
+        geometry = QgsGeometry.unaryUnion(geometries)
+        
+        target_crs = QgsCoordinateReferenceSystem("EPSG:4674")
+        if cut_layer.crs().isValid() and cut_layer.crs() != target_crs:
+            transform = QgsCoordinateTransform(cut_layer.crs(), target_crs, QgsProject.instance())
+            geometry.transform(transform)
+        
+        return None if geometry.isEmpty() else geometry
+
+    def get_cut_key(self):
+        """Hash da geometria exata de corte da opção atual (None = sem corte)
+        
+        Para temas sem filtro WFS (ÁREA QUEIMADA); PRODES/DETER usam o
+        wfs_cut_key calculado por build_wfs_cut_filter.
+        """
+        import hashlib
+        
+        if getattr(self, 'cut_option', None) in (None, 0):
+            return None
+        geometry = self.get_cut_geometry(self.get_cut_layer())
+        return hashlib.sha1(bytes(geometry.asWkb())).hexdigest() if geometry else None
+
+    def get_wfs_spatial_cql(self, base_url, typename):
+        """Trecho CQL do corte espacial para o typename (None se não há corte)"""
+        if not self.wfs_cut_filter:
+            return None
+        
+        geometry_column = self.get_wfs_geometry_column(base_url, typename)
+        if self.wfs_cut_filter['mode'] == 'INTERSECTS':
+            return f"INTERSECTS({geometry_column}, {self.wfs_cut_filter['wkt']})"
+        return f"BBOX({geometry_column}, {self.wfs_cut_filter['bbox']}, 'EPSG:4674')"
+
+    def get_wfs_page_ogr_path(self, page_file):
+        """Caminho OGR de uma página baixada (shapefile zipado é lido via /vsizip/)"""
+        if page_file.endswith('.zip'):
+            return f"/vsizip/{page_file}"
+        return page_file
+
+    def get_wfs_checkpoint_root(self):
+        """Pasta dos checkpoints de download WFS (no cache do plugin)"""
+        return os.path.join(tempfile.gettempdir(), 'DesagregaBiomasBR', 'wfs_checkpoints')
+
+    def purge_wfs_checkpoints(self, root=None):
+        """Remove checkpoints (ou resultados memorizados) mais antigos que a validade configurada"""
+        import shutil
+        import time
+        
+        root = root or self.get_wfs_checkpoint_root()
+        if not os.path.isdir(root):
+            return
+        
+        max_age = self.wfs_checkpoint_valid_hours * 3600
+        for name in os.listdir(root):
+            checkpoint_dir = os.path.join(root, name)
+            manifest_path = os.path.join(checkpoint_dir, 'manifest.json')
+            reference = manifest_path if os.path.exists(manifest_path) else checkpoint_dir
+            try:
+                if time.time() - os.path.getmtime(reference) > max_age:
+                    print(f"🧹 DEBUG: Checkpoint expirado removido: {name}")
+                    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+            except OSError:
+                pass
+
+    def open_wfs_checkpoint(self, base_url, typename, cql_filter, output_format, property_names=None, id_field=None, clip_wkb=None):
+        """Abre (ou cria) o checkpoint em disco de um download WFS
+        
+        O checkpoint é identificado por (URL, typename, filtro CQL, formato,
+        atributos, ordenação, tamanho inicial de página e geometria do recorte
+        por página) e guarda o GeoPackage de trabalho, um
+        manifest.json com a primeira feição ainda não gravada, a última chave
+        lida e as páginas já baixadas fora de ordem, e a lista de ids já
+        recebidos (incluindo os descartados pelo recorte por página). Uma nova
+        execução com os mesmos parâmetros retoma a partir da primeira página
+        que falta.
+        """
+        import json
+        import hashlib
+        from osgeo import ogr
+        
+        self.purge_wfs_checkpoints()
+        
+        clip_key = hashlib.sha1(clip_wkb).hexdigest() if clip_wkb else ''
+        key_source = json.dumps([base_url, typename, cql_filter or '', output_format[0], property_names or [], id_field or '', self.wfs_page_size, clip_key] + self.get_wfs_transfer_key())
+        key = hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:16]
+        checkpoint_dir = os.path.join(self.get_wfs_checkpoint_root(), key)
+        
+        checkpoint = {
+            'dir': checkpoint_dir,
+            'manifest_path': os.path.join(checkpoint_dir, 'manifest.json'),
+            'store_path': os.path.join(checkpoint_dir, 'dados.gpkg'),
+            'store_layer': 'dados_wfs',
+            'ids_path': os.path.join(checkpoint_dir, 'ids_recebidos.jsonl'),
+            'id_field': id_field,
+            'id_set': FeatureIdSet() if id_field else None,
+            'clip_geometry': ogr.CreateGeometryFromWkb(clip_wkb) if clip_wkb else None,
+            'manifest': None
+        }
+        
+        if os.path.exists(checkpoint['manifest_path']):
+            try:
+                with open(checkpoint['manifest_path'], 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if self.validate_wfs_checkpoint_store(checkpoint, manifest):
+                    checkpoint['manifest'] = manifest
+                    print(f"♻️ DEBUG: Checkpoint encontrado: {key} ({manifest['total_features']} feições gravadas)")
+            except Exception as e:
+                print(f"⚠️ DEBUG: Manifest de checkpoint ilegível: {str(e)}")
+        
+        if checkpoint['manifest'] is None:
+            checkpoint = self.reset_wfs_checkpoint(checkpoint)
+            checkpoint['manifest'].update({
+                'typename': typename,
+                'cql_filter': cql_filter,
+                'output_format': output_format[0],
+                'property_names': property_names,
+                'page_size': self.wfs_page_size
+            })
+            self.save_wfs_checkpoint(checkpoint)
+        
+        # Retomada: ids já recebidos entram no conjunto de duplicatas
+        if checkpoint['id_set'] is not None and checkpoint['manifest']['total_features']:
+            if not self.load_wfs_feature_ids(checkpoint):
+                checkpoint = self.reset_wfs_checkpoint(checkpoint)
+                self.save_wfs_checkpoint(checkpoint)
+        
+        # Etapas seguintes gravam suas tabelas no mesmo GeoPackage
+        self.wfs_work_stores[checkpoint['store_path']] = 0
+        return checkpoint
+
+    def load_wfs_feature_ids(self, checkpoint):
+        """Carrega os ids recebidos do checkpoint no conjunto de duplicatas
+        
+        Lê a lista de ids recebidos até o total do manifest (ids gravados
+        depois do último manifest são cortados do arquivo) - inclui as feições
+        descartadas pelo recorte por página, que não estão no GeoPackage.
+        Retorna False se a lista não cobre o total do manifest.
+        """
+        import json
+        
+        expected = checkpoint['manifest']['total_features']
+        lines = []
+        if os.path.exists(checkpoint['ids_path']):
+            with open(checkpoint['ids_path'], 'r', encoding='utf-8') as f:
+                for line in f:
+                    if len(lines) == expected:
+                        break
+                    if line.endswith('\n'):
+                        lines.append(line)
+        
+        if len(lines) < expected:
+            print(f"⚠️ DEBUG: Lista de ids do checkpoint incompleta ({len(lines)} < {expected})")
+            return False
+        
+        # Ids gravados após o último manifest (interrupção entre a página e o manifest)
+        with open(checkpoint['ids_path'], 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        
+        for line in lines:
+            checkpoint['id_set'].add(json.loads(line))
+        print(f"♻️ DEBUG: {len(checkpoint['id_set'])} ids carregados do checkpoint")
+        return True
+
+    def save_wfs_feature_ids(self, checkpoint, new_ids):
+        """Acrescenta os ids novos de uma página à lista de ids recebidos do checkpoint"""
+        import json
+        
+        if not new_ids:
+            return
+        with open(checkpoint['ids_path'], 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(value) + '\n' for value in new_ids)
+
+    def reset_wfs_checkpoint(self, checkpoint):
+        """Descarta o conteúdo do checkpoint e recomeça do startIndex 0"""
+        import shutil
+        
+        shutil.rmtree(checkpoint['dir'], ignore_errors=True)
+        os.makedirs(checkpoint['dir'], exist_ok=True)
+        
+        previous = checkpoint['manifest'] or {}
+        checkpoint['manifest'] = {
+            'typename': previous.get('typename'),
+            'cql_filter': previous.get('cql_filter'),
+            'output_format': previous.get('output_format'),
+            'property_names': previous.get('property_names'),
+            'page_size': previous.get('page_size'),
+            'total_matched': None,
+            'next_start': 0,  # Primeira feição ainda não gravada no GeoPackage
+            'last_key': None,  # Maior chave já lida (paginação por chave)
+            'pages_appended': 0,
+            'total_features': 0,
+            'pending_pages': {},  # Páginas baixadas fora de ordem: startIndex -> [count, arquivo]
+            'duplicates': 0,  # Feições repetidas entre páginas descartadas
+            'outside_cut': 0,  # Feições fora da área de corte descartadas (recorte por página)
+            'tiles_done': [],  # Blocos BBOX já gravados (download por blocos)
+            'complete': False
+        }
+        if checkpoint.get('id_set') is not None:
+            checkpoint['id_set'] = FeatureIdSet()
+        return checkpoint
+
+    def save_wfs_checkpoint(self, checkpoint):
+        """Grava o manifest do checkpoint de forma atômica"""
+        import json
+        import datetime
+        
+        checkpoint['manifest']['updated_at'] = datetime.datetime.now().isoformat()
+        temp_path = checkpoint['manifest_path'] + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint['manifest'], f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, checkpoint['manifest_path'])
+
+    def validate_wfs_checkpoint_store(self, checkpoint, manifest):
+        """Confere o GeoPackage do checkpoint com o manifest antes de retomar
+        
+        Remove feições gravadas depois do último manifest salvo (interrupção
+        entre a gravação da página e a do manifest) e as tabelas derivadas de
+        execuções anteriores. Retorna False se o checkpoint não for aproveitável.
+        """
+        from osgeo import ogr
+        
+        expected = manifest.get('total_features', 0) - manifest.get('outside_cut', 0)
+        store_path = checkpoint['store_path']
+        store_layer = checkpoint['store_layer']
+        
+        if expected == 0:
+            if os.path.exists(store_path):
+                os.remove(store_path)
+            return True
+        
+        dataset = ogr.Open(store_path, 1)
+        if dataset is None or dataset.GetLayerByName(store_layer) is None:
+            return False
+        
+        # Tabelas de correção/corte de execuções anteriores
+        for index in reversed(range(dataset.GetLayerCount())):
+            if dataset.GetLayerByIndex(index).GetName() != store_layer:
+                dataset.DeleteLayer(index)
+        
+        stored = dataset.GetLayerByName(store_layer).GetFeatureCount()
+        if stored < expected:
+            print(f"⚠️ DEBUG: Checkpoint inconsistente ({stored} < {expected} feições)")
+            return False
+        
+        if stored > expected:
+            print(f"🧹 DEBUG: Removendo {stored - expected} feições gravadas após o último manifest")
+            dataset.ExecuteSQL(
+                f'DELETE FROM "{store_layer}" WHERE fid > '
+                f'(SELECT fid FROM "{store_layer}" ORDER BY fid LIMIT 1 OFFSET {expected - 1})')
+        
+        dataset = None
+        return True
+
+    def remove_wfs_page_file(self, page_file):
+        """Remove a página temporária e o esquema .gfs gerado pelo OGR"""
+        for path in (page_file, os.path.splitext(page_file)[0] + '.gfs'):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def check_small_wfs_page(self, page_file, page_number):
+        """Classifica respostas pequenas: 'error' (exceção do servidor), 'empty' ou None"""
+        if os.path.getsize(page_file) >= 1000:
+            return None
+        
+        print(f"⚠️ DEBUG: Página {page_number} muito pequena, verificando...")
+        with open(page_file, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read(500)
+        if 'ows:ExceptionReport' in content or 'ServiceException' in content:
+            print(f"❌ DEBUG: Erro no servidor na página {page_number}")
+            return 'error'
+        if 'numberOfFeatures="0"' in content or ('<wfs:FeatureCollection' in content and '</wfs:FeatureCollection>' in content and 'gml:featureMember' not in content):
+            print(f"✅ DEBUG: Página {page_number} vazia - fim dos dados")
+            return 'empty'
+        return None
+
+    def scan_wfs_page(self, page_file, page_number, id_field=None):
+        """Leitura rápida de uma página: (nº de feições, maior valor de id_field)
+        
+        Sem gravar nada - permite pedir a próxima página antes de gravar esta.
+        Retorna None se a página for inválida.
+        """
+        from osgeo import ogr
+        
+        page_state = self.check_small_wfs_page(page_file, page_number)
+        if page_state == 'error':
+            return None
+        if page_state == 'empty':
+            return 0, None
+        
+        source = ogr.Open(self.get_wfs_page_ogr_path(page_file))
+        if source is None or source.GetLayerCount() == 0:
+            print(f"❌ DEBUG: Página {page_number} inválida")
+            return None
+        page_layer = source.GetLayer(0)
+        page_features = page_layer.GetFeatureCount()
+        
+        max_key = None
+        id_index = page_layer.GetLayerDefn().GetFieldIndex(id_field) if id_field else -1
+        if id_index >= 0:
+            page_layer.SetIgnoredFields(['OGR_GEOMETRY'])
+            for feature in page_layer:
+                value = feature.GetField(id_index)
+                if value is not None and (max_key is None or value > max_key):
+                    max_key = value
+        source = None
+        
+        return page_features, max_key
+
+    def append_wfs_page_to_store(self, page_file, page_number, checkpoint):
+        """Acrescenta uma página baixada ao GeoPackage de trabalho
+        
+        A primeira página cria a camada (com índice espacial); as seguintes são
+        anexadas. Com chave primária, feições cujo id já foi recebido (páginas
+        sobrepostas) são descartadas e somadas em manifest['duplicates']; os
+        ids novos vão para a lista de ids recebidos do checkpoint.
+        Com recorte por página, só as feições dentro da área de corte são
+        gravadas (as demais somam em manifest['outside_cut']).
+        A página é removida em seguida.
+        Retorna (feições na página, feições novas); (0, 0) se vazia, None se inválida.
+        """
+        store_path, store_layer = checkpoint['store_path'], checkpoint['store_layer']
+        from osgeo import gdal, ogr
+        
+        # Verifica se a página tem dados válidos
+        page_state = self.check_small_wfs_page(page_file, page_number)
+        if page_state == 'error':
+            return None
+        if page_state == 'empty':
+            self.remove_wfs_page_file(page_file)
+            return 0, 0
+        
+        ogr_path = self.get_wfs_page_ogr_path(page_file)
+        source = ogr.Open(ogr_path)
+        if source is None or source.GetLayerCount() == 0:
+            print(f"❌ DEBUG: Página {page_number} inválida")
+            return None
+        page_layer = source.GetLayer(0)
+        page_features = page_layer.GetFeatureCount()
+        
+        # Ids já recebidos (em outra página ou antes na mesma): a cópia repetida é
+        # descartada pelo FID da feição na página, a primeira continua
+        duplicate_fids = set()
+        new_ids = []
+        id_set = checkpoint['id_set']
+        id_index = page_layer.GetLayerDefn().GetFieldIndex(checkpoint['id_field']) if id_set is not None else -1
+        if id_index >= 0:
+            page_layer.SetIgnoredFields(['OGR_GEOMETRY'])
+            for feature in page_layer:
+                value = feature.GetField(id_index)
+                if id_set.add(value):
+                    new_ids.append(value)
+                else:
+                    duplicate_fids.add(feature.GetFID())
+        source = None
+        
+        # Antes do recorte: ids de feições fora do corte também contam na retomada
+        self.save_wfs_feature_ids(checkpoint, new_ids)
+        
+        if page_features == 0:
+            print(f"✅ DEBUG: Página {page_number} sem feições - fim dos dados")
+            self.remove_wfs_page_file(page_file)
+            return 0, 0
+        
+        stored_features = page_features - len(duplicate_fids)
+        if duplicate_fids:
+            print(f"🧹 DEBUG: Página {page_number}: {len(duplicate_fids)} feições duplicadas descartadas")
+            checkpoint['manifest']['duplicates'] = checkpoint['manifest'].get('duplicates', 0) + len(duplicate_fids)
+            if not stored_features:
+                self.remove_wfs_page_file(page_file)
+                return page_features, 0
+        
+        clip_path = None
+        if checkpoint.get('clip_geometry') is not None:
+            # Correção + recorte da página: o GeoPackage recebe só o que cai no corte
+            clipped = self.clip_wfs_page(ogr_path, page_file, page_number, checkpoint, duplicate_fids)
+            if clipped is None:
+                return None
+            clip_path, kept_features = clipped
+            checkpoint['manifest']['outside_cut'] = checkpoint['manifest'].get('outside_cut', 0) + stored_features - kept_features
+            if not kept_features:
+                print(f"✂️ DEBUG: Página {page_number}: nenhuma feição na área de corte")
+                self.remove_wfs_page_file(clip_path)
+                self.remove_wfs_page_file(page_file)
+                return page_features, stored_features
+            ogr_path = clip_path
+        elif duplicate_fids:
+            # Sem recorte: cópia da página sem as duplicatas (sem lista de ids em SQL)
+            clip_path = self.copy_wfs_page_without(ogr_path, page_file, page_number, duplicate_fids)
+            if clip_path is None:
+                return None
+            ogr_path = clip_path
+        
+        # Simplificação do perfil de transferência (preserva a topologia de cada feição)
+        simplify = self.get_wfs_transfer_profile()['simplify']
+        
+        if os.path.exists(store_path):
+            options = gdal.VectorTranslateOptions(
+                format='GPKG', accessMode='append', addFields=True, layerName=store_layer,
+                geometryType='PROMOTE_TO_MULTI', dstSRS='EPSG:4674', reproject=False, simplifyTolerance=simplify)
+        else:
+            options = gdal.VectorTranslateOptions(
+                format='GPKG', layerName=store_layer, layerCreationOptions=['SPATIAL_INDEX=YES'],
+                geometryType='PROMOTE_TO_MULTI', dstSRS='EPSG:4674', reproject=False, simplifyTolerance=simplify)
+        
+        result = gdal.VectorTranslate(store_path, ogr_path, options=options)
+        if result is None:
+            print(f"❌ DEBUG: Falha ao gravar página {page_number} no GeoPackage")
+            return None
+        result = None  # Fecha o GeoPackage e grava a página
+        
+        if clip_path:
+            self.remove_wfs_page_file(clip_path)
+        self.remove_wfs_page_file(page_file)
+        return page_features, stored_features
+
+    def copy_wfs_page_without(self, ogr_path, page_file, page_number, skip_fids):
+        """Copia uma página para um GeoPackage temporário sem as feições de skip_fids
+        
+        Retorna o caminho do GeoPackage ou None se a página for inválida.
+        """
+        from osgeo import ogr
+        
+        source = ogr.Open(ogr_path)
+        if source is None or source.GetLayerCount() == 0:
+            print(f"❌ DEBUG: Página {page_number} inválida")
+            return None
+        page_layer = source.GetLayer(0)
+        definition = page_layer.GetLayerDefn()
+        
+        copy_path = os.path.splitext(page_file)[0] + '_sem_duplicatas.gpkg'
+        self.remove_wfs_page_file(copy_path)
+        target = ogr.GetDriverByName('GPKG').CreateDataSource(copy_path)
+        target_layer = target.CreateLayer('pagina', page_layer.GetSpatialRef(), definition.GetGeomType())
+        for index in range(definition.GetFieldCount()):
+            target_layer.CreateField(definition.GetFieldDefn(index))
+        target_definition = target_layer.GetLayerDefn()
+        
+        target.StartTransaction()
+        for feature in page_layer:
+            if feature.GetFID() in skip_fids:
+                continue
+            output = ogr.Feature(target_definition)
+            output.SetFrom(feature)
+            target_layer.CreateFeature(output)
+        target.CommitTransaction()
+        
+        target = None
+        source = None
+        return copy_path
+
+    def clip_wfs_page(self, ogr_path, page_file, page_number, checkpoint, skip_fids=None):
+        """Corrige as geometrias de uma página e recorta pela geometria exata de corte
+        
+        As feições que cruzam a área de corte são gravadas (recortadas) em um
+        GeoPackage temporário do tamanho da página; as demais são descartadas.
+        Feições com FID em skip_fids (duplicatas) são puladas.
+        Retorna (caminho do GeoPackage, feições gravadas) ou None se inválida.
+        """
+        from osgeo import ogr
+        
+        clip_geometry = checkpoint['clip_geometry']
+        source = ogr.Open(ogr_path)
+        if source is None or source.GetLayerCount() == 0:
+            print(f"❌ DEBUG: Página {page_number} inválida")
+            return None
+        page_layer = source.GetLayer(0)
+        definition = page_layer.GetLayerDefn()
+        
+        skip_fids = skip_fids or set()
+        
+        # Filtro pelo retângulo do corte: feições distantes nem chegam ao GEOS
+        min_x, max_x, min_y, max_y = clip_geometry.GetEnvelope()
+        page_layer.SetSpatialFilterRect(min_x, min_y, max_x, max_y)
+        
+        clip_path = os.path.splitext(page_file)[0] + '_recorte.gpkg'
+        self.remove_wfs_page_file(clip_path)
+        target = ogr.GetDriverByName('GPKG').CreateDataSource(clip_path)
+        target_layer = target.CreateLayer('pagina', page_layer.GetSpatialRef(), ogr.wkbMultiPolygon)
+        for index in range(definition.GetFieldCount()):
+            target_layer.CreateField(definition.GetFieldDefn(index))
+        target_definition = target_layer.GetLayerDefn()
+        
+        kept_features = 0
+        target.StartTransaction()
+        for feature in page_layer:
+            if feature.GetFID() in skip_fids:
+                continue
+            geometry = feature.GetGeometryRef()
+            if geometry is None or geometry.IsEmpty():
+                continue
+            
+            # Correção da geometria (equivalente ao fixgeometries)
+            if not geometry.IsValid():
+                repaired = geometry.MakeValid() if hasattr(geometry, 'MakeValid') else None
+                geometry = repaired if repaired is not None else geometry.Buffer(0)
+            if geometry is None or not geometry.Intersects(clip_geometry):
+                continue
+            
+            clipped = self.extract_polygon_parts(geometry.Intersection(clip_geometry))
+            if clipped is None:
+                continue
+            
+            output = ogr.Feature(target_definition)
+            output.SetFrom(feature)
+            output.SetGeometry(clipped)
+            target_layer.CreateFeature(output)
+            kept_features += 1
+        target.CommitTransaction()
+        
+        target = None
+        source = None
+        return clip_path, kept_features
+
+    def extract_polygon_parts(self, geometry):
+        """Partes poligonais de um resultado de recorte como MultiPolygon (None se vazio)"""
+        from osgeo import ogr
+        
+        if geometry is None or geometry.IsEmpty():
+            return None
+        
+        multi = ogr.Geometry(ogr.wkbMultiPolygon)
+        parts = [geometry]
+        while parts:
+            part = parts.pop()
+            part_type = ogr.GT_Flatten(part.GetGeometryType())
+            if part_type == ogr.wkbPolygon:
+                multi.AddGeometry(part)
+            elif part_type in (ogr.wkbMultiPolygon, ogr.wkbGeometryCollection):
+                parts.extend(part.GetGeometryRef(index) for index in range(part.GetGeometryCount()))
+        
+        return multi if not multi.IsEmpty() else None
+
+    def get_work_store_output(self, input_layer, suffix):
+        """Destino do processing para camadas lidas do GeoPackage de trabalho
+        
+        O resultado vira uma nova tabela no mesmo GeoPackage (sem cópia completa
+        em memória). Durante uma etapa do grafo com resultado memorizado, a
+        tabela vai para o GeoPackage da etapa (stage_store_path), seja qual for
+        a origem. Camadas de outras origens continuam usando 'memory:'.
+        """
+        store_path = self.stage_store_path or input_layer.source().split('|')[0]
+        if store_path not in self.wfs_work_stores:
+            return 'memory:'
+        
+        self.wfs_work_stores[store_path] += 1
+        table = f"{suffix}_{self.wfs_work_stores[store_path]}"
+        return f"ogr:dbname='{store_path}' table=\"{table}\" (geom)"
+
+    def load_processing_output(self, output, layer_name):
+        """Converte a saída de um processing em camada (saídas em arquivo retornam o caminho)"""
+        if isinstance(output, QgsVectorLayer):
+            return output
+        
+        if output.startswith('ogr:'):
+            # ogr:dbname='arquivo.gpkg' table="tabela" (geom)
+            store_path = output.split("dbname='")[1].split("'")[0]
+            table = output.split('table="')[1].split('"')[0]
+            output = f"{store_path}|layername={table}"
+        
+        return QgsVectorLayer(output, layer_name, "ogr")
+
+    def download_wfs_pages_concurrent(self, base_url, typename, cql_filter, layer_name, total_matched, output_format, checkpoint, property_names=None):
+        """Baixa as páginas em paralelo com um pool limitado de threads
+        
+        As janelas (startIndex, count) são geradas sob demanda até cobrir o total
+        informado pelo servidor (resultType=hits), com o tamanho definido pelo
+        paginador adaptativo. Uma janela com falha é dividida em duas menores e
+        reenviada. As páginas chegam fora de ordem e são anexadas ao GeoPackage
+        de trabalho na ordem do startIndex assim que ficam disponíveis; o
+        manifest do checkpoint é atualizado a cada página gravada.
+        Retorna None se abortado/interrompido, ou (páginas, total de feições, falha na 1ª página).
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        
+        manifest = checkpoint['manifest']
+        pager = self.create_wfs_pager()
+        max_workers = self.get_page_workers()
+        print(f"📊 DEBUG: {total_matched} feições a baixar, {max_workers} downloads simultâneos")
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = {}
+        retry_windows = []  # Janelas com falha, divididas para reenvio
+        next_append = manifest['next_start']  # startIndex da próxima página a anexar no GeoPackage
+        pages_appended = manifest['pages_appended']
+        total_features = manifest['total_features']
+        stopped = False
+        failed_start = None
+        
+        # Páginas que já estavam baixadas (fora de ordem) no checkpoint
+        downloaded = {}  # startIndex -> (count, arquivo)
+        for start, (count, temp_file) in manifest['pending_pages'].items():
+            if os.path.exists(temp_file):
+                downloaded[int(start)] = (count, temp_file)
+        next_start = max([next_append] + [start + count for start, (count, _) in downloaded.items()])
+        
+        # Lacunas entre páginas já baixadas voltam para a fila
+        covered = next_append
+        for start in sorted(downloaded):
+            if start > covered:
+                retry_windows.append((covered, start - covered))
+            covered = max(covered, start + downloaded[start][0])
+        
+        def submit_window(start, count):
+            params = self.build_wfs_page_params(typename, cql_filter, count, start, output_format, property_names, checkpoint['id_field'])
+            temp_file = os.path.join(checkpoint['dir'], f"page_{start}{output_format[1]}")
+            future = executor.submit(self.fetch_wfs_page, base_url, params, temp_file)
+            pending[future] = (start, count, temp_file)
+        
+        try:
+            while True:
+                # Mantém o pool ocupado: reenvios primeiro, depois janelas novas
+                while len(pending) < max_workers and failed_start is None and not stopped:
+                    if retry_windows:
+                        submit_window(*retry_windows.pop(0))
+                    elif next_start < total_matched:
+                        count = pager.page_size
+                        submit_window(next_start, count)
+                        next_start += count
+                    else:
+                        break
+                
+                if not pending:
+                    break
+                
+                done, _ = wait(list(pending), timeout=0.2, return_when=FIRST_COMPLETED)
+                
+                # Processa eventos da interface para detectar clique no botão abortar
+                self.process_ui_events()
+                
+                # VERIFICAÇÃO DE ABORT: Cancela as páginas que ainda não começaram
+                if self.check_abort_signal():
+                    print(f"🛑 DEBUG: Download abortado pelo usuário ({total_features}/{total_matched} feições) - checkpoint mantido")
+                    for future in pending:
+                        future.cancel()
+                    return None
+                
+                for future in done:
+                    start, count, temp_file = pending.pop(future)
+                    try:
+                        status, size, seconds = future.result()
+                    except Exception as e:
+                        print(f"❌ DEBUG: Falha na janela {start}+{count}: {str(e)}")
+                        status, size, seconds = None, 0, 0
+                    
+                    if status == 200:
+                        downloaded[start] = (count, temp_file)
+                        expected = min(count, total_matched - start)
+                        pager.record_success(expected, seconds, size)
+                        print(f"✅ DEBUG: Janela {start}+{count} baixada ({size} bytes em {seconds:.1f}s) - próxima página: {pager.page_size}")
+                        continue
+                    
+                    print(f"❌ DEBUG: Erro HTTP {status} na janela {start}+{count}")
+                    self.remove_wfs_page_file(temp_file)
+                    pager.record_failure()
+                    if not self.is_retryable_wfs_failure(status):
+                        # Erro definitivo (ex.: 400 filtro inválido): dividir não resolve
+                        failed_start = start if failed_start is None else min(failed_start, start)
+                    elif pager.can_split(count):
+                        half = count // 2
+                        retry_windows.extend([(start, half), (start + half, count - half)])
+                        retry_windows.sort()
+                    else:
+                        failed_start = start if failed_start is None else min(failed_start, start)
+                
+                # Anexa as páginas já disponíveis, na ordem do startIndex
+                while not stopped and next_append in downloaded:
+                    count, temp_file = downloaded.pop(next_append)
+                    appended = self.append_wfs_page_to_store(temp_file, pages_appended + 1, checkpoint)
+                    if not appended or not appended[0]:
+                        # Página inválida ou vazia antes do total: nova execução retoma desta janela
+                        self.remove_wfs_page_file(temp_file)
+                        failed_start = next_append if failed_start is None else min(failed_start, next_append)
+                        stopped = True
+                        break
+                    page_features, stored_features = appended
+                    total_features += stored_features
+                    pages_appended += 1
+                    
+                    # Página menor que o pedido: o servidor limita o count - pede o restante
+                    expected = min(count, total_matched - next_append)
+                    if page_features < expected:
+                        print(f"⚠️ DEBUG: Servidor devolveu {page_features} de {expected} feições - limitando páginas a {page_features}")
+                        pager.max_size = max(pager.min_size, min(pager.max_size, page_features))
+                        pager.page_size = pager._clamp(pager.page_size)
+                        retry_windows.append((next_append + page_features, count - page_features))
+                        retry_windows.sort()
+                    next_append += page_features
+                
+                if done:
+                    # Checkpoint: primeira feição não gravada + páginas baixadas fora de ordem
+                    manifest.update({
+                        'next_start': next_append,
+                        'pages_appended': pages_appended,
+                        'total_features': total_features,
+                        'pending_pages': {str(start): [count, temp_file] for start, (count, temp_file) in downloaded.items()}
+                    })
+                    self.save_wfs_checkpoint(checkpoint)
+                    self.update_notes(f"📄 {total_features}/{total_matched} feições gravadas (página de {pager.page_size}, {max_workers} simultâneas)", "status")
+        finally:
+            executor.shutdown(wait=False)
+        
+        print(f"📊 DEBUG: Paginador: {pager.pages} páginas, {pager.failures} falhas, tamanho final {pager.page_size}")
+        
+        if failed_start is not None:
+            if failed_start == 0 and pages_appended == 0:
+                return 0, 0, True
+            # Mantém o checkpoint: nova execução retoma da primeira página que falta
+            print(f"❌ DEBUG: Download interrompido na feição {failed_start} - checkpoint mantido para retomar")
+            self.update_notes(f"❌ Download interrompido ({total_features}/{total_matched} feições) - processe novamente para retomar", "status")
+            return None
+        
+        # Download concluído: páginas extras (após fim antecipado) não entram no resultado
+        for count, temp_file in downloaded.values():
+            self.remove_wfs_page_file(temp_file)
+        manifest.update({'pending_pages': {}, 'complete': True})
+        self.save_wfs_checkpoint(checkpoint)
+        
+        return pages_appended, total_features, False
+
+    def get_wfs_download_extent(self, base_url, typename):
+        """Extensão (EPSG:4674) a dividir em blocos: área de corte ou extensão do typename"""
+        if self.wfs_cut_filter:
+            return list(self.wfs_cut_filter['extent'])
+        
+        capabilities = self.get_wfs_capabilities(base_url)
+        extent = capabilities['extents'].get(typename.split(':')[-1]) if capabilities else None
+        if extent:
+            # WGS84 x SIRGAS 2000: diferença irrelevante com a margem aplicada
+            return [extent[0] - 0.01, extent[1] - 0.01, extent[2] + 0.01, extent[3] + 0.01]
+        print(f"⚠️ DEBUG: Extensão do typename indisponível")
+        
+        # Extensão do Brasil
+        return [-74.0, -34.0, -28.0, 6.0]
+
+    def split_wfs_tile(self, tile):
+        """Divide um bloco em quatro (None se já atingiu o tamanho mínimo)"""
+        min_x, min_y, max_x, max_y = tile
+        if max_x - min_x < 2 * self.wfs_tile_min_degrees and max_y - min_y < 2 * self.wfs_tile_min_degrees:
+            return None
+        mid_x, mid_y = (min_x + max_x) / 2, (min_y + max_y) / 2
+        return [[min_x, min_y, mid_x, mid_y], [mid_x, min_y, max_x, mid_y],
+                [min_x, mid_y, mid_x, max_y], [mid_x, mid_y, max_x, max_y]]
+
+    def download_wfs_tiles_concurrent(self, base_url, typename, cql_filter, layer_name, total_matched, output_format, checkpoint, property_names=None):
+        """Baixa a camada em blocos BBOX consultados em paralelo
+        
+        A extensão é dividida em quadtree conforme a densidade: cada bloco tem
+        o total consultado (resultType=hits) e é dividido em quatro enquanto
+        passar de uma página máxima; blocos que cabem são baixados inteiros. As
+        consultas BBOX usam o índice espacial do servidor, sem o custo do
+        startIndex. Feições que cruzam a borda entre blocos chegam mais de uma
+        vez e são descartadas pela chave primária ao gravar. Blocos gravados,
+        feições gravadas e ids recebidos ficam no checkpoint para retomar.
+        Retorna None se abortado/interrompido, ou (blocos, total de feições, falha no 1º bloco).
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        
+        manifest = checkpoint['manifest']
+        tiles_done = set(manifest.get('tiles_done', []))
+        geometry_column = self.get_wfs_geometry_column(base_url, typename)
+        max_features = self.wfs_page_size_max
+        max_workers = self.get_page_workers()
+        
+        pages_appended = manifest['pages_appended']
+        total_features = manifest['total_features']
+        tile_counter = len(tiles_done)
+        failed_tile = None
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = {}
+        queue = [('hits', self.get_wfs_download_extent(base_url, typename), None)]
+        
+        def tile_key(tile):
+            return ','.join(f"{value:.6f}" for value in tile)
+        
+        def tile_filter(tile):
+            bbox_filter = f"BBOX({geometry_column}, {tile_key(tile)}, 'EPSG:4674')"
+            return f"({cql_filter}) AND {bbox_filter}" if cql_filter else bbox_filter
+        
+        def mark_done(tile=None):
+            # Sem bloco: só registra feições gravadas (bloco dividido continua pendente)
+            if tile is not None:
+                tiles_done.add(tile_key(tile))
+            manifest.update({
+                'tiles_done': sorted(tiles_done),
+                'pages_appended': pages_appended,
+                'total_features': total_features
+            })
+            self.save_wfs_checkpoint(checkpoint)
+        
+        try:
+            while True:
+                while len(pending) < max_workers and queue and failed_tile is None:
+                    kind, tile, count = queue.pop(0)
+                    if tile_key(tile) in tiles_done:
+                        continue
+                    if kind == 'hits':
+                        future = executor.submit(self.get_wfs_hits_count, base_url, typename, tile_filter(tile))
+                        pending[future] = (kind, tile, None, None)
+                    else:
+                        tile_counter += 1
+                        temp_file = os.path.join(checkpoint['dir'], f"tile_{tile_counter}{output_format[1]}")
+                        params = self.build_wfs_page_params(typename, tile_filter(tile), count, 0, output_format, property_names, checkpoint['id_field'])
+                        future = executor.submit(self.fetch_wfs_page, base_url, params, temp_file)
+                        pending[future] = (kind, tile, count, temp_file)
+                
+                if not pending:
+                    break
+                
+                done, _ = wait(list(pending), timeout=0.2, return_when=FIRST_COMPLETED)
+                
+                # Processa eventos da interface para detectar clique no botão abortar
+                self.process_ui_events()
+                
+                # VERIFICAÇÃO DE ABORT: Cancela os blocos que ainda não começaram
+                if self.check_abort_signal():
+                    print(f"🛑 DEBUG: Download por blocos abortado ({total_features}/{total_matched} feições) - checkpoint mantido")
+                    for future in pending:
+                        future.cancel()
+                    return None
+                
+                for future in done:
+                    kind, tile, count, temp_file = pending.pop(future)
+                    
+                    if kind == 'hits':
+                        try:
+                            hits = future.result()
+                        except Exception as e:
+                            print(f"⚠️ DEBUG: Falha no total do bloco {tile_key(tile)}: {str(e)}")
+                            hits = None
+                        
+                        if hits == 0:
+                            mark_done(tile)
+                        elif hits is not None and hits <= max_features:
+                            queue.append(('get', tile, hits))
+                        elif self.split_wfs_tile(tile):
+                            # Bloco denso (ou total desconhecido): divide em quatro
+                            queue.extend(('hits', child, None) for child in self.split_wfs_tile(tile))
+                        else:
+                            queue.append(('get', tile, hits or max_features))
+                        continue
+                    
+                    try:
+                        status, _, seconds = future.result()
+                    except Exception as e:
+                        print(f"❌ DEBUG: Falha no bloco {tile_key(tile)}: {str(e)}")
+                        status, seconds = None, 0
+                    
+                    if status != 200:
+                        print(f"❌ DEBUG: Erro HTTP {status} no bloco {tile_key(tile)}")
+                        self.remove_wfs_page_file(temp_file)
+                        children = self.split_wfs_tile(tile)
+                        if self.is_retryable_wfs_failure(status) and children:
+                            queue.extend(('hits', child, None) for child in children)
+                        else:
+                            failed_tile = tile
+                        continue
+                    
+                    appended = self.append_wfs_page_to_store(temp_file, pages_appended + 1, checkpoint)
+                    if appended is None:
+                        self.remove_wfs_page_file(temp_file)
+                        failed_tile = tile
+                        continue
+                    page_features, stored_features = appended
+                    pages_appended += 1
+                    total_features += stored_features
+                    print(f"✅ DEBUG: Bloco {tile_key(tile)}: {page_features} feições ({stored_features} novas) em {seconds:.1f}s")
+                    
+                    children = self.split_wfs_tile(tile)
+                    if page_features < count and children:
+                        # Servidor limitou a resposta: completa pelos sub-blocos
+                        print(f"⚠️ DEBUG: Bloco devolveu {page_features} de {count} feições - dividindo")
+                        queue.extend(('hits', child, None) for child in children)
+                        mark_done()
+                    else:
+                        mark_done(tile)
+                    
+                    self.update_notes(f"🧩 {total_features}/{total_matched} feições gravadas ({pages_appended} blocos)", "status")
+        finally:
+            executor.shutdown(wait=False)
+        
+        if failed_tile is not None:
+            if pages_appended == 0:
+                return 0, 0, True
+            print(f"❌ DEBUG: Download por blocos interrompido no bloco {tile_key(failed_tile)} - checkpoint mantido para retomar")
+            self.update_notes(f"❌ Download interrompido ({total_features}/{total_matched} feições) - processe novamente para retomar", "status")
+            return None
+        
+        manifest['complete'] = True
+        self.save_wfs_checkpoint(checkpoint)
+        
+        return pages_appended, total_features, False
+
+    def download_wfs_pages_sequential(self, base_url, typename, cql_filter, layer_name, output_format, checkpoint, property_names=None, total_matched=None, keyset=False):
+        """Baixa as páginas uma a uma (total desconhecido ou paginação por chave)
+        
+        O tamanho de cada página vem do paginador adaptativo; uma página com
+        falha é repetida com tamanho menor. Com keyset=True cada página pede
+        "chave > maior chave já lida" (startIndex 0, sortBy pela chave), sem o
+        custo crescente do startIndex.
+        
+        Pré-busca: assim que uma página chega, uma leitura rápida (nº de feições
+        e maior chave) define a próxima, que já é pedida em segundo plano
+        enquanto a atual é gravada no GeoPackage e registrada no checkpoint - no
+        máximo duas páginas em disco ao mesmo tempo.
+        Retorna None se abortado/interrompido, ou (páginas, total de feições, falha na 1ª página).
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait
+        
+        manifest = checkpoint['manifest']
+        id_field, id_set = checkpoint['id_field'], checkpoint['id_set']
+        pager = self.create_wfs_pager()
+        pages_appended = manifest['pages_appended']
+        total_features = manifest['total_features']
+        page_number = pages_appended + 1
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        
+        def submit_page(start_index, last_key, page_size):
+            if keyset:
+                # Próxima página começa depois da maior chave já lida
+                page_filter = cql_filter
+                if last_key is not None:
+                    key_filter = f"{id_field} > {last_key}"
+                    page_filter = f"({cql_filter}) AND {key_filter}" if cql_filter else key_filter
+                params = self.build_wfs_page_params(typename, page_filter, page_size, 0, output_format, property_names, id_field)
+            else:
+                # Parâmetros WFS - sempre inclui CQL_FILTER quando disponível
+                params = self.build_wfs_page_params(typename, cql_filter, page_size, start_index, output_format, property_names, id_field)
+            temp_file = os.path.join(checkpoint['dir'], f"page_{start_index}{output_format[1]}")
+            future = executor.submit(self.fetch_wfs_page, base_url, params, temp_file)
+            return {'future': future, 'start': start_index, 'key': last_key, 'size': page_size, 'file': temp_file}
+        
+        current = submit_page(manifest['next_start'], manifest.get('last_key', id_set.max_int) if keyset else None, pager.page_size)
+        next_page = None
+        try:
+            while current:
+                if keyset:
+                    print(f"📄 DEBUG: Baixando página {page_number} ({id_field} > {current['key']}, {current['size']} feições)...")
+                else:
+                    print(f"📄 DEBUG: Baixando página {page_number} (índice {current['start']}, {current['size']} feições)...")
+                
+                # Atualiza notas com progresso
+                self.update_notes(f"📄 Baixando página {page_number} ({total_features} feições baixadas)", "status")
+                
+                # Espera a página mantendo a interface respondendo (botão abortar)
+                while not current['future'].done():
+                    wait([current['future']], timeout=0.2)
+                    self.process_ui_events()
+                    
+                    # VERIFICAÇÃO DE ABORT: Para interromper download se solicitado
+                    if self.check_abort_signal():
+                        print(f"🛑 DEBUG: Download abortado pelo usuário na página {page_number}")
+                        current['future'].cancel()
+                        return None
+                
+                try:
+                    status, size, seconds = current['future'].result()
+                except Exception as e:
+                    print(f"❌ DEBUG: Falha na página {page_number}: {str(e)}")
+                    status, size, seconds = None, 0, 0
+                
+                if status != 200:
+                    print(f"❌ DEBUG: Erro HTTP {status} na página {page_number}")
+                    self.remove_wfs_page_file(current['file'])
+                    if self.is_retryable_wfs_failure(status) and pager.can_split(current['size']):
+                        # Repete a mesma página com tamanho menor
+                        pager.record_failure()
+                        current = submit_page(current['start'], current['key'], pager.page_size)
+                        continue
+                    if pages_appended == 0:
+                        return 0, 0, True
+                    # Mantém o checkpoint: nova execução retoma desta página
+                    print(f"❌ DEBUG: Download interrompido na página {page_number} - checkpoint mantido para retomar")
+                    self.update_notes(f"❌ Download interrompido ({total_features} feições gravadas) - processe novamente para retomar", "status")
+                    return None
+                
+                # Leitura rápida: define a próxima página antes de gravar esta
+                scan = self.scan_wfs_page(current['file'], page_number, id_field if keyset else None)
+                if not scan:
+                    # Página inválida: o checkpoint fica incompleto para retomar desta página
+                    self.remove_wfs_page_file(current['file'])
+                    print(f"❌ DEBUG: Página {page_number} inválida - checkpoint mantido para retomar")
+                    self.update_notes(f"❌ Download interrompido ({total_features} feições gravadas) - processe novamente para retomar", "status")
+                    return None
+                if not scan[0]:
+                    # Página vazia: fim dos dados
+                    self.remove_wfs_page_file(current['file'])
+                    break
+                page_features, page_max_key = scan
+                pager.record_success(page_features, seconds, size)
+                print(f"✅ DEBUG: Página {page_number}: {page_features} feições em {seconds:.1f}s - próxima página: {pager.page_size}")
+                
+                next_start = current['start'] + page_features
+                if total_matched is not None:
+                    # Total conhecido: termina ao atingir o total (página curta pode ser limite do servidor)
+                    is_last = total_features + page_features >= total_matched
+                else:
+                    # Se esta página tem menos feições que o tamanho da página, é a última
+                    is_last = page_features < current['size']
+                    # Proteção contra loop infinito (servidor que ignora startIndex)
+                    if next_start >= self.wfs_sequential_feature_limit:
+                        print(f"⚠️ DEBUG: Limite de {self.wfs_sequential_feature_limit} feições atingido sem total informado")
+                        is_last = True
+                
+                next_key = page_max_key if page_max_key is not None else current['key']
+                next_page = None if is_last else submit_page(next_start, next_key, pager.page_size)
+                
+                # Grava a página atual enquanto a próxima é baixada
+                appended = self.append_wfs_page_to_store(current['file'], page_number, checkpoint)
+                if not appended:
+                    self.remove_wfs_page_file(current['file'])
+                    print(f"❌ DEBUG: Falha ao gravar a página {page_number} - checkpoint mantido para retomar")
+                    self.update_notes(f"❌ Download interrompido ({total_features} feições gravadas) - processe novamente para retomar", "status")
+                    return None
+                if not appended[0]:
+                    break
+                pages_appended += 1
+                total_features += appended[1]
+                
+                # Checkpoint: próxima página a baixar
+                manifest.update({
+                    'next_start': next_start,
+                    'last_key': next_key if keyset else None,
+                    'pages_appended': pages_appended,
+                    'total_features': total_features
+                })
+                self.save_wfs_checkpoint(checkpoint)
+                
+                if next_page is None and total_matched is not None and total_features < total_matched and page_features >= current['size']:
+                    # Duplicatas descartadas: ainda faltam feições para o total
+                    next_page = submit_page(next_start, next_key, pager.page_size)
+                
+                if next_page is None:
+                    print(f"✅ DEBUG: Última página gravada ({total_features} feições)")
+                
+                current = next_page
+                next_page = None
+                page_number += 1
+        finally:
+            if next_page is not None:
+                next_page['future'].cancel()
+            executor.shutdown(wait=False)
+        
+        manifest['complete'] = True
+        self.save_wfs_checkpoint(checkpoint)
+        
+        return pages_appended, total_features, False
+
+    def download_wfs_layer_fallback(self, url, layer_name, property_names=None, use_cut_filter=True):
+        """Fallback para WFS 1.0 sem paginação - ESTRATÉGIA SIMPLIFICADA
+        
+        ESTRATÉGIA: 
+        - Sempre usa CQL_FILTER para filtros temporais (quando disponível)
+        - Inclui no CQL_FILTER o mesmo corte espacial do download paginado
+        """
+        try:
+            print(f"🔄 DEBUG: Fallback - Baixando dados WFS sem paginação: {layer_name}")
+            print(f"🔄 DEBUG: CQL_FILTER no WFS (temporal + espacial), recorte exato depois")
+            
+            # Extrai typename da URL base
+            typename = self.extract_typename_from_url(url, layer_name)
+            base_url = url.split('?')[0]
+            
+            # Extrai filtro CQL da URL (será aplicado no WFS)
+            cql_filter = None
+            if 'CQL_FILTER=' in url:
+                cql_filter = url.split('CQL_FILTER=')[1].split('&')[0]
+                cql_filter = cql_filter.replace('%20', ' ').replace('%27', "'")
+                print(f"📅 DEBUG: Filtro CQL extraído: {cql_filter}")
+            
+            # Corte espacial no servidor
+            spatial_filter = self.get_wfs_spatial_cql(base_url, typename) if use_cut_filter else None
+            if spatial_filter:
+                cql_filter = f"({cql_filter}) AND {spatial_filter}" if cql_filter else spatial_filter
+            
+            # Formato de saída mais compacto anunciado pelo servidor
+            output_format = self.negotiate_wfs_output_format(base_url)
+            
+            # Parâmetros WFS - sempre inclui CQL_FILTER quando disponível
+            params = {
+                "service": "WFS",
+                "version": "1.0.0", 
+                "request": "GetFeature",
+                "typeName": typename,
+                "outputFormat": output_format[0],
+                "srsName": "EPSG:4674"
+            }
+            
+            # Adiciona CQL_FILTER se disponível
+            if cql_filter:
+                params["CQL_FILTER"] = cql_filter
+                print(f"📅 DEBUG: FALLBACK com CQL_FILTER: {cql_filter}")
+            else:
+                print(f"🌍 DEBUG: FALLBACK sem filtros - dados completos")
+            
+            # WFS 1.0: atributos já validados no download paginado
+            if property_names:
+                params["propertyName"] = ','.join(property_names)
+            
+            # Casas decimais das coordenadas (perfil de transferência)
+            num_decimals = self.get_wfs_transfer_profile()['num_decimals']
+            if num_decimals:
+                params["format_options"] = f"numDecimals:{num_decimals}"
+            
+            print(f"🌐 DEBUG: URL base: {base_url}")
+            print(f"📋 DEBUG: Parâmetros: {params}")
+            
+            # Download em blocos direto para o arquivo temporário
+            temp_dir = tempfile.gettempdir()
+            temp_file = os.path.join(temp_dir, f"{layer_name}_{id(self)}{output_format[1]}")
+            
+            status, file_size = self.stream_download_to_file(
+                base_url, temp_file, params=params, timeout=120,
+                progress_callback=self.create_download_progress_callback(f"WFS {layer_name}"))
+            
+            if status is None:
+                print(f"🛑 DEBUG: Download fallback abortado")
+                return None
+            
+            if status != 200:
+                print(f"❌ DEBUG: Erro HTTP {status}")
+                return None
+            
+            print(f"📁 DEBUG: Arquivo temporário salvo: {temp_file}")
+            print(f"📊 DEBUG: Tamanho do arquivo: {file_size} bytes")
+            
+            # Carrega como layer do QGIS
+            ogr_path = self.get_wfs_page_ogr_path(temp_file)
+            layer = QgsVectorLayer(ogr_path, layer_name, "ogr")
+            
+            if not layer.isValid():
+                print(f"❌ DEBUG: Layer inválida: {layer.error().message()}")
+                layer = QgsVectorLayer(f"{ogr_path}|encoding=UTF-8", layer_name, "ogr")
+                
+                if not layer.isValid():
+                    print(f"❌ DEBUG: Layer ainda inválida mesmo com UTF-8")
+                    return None
+            
+            self.process_ui_events()
+            feature_count = layer.featureCount()
+            print(f"✅ DEBUG: Layer fallback carregada com {feature_count} feições")
+            
+            # CORREÇÃO 2: Força projeção SIRGAS 2000 (EPSG:4674) no fallback
+            target_crs = QgsCoordinateReferenceSystem("EPSG:4674")
+            if layer.crs() != target_crs:
+                print(f"🗺️ DEBUG: Corrigindo projeção fallback para SIRGAS 2000 (EPSG:4674)")
+                layer.setCrs(target_crs)
+            
+            # CORREÇÃO 3: Aplica fix geometry nos dados PRODES baixados (fallback)
+            print(f"🔧 DEBUG: Aplicando fix geometry nos dados PRODES baixados (fallback)...")
+            fixed_layer = self.auto_fix_geometries(layer, "prodes_downloaded_fallback")
+            if fixed_layer and fixed_layer.isValid():
+                print(f"✅ DEBUG: Fix geometry aplicado nos dados PRODES (fallback): {fixed_layer.featureCount()} feições")
+                layer = fixed_layer
+                # Força projeção novamente na layer corrigida
+                if layer.crs() != target_crs:
+                    layer.setCrs(target_crs)
+            else:
+                print(f"⚠️ DEBUG: Fix geometry falhou nos dados PRODES (fallback), usando layer original")
+            
+            # Filtro temporal já foi aplicado no WFS via CQL_FILTER (se havia filtro)
+            # Cortes espaciais serão aplicados depois via geoprocessamento
+            if cql_filter:
+                print(f"✅ DEBUG: Filtro temporal aplicado no WFS via CQL_FILTER (fallback)")
+            else:
+                print(f"✅ DEBUG: Download completo (sem filtro temporal) - fallback")
+            
+            return layer
+            
+        except Exception as e:
+            print(f"❌ ERROR download_wfs_layer_fallback: {str(e)}")
+            return None
+
+    def extract_typename_from_url(self, url, layer_name):
+        """Extrai o typename correto baseado na URL e nome da layer
+        
+        NOTA: Para Amazônia, usa typenames da Amazônia Legal (WFS mais estável)
+        """
+        try:
+            # Mapeamento de typenames corretos por bioma
+            typename_mapping = {
+                'Pantanal': {
+                    'accumulated_deforestation': 'prodes-pantanal-nb:accumulated_deforestation_2000',
+                    'yearly_deforestation': 'prodes-pantanal-nb:yearly_deforestation',
+                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'  # DETER Pantanal usa mesmo endpoint do Cerrado
+                },
+                'Cerrado': {
+                    'accumulated_deforestation': 'prodes-cerrado-nb:accumulated_deforestation_2000',
+                    'yearly_deforestation': 'prodes-cerrado-nb:yearly_deforestation',
+                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'
+                },
+                'Pampa': {
+                    'accumulated_deforestation': 'prodes-pampa-nb:accumulated_deforestation_2000',
+                    'yearly_deforestation': 'prodes-pampa-nb:yearly_deforestation',
+                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'  # DETER Pampa usa mesmo endpoint do Cerrado
+                },
+                'Caatinga': {
+                    'accumulated_deforestation': 'prodes-caatinga-nb:accumulated_deforestation_2000',
+                    'yearly_deforestation': 'prodes-caatinga-nb:yearly_deforestation',
+                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'  # DETER Caatinga usa mesmo endpoint do Cerrado
+                },
+                'Mata Atlântica': {
+                    'accumulated_deforestation': 'prodes-mata-atlantica-nb:accumulated_deforestation_2000',
+                    'yearly_deforestation': 'prodes-mata-atlantica-nb:yearly_deforestation',
+                    'deter_alerts': 'deter-cerrado-nb:deter_cerrado'  # DETER Mata Atlântica usa mesmo endpoint do Cerrado
+                },
+                'Amazônia Legal': {
+                    'accumulated_deforestation': 'prodes-legal-amz:accumulated_deforestation_2007',
+                    'yearly_deforestation': 'prodes-legal-amz:yearly_deforestation',
+                    'deter_alerts': 'deter-amz:deter_amz'
+                }
+            }
+            
+            # Determina tipo de layer
+            if 'accumulated' in layer_name.lower():
+                layer_type = 'accumulated_deforestation'
+            elif 'deter' in layer_name.lower() or layer_name == 'deter_alerts':
+                layer_type = 'deter_alerts'
+            else:
+                layer_type = 'yearly_deforestation'
+            
+            # CORREÇÃO: Para Amazônia, usar typenames da Amazônia Legal
+            import unicodedata
+            effective_biome = self.selected_biome
+            biome_normalized = unicodedata.normalize('NFC', self.selected_biome) if self.selected_biome else self.selected_biome
+            amazonia_check = unicodedata.normalize('NFC', 'Amazônia')
+            
+            print(f"🔍 DEBUG extract_typename: selected_biome = '{self.selected_biome}'")
+            print(f"🔍 DEBUG extract_typename: biome_normalized == amazonia_check = {biome_normalized == amazonia_check}")
+            
+            if biome_normalized == amazonia_check:
+                effective_biome = 'Amazônia Legal'
+                print(f"🔄 DEBUG extract_typename: Convertendo Amazônia → Amazônia Legal")
+            
+            # Busca typename correto
+            biome_mapping = typename_mapping.get(effective_biome, {})
+            typename = biome_mapping.get(layer_type)
+            
+            if typename:
+                print(f"✅ DEBUG: Typename encontrado: {typename}")
+                return typename
+            else:
+                print(f"❌ DEBUG: Typename não encontrado para {self.selected_biome} - {layer_type}")
+                # Fallback: extrai da URL
+                if '/geoserver/' in url:
+                    parts = url.split('/geoserver/')[1].split('/')[0:2]
+                    if len(parts) >= 2:
+                        namespace = parts[0]
+                        layer_part = parts[1]
+                        fallback_typename = f"{namespace}:{layer_part}"
+                        print(f"🔄 DEBUG: Usando fallback typename: {fallback_typename}")
+                        return fallback_typename
+                        
+                return None
+                
+        except Exception as e:
+            print(f"❌ ERROR extract_typename_from_url: {str(e)}")
+            return None
+
+    def cut_processing_layers(self):
+        """Recorta processing_layers pela opção de corte (sem widgets; erro vira exceção)"""
+        # CORREÇÃO 1: Verifica se realmente precisa fazer corte espacial
+        # DEBUG: Mostra valor atual de cut_option
+        cut_option_value = getattr(self, 'cut_option', None)
+        print(f"🔧 DEBUG: cut_option atual = {cut_option_value}")
+        print(f"🔧 DEBUG: type(cut_option) = {type(cut_option_value)}")
+        
+        # CORREÇÃO MELHORADA: Verifica se realmente precisa fazer corte espacial
+        # Considera None, 0 ou atributo não existente como "sem corte"
+        needs_cut = (
+            hasattr(self, 'cut_option') and 
+            self.cut_option is not None and 
+            self.cut_option != 0
+        )
+        
+        # CORREÇÃO AMAZÔNIA: Se usuário selecionou Amazônia e não pediu corte,
+        # ainda precisa cortar pelo limite do bioma (pois usamos WFS da Amazônia Legal)
+        needs_amazonia_biome_cut = (
+            self.selected_biome == 'Amazônia' and 
+            not needs_cut and
+            hasattr(self, '_needs_amazonia_biome_cut') and 
+            self._needs_amazonia_biome_cut
+        )
+        
+        if not needs_cut and not needs_amazonia_biome_cut:
+            # Sem corte espacial - pula esta etapa
+            self.update_notes(f"🌍 Sem recorte espacial | Usando bioma completo: {self.selected_biome}", "status")
+            print(f"🌍 DEBUG: Sem corte espacial - pulando etapa")
+            
+            return
+        
+        # Camadas recortadas página a página durante o download não passam de novo pelo clip
+        if self.processing_layers and all(layer.customProperty('desagrega_recortada') for layer in self.processing_layers):
+            self.update_notes(f"✂️ Recorte já aplicado durante o download", "status")
+            print(f"✂️ DEBUG: Camadas já recortadas página a página - pulando etapa")
+            return
+        
+        # CORREÇÃO AMAZÔNIA: Aplica corte pelo bioma quando necessário
+        if needs_amazonia_biome_cut and not needs_cut:
+            print(f"🌳 DEBUG: Aplicando corte automático pelo bioma Amazônia")
+            self.update_notes(f"🌳 Aplicando recorte pelo bioma Amazônia | Dados vieram da Amazônia Legal", "status")
+            
+            # Obtém layer do bioma Amazônia do shapefile IBGE
+            cut_layer = self.get_amazonia_biome_cut_layer()
+            
+            if not cut_layer:
+                print(f"⚠️ DEBUG: Não foi possível obter limite do bioma Amazônia - usando dados completos")
+                self.update_notes(f"⚠️ Limite do bioma não disponível | Usando dados da Amazônia Legal", "warning")
+                return
+            
+            print(f"🔄 DEBUG: Aplicando corte pelo bioma Amazônia com {cut_layer.featureCount()} feições")
+            
+            # Fix geometries na layer de corte
+            fixed_cut_layer = self.auto_fix_geometries(cut_layer, "bioma_amazonia")
+            if not fixed_cut_layer:
+                fixed_cut_layer = cut_layer
+            
+            # Aplica corte em cada layer processada
+            clipped_layers = []
+            
+            for i, layer in enumerate(self.processing_layers):
+                if layer.customProperty('desagrega_recortada'):
+                    clipped_layers.append(layer)
+                    continue
+                
+                print(f"🌳 DEBUG: Cortando layer {i+1}/{len(self.processing_layers)} pelo bioma Amazônia...")
+                
+                fixed_data_layer = self.auto_fix_geometries(layer, f"dados_{i}")
+                if not fixed_data_layer:
+                    fixed_data_layer = layer
+                
+                clipped_layer = self.clip_layer(fixed_data_layer, fixed_cut_layer)
+                
+                if clipped_layer:
+                    clipped_layers.append(clipped_layer)
+                    print(f"✅ DEBUG: Layer cortada pelo bioma: {clipped_layer.featureCount()} feições")
+                else:
+                    print(f"❌ DEBUG: Falha ao cortar layer pelo bioma")
+            
+            if clipped_layers:
+                self.processing_layers = clipped_layers
+            
+            return
+        
+        # Se chegou aqui, precisa fazer corte espacial
+        self.update_notes(f"✂️ Aplicando recorte espacial | Opção: {self.get_cut_option_name()}", "status")
+        
+        # Obtém layer de corte
+        cut_layer = self.get_cut_layer()
+        
+        if not cut_layer:
+            raise Exception("Falha ao obter layer de corte espacial")
+        
+        print(f"🔄 DEBUG: Aplicando corte espacial com {cut_layer.name()}")
+        
+        # CORREÇÃO 2: Aplica fixgeometries automaticamente em ambas as layers
+        print(f"🔧 DEBUG: Aplicando fixgeometries nas layers...")
+        
+        # Fix geometries na layer de corte
+        fixed_cut_layer = self.auto_fix_geometries(cut_layer, "corte")
+        if not fixed_cut_layer:
+            print(f"⚠️ DEBUG: Falha no fix da layer de corte, usando original")
+            fixed_cut_layer = cut_layer
+        
+        # Aplica corte em cada layer processada
+        clipped_layers = []
+        
+        for i, layer in enumerate(self.processing_layers):
+            if layer.customProperty('desagrega_recortada'):
+                print(f"✂️ DEBUG: Layer {layer.name()} já recortada durante o download")
+                clipped_layers.append(layer)
+                continue
+            
+            print(f"✂️ DEBUG: Cortando layer {i+1}/{len(self.processing_layers)}: {layer.name()}...")
+            
+            # Fix geometries na layer de dados
+            fixed_data_layer = self.auto_fix_geometries(layer, f"dados_{i}")
+            if not fixed_data_layer:
+                print(f"⚠️ DEBUG: Falha no fix da layer de dados {i}, usando original")
+                fixed_data_layer = layer
+            
+            # Aplica corte com layers corrigidas
+            clipped_layer = self.clip_layer(fixed_data_layer, fixed_cut_layer)
+            
+            if clipped_layer:
+                clipped_layers.append(clipped_layer)
+                print(f"✅ DEBUG: Layer cortada: {clipped_layer.featureCount()} feições")
+            else:
+                print(f"❌ DEBUG: Falha ao cortar layer {layer.name()}")
+        
+        if not clipped_layers:
+            raise Exception("Nenhuma layer foi cortada com sucesso")
+        
+        self.processing_layers = clipped_layers
+
+    def auto_fix_geometries(self, layer, layer_type):
+        """Aplica fixgeometries automaticamente sem avisar o usuário"""
+        if getattr(self.download_worker_state, 'fix_deferred', None) is not None:
+            # Durante o download: a correção fica para a etapa 'correcao' do grafo
+            self.download_worker_state.fix_deferred = True
+            return layer
+        
+        try:
+            import processing
+            
+            print(f"🔧 DEBUG: Aplicando fixgeometries na layer {layer_type}...")
+            
+            # Executa fixgeometries
+            fixed_result = processing.run("native:fixgeometries", {
+                'INPUT': layer,
+                'OUTPUT': self.get_work_store_output(layer, "fixed")
+            })
+            
+            fixed_layer = self.load_processing_output(fixed_result['OUTPUT'], f"{layer.name()}_fixed")
+            
+            if fixed_layer and fixed_layer.isValid():
+                original_count = layer.featureCount()
+                fixed_count = fixed_layer.featureCount()
+                
+                # NOVO: Registra processamento com detalhes sobre perda
+                if fixed_count < original_count:
+                    loss_count = original_count - fixed_count
+                    loss_percent = (loss_count / original_count) * 100
+                    self.add_processing_log(
+                        "CORREÇÃO DE GEOMETRIAS",
+                        f"{original_count} feições antes e {fixed_count} feições depois (PERDA: {loss_count} polígonos inválidos removidos - {loss_percent:.1f}%)"
+                    )
+                elif fixed_count > original_count:
+                    gain_count = fixed_count - original_count
+                    self.add_processing_log(
+                        "CORREÇÃO DE GEOMETRIAS",
+                        f"{original_count} feições antes e {fixed_count} feições depois (GANHO: {gain_count} polígonos corrigidos/divididos)"
+                    )
+                else:
+                    self.add_processing_log(
+                        "CORREÇÃO DE GEOMETRIAS",
+                        f"{original_count} feições antes e {fixed_count} feições depois (SEM PERDA: todas as geometrias já eram válidas)"
+                    )
+                
+                print(f"✅ DEBUG: Fixgeometries aplicado na layer {layer_type}")
+                print(f"   Feições: {original_count} → {fixed_count}")
+                
+                # Define nome para a layer corrigida
+                fixed_layer.setName(f"{layer.name()}_fixed")
+                
+                return fixed_layer
+            else:
+                print(f"⚠️ DEBUG: Fixgeometries falhou para layer {layer_type}")
+                return None
+                
+        except Exception as e:
+            print(f"⚠️ DEBUG: Erro no fixgeometries da layer {layer_type}: {str(e)}")
+            return None
+
+    def clip_layer(self, input_layer, clip_layer, log_processing=True):
+        """Aplica corte espacial usando processing"""
+        try:
+            import processing
+            
+            # Verifica se as layers são válidas
+            if not input_layer.isValid() or not clip_layer.isValid():
+                return None
+            
+            # Verifica se há geometrias
+            if input_layer.featureCount() == 0 or clip_layer.featureCount() == 0:
+                return None
+            
+            # Executa algoritmo de clip
+            result = processing.run("native:clip", {
+                'INPUT': input_layer,
+                'OVERLAY': clip_layer,
+                'OUTPUT': self.get_work_store_output(input_layer, "clipped")
+            })
+            
+            if not result or 'OUTPUT' not in result:
+                return None
+            
+            clipped_layer = self.load_processing_output(result['OUTPUT'], f"{input_layer.name()}_clipped")
+            
+            if not clipped_layer or not clipped_layer.isValid():
+                return None
+            
+            feature_count = clipped_layer.featureCount()
+            original_count = input_layer.featureCount()
+            
+            # NOVO: Registra processamento apenas se solicitado
+            if log_processing:
+                if feature_count == 0:
+                    self.add_processing_log(
+                        "CORTE ESPACIAL",
+                        f"{original_count} feições → 0 feições (área fora do polígono de corte)"
+                    )
+                else:
+                    reduction_percent = ((original_count - feature_count) / original_count) * 100 if original_count > 0 else 0
+                    self.add_processing_log(
+                        "CORTE ESPACIAL",
+                        f"{original_count} feições → {feature_count} feições (redução de {reduction_percent:.1f}%)"
+                    )
+            
+            if feature_count == 0:
+                # Retorna layer vazia mas válida
+                clipped_layer.setName(f"{input_layer.name()}_clipped_empty")
+                return clipped_layer
+            
+            clipped_layer.setName(f"{input_layer.name()}_clipped")
+            return clipped_layer
+                
+        except Exception as e:
+            from qgis.core import QgsMessageLog, Qgis
+            error_msg = f"❌ ERRO clip_layer: {str(e)}"
+            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
+            return None
+
+    def merge_processing_layers(self):
+        """Mescla processing_layers quando necessário (sem widgets; erro vira exceção)"""
+        if self.data_type == "acumulado" and len(self.processing_layers) > 1:
+            # Para acumulado, precisa mesclar accumulated + yearly
+            self.update_notes(f"🔄 Mesclando camadas | accumulated_deforestation + yearly_deforestation", "status")
+            
+            print(f"🔄 DEBUG: Mesclando {len(self.processing_layers)} layers para tipo acumulado")
+            
+            merged_layer = self.merge_layers(self.processing_layers)
+            
+            if merged_layer:
+                self.processing_layers = [merged_layer]
+                print(f"✅ DEBUG: Layers mescladas: {merged_layer.featureCount()} feições")
+            else:
+                raise Exception("Falha ao mesclar layers")
+                
+        else:
+            # Para incremental, usa apenas uma layer
+            self.update_notes(f"📊 Processando dados incrementais | {self.processing_layers[0].featureCount()} feições", "status")
+            print(f"📊 DEBUG: Tipo incremental - usando layer única")
+
+    def generate_theme_output_filename(self):
+        """Nome do arquivo de saída do tema com a seleção de corte atual"""
+        if self.selected_theme == "PRODES":
+            return self.generate_output_filename()
+        if self.selected_theme == "DETER":
+            return self.generate_deter_output_filename()
+        if self.selected_theme == "TERRACLASS":
+            return self.generate_terraclass_output_filename()
+        return self.generate_queimadas_output_filename()
+
+    def prepare_theme_stages(self):
+        """Entradas do grafo de etapas do tema selecionado (URLs, filtros, corte no servidor)
+        
+        Erros (serviço fora do ar, nada a baixar) viram exceção.
+        """
+        if self.selected_theme in ("PRODES", "DETER"):
+            if self.selected_theme == "PRODES":
+                self.urls_and_filters = self.build_urls_and_filters()
+            else:
+                self.urls_and_filters = self.build_deter_urls_and_filters()
+            print(f"🌐 DEBUG: URLs e filtros {self.selected_theme}: {self.urls_and_filters}")
+            
+            urls = self.urls_and_filters['urls']
+            layer_names = self.urls_and_filters['layer_names']
+            if not urls:
+                raise Exception(f"URLs {self.selected_theme} não disponíveis para {self.selected_biome}")
+            
+            self.update_notes(f"📊 Conectando ao servidor TerraBrasilis | Bioma: {self.selected_biome} | Tema: {self.selected_theme}", "status")
+            for url in urls:
+                if not self.test_wfs_connectivity(url):
+                    raise Exception(f"Falha na conectividade com serviços {self.selected_theme}")
+            
+            self.update_notes(f"📥 Baixando {len(urls)} camada(s) | {' + '.join(layer_names)}", "status")
+            
+            # Corte espacial resolvido uma vez e enviado ao servidor junto com o filtro temporal
+            self.wfs_cut_filter = self.build_wfs_cut_filter()
+            
+            profile = self.get_wfs_transfer_profile()
+            if profile['num_decimals'] or profile['simplify']:
+                self.add_processing_log("PERFIL DE TRANSFERÊNCIA", self.describe_wfs_transfer_profile())
+        
+        elif self.selected_theme == "TERRACLASS":
+            self.terraclass_download_info = self.build_terraclass_download_info()
+            print(f"🌐 DEBUG: Info de download TERRACLASS: {self.terraclass_download_info}")
+            if not self.terraclass_download_info:
+                raise Exception(f"TERRACLASS não encontrado para {self.terraclass_state}")
+            
+            self.update_notes(f"📥 Baixando TERRACLASS {self.terraclass_download_info['location']}...", "status")
+        
+        elif self.selected_theme == "ÁREA QUEIMADA":
+            self.queimadas_download_info = self.build_queimadas_download_info()
+            print(f"🌐 DEBUG: Info de download ÁREA QUEIMADA: {len(self.queimadas_download_info['urls'])} arquivos")
+            if not self.queimadas_download_info['urls']:
+                raise Exception("Nenhum arquivo encontrado para o período selecionado")
+            
+            # Informações detalhadas usadas por generate_metadata_file
+            self.queimadas_download_info_metadata = {
+                'urls': self.queimadas_download_info['urls'].copy(),
+                'months': self.queimadas_download_info['months'].copy(),
+                'base_url': self.queimadas_base_url,
+                'data_type': self.queimadas_data_type,
+                'year': getattr(self, 'queimadas_year', None),
+                'month': getattr(self, 'queimadas_month', None)
+            }
+        
+        else:
+            raise Exception(f"Processamento para {self.selected_theme} não implementado")
+
+    def get_stage_memo_root(self):
+        """Pasta dos resultados memorizados das etapas (no cache do plugin)"""
+        return os.path.join(tempfile.gettempdir(), 'DesagregaBiomasBR', 'etapas')
+
+    def get_stage_graph(self):
+        """Grafo de etapas do tema selecionado (download → correção → corte → mesclagem)
+        
+        Cada etapa declara nome, função de trabalho (recebe a QgsTask ou
+        None), parâmetros que entram na chave e rótulo de andamento. 'memo':
+        False marca a etapa cujo cache já é chaveado por conta própria
+        (armazenamentos locais e checkpoints WFS do PRODES/DETER): ela não
+        grava resultado, mas a chave calculada depois dela continua a cadeia.
+        Formato de saída, destino e 'adicionar ao mapa' não são parâmetros de
+        nenhuma etapa: mudá-los reaproveita tudo até o salvamento.
+        """
+        if self.selected_theme in ("PRODES", "DETER"):
+            return [
+                {'name': 'download', 'run': self.stage_download_wfs, 'params': self.get_wfs_download_params,
+                 'label': "📥 Baixando dados do servidor...", 'memo': False},
+                {'name': 'correcao', 'run': self.stage_fix_geometries, 'params': lambda: {},
+                 'label': "🔧 Corrigindo geometrias..."},
+                {'name': 'corte', 'run': lambda task: self.cut_processing_layers(),
+                 'params': lambda: {
+                     'cut_option': getattr(self, 'cut_option', None),
+                     'cut': self.wfs_cut_key,
+                     'amazonia_biome_cut': getattr(self, '_needs_amazonia_biome_cut', False)
+                 },
+                 'label': "✂️ Realizando corte espacial..."},
+                {'name': 'mesclagem', 'run': lambda task: self.merge_processing_layers(),
+                 'params': lambda: {'data_type': getattr(self, 'data_type', None)},
+                 'label': "🔄 Mesclando dados..."}
+            ]
+        
+        if self.selected_theme == "TERRACLASS":
+            return [
+                {'name': 'download', 'run': self.stage_download_terraclass,
+                 'params': lambda: {'url': self.terraclass_download_info['url']},
+                 'label': "📥 Baixando arquivo TERRACLASS..."}
+            ]
+        
+        if self.selected_theme == "ÁREA QUEIMADA":
+            cut_key = self.get_cut_key()
+            return [
+                {'name': 'download', 'run': self.stage_download_queimadas,
+                 'params': lambda: {'urls': self.queimadas_download_info['urls']},
+                 'label': "📥 Baixando arquivos de área queimada..."},
+                {'name': 'mesclagem', 'run': self.stage_merge_queimadas,
+                 'params': lambda: {'data_type': self.queimadas_data_type},
+                 'label': "🔄 Unindo dados de área queimada..."},
+                {'name': 'corte_bioma', 'run': self.stage_cut_queimadas_biome,
+                 'params': lambda: {'biome': self.selected_biome},
+                 'label': "✂️ Aplicando corte por bioma..."},
+                {'name': 'dissolucao', 'run': self.stage_dissolve_queimadas,
+                 'params': lambda: {'dissolve': self.should_dissolve_queimadas()},
+                 'label': "🔄 Dissolvendo áreas queimadas adjacentes..."},
+                {'name': 'corte', 'run': self.stage_additional_cut,
+                 'params': lambda: {'cut_option': getattr(self, 'cut_option', None), 'cut': cut_key},
+                 'label': "✂️ Aplicando corte espacial adicional..."}
+            ]
+        
+        raise Exception(f"Processamento para {self.selected_theme} não implementado")
+
+    def get_stage_key(self, previous_key, stage):
+        """Chave da etapa: hash da chave da etapa anterior, do nome e dos parâmetros
+        
+        None quando a etapa (ou alguma anterior) não pode ser memorizada.
+        """
+        import json
+        import hashlib
+        
+        if previous_key is None:
+            return None
+        params = stage['params']()
+        if params is None:
+            return None
+        key_source = json.dumps([previous_key, stage['name'], params], sort_keys=True, default=str)
+        return hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:16]
+
+    def start_stage_graph(self):
+        """Prepara a execução do grafo de etapas do tema (remove resultados expirados)"""
+        self.purge_wfs_checkpoints(self.get_stage_memo_root())
+        self.stage_graph = {
+            'stages': self.get_stage_graph(),
+            'position': 0,
+            'key': '' if self.stage_memo_enabled else None
+        }
+
+    def next_graph_stage(self):
+        """Próxima etapa a executar (None = grafo concluído)
+        
+        Antes, restaura o resultado memorizado mais adiantado entre as etapas
+        restantes cuja chave já pode ser calculada e pula as anteriores a ele.
+        """
+        graph = self.stage_graph
+        remaining = graph['stages'][graph['position']:]
+        
+        keys = []
+        key = graph['key']
+        for stage in remaining:
+            key = self.get_stage_key(key, stage)
+            keys.append(key)
+        
+        for offset in reversed(range(len(remaining))):
+            stage = remaining[offset]
+            if keys[offset] and stage.get('memo', True) and self.load_stage_memo(stage, keys[offset]):
+                graph['position'] += offset + 1
+                graph['key'] = keys[offset]
+                break
+        
+        if graph['position'] >= len(graph['stages']):
+            return None
+        return graph['stages'][graph['position']]
+
+    def run_graph_stage(self, stage, task=None):
+        """Executa uma etapa do grafo e memoriza o seu resultado
+        
+        As saídas do processing vão direto para o GeoPackage da pasta da
+        etapa (get_work_store_output) e arquivos extraídos para a própria
+        pasta (get_stage_work_dir): memorizar é só gravar o manifesto. Etapa
+        que devolve as mesmas camadas (ex.: corte sem opção de corte) não
+        grava nada. Erros viram exceção. Retorna True.
+        """
+        import shutil
+        
+        graph = self.stage_graph
+        key = self.get_stage_key(graph['key'], stage) if stage.get('memo', True) else None
+        stage_dir = os.path.join(self.get_stage_memo_root(), key) if key else None
+        stage_lock = get_store_lock(stage_dir) if stage_dir else None
+        if stage_lock and not stage_lock.acquire(blocking=False):
+            # Outro processamento simultâneo está gravando esta mesma etapa: roda sem memorizar
+            print(f"🧩 DEBUG: Etapa {stage['name']} ({key}) em gravação por outro processamento")
+            key = stage_dir = stage_lock = None
+        
+        try:
+            if stage_dir:
+                shutil.rmtree(stage_dir, ignore_errors=True)  # Resto de uma execução interrompida
+                os.makedirs(stage_dir, exist_ok=True)
+                self.stage_store_path = os.path.join(stage_dir, 'etapa.gpkg')
+                self.wfs_work_stores[self.stage_store_path] = 0
+            
+            input_ids = [layer.id() for layer in self.processing_layers]
+            try:
+                print(f"🧩 DEBUG: Etapa {stage['name']} ({key or 'sem memorização'})")
+                stage['run'](task)
+            finally:
+                self.stage_store_path = None
+            
+            # Chave recalculada: o download atualiza os armazenamentos locais que entram nela
+            graph['key'] = self.get_stage_key(graph['key'], stage)
+            graph['position'] += 1
+            
+            if stage_dir:
+                changed = [layer.id() for layer in self.processing_layers] != input_ids
+                if not changed or graph['key'] != key or not self.save_stage_memo(stage, key):
+                    shutil.rmtree(stage_dir, ignore_errors=True)
+        finally:
+            if stage_lock:
+                stage_lock.release()
+        return True
+
+    def run_stage_graph(self, task=None):
+        """Executa o grafo de etapas inteiro na thread atual (Processing, QgsTask)
+        
+        Retorna False se o processamento foi abortado; erros de etapa viram exceção.
+        """
+        self.start_stage_graph()
+        stage = self.next_graph_stage()
+        while stage:
+            if self.check_abort_signal():
+                return False
+            self.update_notes(stage['label'], "status")
+            self.run_graph_stage(stage, task)
+            stage = self.next_graph_stage()
+        return not self.check_abort_signal()
+
+    def move_layers_to_main_thread(self):
+        """Entrega à thread principal as camadas de processing_layers criadas na thread atual (QgsTask)"""
+        main_thread = QgsApplication.instance().thread()
+        for layer in self.processing_layers:
+            if layer.thread() == QThread.currentThread() and layer.thread() != main_thread:
+                layer.moveToThread(main_thread)
+
+    def get_stage_work_dir(self):
+        """Pasta da etapa em andamento para arquivos extraídos (None = pasta temporária)"""
+        if not self.stage_store_path:
+            return None
+        return os.path.dirname(self.stage_store_path)
+
+    def save_stage_memo(self, stage, key):
+        """Grava o manifesto da etapa: origem e total de cada camada de saída e log
+        
+        Camadas em arquivos de caches chaveados (pastas das etapas e
+        checkpoints WFS) são só referenciadas. Camadas em memória ou em
+        arquivos temporários reaproveitados por outras execuções são gravadas
+        no GeoPackage da etapa. Retorna False se a etapa não pôde ser
+        memorizada.
+        """
+        import json
+        import datetime
+        
+        stage_dir = os.path.join(self.get_stage_memo_root(), key)
+        store_path = os.path.join(stage_dir, 'etapa.gpkg')
+        keyed_roots = (self.get_stage_memo_root() + os.sep, self.get_wfs_checkpoint_root() + os.sep)
+        
+        try:
+            layers = []
+            for n, layer in enumerate(self.processing_layers):
+                source = layer.source()
+                if layer.providerType() != 'ogr' or not source.startswith(keyed_roots):
+                    table = f"resultado_{n}"
+                    if not self.write_layer_table(layer, store_path, table):
+                        return False
+                    source = f"{store_path}|layername={table}"
+                
+                layers.append({
+                    'source': source,
+                    'name': layer.name(),
+                    'features': layer.featureCount(),
+                    'crs': layer.crs().authid(),
+                    'properties': {name: True for name in ('desagrega_recortada', 'desagrega_correcao_pendente') if layer.customProperty(name)}
+                })
+            
+            manifest = {
+                'stage': stage['name'],
+                'layers': layers,
+                'processing_log': self.processing_log,
+                'created_at': datetime.datetime.now().isoformat()
+            }
+            manifest_path = os.path.join(stage_dir, 'manifest.json')
+            temp_path = manifest_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, manifest_path)
+            print(f"💾 DEBUG: Etapa {stage['name']} memorizada: {stage_dir}")
+            return True
+            
+        except Exception as e:
+            print(f"⚠️ DEBUG: Falha ao memorizar a etapa {stage['name']}: {str(e)}")
+            return False
+
+    def load_stage_memo(self, stage, key):
+        """Restaura camadas e log de processamentos de uma etapa memorizada
+        
+        Retorna True quando todas as camadas do manifesto abriram com o mesmo
+        total de feições.
+        """
+        import json
+        
+        manifest_path = os.path.join(self.get_stage_memo_root(), key, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return False
+        
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            
+            layers = []
+            for entry in manifest['layers']:
+                layer = QgsVectorLayer(entry['source'], entry['name'], "ogr")
+                if not layer.isValid() or layer.featureCount() != entry['features']:
+                    print(f"⚠️ DEBUG: Etapa {stage['name']} memorizada inconsistente - processando novamente")
+                    return False
+                if entry['crs'] and layer.crs().authid() != entry['crs']:
+                    layer.setCrs(QgsCoordinateReferenceSystem(entry['crs']))
+                for name, value in entry['properties'].items():
+                    layer.setCustomProperty(name, value)
+                layers.append(layer)
+            
+            self.processing_layers = layers
+            self.processing_log = manifest['processing_log']
+            total = sum(entry['features'] for entry in manifest['layers'])
+            self.add_processing_log(
+                "REAPROVEITAMENTO DE ETAPAS",
+                f"Etapas até '{stage['name']}' reaproveitadas de {manifest['created_at'][:16].replace('T', ' ')} (mesmas entradas, {total} feições)"
+            )
+            
+            print(f"♻️ DEBUG: Etapa {stage['name']} reaproveitada: {total} feições")
+            self.update_notes(f"♻️ Reaproveitando etapas até '{stage['name']}' ({total} feições)", "status")
+            return True
+            
+        except Exception as e:
+            print(f"⚠️ DEBUG: Falha ao ler etapa memorizada: {str(e)}")
+            return False
+
+    def write_layer_table(self, layer, store_path, table):
+        """Grava a camada como tabela de um GeoPackage (cria o arquivo ou acrescenta a tabela)"""
+        from qgis.core import QgsVectorFileWriter
+        
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "GPKG"
+        options.fileEncoding = "UTF-8"
+        options.layerName = table
+        if os.path.exists(store_path):
+            options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
+        
+        error = QgsVectorFileWriter.writeAsVectorFormatV3(layer, store_path, layer.transformContext(), options)
+        if error[0] != QgsVectorFileWriter.NoError:
+            print(f"❌ DEBUG: Erro ao gravar tabela {table}: {error[1]}")
+            return False
+        return True
+
+    def get_stage_memo_sources(self):
+        """Estado dos armazenamentos locais que alimentam o download (parte da chave)
+        
+        PRODES anual: feições e data de download de cada ano pedido no
+        armazenamento de anos (ano ausente vira None e é baixado). DETER:
+        última view_date e total de alertas do armazenamento. Retorna None
+        quando o download não pode ser memorizado: DETER cujo período chega à
+        janela de sobreposição (cada sincronização pode trazer alertas novos
+        ou publicados com atraso).
+        """
+        import datetime
+        
+        urls = self.urls_and_filters.get('urls', [])
+        layer_names = self.urls_and_filters.get('layer_names', [])
+        year_ranges = self.urls_and_filters.get('year_ranges') or []
+        
+        if self.selected_theme == 'DETER':
+            recent = datetime.date.today() - datetime.timedelta(days=self.deter_sync_overlap_days)
+            if datetime.date(int(self.deter_end_year), 12, 31) >= recent:
+                return None
+        
+        sources = []
+        for i, (url, layer_name) in enumerate(zip(urls, layer_names)):
+            property_names = self.get_wfs_attribute_selection(layer_name)
+            year_range = year_ranges[i] if i < len(year_ranges) else None
+            if self.selected_theme == 'DETER':
+                manifest = self.open_deter_store(url, property_names)['manifest']
+                sources.append([manifest['last_view_date'], manifest['features']])
+            elif year_range:
+                years = self.open_prodes_year_store(url, property_names)['manifest']['years']
+                sources.append({str(year): years.get(str(year)) for year in range(year_range[0], year_range[1] + 1)})
+            else:
+                sources.append(None)  # Download direto: validade dada pela limpeza dos resultados memorizados
+        return sources
+
+    def get_wfs_download_params(self):
+        """Parâmetros da etapa de download WFS (None = não memorizável)
+        
+        URLs e filtros, atributos, perfil de transferência, geometria de
+        corte enviada ao servidor e estado dos armazenamentos locais
+        (get_stage_memo_sources).
+        """
+        sources = self.get_stage_memo_sources()
+        if sources is None:
+            return None
+        return {
+            'theme': self.selected_theme,
+            'biome': self.selected_biome,
+            'urls_and_filters': self.urls_and_filters,
+            'attributes': {name: self.get_wfs_attribute_selection(name) for name in self.urls_and_filters.get('layer_names', [])},
+            'transfer': self.get_wfs_transfer_key(),
+            'cut': self.wfs_cut_key,
+            'streaming_clip': self.wfs_streaming_clip,
+            'sources': sources
+        }
+
+    def stage_download_wfs(self, task=None):
+        """Etapa de download PRODES/DETER: camadas de urls_and_filters (correção pendente)"""
+        jobs = list(enumerate(zip(self.urls_and_filters['urls'], self.urls_and_filters['filters'], self.urls_and_filters['layer_names'])))
+        results = list(self.download_stage_layers(jobs, task))
+        results += [(None, False)] * (len(jobs) - len(results))
+        if self.check_abort_signal():
+            return
+        
+        layers = []
+        for (layer, fix_deferred), (i, (url, filter_str, layer_name)) in zip(results, jobs):
+            if not layer or not layer.isValid() or layer.featureCount() == 0:
+                raise Exception(f"Falha ao baixar camada {layer_name}")
+            if fix_deferred:
+                layer.setCustomProperty('desagrega_correcao_pendente', True)
+            layers.append(layer)
+            print(f"✅ DEBUG: Camada {layer_name} baixada: {layer.featureCount()} feições")
+        
+        self.processing_layers = layers
+        self.log_http_session_stats()
+
+    def stage_fix_geometries(self, task=None):
+        """Etapa de correção: fixgeometries nas camadas baixadas com correção pendente"""
+        fixed_layers = []
+        for layer in self.processing_layers:
+            if layer.customProperty('desagrega_correcao_pendente'):
+                fixed_layer = self.auto_fix_geometries(layer, f"{layer.name()}_downloaded")
+                if fixed_layer and fixed_layer.isValid():
+                    fixed_layer.setCrs(QgsCoordinateReferenceSystem("EPSG:4674"))
+                    if layer.customProperty('desagrega_recortada'):
+                        fixed_layer.setCustomProperty('desagrega_recortada', True)
+                    layer = fixed_layer
+                else:
+                    layer.removeCustomProperty('desagrega_correcao_pendente')
+            fixed_layers.append(layer)
+        self.processing_layers = fixed_layers
+
+    def merge_layers(self, layers):
+        """Mescla múltiplas layers em uma só"""
+        try:
+            import processing
+            
+            print(f"🔄 DEBUG: Mesclando {len(layers)} layers")
+            
+            if len(layers) == 1:
+                return layers[0]
+            
+            # Executa merge
+            result = processing.run("native:mergevectorlayers", {
+                'LAYERS': layers,
+                'CRS': layers[0].crs(),
+                'OUTPUT': self.get_work_store_output(layers[0], "merged")
+            })
+            
+            merged_layer = self.load_processing_output(result['OUTPUT'], f"{layers[0].name()}_merged")
+            
+            if merged_layer and merged_layer.isValid():
+                merged_layer.setName(f"PRODES_{self.selected_biome}_merged")
+                
+                # NOVO: Registra processamento
+                total_features = sum(layer.featureCount() for layer in layers)
+                merged_count = merged_layer.featureCount()
+                self.add_processing_log(
+                    "UNIÃO DE CAMADAS",
+                    f"{len(layers)} camadas unidas → {merged_count} feições totais"
+                )
+                
+                print(f"✅ DEBUG: Merge executado com sucesso")
+                return merged_layer
+            else:
+                print(f"❌ DEBUG: Resultado do merge inválido")
+                return None
+                
+        except Exception as e:
+            print(f"❌ ERROR merge_layers: {str(e)}")
+            return None
+
+    def add_result_to_map(self):
+        """Carrega final_file_path no projeto (só na thread principal)
+        
+        TERRACLASS recebe a simbologia do estilo_terraclass.qml. Retorna a
+        camada adicionada ou None.
+        """
+        layer_name = os.path.splitext(os.path.basename(self.final_file_path))[0]
+        print(f"🗺️ DEBUG: Adicionando {self.final_file_path} ao QGIS como '{layer_name}'")
+        
+        # Preserva a projeção original dos dados (sem setCrs)
+        layer = QgsVectorLayer(self.final_file_path, layer_name, "ogr")
+        if not layer.isValid():
+            print(f"⚠️ DEBUG: Falha ao carregar layer no QGIS (arquivo foi salvo)")
+            return None
+        
+        QgsProject.instance().addMapLayer(layer)
+        if self.selected_theme == "TERRACLASS":
+            self.apply_terraclass_style(layer)
+        
+        # Zoom para a extensão da layer
+        try:
+            from qgis.utils import iface
+            iface.mapCanvas().setExtent(layer.extent())
+            iface.mapCanvas().refresh()
+        except:
+            print(f"✅ DEBUG: Layer adicionada (zoom não ajustado)")
+        return layer
+
+    def save_layer_to_file(self, layer, file_path, format_name):
+        """Salva layer em arquivo"""
+        try:
+            from qgis.core import QgsVectorFileWriter
+            
+            print(f"💾 DEBUG: Salvando layer {layer.name()} em {file_path}")
+            
+            # Cria pasta se não existir
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            
+            # Configura opções de salvamento
+            options = QgsVectorFileWriter.SaveVectorOptions()
+            options.driverName = format_name
+            options.fileEncoding = "UTF-8"
+            
+            # Salva o arquivo
+            error = QgsVectorFileWriter.writeAsVectorFormatV3(
+                layer,
+                file_path,
+                layer.transformContext(),
+                options
+            )
+            
+            if error[0] == QgsVectorFileWriter.NoError:
+                print(f"✅ DEBUG: Arquivo salvo com sucesso")
+                return True
+            else:
+                print(f"❌ DEBUG: Erro ao salvar: {error[1]}")
+                return False
+                
+        except Exception as e:
+            print(f"❌ ERROR save_layer_to_file: {str(e)}")
+            return False
+
+    def generate_metadata_file(self, metadata_path):
+        """Gera arquivo de metadados em formato texto"""
+        try:
+            from datetime import datetime
+            
+            metadata_content = []
+            metadata_content.append("=" * 60)
+            metadata_content.append(f"METADADOS DO PROCESSAMENTO {self.selected_theme}")
+            metadata_content.append("Plugin DesagregaBiomasBR")
+            metadata_content.append("=" * 60)
+            metadata_content.append("")
+            
+            # Texto introdutório específico por tema
+            if self.selected_theme == "PRODES":
+                period_text = ""
+                if hasattr(self, 'data_type') and self.data_type and hasattr(self, 'start_year') and hasattr(self, 'end_year'):
+                    if self.data_type == "incremental" and self.start_year and self.end_year:
+                        if self.start_year == self.end_year:
+                            period_text = f"no ano de {self.start_year}"
+                        else:
+                            period_text = f"no período de {self.start_year} a {self.end_year}"
+                    elif self.data_type == "acumulado" and self.end_year:
+                        base_year = self.prodes_base_years.get(self.selected_biome, 2000)
+                        period_text = f"acumuladas de {base_year} até {self.end_year}"
+                
+                intro_text = f"Áreas desmatadas {period_text}. O mapeamento utiliza imagens do satélite "
+                intro_text += "Landsat ou similares, para registrar e quantificar as áreas desmatadas maiores que "
+                intro_text += "6,25 hectares. O PRODES considera como desmatamento a supressão da vegetação nativa, "
+                intro_text += "independentemente da futura utilização destas áreas."
+                
+            elif self.selected_theme == "ÁREA QUEIMADA":
+                intro_text = "O shapefile refere-se ao produto AQ1Km, que apresenta uma estimativa das áreas queimadas nos biomas brasileiros, "
+                intro_text += "gerado a partir de dados MODIS (coleção 6) dos satélites AQUA e TERRA. Trata-se de um produto de baixa resolução "
+                intro_text += "espacial (1 km), com cobertura diária e abordagem sinótica, voltado à identificação e ao monitoramento contínuo "
+                intro_text += "de áreas afetadas por queimadas."
+                
+            else:
+                intro_text = f"Processamento de dados {self.selected_theme} para análise ambiental."
+            
+            metadata_content.append("DESCRIÇÃO:")
+            metadata_content.append(intro_text)
+            metadata_content.append("")
+            
+            # Informações gerais
+            metadata_content.append("INFORMAÇÕES GERAIS:")
+            metadata_content.append(f"Data/Hora do processamento: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+            metadata_content.append(f"Tema: {self.selected_theme}")
+            metadata_content.append(f"Bioma: {self.selected_biome}")
+            metadata_content.append("")
+            
+            # Configurações temporais específicas por tema
+            metadata_content.append("CONFIGURAÇÕES TEMPORAIS:")
+            
+            if self.selected_theme == "PRODES":
+                metadata_content.append(f"Unidade temporal: Baseado na coluna 'year' dos dados")
+                metadata_content.append(f"Tipo de dados: {getattr(self, 'data_type', 'N/A')}")
+                
+                if hasattr(self, 'start_year') and hasattr(self, 'end_year'):
+                    if self.data_type == "incremental":
+                        metadata_content.append(f"Período: {self.start_year} - {self.end_year}")
+                    elif self.data_type == "acumulado":
+                        base_year = self.prodes_base_years.get(self.selected_biome, 2000)
+                        metadata_content.append(f"Período: {base_year} - {self.end_year} (acumulado)")
+                        
+            elif self.selected_theme == "ÁREA QUEIMADA":
+                metadata_content.append(f"Unidade temporal: Dados mensais")
+                metadata_content.append(f"Tipo de dados: {getattr(self, 'queimadas_data_type', 'N/A')}")
+                
+                if hasattr(self, 'queimadas_data_type') and self.queimadas_data_type:
+                    if self.queimadas_data_type == "anual" and hasattr(self, 'queimadas_year') and self.queimadas_year:
+                        metadata_content.append(f"Período: Janeiro de {self.queimadas_year} a Dezembro de {self.queimadas_year}")
+                        # Calcula quantos meses foram processados
+                        months_count = len([m for m in self.queimadas_months if m.startswith(f"{self.queimadas_year:04d}_")])
+                        metadata_content.append(f"Arquivos processados: {months_count} meses unidos")
+                    elif self.queimadas_data_type == "mensal" and hasattr(self, 'queimadas_month') and self.queimadas_month:
+                        year, month, _ = self.queimadas_month.split('_')
+                        metadata_content.append(f"Período: {month}/{year}")
+                        metadata_content.append(f"Arquivos processados: 1 arquivo mensal")
+                        
+            elif self.selected_theme == "DETER":
+                metadata_content.append(f"Unidade temporal: Baseado na coluna 'view_date' dos dados")
+                if hasattr(self, 'deter_start_year') and hasattr(self, 'deter_end_year'):
+                    metadata_content.append(f"Período: {self.deter_start_year} - {self.deter_end_year}")
+                if hasattr(self, 'deter_selected_classes') and self.deter_selected_classes:
+                    metadata_content.append(f"Classes selecionadas: {', '.join(self.deter_selected_classes)}")
+                    
+            elif self.selected_theme == "TERRACLASS":
+                metadata_content.append(f"Unidade temporal: Anual")
+                if hasattr(self, 'terraclass_year') and self.terraclass_year:
+                    metadata_content.append(f"Ano: {self.terraclass_year}")
+                    
+            metadata_content.append("")
+            
+            # Filtros aplicados - específico por tema
+            metadata_content.append("FILTROS APLICADOS:")
+            if self.selected_theme == "ÁREA QUEIMADA":
+                # Para ÁREA QUEIMADA, os filtros são automáticos (bioma + período)
+                metadata_content.append(f"Filtro espacial automático: Bioma {self.selected_biome}")
+                metadata_content.append("Observação: Dados originais cobrem todo o Brasil, corte por bioma aplicado automaticamente")
+                if hasattr(self, 'queimadas_download_info_metadata') and self.queimadas_download_info_metadata:
+                    if self.queimadas_download_info_metadata['data_type'] == 'anual':
+                        metadata_content.append(f"Filtro temporal: Ano {self.queimadas_download_info_metadata['year']}")
+                    else:
+                        metadata_content.append(f"Filtro temporal: Mês específico")
+            else:
+                # Para PRODES, DETER, TERRACLASS usa o formato original
+                if hasattr(self, 'urls_and_filters') and self.urls_and_filters:
+                    for i, filter_str in enumerate(self.urls_and_filters['filters']):
+                        if filter_str:
+                            clean_filter = filter_str.replace('%20', ' ').replace('%27', "'")
+                            metadata_content.append(f"Camada {i+1}: {clean_filter}")
+                        else:
+                            metadata_content.append(f"Camada {i+1}: Sem filtro")
+                else:
+                    metadata_content.append("Nenhum filtro específico aplicado")
+            metadata_content.append("")
+            
+            # NOVO: Corte espacial detalhado
+            metadata_content.append("CORTE ESPACIAL:")
+            
+            if self.selected_theme == "ÁREA QUEIMADA":
+                # Para ÁREA QUEIMADA sempre há corte por bioma
+                metadata_content.append("1. Corte automático por bioma (sempre aplicado):")
+                metadata_content.append(f"   - Bioma selecionado: {self.selected_biome}")
+                metadata_content.append(f"   - Shapefile de referência: {self.ibge_shapefile_name}")
+                if self.selected_biome == 'Amazônia Legal':
+                    metadata_content.append(f"   - Coluna utilizada: regiao = 'Amazônia Legal'")
+                else:
+                    metadata_content.append(f"   - Coluna utilizada: bioma = '{self.selected_biome}'")
+                
+                # Verifica se há corte adicional
+                if hasattr(self, 'cut_option') and self.cut_option is not None and self.cut_option != 0:
+                    metadata_content.append("")
+                    metadata_content.append("2. Corte adicional (configurado pelo usuário):")
+                    if self.cut_option == 1:
+                        metadata_content.append("   - Tipo: Layer do QGIS")
+                        if hasattr(self, 'selected_layer') and self.selected_layer:
+                            metadata_content.append(f"   - Nome da layer: {self.selected_layer.name()}")
+                            metadata_content.append(f"   - Número de feições: {self.selected_layer.featureCount()}")
+                            metadata_content.append(f"   - Sistema de coordenadas da layer: {self.selected_layer.crs().authid()} - {self.selected_layer.crs().description()}")
+                            
+                            if hasattr(self, 'selected_field') and self.selected_field:
+                                metadata_content.append(f"   - Campo utilizado: {self.selected_field}")
+                                if hasattr(self, 'selected_element') and self.selected_element:
+                                    metadata_content.append(f"   - Elemento selecionado: {self.selected_element}")
+                    elif self.cut_option == 2:
+                        metadata_content.append("   - Tipo: Retângulo desenhado")
+                        if hasattr(self, 'drawn_rectangle') and self.drawn_rectangle:
+                            metadata_content.append(f"   - Coordenadas: ({self.drawn_rectangle.xMinimum():.6f}, {self.drawn_rectangle.yMinimum():.6f}) - ({self.drawn_rectangle.xMaximum():.6f}, {self.drawn_rectangle.yMaximum():.6f})")
+                    elif self.cut_option == 3:
+                        metadata_content.append("   - Tipo: IBGE")
+                        metadata_content.append(f"   - Shapefile: {self.ibge_shapefile_name}")
+                        if self.ibge_state:
+                            metadata_content.append(f"   - Estado: {self.ibge_state}")
+                            if self.ibge_municipality:
+                                metadata_content.append(f"   - Município: {self.ibge_municipality}")
+                else:
+                    metadata_content.append("")
+                    metadata_content.append("2. Corte adicional: Nenhum (apenas corte por bioma aplicado)")
+                    
+            else:
+                # Para outros temas (PRODES, DETER, TERRACLASS) mantém lógica original
+                if hasattr(self, 'cut_option'):
+                    if self.cut_option == 0:
+                        metadata_content.append("Tipo: Sem corte (bioma completo)")
+                    elif self.cut_option == 1:
+                        metadata_content.append("Tipo: Layer do QGIS")
+                        if hasattr(self, 'selected_layer') and self.selected_layer:
+                            metadata_content.append(f"Nome da layer: {self.selected_layer.name()}")
+                            metadata_content.append(f"Número de feições: {self.selected_layer.featureCount()}")
+                            metadata_content.append(f"Sistema de coordenadas da layer: {self.selected_layer.crs().authid()} - {self.selected_layer.crs().description()}")
+                            
+                            if hasattr(self, 'selected_field') and self.selected_field:
+                                metadata_content.append(f"Campo utilizado: {self.selected_field}")
+                                if hasattr(self, 'selected_element') and self.selected_element:
+                                    metadata_content.append(f"Elemento selecionado: {self.selected_element}")
+                    elif self.cut_option == 2:
+                        metadata_content.append("Tipo: Retângulo desenhado")
+                        if hasattr(self, 'drawn_rectangle') and self.drawn_rectangle:
+                            metadata_content.append(f"Coordenadas: ({self.drawn_rectangle.xMinimum():.6f}, {self.drawn_rectangle.yMinimum():.6f}) - ({self.drawn_rectangle.xMaximum():.6f}, {self.drawn_rectangle.yMaximum():.6f})")
+                    elif self.cut_option == 3:
+                        metadata_content.append("Tipo: IBGE")
+                        metadata_content.append(f"Shapefile: {self.ibge_shapefile_name}")
+                        metadata_content.append(f"Bioma/Região: {self.selected_biome} (já filtrado)")
+                        if self.ibge_state:
+                            metadata_content.append(f"Estado: {self.ibge_state}")
+                            if self.ibge_municipality:
+                                metadata_content.append(f"Município: {self.ibge_municipality}")
+                                
+            metadata_content.append("")
+            
+            # Perfil de transferência do WFS (precisão das coordenadas)
+            if self.selected_theme in ["PRODES", "DETER"]:
+                metadata_content.append("PERFIL DE TRANSFERÊNCIA:")
+                metadata_content.append(self.describe_wfs_transfer_profile())
+                metadata_content.append("")
+            
+            # URLs utilizadas - específico por tema
+            metadata_content.append("URLS DOS SERVIÇOS:")
+            
+            if self.selected_theme == "ÁREA QUEIMADA":
+                # Para ÁREA QUEIMADA, lista as URLs dos ZIPs baixados
+                if hasattr(self, 'queimadas_download_info_metadata') and self.queimadas_download_info_metadata:
+                    metadata_content.append(f"Servidor base: {self.queimadas_download_info_metadata['base_url']}")
+                    metadata_content.append(f"Arquivos baixados: {len(self.queimadas_download_info_metadata['urls'])} ZIPs")
+                    # Lista alguns exemplos das URLs
+                    for i, url in enumerate(self.queimadas_download_info_metadata['urls'][:3]):  # Primeiros 3
+                        month = self.queimadas_download_info_metadata['months'][i]
+                        metadata_content.append(f"  Exemplo {i+1}: {url}")
+                    if len(self.queimadas_download_info_metadata['urls']) > 3:
+                        metadata_content.append(f"  ... e mais {len(self.queimadas_download_info_metadata['urls']) - 3} arquivos")
+            else:
+                # Para PRODES, DETER, TERRACLASS usa o formato original
+                if hasattr(self, 'urls_and_filters') and self.urls_and_filters:
+                    for i, (url, layer_name) in enumerate(zip(self.urls_and_filters['urls'], self.urls_and_filters['layer_names'])):
+                        metadata_content.append(f"{layer_name}: {url}")
+                        
+            metadata_content.append("")
+            
+            # NOVO: Informações do arquivo final com sistema de coordenadas
+            metadata_content.append("ARQUIVO RESULTANTE:")
+            metadata_content.append(f"Nome: {self.output_filename}")
+            metadata_content.append(f"Caminho: {getattr(self, 'final_file_path', 'N/A')}")
+            metadata_content.append(f"Formato: {'Shapefile' if getattr(self, 'final_file_path', '').lower().endswith('.shp') else 'GeoPackage'}")
+            
+            if hasattr(self, 'processing_layers') and self.processing_layers:
+                final_layer = self.processing_layers[0]
+                metadata_content.append(f"Número de feições: {final_layer.featureCount()}")
+                metadata_content.append(f"Sistema de coordenadas: EPSG:4674 - SIRGAS 2000")
+                metadata_content.append(f"Tipo de geometria: {QgsWkbTypes.displayString(final_layer.wkbType())}")
+                
+                # Extensão geográfica
+                extent = final_layer.extent()
+                if not extent.isEmpty():
+                    metadata_content.append(f"Extensão geográfica:")
+                    metadata_content.append(f"  Longitude mínima: {extent.xMinimum():.6f}")
+                    metadata_content.append(f"  Longitude máxima: {extent.xMaximum():.6f}")
+                    metadata_content.append(f"  Latitude mínima: {extent.yMinimum():.6f}")
+                    metadata_content.append(f"  Latitude máxima: {extent.yMaximum():.6f}")
+                    
+                # Campos da tabela
+                fields = final_layer.fields()
+                if len(fields) > 0:
+                    metadata_content.append(f"Campos da tabela:")
+                    for field in fields:
+                        metadata_content.append(f"  {field.name()}: {field.typeName()}")
+            
+            # Informações específicas por tema
+            if self.selected_theme == "ÁREA QUEIMADA":
+                metadata_content.append("")  # NOVO: Linha em branco antes da seção específica
+                metadata_content.append("INFORMAÇÕES ESPECÍFICAS DO PRODUTO AQ1KM:")
+                metadata_content.append("")
+                
+                metadata_content.append("Título:")
+                metadata_content.append("Produto AQ1Km – Áreas Queimadas com Resolução Espacial de 1 km")
+                metadata_content.append("")
+                
+                # Adiciona período específico baseado no processamento
+                periodo_temporal = "Dados mensais"
+                if hasattr(self, 'queimadas_download_info_metadata') and self.queimadas_download_info_metadata:
+                    if self.queimadas_download_info_metadata['data_type'] == 'anual':
+                        ano = self.queimadas_download_info_metadata['year']
+                        periodo_temporal = f"Janeiro de {ano} a Dezembro de {ano}"
+                    elif self.queimadas_download_info_metadata['data_type'] == 'mensal':
+                        mes_data = self.queimadas_download_info_metadata.get('month', '')
+                        if mes_data:
+                            year, month, _ = mes_data.split('_')
+                            periodo_temporal = f"{month}/{year}"
+                
+                metadata_content.append("Cobertura Temporal:")
+                metadata_content.append(periodo_temporal)
+                metadata_content.append("")
+                
+                metadata_content.append("Fonte e Parceria:")
+                metadata_content.append("O desenvolvimento do produto AQ1Km é fruto da parceria entre o Instituto Nacional de Pesquisas Espaciais (INPE) e o Laboratório de Aplicações de Satélites Ambientais (LASA/UFRJ), no âmbito de pesquisas voltadas ao monitoramento ambiental por sensoriamento remoto.")
+                metadata_content.append("")
+                
+                metadata_content.append("Metodologia:")
+                metadata_content.append("A detecção das áreas queimadas é realizada com base em algoritmos que utilizam bandas térmicas (4 µm) dos sensores MODIS, com foco na identificação de alterações na resposta espectral associadas a queimadas recentes. A metodologia está descrita em detalhes no artigo científico:")
+                metadata_content.append("")
+                metadata_content.append("LIBONATI, R.; DACAMARA, C.; SETZER, A.; MORELLI, F.; MELCHIORI, A. An Algorithm for Burned Area Detection in the Brazilian Cerrado Using 4 µm MODIS Imagery. Remote Sensing, v. 7, p. 15782–15803, 2015. https://doi.org/10.3390/rs71215803")
+                metadata_content.append("")
+                
+                metadata_content.append("Características Técnicas:")
+                metadata_content.append("- Resolução Espacial: 1 km")
+                metadata_content.append("- Sistema de Referência: SIRGAS 2000 – EPSG:4674")
+                metadata_content.append("- Formato: Shapefile (vetorial)")
+                metadata_content.append("- Cobertura: Diária com abordagem sinótica")
+                metadata_content.append("")
+                
+                metadata_content.append("Uso Recomendado:")
+                metadata_content.append("O produto é indicado para análises de caráter regional ou nacional, avaliação de tendências temporais de queimadas, estudos ambientais e suporte à formulação de políticas públicas relacionadas à conservação dos biomas brasileiros.")
+                metadata_content.append("")
+                
+                metadata_content.append("Limitações de Uso:")
+                metadata_content.append("Devido à sua resolução espacial de 1 km, não é recomendado para análises locais ou de pequena escala.")
+                metadata_content.append("")
+            
+            # NOVO: Seção de processamentos realizados
+            metadata_content.append("=" * 60)
+            metadata_content.append("PROCESSAMENTOS REALIZADOS:")
+            metadata_content.append("=" * 60)
+            processing_summary = self.get_processing_summary()
+            
+            if len(processing_summary) == 1 and "Nenhum processamento" in processing_summary[0]:
+                metadata_content.append("Dados utilizados conforme baixados da fonte original, sem processamentos adicionais.")
+            else:
+                metadata_content.append("Os seguintes processamentos foram aplicados aos dados originais:")
+                metadata_content.append("")
+                
+                for i, process in enumerate(processing_summary, 1):
+                    metadata_content.append(f"{i:2d}. {process}")
+                
+                metadata_content.append("")
+                metadata_content.append("NOTA: Todos os processamentos utilizaram algoritmos nativos do QGIS.")
+                metadata_content.append("Os dados de saída preservam a qualidade e integridade dos dados originais.")
+            
+            metadata_content.append("")
+            metadata_content.append("=" * 60)
+            metadata_content.append("Gerado pelo plugin DesagregaBiomasBR")
+            metadata_content.append(f"Desenvolvido para processamento de dados {self.selected_theme}")
+            metadata_content.append("=" * 60)
+            
+            # Salva arquivo
+            with open(metadata_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(metadata_content))
+            
+            print(f"✅ DEBUG: Metadados salvos com {len(metadata_content)} linhas")
+            return True
+            
+        except Exception as e:
+            print(f"❌ ERROR generate_metadata_file: {str(e)}")
+            return False
+
+    def generate_output_filename(self):
+        """Gera nome do arquivo baseado nas seleções"""
+        try:
+            # Base do nome
+            parts = [
+                self.selected_theme.lower(),
+                self.selected_biome.lower().replace(' ', '_').replace('ã', 'a').replace('ô', 'o'),
+                self.data_type
+            ]
+            
+            # Adiciona informações temporais
+            if self.data_type == "incremental" and hasattr(self, 'start_year') and hasattr(self, 'end_year'):
+                parts.append(f"{self.start_year}_{self.end_year}")
+            elif self.data_type == "acumulado" and hasattr(self, 'end_year'):
+                base_year = self.prodes_base_years.get(self.selected_biome, 2000)
+                parts.append(f"{base_year}_{self.end_year}")
+            
+            # NOVO: Adiciona informações de corte espacial com nome do arquivo
+            if hasattr(self, 'cut_option') and self.cut_option != 0:
+                if self.cut_option == 1 and hasattr(self, 'selected_layer') and self.selected_layer:
+                    # Layer carregado - usa nome da layer
+                    layer_name = self.selected_layer.name()
+                    # Remove caracteres especiais e limita tamanho
+                    clean_name = layer_name.replace(' ', '_').replace('-', '_').replace('.', '_')
+                    clean_name = ''.join(c for c in clean_name if c.isalnum() or c == '_')[:20]
+                    parts.append(f"corte_{clean_name}")
+                    
+                    # Se tem campo e elemento específico, adiciona também
+                    if hasattr(self, 'selected_field') and self.selected_field and hasattr(self, 'selected_element') and self.selected_element:
+                        clean_element = str(self.selected_element).replace(' ', '_').replace('-', '_')
+                        clean_element = ''.join(c for c in clean_element if c.isalnum() or c == '_')[:15]
+                        parts.append(clean_element)
+                        
+                elif self.cut_option == 2:
+                    # Retângulo desenhado
+                    parts.append("corte_retangulo")
+                    
+                elif self.cut_option == 3:
+                    # IBGE - inclui informações da seleção
+                    parts.append("corte_ibge")
+                    if self.ibge_state:
+                        clean_state = self.ibge_state.replace(' ', '_')
+                        clean_state = ''.join(c for c in clean_state if c.isalnum() or c == '_')[:10]
+                        parts.append(clean_state.lower())
+                        
+                        if self.ibge_municipality:
+                            clean_municipality = self.ibge_municipality.replace(' ', '_')
+                            clean_municipality = ''.join(c for c in clean_municipality if c.isalnum() or c == '_')[:15]
+                            parts.append(clean_municipality.lower())
+            
+            filename = "_".join(parts)
+            
+            # Limita tamanho total do nome (alguns sistemas têm limite)
+            if len(filename) > 100:
+                filename = filename[:100]
+                
+            print(f"📁 DEBUG: Nome do arquivo gerado: {filename}")
+            return filename
+            
+        except Exception as e:
+            print(f"❌ ERROR generate_output_filename: {str(e)}")
+            return "prodes_result"
+
+    def build_urls_and_filters(self):
+        """Constrói URLs e filtros CQL para o processamento"""
+        try:
+            result = {
+                'urls': [],
+                'filters': [],
+                'layer_names': [],
+                'year_ranges': []  # Intervalo de anos montado a partir do armazenamento local
+            }
+            
+            print(f"🔍 DEBUG build_urls_and_filters: selected_biome = '{self.selected_biome}'")
+            urls = self.get_dynamic_prodes_urls(self.selected_biome)
+            print(f"🔍 DEBUG build_urls_and_filters: URLs retornadas = {urls}")
+            
+            if self.data_type == "incremental":
+                # Só yearly_deforestation com filtro
+                result['urls'].append(urls['yearly'])
+                result['layer_names'].append('yearly_deforestation')
+                
+                # Constrói filtro CQL baseado na coluna 'year'
+                cql_filter = f"year BETWEEN {self.start_year} AND {self.end_year}"
+                
+                result['filters'].append(cql_filter)
+                result['year_ranges'].append((int(self.start_year), int(self.end_year)))
+                
+            elif self.data_type == "acumulado":
+                # accumulated_deforestation (sem filtro) + yearly_deforestation (com filtro até ano final)
+                result['urls'].append(urls['accumulated'])
+                result['urls'].append(urls['yearly'])
+                result['layer_names'].append('accumulated_deforestation')
+                result['layer_names'].append('yearly_deforestation')
+                
+                # Filtro só para yearly (accumulated não precisa de filtro)
+                result['filters'].append("")  # Sem filtro para accumulated
+                
+                # Para yearly até o ano final, baseado na coluna 'year'
+                base_year = self.prodes_base_years.get(self.selected_biome, 2000)
+                cql_filter = f"year%20BETWEEN%20{base_year}%20AND%20{self.end_year}"
+                
+                result['filters'].append(cql_filter)
+                result['year_ranges'].extend([None, (int(base_year), int(self.end_year))])
+            
+            return result
+            
+        except Exception as e:
+            print(f"❌ ERROR build_urls_and_filters: {str(e)}")
+            return {'urls': [], 'filters': [], 'layer_names': [], 'year_ranges': []}
+
+    def build_deter_urls_and_filters(self):
+        """Constrói URLs e filtros para processamento DETER - ESTRATÉGIA ROBUSTA"""
+        try:
+            result = {
+                'urls': [],
+                'filters': [],
+                'layer_names': []
+            }
+            
+            # URLs dos serviços DETER
+            deter_urls = {
+                'Cerrado': 'https://terrabrasilis.dpi.inpe.br/geoserver/deter-cerrado-nb/deter_cerrado/ows',
+                'Amazônia Legal': 'https://terrabrasilis.dpi.inpe.br/geoserver/deter-amz/deter_amz/ows'
+            }
+            
+            # URL única para DETER
+            url = deter_urls[self.selected_biome]
+            result['urls'].append(url)
+            result['layer_names'].append('deter_alerts')
+            
+            # ESTRATÉGIA: armazenamento local do bioma sincronizado por view_date
+            # (download_deter_layer). Filtros de data/classes são aplicados na leitura
+            # do armazenamento ou, em consultas avulsas com corte, no CQL_FILTER do WFS
+            result['filters'].append('')  # Filtros montados abaixo (QGIS/OGR e CQL)
+            
+            # NOVA ESTRATÉGIA: Constrói expressão QGIS nativa
+            # Formato de data ISO para QGIS: YYYY-MM-DD
+            start_date = f"{self.deter_start_year}-01-01"
+            end_date = f"{self.deter_end_year}-12-31"
+            
+            # Expressão de data usando sintaxe QGIS
+            date_filter = f"\"view_date\" >= '{start_date}' AND \"view_date\" <= '{end_date}'"
+            
+            # Classes selecionadas
+            available_classes = self.deter_classes[self.selected_biome]
+            total_available = len(available_classes)
+            total_selected = len(self.deter_selected_classes)
+            
+            if total_selected == total_available:
+                # Todas as classes = só filtro temporal
+                qgis_expression = date_filter
+                server_filter = f"view_date >= '{start_date}' AND view_date <= '{end_date}'"
+                print(f"✅ INFO: Todas as {total_selected} classes selecionadas - aplicando APENAS filtro temporal")
+            else:
+                # Algumas classes = filtro temporal + classes
+                if len(self.deter_selected_classes) == 1:
+                    class_filter = f"\"classname\" = '{self.deter_selected_classes[0]}'"
+                else:
+                    classes_str = "','".join(self.deter_selected_classes)
+                    class_filter = f"\"classname\" IN ('{classes_str}')"
+                
+                qgis_expression = f"{date_filter} AND {class_filter}"
+                server_filter = qgis_expression.replace('"', '')
+                print(f"✅ INFO: {total_selected}/{total_available} classes selecionadas - aplicando filtros temporal + classes")
+            
+            # Expressão QGIS/OGR para ler o armazenamento local e versão CQL para o WFS
+            result['memory_filter'] = qgis_expression
+            result['server_filter'] = server_filter
+            
+            print(f"🔍 DEBUG: URL DETER: {url}")
+            print(f"🔍 DEBUG: Expressão QGIS: {qgis_expression}")
+            
+            return result
+            
+        except Exception as e:
+            print(f"❌ ERROR build_deter_urls_and_filters: {str(e)}")
+            return {'urls': [], 'filters': [], 'layer_names': [], 'memory_filter': '', 'server_filter': ''}
+
+    def generate_terraclass_output_filename(self):
+        """Gera nome do arquivo de saída para TERRACLASS"""
+        try:
+            # Componentes do nome
+            theme = self.selected_theme.lower()
+            biome = self.selected_biome.lower().replace(' ', '_').replace('ã', 'a').replace('ô', 'o')
+            year = str(self.terraclass_year)
+            
+            # Estado normalizado
+            state_normalized = self.normalize_terraclass_text(self.terraclass_state)
+            
+            # Tipo de download
+            if self.terraclass_municipality:
+                # Download municipal
+                municipality_normalized = self.normalize_terraclass_text(self.terraclass_municipality)
+                download_type = "municipal"
+                location_part = f"{state_normalized}_{municipality_normalized}"
+            else:
+                # Download estadual
+                download_type = "estadual"
+                location_part = state_normalized
+            
+            # Nome final
+            filename = f"{theme}_{biome}_{year}_{download_type}_{location_part}"
+            
+            # Limita tamanho do nome
+            if len(filename) > 100:
+                filename = f"{theme}_{biome}_{year}_{location_part}"
+            
+            print(f"📁 DEBUG: Nome TERRACLASS gerado: {filename}")
+            return filename
+            
+        except Exception as e:
+            print(f"❌ ERROR generate_terraclass_output_filename: {str(e)}")
+            return f"terraclass_{self.selected_biome.lower()}_{self.terraclass_year}_{self.terraclass_state.lower()}"
+
+    def build_terraclass_download_info(self):
+        """Constrói informações de download para TERRACLASS"""
+        try:
+            # Obtém dados do shapefile IBGE
+            shapefile_data = self.get_terraclass_shapefile_data()
+            if not shapefile_data:
+                raise Exception("Falha ao obter dados do shapefile IBGE")
+            
+            # Constrói URL baseada no tipo de download usando configuração dinâmica
+            url_templates = self.get_dynamic_terraclass_urls()
+            
+            if self.terraclass_municipality:
+                # Download municipal
+                url_template = url_templates['base'] + url_templates['municipal']
+                
+                url = url_template.format(
+                    uf_lower=shapefile_data['uf'].lower(),
+                    bioma='AMZ' if self.selected_biome == 'Amazônia' else 'CER',
+                    ano=self.terraclass_year,
+                    municipio_normalizado=self.normalize_terraclass_text(self.terraclass_municipality),
+                    UF=shapefile_data['uf'],
+                    geocodigo_munic=shapefile_data['geocodigo']
+                )
+                download_type = "Municipal"
+                location = f"{self.terraclass_state} - {self.terraclass_municipality}"
+            else:
+                # Download estadual
+                url_template = url_templates['base'] + url_templates['estadual']
+                
+                url = url_template.format(
+                    bioma='AMZ' if self.selected_biome == 'Amazônia' else 'CER',
+                    ano=self.terraclass_year,
+                    estado_normalizado=self.normalize_terraclass_text(self.terraclass_state),
+                    geocodigo_uf=shapefile_data['cod_uf']
+                )
+                download_type = "Estadual"
+                location = self.terraclass_state
+            
+            return {
+                'url': url,
+                'download_type': download_type,
+                'location': location,
+                'biome': self.selected_biome,
+                'year': self.terraclass_year,
+                'shapefile_data': shapefile_data
+            }
+            
+        except Exception as e:
+            print(f"❌ ERROR build_terraclass_download_info: {str(e)}")
+            return None
+
+    def get_terraclass_shapefile_data(self):
+        """Obtém dados necessários do shapefile IBGE para TERRACLASS"""
+        try:
+            if not self.ibge_layer:
+                return None
+            
+            # Constrói filtro para encontrar os dados necessários
+            if self.terraclass_municipality:
+                # Para município específico
+                expression = f'"bioma" = \'{self.selected_biome}\' AND "estado" = \'{self.terraclass_state}\' AND "nome" = \'{self.terraclass_municipality}\''
+            else:
+                # Para estado (pega qualquer município do estado para obter cod_uf)
+                expression = f'"bioma" = \'{self.selected_biome}\' AND "estado" = \'{self.terraclass_state}\''
+            
+            # Busca primeira feição que atende o critério
+            request = QgsFeatureRequest().setFilterExpression(expression)
+            features = list(self.ibge_layer.getFeatures(request))
+            
+            if not features:
+                print(f"❌ DEBUG: Nenhuma feição encontrada no shapefile para {self.terraclass_state}")
+                return None
+            
+            feature = features[0]  # Usa primeira feição encontrada
+            
+            data = {
+                'nome': feature['nome'],
+                'geocodigo': feature['geocodigo'], 
+                'uf': feature['uf'],
+                'estado': feature['estado'],
+                'bioma': feature['bioma'],
+                'cod_uf': feature['cod_uf']
+            }
+            
+            print(f"✅ DEBUG: Dados do shapefile obtidos: {data}")
+            return data
+            
+        except Exception as e:
+            print(f"❌ ERROR get_terraclass_shapefile_data: {str(e)}")
+            return None
+
+    def download_terraclass_zip(self, url):
+        """Baixa arquivo ZIP do TERRACLASS"""
+        try:
+            print(f"🌐 DEBUG: Iniciando download ZIP: {url}")
+            
+            # Verifica abort antes de iniciar download
+            if self.check_abort_signal():
+                print("🛑 DEBUG: Download TERRACLASS abortado antes do início")
+                return None
+            
+            temp_dir = tempfile.gettempdir()
+            zip_filename = f"terraclass_{self.terraclass_year}_{id(self)}.zip"
+            zip_path = os.path.join(temp_dir, zip_filename)
+            
+            # Download em blocos com verificação de abort a cada bloco
+            status, file_size = self.stream_download_to_file(
+                url, zip_path, timeout=120,
+                progress_callback=self.create_download_progress_callback("TERRACLASS"))
+            
+            if status is None:
+                print("🛑 DEBUG: Download TERRACLASS abortado durante transferência")
+                self.check_abort_signal()
+                return None
+            
+            if status != 200:
+                print(f"❌ DEBUG: Erro no download: HTTP {status}")
+                return None
+            
+            if file_size > 1000:  # Verifica se é um arquivo válido
+                print(f"✅ DEBUG: ZIP salvo em: {zip_path}")
+                print(f"📊 DEBUG: Tamanho do arquivo: {file_size} bytes")
+                return zip_path
+            
+            print(f"❌ DEBUG: Arquivo muito pequeno ({file_size} bytes) - provavelmente erro")
+            os.remove(zip_path)
+            return None
+            
+        except Exception as e:
+            print(f"❌ ERROR download_terraclass_zip: {str(e)}")
+            return None
+
+    def extract_terraclass_zip(self, zip_path, extract_dir=None):
+        """Extrai arquivo ZIP do TERRACLASS (em extract_dir ou numa pasta temporária)"""
+        try:
+            import zipfile
+            import tempfile
+            import os
+            
+            # Cria diretório temporário para extração
+            extract_dir = extract_dir or os.path.join(tempfile.gettempdir(), f"terraclass_extract_{id(self)}")
+            os.makedirs(extract_dir, exist_ok=True)
+            
+            print(f"📦 DEBUG: Extraindo para: {extract_dir}")
+            
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                zip_ref.extractall(extract_dir)
+                
+                # Lista arquivos extraídos
+                extracted_files = []
+                for root, dirs, files in os.walk(extract_dir):
+                    for file in files:
+                        file_path = os.path.join(root, file)
+                        extracted_files.append(file_path)
+                        print(f"   📄 {file}")
+                
+                print(f"✅ DEBUG: {len(extracted_files)} arquivos extraídos")
+                return extracted_files
+                
+        except Exception as e:
+            print(f"❌ ERROR extract_terraclass_zip: {str(e)}")
+            return None
+
+    def find_terraclass_shapefile(self, extracted_files):
+        """Encontra o shapefile principal nos arquivos extraídos"""
+        try:
+            # Procura por arquivos .shp
+            shapefiles = [f for f in extracted_files if f.endswith('.shp')]
+            
+            if not shapefiles:
+                print(f"❌ DEBUG: Nenhum arquivo .shp encontrado")
+                return None
+            
+            # Se há apenas um, usa ele
+            if len(shapefiles) == 1:
+                print(f"✅ DEBUG: Shapefile único encontrado: {shapefiles[0]}")
+                return shapefiles[0]
+            
+            # Se há múltiplos, procura pelo principal (maior ou com padrão específico)
+            main_shapefile = None
+            
+            for shp in shapefiles:
+                filename = os.path.basename(shp).lower()
+                # Padrões que indicam arquivo principal
+                if any(pattern in filename for pattern in ['terraclass', 'principal', 'main']):
+                    main_shapefile = shp
+                    break
+            
+            # Se não encontrou por padrão, usa o primeiro
+            if not main_shapefile:
+                main_shapefile = shapefiles[0]
+            
+            print(f"✅ DEBUG: Shapefile principal selecionado: {main_shapefile}")
+            return main_shapefile
+            
+        except Exception as e:
+            print(f"❌ ERROR find_terraclass_shapefile: {str(e)}")
+            return None
+
+    def apply_terraclass_style(self, layer):
+        """Aplica estilo TERRACLASS conforme arquivo QML"""
+        try:
+            # Procura arquivo de estilo
+            style_path = os.path.join(self.plugin_dir, 'estilo_terraclass.qml')
+            
+            if os.path.exists(style_path):
+                print(f"🎨 DEBUG: Aplicando estilo: {style_path}")
+                
+                # Carrega estilo do arquivo QML
+                result = layer.loadNamedStyle(style_path)
+                
+                if result[1]:  # result[1] indica sucesso
+                    print(f"✅ DEBUG: Estilo QML aplicado com sucesso")
+                    layer.triggerRepaint()
+                    return True
+                else:
+                    print(f"⚠️ DEBUG: Falha ao carregar estilo QML: {result[0]}")
+            else:
+                print(f"⚠️ DEBUG: Arquivo de estilo não encontrado: {style_path}")
+            
+            # Aplica estilo padrão se QML falhar
+            self.apply_default_terraclass_style(layer)
+            return False
+            
+        except Exception as e:
+            print(f"❌ ERROR apply_terraclass_style: {str(e)}")
+            self.apply_default_terraclass_style(layer)
+            return False
+
+    def apply_default_terraclass_style(self, layer):
+        """Aplica estilo padrão para TERRACLASS"""
+        try:
+            from qgis.core import QgsSymbol, QgsSingleSymbolRenderer
+            from qgis.PyQt.QtGui import QColor
+            
+            # Cria símbolo padrão
+            symbol = QgsSymbol.defaultSymbol(layer.geometryType())
+            symbol.setColor(QColor(34, 139, 34, 180))  # Verde semi-transparente
+            symbol.symbolLayer(0).setStrokeColor(QColor(0, 100, 0, 255))  # Borda verde escura
+            symbol.symbolLayer(0).setStrokeWidth(0.5)
+            
+            # Aplica renderizador
+            renderer = QgsSingleSymbolRenderer(symbol)
+            layer.setRenderer(renderer)
+            layer.triggerRepaint()
+            
+            print(f"✅ DEBUG: Estilo padrão TERRACLASS aplicado")
+            
+        except Exception as e:
+            print(f"❌ ERROR apply_default_terraclass_style: {str(e)}")
+
+    def stage_download_terraclass(self, task=None):
+        """Etapa de download TERRACLASS: ZIP do estado/município extraído na pasta da etapa"""
+        info = self.terraclass_download_info
+        self.update_notes(f"📥 Baixando {info['download_type']} | {info['location']}", "status")
+        print(f"🌐 DEBUG: URL TERRACLASS: {info['url']}")
+        
+        zip_path = self.download_terraclass_zip(info['url'])
+        if not zip_path:
+            if self.check_abort_signal():
+                return
+            raise Exception("Falha ao baixar arquivo ZIP TERRACLASS")
+        
+        self.update_notes(f"📦 Extraindo ZIP | Processando shapefile", "status")
+        extracted_files = self.extract_terraclass_zip(zip_path, self.get_stage_work_dir())
+        shapefile_path = self.find_terraclass_shapefile(extracted_files) if extracted_files else None
+        if not shapefile_path:
+            raise Exception("Nenhum shapefile encontrado no ZIP TERRACLASS")
+        
+        layer = QgsVectorLayer(shapefile_path, f"TERRACLASS_{self.terraclass_year}", "ogr")
+        if not layer.isValid():
+            raise Exception("Shapefile TERRACLASS extraído é inválido")
+        
+        self.add_processing_log(
+            "EXTRAÇÃO DE ARQUIVO",
+            f"Arquivo ZIP extraído → Shapefile TERRACLASS carregado ({layer.featureCount()} feições)"
+        )
+        print(f"✅ DEBUG: Shapefile carregado: {layer.featureCount()} feições")
+        self.processing_layers = [layer]
+
+    def generate_terraclass_metadata_file(self, metadata_path):
+        """Gera arquivo de metadados específico para TERRACLASS"""
+        try:
+            from datetime import datetime
+            
+            metadata_content = []
+            metadata_content.append("=" * 60)
+            metadata_content.append(f"METADADOS DO PROCESSAMENTO TERRACLASS")
+            metadata_content.append("Plugin DesagregaBiomasBR")
+            metadata_content.append("=" * 60)
+            metadata_content.append("")
+            
+            # Texto introdutório específico do TERRACLASS
+            intro_text = "O Projeto TerraClass tem como objetivo qualificar o desflorestamento da Amazônia Legal e Cerrado. "
+            intro_text += "A partir das áreas mapeadas pelo PRODES, o TerraClass produz mapas sistêmicos de uso e cobertura "
+            intro_text += "das terras desflorestadas nas regiões indicadas."
+            
+            metadata_content.append("DESCRIÇÃO:")
+            metadata_content.append(intro_text)
+            metadata_content.append("")
+            
+            # Informações gerais
+            metadata_content.append("INFORMAÇÕES GERAIS:")
+            metadata_content.append(f"Data/Hora do processamento: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+            metadata_content.append(f"Tema: TERRACLASS")
+            metadata_content.append(f"Bioma: {self.selected_biome}")
+            metadata_content.append(f"Ano: {self.terraclass_year}")
+            if hasattr(self, 'terraclass_state') and self.terraclass_state:
+                metadata_content.append(f"Estado: {self.terraclass_state}")
+            if hasattr(self, 'terraclass_municipality') and self.terraclass_municipality:
+                metadata_content.append(f"Município: {self.terraclass_municipality}")
+            metadata_content.append("")
+            
+            # Metodologia
+            metadata_content.append("METODOLOGIA:")
+            methodol_text = "A metodologia TerraClass, desenvolvida conjuntamente entre o INPE e a EMBRAPA, "
+            methodol_text += "baseia-se atualmente na análise da série temporal de imagens de satélite de média resolução (20 a 10m), "
+            methodol_text += "e técnicas de processamento de imagens, para identificar as diferentes classes de uso e cobertura: "
+            methodol_text += "vegetação natural – primária e secundária; cultura agrícola – perene, semiperene, temporária de um ciclo, "
+            methodol_text += "e de mais de um ciclo; pastagem; silvicultura; mineração; urbanizada; outras áreas edificadas; "
+            methodol_text += "outros usos; natural não-florestal e corpos d´água."
+            metadata_content.append(methodol_text)
+            metadata_content.append("")
+            
+            # Configurações temporais
+            metadata_content.append("CONFIGURAÇÕES TEMPORAIS:")
+            metadata_content.append(f"Unidade temporal: Anual")
+            metadata_content.append(f"Ano de referência: {self.terraclass_year}")
+            metadata_content.append("")
+            
+            # Configurações espaciais
+            metadata_content.append("CONFIGURAÇÕES ESPACIAIS:")
+            metadata_content.append(f"Bioma: {self.selected_biome}")
+            if hasattr(self, 'terraclass_state') and self.terraclass_state:
+                metadata_content.append(f"Estado: {self.terraclass_state}")
+                if hasattr(self, 'terraclass_municipality') and self.terraclass_municipality:
+                    metadata_content.append(f"Município: {self.terraclass_municipality}")
+                    metadata_content.append("Tipo de recorte: Municipal")
+                else:
+                    metadata_content.append("Tipo de recorte: Estadual")
+            else:
+                metadata_content.append("Tipo de recorte: Bioma completo")
+            metadata_content.append("")
+            
+            # URL do arquivo
+            metadata_content.append("ORIGEM DOS DADOS:")
+            if hasattr(self, 'terraclass_download_info') and self.terraclass_download_info:
+                metadata_content.append(f"Tipo de download: {self.terraclass_download_info['download_type']}")
+                metadata_content.append(f"Local: {self.terraclass_download_info['location']}")
+                metadata_content.append(f"URL: {self.terraclass_download_info['url']}")
+            metadata_content.append("")
+            
+            # Informações do arquivo final
+            metadata_content.append("ARQUIVO RESULTANTE:")
+            metadata_content.append(f"Nome: {self.output_filename}")
+            metadata_content.append(f"Caminho: {getattr(self, 'final_file_path', 'N/A')}")
+            metadata_content.append(f"Formato: {'Shapefile' if getattr(self, 'final_file_path', '').lower().endswith('.shp') else 'GeoPackage'}")
+            
+            if hasattr(self, 'processing_layers') and self.processing_layers:
+                final_layer = self.processing_layers[0]
+                metadata_content.append(f"Número de feições: {final_layer.featureCount()}")
+                metadata_content.append(f"Sistema de coordenadas: {final_layer.crs().authid()} - {final_layer.crs().description()}")
+                metadata_content.append(f"Tipo de geometria: {QgsWkbTypes.displayString(final_layer.wkbType())}")
+                
+                # Extensão geográfica
+                extent = final_layer.extent()
+                if not extent.isEmpty():
+                    metadata_content.append(f"Extensão geográfica:")
+                    metadata_content.append(f"  Longitude mínima: {extent.xMinimum():.6f}")
+                    metadata_content.append(f"  Longitude máxima: {extent.xMaximum():.6f}")
+                    metadata_content.append(f"  Latitude mínima: {extent.yMinimum():.6f}")
+                    metadata_content.append(f"  Latitude máxima: {extent.yMaximum():.6f}")
+                
+                metadata_content.append("")  # NOVO: Linha em branco antes dos campos da tabela
+                    
+                # Campos da tabela (classes de uso)
+                fields = final_layer.fields()
+                if len(fields) > 0:
+                    metadata_content.append(f"Campos da tabela:")
+                    for field in fields:
+                        metadata_content.append(f"  {field.name()}: {field.typeName()}")
+                        
+                    metadata_content.append("")  # NOVO: Linha em branco após campos da tabela
+                    
+                    # Análise das classes de uso presentes
+                    metadata_content.append("CLASSES DE USO E COBERTURA IDENTIFICADAS:")
+                    
+                    # Busca por campos que podem conter classes de uso
+                    class_fields = []
+                    for field in fields:
+                        field_name = field.name().lower()
+                        if any(keyword in field_name for keyword in ['class', 'uso', 'cover', 'terra']):
+                            class_fields.append(field.name())
+                    
+                    if class_fields:
+                        for class_field in class_fields[:2]:  # Primeiros 2 campos de classe
+                            unique_values = []
+                            for feature in final_layer.getFeatures():
+                                value = feature[class_field]
+                                if value and value not in unique_values:
+                                    unique_values.append(value)
+                            
+                            if unique_values:
+                                metadata_content.append(f"  Campo '{class_field}':")
+                                for value in sorted(unique_values)[:15]:  # Primeiras 15 classes
+                                    metadata_content.append(f"    - {value}")
+                                if len(unique_values) > 15:
+                                    metadata_content.append(f"    ... e mais {len(unique_values) - 15} classes")
+            
+            metadata_content.append("")
+            metadata_content.append("INFORMAÇÕES ADICIONAIS:")
+            metadata_content.append("O TerraClass é uma iniciativa conjunta do INPE (Instituto Nacional de Pesquisas Espaciais)")
+            metadata_content.append("e EMBRAPA (Empresa Brasileira de Pesquisa Agropecuária) para qualificação do uso da terra")
+            metadata_content.append("em áreas desflorestadas dos biomas brasileiros.")
+            metadata_content.append("")
+            metadata_content.append("Palavras-chave: uso da terra, cobertura da terra, desflorestamento, PRODES, sensoriamento remoto")
+            metadata_content.append("")
+            
+            # NOVO: Seção específica de processamentos TERRACLASS
+            metadata_content.append("=" * 60)
+            metadata_content.append("PROCESSAMENTOS REALIZADOS:")
+            metadata_content.append("=" * 60)
+            processing_summary = self.get_processing_summary()
+            
+            if len(processing_summary) == 1 and "Nenhum processamento" in processing_summary[0]:
+                metadata_content.append("Dados utilizados conforme baixados da fonte original (arquivo ZIP).")
+                metadata_content.append("Processamento realizado: Extração de arquivo ZIP + Aplicação de simbologia padrão.")
+            else:
+                metadata_content.append("Os seguintes processamentos foram aplicados aos dados originais:")
+                metadata_content.append("")
+                
+                for i, process in enumerate(processing_summary, 1):
+                    metadata_content.append(f"{i:2d}. {process}")
+                
+                metadata_content.append("")
+                metadata_content.append("NOTA: Todos os processamentos utilizaram algoritmos nativos do QGIS.")
+                metadata_content.append("Os dados TERRACLASS preservam a classificação original INPE/EMBRAPA.")
+                
+            metadata_content.append("")
+            metadata_content.append("=" * 60)
+            metadata_content.append("Gerado pelo plugin DesagregaBiomasBR")
+            metadata_content.append(f"Desenvolvido para processamento de dados TERRACLASS")
+            metadata_content.append("=" * 60)
+            
+            # Salva arquivo
+            with open(metadata_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(metadata_content))
+            
+            return True
+            
+        except Exception as e:
+            from qgis.core import QgsMessageLog, Qgis
+            error_msg = f"❌ ERRO generate_terraclass_metadata_file: {str(e)}"
+            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
+            return False
+
+    def generate_deter_output_filename(self):
+        """Gera nome do arquivo de saída para DETER"""
+        try:
+            # Componentes do nome
+            theme = self.selected_theme.lower()
+            biome = self.selected_biome.lower().replace(' ', '_').replace('â', 'a').replace('ô', 'o')
+            period = f"{self.deter_start_year}_{self.deter_end_year}"
+            
+            # Classes selecionadas com lógica inteligente
+            if self.selected_biome and self.selected_biome in self.deter_classes:
+                available_classes = self.deter_classes[self.selected_biome]
+                total_available = len(available_classes)
+                total_selected = len(self.deter_selected_classes)
+                
+                if total_selected == total_available:
+                    # Todas as classes = sem filtro
+                    classes_part = "todas_classes"
+                elif total_selected == 1:
+                    # Uma classe específica
+                    classes_part = self.deter_selected_classes[0].lower().replace('_', '')
+                else:
+                    # Algumas classes
+                    classes_part = f"select_{total_selected}_de_{total_available}"
+            else:
+                # Fallback
+                classes_part = "classes_selecionadas"
+            
+            # Tipo de corte
+            cut_name = self.get_cut_option_name()
+            
+            # Nome final
+            filename = f"{theme}_{biome}_{period}_{classes_part}_{cut_name}"
+            
+            # Limita tamanho do nome
+            if len(filename) > 100:
+                filename = f"{theme}_{biome}_{period}_{cut_name}"
+            
+            print(f"📁 DEBUG: Nome DETER gerado: {filename}")
+            return filename
+            
+        except Exception as e:
+            print(f"❌ ERROR generate_deter_output_filename: {str(e)}")
+            return f"deter_{self.selected_biome.lower()}_{self.deter_start_year}_{self.deter_end_year}"
+
+    def get_cut_layer(self):
+        """Retorna a layer de corte baseada na opção selecionada"""
+        print(f"🔧 DEBUG get_cut_layer: Iniciando...")
+        print(f"🔧 DEBUG get_cut_layer: cut_option = {getattr(self, 'cut_option', 'UNDEFINED')}")
+        
+        if not hasattr(self, 'cut_option'):
+            print(f"❌ DEBUG get_cut_layer: cut_option não existe!")
+            return None
+            
+        if self.cut_option == 0:
+            # Sem limite de corte
+            print(f"🔧 DEBUG get_cut_layer: cut_option=0 (sem corte)")
+            return None
+            
+        elif self.cut_option == 1:
+            # Layer carregado no QGIS
+            print(f"🔧 DEBUG get_cut_layer: cut_option=1 (layer carregado)")
+            print(f"🔧 DEBUG get_cut_layer: selected_layer = {getattr(self, 'selected_layer', 'UNDEFINED')}")
+            print(f"🔧 DEBUG get_cut_layer: selected_field = {getattr(self, 'selected_field', 'UNDEFINED')}")
+            print(f"🔧 DEBUG get_cut_layer: selected_element = {getattr(self, 'selected_element', 'UNDEFINED')}")
+            
+            if self.selected_layer:
+                if self.selected_field and self.selected_element:
+                    # Cria layer filtrada
+                    try:
+                        print(f"🔧 DEBUG get_cut_layer: Tentando criar layer filtrada...")
+                        expression = f'"{self.selected_field}" = \'{self.selected_element}\''
+                        print(f"🔧 DEBUG get_cut_layer: Expression = {expression}")
+                        
+                        request = QgsFeatureRequest().setFilterExpression(expression)
+                        filtered_layer = self.selected_layer.materialize(request)
+                        
+                        if filtered_layer and filtered_layer.isValid():
+                            feature_count = filtered_layer.featureCount()
+                            print(f"✅ DEBUG get_cut_layer: Layer filtrada criada com {feature_count} feições")
+                            
+                            if feature_count > 0:
+                                filtered_layer.setName(f"{self.selected_layer.name()}_{self.selected_field}_{self.selected_element}")
+                                return filtered_layer
+                            else:
+                                print(f"⚠️ DEBUG get_cut_layer: Layer filtrada vazia - usando layer original")
+                                return self.selected_layer
+                        else:
+                            print(f"❌ DEBUG get_cut_layer: Falha ao criar layer filtrada - usando layer original")
+                            return self.selected_layer
+                            
+                    except Exception as e:
+                        print(f"❌ DEBUG get_cut_layer: Erro ao filtrar: {e}")
+                        print(f"🔧 DEBUG get_cut_layer: Retornando layer original")
+                        return self.selected_layer
+                else:
+                    print(f"🔧 DEBUG get_cut_layer: Sem filtro - retornando layer original")
+                    return self.selected_layer
+            else:
+                print(f"❌ DEBUG get_cut_layer: selected_layer é None!")
+                return None
+            
+        elif self.cut_option == 2:
+            # Desenho na tela
+            print(f"🔧 DEBUG get_cut_layer: cut_option=2 (desenho)")
+            print(f"🔧 DEBUG get_cut_layer: drawn_rectangle = {getattr(self, 'drawn_rectangle', 'UNDEFINED')}")
+            
+            if hasattr(self, 'drawn_rectangle') and self.drawn_rectangle:
+                try:
+                    print(f"🔧 DEBUG get_cut_layer: Criando layer de retângulo...")
+                    # Cria layer de memória com o retângulo
+                    rect_layer = QgsVectorLayer("Polygon?crs=EPSG:4674", "RetanguloDesenhado", "memory")
+                    provider = rect_layer.dataProvider()
+                    
+                    # Cria feição com geometria do retângulo
+                    rect_feature = QgsFeature()
+                    rect_geometry = QgsGeometry.fromRect(self.drawn_rectangle)
+                    rect_feature.setGeometry(rect_geometry)
+                    
+                    # Adiciona feição
+                    provider.addFeature(rect_feature)
+                    rect_layer.updateExtents()
+                    
+                    print(f"✅ DEBUG get_cut_layer: Layer de retângulo criada")
+                    return rect_layer
+                except Exception as e:
+                    print(f"❌ DEBUG get_cut_layer: Erro ao criar retângulo: {e}")
+                    return None
+            else:
+                print(f"❌ DEBUG get_cut_layer: drawn_rectangle não existe ou é None!")
+                return None
+            
+        elif self.cut_option == 3:
+            # IBGE
+            print(f"🔧 DEBUG get_cut_layer: cut_option=3 (IBGE)")
+            try:
+                ibge_layer = self.get_ibge_cut_layer()
+                if ibge_layer:
+                    print(f"✅ DEBUG get_cut_layer: Layer IBGE obtida: {ibge_layer.featureCount()} feições")
+                else:
+                    print(f"❌ DEBUG get_cut_layer: get_ibge_cut_layer retornou None")
+                return ibge_layer
+            except Exception as e:
+                print(f"❌ DEBUG get_cut_layer: Erro ao obter layer IBGE: {e}")
+                return None
+        
+        print(f"❌ DEBUG get_cut_layer: cut_option inválido: {self.cut_option}")
+        return None
+
+    def get_cut_option_name(self):
+        """Retorna o nome da opção de corte selecionada"""
+        if self.cut_option == 0:
+            return "SemCorte"
+        elif self.cut_option == 1:
+            return f"Layer_{self.selected_layer.name() if self.selected_layer else 'Indefinido'}"
+        elif self.cut_option == 2:
+            return "RetanguloDesenhado"
+        elif self.cut_option == 3:
+            # IBGE
+            parts = ["IBGE"]
+            if self.ibge_state:
+                parts.append(self.ibge_state.replace(" ", "_"))
+            if self.ibge_municipality:
+                parts.append(self.ibge_municipality.replace(" ", "_"))
+            return "_".join(parts)
+        else:
+            return "Desconhecido"
+
+    def normalize_terraclass_text(self, text):
+        """Normaliza texto para URLs TERRACLASS - remove acentos e caracteres especiais"""
+        import unicodedata
+        import re
+        
+        # Remove acentos
+        text_normalized = unicodedata.normalize('NFD', text)
+        text_ascii = ''.join(c for c in text_normalized if unicodedata.category(c) != 'Mn')
+        
+        # Converte para maiúsculo e substitui espaços por _
+        text_clean = text_ascii.upper().replace(' ', '_')
+        
+        # Remove outros caracteres especiais
+        text_clean = re.sub(r'[^A-Z0-9_]', '', text_clean)
+        
+        return text_clean
+
+    def load_ibge_shapefile(self):
+        """Carrega o shapefile IBGE dos limites"""
+        try:
+            if os.path.exists(self.ibge_shapefile_path):
+                self.ibge_layer = QgsVectorLayer(self.ibge_shapefile_path, "IBGE_Limites", "ogr")
+                if self.ibge_layer.isValid():
+                    print(f"✅ Shapefile IBGE carregado: {self.ibge_layer.featureCount()} feições")
+                    return True
+                else:
+                    print(f"❌ Shapefile IBGE inválido: {self.ibge_shapefile_path}")
+                    return False
+            else:
+                print(f"❌ Shapefile IBGE não encontrado: {self.ibge_shapefile_path}")
+                return False
+        except Exception as e:
+            print(f"❌ Erro ao carregar shapefile IBGE: {str(e)}")
+            return False
+
+    def get_ibge_cut_layer(self):
+        """Obtém a camada de corte baseada na seleção IBGE"""
+        if not self.ibge_layer:
+            return None
+        
+        # Constrói filtro baseado na seleção hierárquica
+        filters = []
+        
+        # Filtro por bioma/região
+        if self.ibge_biome_region:
+            if self.ibge_biome_region == 'Amazônia Legal':
+                filters.append(f'"regiao" = \'Amazônia Legal\'')
+            else:
+                filters.append(f'"bioma" = \'{self.ibge_biome_region}\'')
+        
+        # Filtro por estado
+        if self.ibge_state:
+            filters.append(f'"estado" = \'{self.ibge_state}\'')
+        
+        # Filtro por município (se selecionado)
+        if self.ibge_municipality:
+            filters.append(f'"nome" = \'{self.ibge_municipality}\'')
+        
+        if not filters:
+            return None
+        
+        # Aplica filtros
+        expression = ' AND '.join(filters)
+        request = QgsFeatureRequest().setFilterExpression(expression)
+        
+        # Cria nova camada com as feições filtradas
+        filtered_layer = QgsVectorLayer(f"Polygon?crs={self.ibge_layer.crs().authid()}", "IBGE_Filtered", "memory")
+        provider = filtered_layer.dataProvider()
+        provider.addAttributes(self.ibge_layer.fields())
+        filtered_layer.updateFields()
+        
+        # Adiciona feições filtradas
+        features = []
+        for feature in self.ibge_layer.getFeatures(request):
+            features.append(feature)
+        
+        provider.addFeatures(features)
+        
+        if not self.ibge_municipality and self.ibge_state:
+            # Se não selecionou município, dissolve por estado
+            dissolved_layer = self.dissolve_layer(filtered_layer, 'estado')
+            return dissolved_layer if dissolved_layer else filtered_layer
+        
+        return filtered_layer
+
+    def get_amazonia_biome_cut_layer(self):
+        """Obtém a camada de corte do bioma Amazônia para recortar dados da Amazônia Legal
+        
+        Esta função é usada quando o usuário seleciona 'Amazônia' mas os dados vêm
+        do WFS da Amazônia Legal (que é mais estável). O corte garante que apenas
+        os polígonos dentro do bioma Amazônia sejam retornados.
+        """
+        try:
+            print(f"🌳 DEBUG: Obtendo limite do bioma Amazônia para corte...")
+            
+            # Verifica se o shapefile IBGE está disponível
+            if not hasattr(self, 'ibge_layer') or not self.ibge_layer:
+                # Tenta carregar o shapefile IBGE
+                self.load_ibge_shapefile()
+            
+            if not self.ibge_layer:
+                print(f"❌ DEBUG: Shapefile IBGE não disponível")
+                return None
+            
+            # Filtra pelo bioma Amazônia
+            expression = '"bioma" = \'Amazônia\''
+            request = QgsFeatureRequest().setFilterExpression(expression)
+            
+            # Cria nova camada com as feições do bioma Amazônia
+            filtered_layer = QgsVectorLayer(f"Polygon?crs={self.ibge_layer.crs().authid()}", "Bioma_Amazonia", "memory")
+            provider = filtered_layer.dataProvider()
+            provider.addAttributes(self.ibge_layer.fields())
+            filtered_layer.updateFields()
+            
+            # Adiciona feições filtradas
+            features = []
+            for feature in self.ibge_layer.getFeatures(request):
+                features.append(feature)
+            
+            if not features:
+                print(f"❌ DEBUG: Nenhuma feição encontrada para bioma Amazônia")
+                return None
+            
+            provider.addFeatures(features)
+            print(f"✅ DEBUG: {len(features)} feições do bioma Amazônia encontradas")
+            
+            # Dissolve para obter um único polígono do bioma
+            dissolved_layer = self.dissolve_layer(filtered_layer, 'bioma')
+            
+            if dissolved_layer and dissolved_layer.isValid():
+                print(f"✅ DEBUG: Layer do bioma Amazônia dissolvida: {dissolved_layer.featureCount()} feições")
+                return dissolved_layer
+            else:
+                print(f"⚠️ DEBUG: Dissolve falhou, usando layer não dissolvida")
+                return filtered_layer
+                
+        except Exception as e:
+            print(f"❌ ERROR get_amazonia_biome_cut_layer: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def dissolve_layer(self, layer, field):
+        """Dissolve uma camada por um campo específico"""
+        try:
+            from qgis.analysis import QgsNativeAlgorithms
+            import processing
+            
+            # Configura parâmetros para dissolução
+            params = {
+                'INPUT': layer,
+                'FIELD': [field],
+                'OUTPUT': 'memory:'
+            }
+            
+            # Executa algoritmo de dissolução
+            result = processing.run("native:dissolve", params)
+            dissolved_layer = result['OUTPUT']
+            
+            if dissolved_layer and dissolved_layer.isValid():
+                original_count = layer.featureCount()
+                dissolved_count = dissolved_layer.featureCount()
+                
+                # NOVO: Registra processamento de dissolve
+                if dissolved_count < original_count:
+                    reduction_count = original_count - dissolved_count
+                    reduction_percent = (reduction_count / original_count) * 100
+                    self.add_processing_log(
+                        f"DISSOLUÇÃO POR CAMPO '{field}'",
+                        f"{original_count} feições → {dissolved_count} feições dissolvidas (união de {reduction_count} polígonos - {reduction_percent:.1f}% redução)"
+                    )
+                else:
+                    self.add_processing_log(
+                        f"DISSOLUÇÃO POR CAMPO '{field}'",
+                        f"{original_count} feições analisadas → {dissolved_count} feições (nenhum polígono foi unido)"
+                    )
+            
+            return dissolved_layer
+        except Exception as e:
+            print(f"❌ Erro ao dissolver camada: {str(e)}")
+            return None
+
+    def generate_queimadas_months(self):
+        """Gera lista de meses disponíveis dinamicamente (09/2002 até mês atual -1)"""
+        try:
+            import datetime
+            
+            # Data atual
+            now = datetime.datetime.now()
+            
+            # Mês anterior (atual -1)
+            if now.month == 1:
+                end_year = now.year - 1
+                end_month = 12
+            else:
+                end_year = now.year
+                end_month = now.month - 1
+            
+            # Lista de meses no formato YYYY_MM_01
+            months = []
+            
+            # Começar em setembro de 2002
+            year = 2002
+            month = 9
+            
+            while year < end_year or (year == end_year and month <= end_month):
+                month_str = f"{year:04d}_{month:02d}_01"
+                months.append(month_str)
+                
+                # Próximo mês
+                month += 1
+                if month > 12:
+                    month = 1
+                    year += 1
+            
+            print(f"🔥 DEBUG: {len(months)} meses de área queimada disponíveis (2002-09 até {end_year:04d}-{end_month:02d})")
+            return months
+            
+        except Exception as e:
+            print(f"❌ ERROR generate_queimadas_months: {str(e)}")
+            return []
+
+    def generate_queimadas_output_filename(self):
+        """Gera nome do arquivo de saída para ÁREA QUEIMADA"""
+        try:
+            # Componentes do nome
+            theme = "area_queimada"
+            biome = self.selected_biome.lower().replace(' ', '_').replace('ã', 'a').replace('ô', 'o')
+            
+            # Período baseado no tipo
+            if self.queimadas_data_type == "anual":
+                period = f"{self.queimadas_year}"
+                data_type = "anual"
+            else:  # mensal
+                year, month, _ = self.queimadas_month.split('_')
+                period = f"{year}{month}"
+                data_type = "mensal"
+            
+            # Tipo de corte
+            cut_name = self.get_cut_option_name()
+            
+            # Nome final - ajustado para área queimada
+            if self.cut_option == 0:  # Todo o bioma
+                # Para área queimada, não adiciona "SemCorte" pois sempre há algum corte
+                filename = f"{theme}_{biome}_{period}_{data_type}"
+            else:
+                # Para outros tipos de corte, adiciona o nome do corte
+                filename = f"{theme}_{biome}_{period}_{data_type}_{cut_name}"
+            
+            # Limita tamanho do nome
+            if len(filename) > 100:
+                if self.cut_option == 0:
+                    filename = f"{theme}_{biome}_{period}"
+                else:
+                    filename = f"{theme}_{biome}_{period}_{cut_name}"
+            
+            print(f"📁 DEBUG: Nome ÁREA QUEIMADA gerado: {filename}")
+            return filename
+            
+        except Exception as e:
+            print(f"❌ ERROR generate_queimadas_output_filename: {str(e)}")
+            return f"area_queimada_{self.selected_biome.lower()}_{self.queimadas_data_type}"
+
+    def build_queimadas_download_info(self):
+        """Constrói informações de download para ÁREA QUEIMADA"""
+        try:
+            result = {
+                'urls': [],
+                'months': [],
+                'data_type': self.queimadas_data_type
+            }
+            
+            if self.queimadas_data_type == "anual":
+                # Busca todos os meses do ano selecionado
+                year_months = [m for m in self.queimadas_months if m.startswith(f"{self.queimadas_year:04d}_")]
+                for month_str in year_months:
+                    url = self.build_queimadas_url(month_str)
+                    result['urls'].append(url)
+                    result['months'].append(month_str)
+                    
+                print(f"🔥 DEBUG: Ano {self.queimadas_year} - {len(year_months)} meses encontrados")
+                    
+            else:  # mensal (SIMPLIFICADO - apenas 1 mês)
+                month_str = self.queimadas_month
+                url = self.build_queimadas_url(month_str)
+                result['urls'].append(url)
+                result['months'].append(month_str)
+                    
+                print(f"🔥 DEBUG: Mês selecionado: {month_str}")
+            
+            if not result['urls']:
+                raise Exception("Nenhum arquivo encontrado para o período selecionado")
+                
+            return result
+            
+        except Exception as e:
+            print(f"❌ ERROR build_queimadas_download_info: {str(e)}")
+            return {'urls': [], 'months': [], 'data_type': self.queimadas_data_type}
+
+    def build_queimadas_url(self, month_str):
+        """Constrói URL específica baseada no mês (resolve problema v/V)"""
+        try:
+            # Extrai ano e mês do formato YYYY_MM_01
+            year, month, day = month_str.split('_')
+            year_int = int(year)
+            month_int = int(month)
+            
+            # CORREÇÃO: Define padrão v/V baseado na data
+            # Até agosto de 2020 (2020_08_01): usa 'v' minúsculo
+            # A partir de setembro de 2020 (2020_09_01): usa 'V' maiúsculo
+            if year_int < 2020 or (year_int == 2020 and month_int <= 8):
+                version = "v6"  # minúsculo
+            else:
+                version = "V6"  # maiúsculo
+            
+            url = f"{self.queimadas_base_url}{month_str}_aq1km_{version}.zip"
+            print(f"🔥 DEBUG: URL construída: {url} (padrão: {version})")
+            
+            return url
+            
+        except Exception as e:
+            print(f"❌ ERROR build_queimadas_url: {str(e)}")
+            # Fallback para padrão antigo
+            return f"{self.queimadas_base_url}{month_str}_aq1km_v6.zip"
+
+    def reproject_layer(self, layer, target_crs):
+        """
+        Reprojeta uma layer para o CRS de destino
+        """
+        try:
+            import processing
+            
+            # Parâmetros para reprojeção
+            params = {
+                'INPUT': layer,
+                'TARGET_CRS': target_crs,
+                'OUTPUT': self.get_work_store_output(layer, "reprojected")
+            }
+            
+            # Executa o algoritmo de reprojeção
+            result = processing.run("native:reprojectlayer", params)
+            
+            if result and 'OUTPUT' in result:
+                reprojected_layer = self.load_processing_output(result['OUTPUT'], f"{layer.name()}_reprojected")
+                
+                if reprojected_layer and reprojected_layer.isValid():
+                    # NOVO: Registra processamento
+                    original_crs = layer.crs().authid()
+                    target_crs_id = target_crs if isinstance(target_crs, str) else target_crs.authid()
+                    self.add_processing_log(
+                        "REPROJEÇÃO DE COORDENADAS",
+                        f"{original_crs} → {target_crs_id}"
+                    )
+                    return reprojected_layer
+                else:
+                    return None
+            else:
+                return None
+                
+        except Exception as e:
+            from qgis.core import QgsMessageLog, Qgis
+            error_msg = f"❌ ERRO reproject_layer: {str(e)}"
+            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
+            return None
+
+    def get_queimadas_biome_cut_layer(self):
+        """Cria layer de corte baseada no bioma selecionado para ÁREA QUEIMADA"""
+        try:
+            if not self.ibge_layer:
+                return None
+            
+            # Constrói expressão de filtro baseada no bioma
+            if self.selected_biome == 'Amazônia Legal':
+                # Para Amazônia Legal, usa coluna 'regiao'
+                expression = f'"regiao" = \'Amazônia Legal\''
+            else:
+                # Para outros biomas, usa coluna 'bioma' (com b minúsculo)
+                expression = f'"bioma" = \'{self.selected_biome}\''
+            
+            # Aplica filtro
+            request = QgsFeatureRequest().setFilterExpression(expression)
+            
+            # Conta quantas feições correspondem ao filtro
+            filtered_features = list(self.ibge_layer.getFeatures(request))
+            
+            if not filtered_features:
+                return None
+            
+            # Cria layer filtrada em memória
+            filtered_layer = QgsVectorLayer(f"Polygon?crs={self.ibge_layer.crs().authid()}", f"corte_{self.selected_biome}", "memory")
+            provider = filtered_layer.dataProvider()
+            provider.addAttributes(self.ibge_layer.fields())
+            filtered_layer.updateFields()
+            
+            # Adiciona feições filtradas
+            provider.addFeatures(filtered_features)
+            filtered_layer.updateExtents()
+            
+            return filtered_layer
+                
+        except Exception as e:
+            from qgis.core import QgsMessageLog, Qgis
+            error_msg = f"❌ ERRO get_queimadas_biome_cut_layer: {str(e)}"
+            QgsMessageLog.logMessage(error_msg, "DesagregaBiomasBR", Qgis.Critical)
+            return None
+
+    def extract_and_load_queimadas_shapefile(self, zip_path, month_str, extract_dir=None):
+        """Extrai ZIP (em extract_dir ou numa pasta temporária) e carrega o shapefile de área queimada"""
+        try:
+            import zipfile
+            import tempfile
+            import os
+            from qgis.core import QgsVectorLayer
+            
+            # Cria diretório temporário para extração
+            extract_dir = extract_dir or os.path.join(tempfile.gettempdir(), f"queimadas_{month_str}")
+            os.makedirs(extract_dir, exist_ok=True)
+            
+            # Extrai ZIP
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                zip_ref.extractall(extract_dir)
+                extracted_files = zip_ref.namelist()
+                print(f"🔥 DEBUG: Extraídos {len(extracted_files)} arquivos para {extract_dir}")
+            
+            # Procura arquivo .shp
+            shp_file = None
+            for file in extracted_files:
+                if file.endswith('.shp'):
+                    shp_file = os.path.join(extract_dir, file)
+                    break
+            
+            if not shp_file or not os.path.exists(shp_file):
+                print(f"❌ DEBUG: Arquivo .shp não encontrado em {zip_path}")
+                return None
+            
+            # Carrega shapefile
+            layer = QgsVectorLayer(shp_file, f"area_queimada_{month_str}", "ogr")
+            
+            if layer.isValid():
+                print(f"✅ DEBUG: Shapefile {month_str} carregado: {layer.featureCount()} feições")
+                return layer
+            else:
+                print(f"❌ DEBUG: Shapefile {month_str} inválido")
+                return None
+                
+        except Exception as e:
+            print(f"❌ ERROR extract_and_load_queimadas_shapefile: {str(e)}")
+            return None
+
+    def dissolve_queimadas_layer(self, layer):
+        """Dissolve áreas queimadas com tratamento de sobreposições"""
+        try:
+            import processing
+            
+            print(f"🔥 DEBUG: Aplicando dissolve em áreas queimadas...")
+            original_count = layer.featureCount()
+            
+            # ETAPA 1: Buffer 0 para limpar sobreposições
+            print(f"🔥 DEBUG: Limpando sobreposições com buffer 0...")
+            clean_params = {
+                'INPUT': layer,
+                'DISTANCE': 0,
+                'OUTPUT': self.get_work_store_output(layer, "buffer")
+            }
+            
+            clean_result = processing.run("native:buffer", clean_params)
+            clean_layer = self.load_processing_output(clean_result['OUTPUT'], f"{layer.name()}_buffer")
+            
+            if not clean_layer or not clean_layer.isValid():
+                print(f"❌ DEBUG: Buffer 0 falhou")
+                return None
+            
+            # ETAPA 2: Dissolve completo (une TODAS as geometrias adjacentes)
+            print(f"🔥 DEBUG: Aplicando dissolve completo...")
+            dissolve_params = {
+                'INPUT': clean_layer,
+                'FIELD': [],  # Sem campo = dissolve tudo
+                'OUTPUT': self.get_work_store_output(clean_layer, "dissolved")
+            }
+            
+            result = processing.run("native:dissolve", dissolve_params)
+            dissolved_layer = self.load_processing_output(result['OUTPUT'], f"{layer.name()}_dissolved")
+            
+            if dissolved_layer and dissolved_layer.isValid():
+                dissolved_count = dissolved_layer.featureCount()
+                
+                print(f"✅ DEBUG: Dissolve concluído: {original_count} → {dissolved_count} feições")
+                
+                # LOGS REMOVIDOS: Evita duplicação com o novo log otimizado
+                # O log detalhado agora é feito na função stage_dissolve_queimadas
+                
+                dissolved_layer.setName(f"{layer.name()}_dissolved")
+                return dissolved_layer
+            else:
+                print(f"❌ DEBUG: Dissolve retornou layer inválida")
+                return None
+            
+        except Exception as e:
+            print(f"❌ ERROR dissolve_queimadas_layer: {str(e)}")
+            # LOGS REMOVIDOS: Evita duplicação com o novo log otimizado
+            # O log detalhado de erro agora é feito na função stage_dissolve_queimadas
+            return None
+
+    def should_dissolve_queimadas(self):
+        """Dissolve das áreas queimadas pedido (só no modo anual, com a opção marcada)"""
+        return self.queimadas_data_type == "anual" and bool(getattr(self, 'queimadas_dissolve', False))
+
+    def stage_download_queimadas(self, task=None):
+        """Etapa de download ÁREA QUEIMADA: ZIPs mensais baixados e extraídos (uma camada por mês)"""
+        urls = self.queimadas_download_info['urls']
+        months = self.queimadas_download_info['months']
+        stage_dir = self.get_stage_work_dir()
+        print(f"🔥 DEBUG: Iniciando download de {len(urls)} arquivos")
+        
+        layers = []
+        for n, (url, month_str) in enumerate(zip(urls, months)):
+            if self.check_abort_signal():
+                return
+            
+            print(f"🔥 DEBUG: Baixando arquivo {n+1}/{len(urls)}: {month_str}")
+            self.update_notes(f"📥 Baixando área queimada {n+1}/{len(urls)}: {month_str}", "status")
+            
+            # Download em blocos com verificação de abort a cada bloco
+            zip_path = os.path.join(tempfile.gettempdir(), f"{month_str}_aq1km_v6.zip")
+            status, file_size = self.stream_download_to_file(
+                url, zip_path, timeout=120,
+                progress_callback=self.create_download_progress_callback(f"Área queimada {month_str}"))
+            if status is None:
+                if self.check_abort_signal():
+                    return
+                raise Exception(f"Falha no download {month_str}")
+            if status != 200:
+                raise Exception(f"Erro no download {month_str}: HTTP {status}")
+            print(f"✅ DEBUG: Arquivo {month_str} baixado: {file_size} bytes")
+            
+            # Extraído na pasta da etapa (resultado memorizado sem cópia)
+            extract_dir = os.path.join(stage_dir, month_str) if stage_dir else None
+            layer = self.extract_and_load_queimadas_shapefile(zip_path, month_str, extract_dir)
+            if layer and layer.isValid():
+                layers.append(layer)
+            else:
+                print(f"⚠️ DEBUG: Falha ao carregar layer {month_str}")
+            
+            if task is not None:
+                task.setProgress(100.0 * (n + 1) / len(urls))
+        
+        if not layers:
+            raise Exception("Nenhum shapefile de área queimada carregado")
+        self.processing_layers = layers
+
+    def stage_merge_queimadas(self, task=None):
+        """Etapa de união: modo anual junta os meses (dissolve fica para depois do corte)"""
+        if self.queimadas_data_type != "anual":
+            print(f"🔥 DEBUG: Modo mensal - mantendo {len(self.processing_layers)} layers separadas")
+            return
+        
+        print(f"🔥 DEBUG: Modo anual - unindo {len(self.processing_layers)} layers")
+        merged_layer = self.merge_layers(self.processing_layers)
+        if not merged_layer or not merged_layer.isValid():
+            raise Exception("Falha ao unir layers anuais")
+        
+        print(f"✅ DEBUG: Layers anuais unidas: {merged_layer.featureCount()} feições")
+        self.processing_layers = [merged_layer]
+
+    def stage_cut_queimadas_biome(self, task=None):
+        """Etapa de corte por bioma (dados do Brasil todo): correção, reprojeção e clip
+        
+        Se o corte falhar, segue com os dados originais.
+        """
+        from qgis.core import QgsMessageLog, Qgis
+        
+        try:
+            # Lista feições originais antes do corte
+            total_original = sum([layer.featureCount() for layer in self.processing_layers])
+            
+            # Cria layer de corte baseada no bioma selecionado
+            cut_layer = self.get_queimadas_biome_cut_layer()
+            
+            if not cut_layer or not cut_layer.isValid():
+                QgsMessageLog.logMessage(f"❌ FALHA: Corte por bioma não funcionou para {self.selected_biome}", "DesagregaBiomasBR", Qgis.Warning)
+                return
+            
+            # Aplica corte em todas as layers de processamento
+            cut_layers = []
+            total_cut = 0
+            
+            for i, layer in enumerate(self.processing_layers):
+                self.update_notes(f"✂️ Cortando layer {i+1}/{len(self.processing_layers)} por bioma...", "status")
+                
+                # ETAPA 1: Corrigir geometrias inválidas
+                fixed_layer = self.auto_fix_geometries(layer, f"queimadas_{i}")
+                
+                if not fixed_layer or not fixed_layer.isValid():
+                    fixed_layer = layer
+                
+                # ETAPA 2: Reprojetar para o mesmo CRS do shapefile IBGE
+                target_crs = cut_layer.crs()
+                
+                if fixed_layer.crs().authid() != target_crs.authid():
+                    reprojected_layer = self.reproject_layer(fixed_layer, target_crs)
+                    
+                    if not reprojected_layer or not reprojected_layer.isValid():
+                        prepared_layer = fixed_layer
+                    else:
+                        prepared_layer = reprojected_layer
+                else:
+                    prepared_layer = fixed_layer
+                
+                # ETAPA 3: Aplicar corte espacial (sem registro individual - será registrado em lote)
+                cut_result = self.clip_layer(prepared_layer, cut_layer, log_processing=False)
+                
+                if cut_result and cut_result.isValid():
+                    cut_layers.append(cut_result)
+                    total_cut += cut_result.featureCount()
+                else:
+                    cut_layers.append(layer)  # Usa original se corte falhar
+                    total_cut += layer.featureCount()
+            
+            # Atualiza layers de processamento com versões cortadas por bioma
+            if total_cut < total_original:
+                reduction = total_original - total_cut
+                percentage = (reduction / total_original) * 100
+                QgsMessageLog.logMessage(f"✅ SUCESSO: Corte por bioma aplicado! {total_original} → {total_cut} feições ({percentage:.1f}% redução)", "DesagregaBiomasBR", Qgis.Success)
+                
+                self.add_processing_log(
+                    "CORTE POR BIOMA",
+                    f"{total_original} feições → {total_cut} feições (redução de {percentage:.1f}%) - Bioma: {self.selected_biome}"
+                )
+            else:
+                self.add_processing_log(
+                    "CORTE POR BIOMA",
+                    f"{total_original} feições mantidas - Bioma: {self.selected_biome} (dados já estavam dentro do bioma)"
+                )
+            
+            self.processing_layers = cut_layers
+            
+        except Exception as e:
+            # Continua mesmo com erro de corte
+            QgsMessageLog.logMessage(f"❌ ERRO stage_cut_queimadas_biome: {str(e)}", "DesagregaBiomasBR", Qgis.Critical)
+
+    def stage_dissolve_queimadas(self, task=None):
+        """Etapa de dissolve APÓS o corte por bioma (dissolve só os dados do bioma)
+        
+        Se o dissolve falhar, segue com a layer cortada.
+        """
+        from qgis.core import QgsMessageLog, Qgis
+        
+        if not self.should_dissolve_queimadas() or len(self.processing_layers) != 1:
+            print(f"🔥 DEBUG: Dissolve NÃO será aplicado")
+            return
+        
+        try:
+            # Pega a layer já cortada por bioma
+            cut_layer = self.processing_layers[0]
+            features_before = cut_layer.featureCount()
+            
+            print(f"🔥 DEBUG: Dissolve pós-corte - processando {features_before} feições do bioma {self.selected_biome}")
+            
+            dissolved_layer = self.dissolve_queimadas_layer(cut_layer)
+            
+            if dissolved_layer and dissolved_layer.isValid():
+                features_after = dissolved_layer.featureCount()
+                reduction = features_before - features_after
+                
+                self.processing_layers = [dissolved_layer]
+                print(f"✅ DEBUG: Dissolve pós-corte concluído: {features_before} → {features_after} feições")
+                
+                if reduction > 0:
+                    percentage = (reduction / features_before) * 100
+                    self.add_processing_log(
+                        "DISSOLUÇÃO DE ÁREAS QUEIMADAS",
+                        f"{features_before} feições → {features_after} feições (redução de {percentage:.1f}%) - Bioma: {self.selected_biome}"
+                    )
+                else:
+                    self.add_processing_log(
+                        "DISSOLUÇÃO DE ÁREAS QUEIMADAS",
+                        f"{features_before} feições mantidas (sem áreas adjacentes para unir) - Bioma: {self.selected_biome}"
+                    )
+                
+                QgsMessageLog.logMessage(f"✅ SUCESSO: Dissolve pós-corte - {features_before} → {features_after} feições", "DesagregaBiomasBR", Qgis.Success)
+                
+            else:
+                # Se dissolve falhar, usa layer cortada mesmo
+                print(f"⚠️ DEBUG: Dissolve pós-corte falhou, usando layer cortada")
+                self.add_processing_log(
+                    "DISSOLUÇÃO DE ÁREAS QUEIMADAS",
+                    f"Falha no dissolve - mantendo {features_before} feições cortadas do bioma {self.selected_biome}"
+                )
+            
+        except Exception as e:
+            # Continua mesmo com erro no dissolve
+            QgsMessageLog.logMessage(f"❌ ERRO stage_dissolve_queimadas: {str(e)}", "DesagregaBiomasBR", Qgis.Critical)
+
+    def stage_additional_cut(self, task=None):
+        """Etapa de corte adicional da ÁREA QUEIMADA (além do bioma, só com opção de corte)"""
+        if getattr(self, 'cut_option', None) in (None, 0):
+            return
+        self.cut_processing_layers()
+
+
+class PipelineJob(DesagregaBiomasBRPipeline):
+    """Um processamento do assistente executado inteiro fora da interface
+
+    Recebe uma cópia das seleções já resolvidas do diálogo (os mesmos
+    atributos de estado que HeadlessPipeline recebe dos parâmetros) e roda
+    preparação, grafo de etapas, salvamento e metadados no corpo de uma
+    QgsTask (run). Cada processamento tem o seu próprio estado, então vários
+    podem rodar ao mesmo tempo; à thread principal ficam só a interface e
+    add_result_to_map.
+    """
+
+    # Seleções lidas pelo pipeline que reset_all_variables/init_pipeline_settings não criam
+    SELECTION_ATTRIBUTES = ('plugin_dir', 'ibge_shapefile_name', 'ibge_shapefile_path', 'queimadas_data_type',
+                            'queimadas_year', 'queimadas_month', 'queimadas_dissolve')
+    # Estado de execução: cada processamento começa do zero
+    RUN_STATE_ATTRIBUTES = ('processing_layers', 'processing_log', 'urls_and_filters', 'wfs_work_stores',
+                            'wfs_cut_filter', 'wfs_clip_geometry', 'wfs_cut_key', 'stage_graph', 'stage_store_path',
+                            'abort_download', 'download_in_progress', 'background_task',
+                            'worker_download_progress', 'http_session')
+
+    def __init__(self, source, output_folder, format_name, extension, generate_metadata=False):
+        self.reset_all_variables()
+        self.init_pipeline_settings()
+        
+        for name in set(vars(self)) | set(self.SELECTION_ATTRIBUTES):
+            if name in self.RUN_STATE_ATTRIBUTES or not hasattr(source, name):
+                continue
+            value = getattr(source, name)
+            if isinstance(value, (list, dict, set)):
+                value = copy.copy(value)
+            elif isinstance(value, QgsRectangle):
+                value = QgsRectangle(value)
+            elif not isinstance(value, (type(None), bool, int, float, str, bytes, tuple)):
+                continue  # Widgets, camadas e objetos de thread ficam com o diálogo
+            setattr(self, name, value)
+        
+        # Camada de corte do projeto: cópia em memória (só o elemento escolhido) feita aqui, na thread principal
+        if getattr(source, 'selected_layer', None) is not None:
+            request = QgsFeatureRequest()
+            if self.selected_field and self.selected_element:
+                request.setFilterExpression(f'"{self.selected_field}" = \'{self.selected_element}\'')
+            self.selected_layer = source.selected_layer.materialize(request)
+            if self.selected_layer.featureCount() == 0:
+                self.selected_layer = source.selected_layer.materialize(QgsFeatureRequest())  # Mesmo recuo de get_cut_layer
+            self.selected_layer.setName(source.selected_layer.name())
+        
+        self.output_folder = output_folder
+        self.format_name = format_name
+        self.extension = extension
+        self.generate_metadata = generate_metadata
+        self.output_filename = None
+        self.final_file_path = None
+        self.metadata_file_path = None
+        self.feature_count = 0
+        self.status_note = ""
+
+    def update_notes(self, message, note_type="status"):
+        """Notas guardadas para a interface (o diálogo lê get_progress_text)"""
+        if self.in_download_worker():
+            super().update_notes(message, note_type)
+            return
+        self.status_note = message
+
+    def show_worker_progress(self):
+        """O progresso das camadas já faz parte de get_progress_text"""
+
+    def get_progress_text(self):
+        """Última nota do processamento e o progresso das camadas em download simultâneo"""
+        progress = dict(self.worker_download_progress)
+        parts = [self.status_note] + [f"{name}: {message}" for name, message in progress.items()]
+        return ' | '.join(part for part in parts if part)
+
+    def check_abort_signal(self):
+        """Abortar no diálogo ou cancelar no gerenciador de tarefas"""
+        if self.background_task is not None and self.background_task.isCanceled():
+            self.abort_download = True
+        return self.abort_download
+
+    def run(self, task=None):
+        """Corpo da QgsTask: preparação, grafo de etapas, salvamento e metadados
+        
+        Retorna o caminho do arquivo salvo ou None se abortado; erros viram
+        exceção. As camadas resultantes são entregues à thread principal.
+        """
+        self.background_task = task
+        self.processing_log = []
+        try:
+            # Limites IBGE abertos nesta thread (corte IBGE, TERRACLASS e ÁREA QUEIMADA)
+            if self.ibge_shapefile_path and os.path.exists(self.ibge_shapefile_path):
+                self.load_ibge_shapefile()
+            
+            self.output_filename = self.generate_theme_output_filename()
+            print(f"📁 DEBUG: Nome do arquivo {self.selected_theme}: {self.output_filename}")
+            
+            self.prepare_theme_stages()
+            if not self.run_stage_graph(task):
+                return None
+            if not self.processing_layers:
+                raise Exception("Nenhuma layer para salvar")
+            
+            full_path = os.path.join(self.output_folder, f"{self.output_filename}{self.extension}")
+            self.update_notes(f"💾 Salvando arquivo | Formato: {self.format_name} | Destino: {full_path}", "status")
+            if not self.save_layer_to_file(self.processing_layers[0], full_path, self.format_name):
+                raise Exception("Falha ao salvar arquivo")
+            self.final_file_path = full_path
+            self.feature_count = self.processing_layers[0].featureCount()
+            
+            if self.generate_metadata:
+                self.update_notes(f"📄 Gerando metadados | Arquivo: {self.output_filename}.txt", "status")
+                metadata_path = os.path.join(self.output_folder, f"{self.output_filename}.txt")
+                if self.selected_theme == "TERRACLASS":
+                    generated = self.generate_terraclass_metadata_file(metadata_path)
+                else:
+                    generated = self.generate_metadata_file(metadata_path)
+                if generated:
+                    self.metadata_file_path = metadata_path
+                else:
+                    print(f"⚠️ DEBUG: Falha ao gerar metadados (continuando...)")
+            
+            return full_path
+        finally:
+            self.ibge_layer = None  # Liberada na thread que a abriu
+            if task is not None:
+                self.move_layers_to_main_thread()
+            self.close_http_session()
@@ -8,11 +8,14 @@ import os.path
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication, Qt, QSize
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction, QToolBar
+from qgis.core import QgsApplication
 
 # Initialize Qt resources from file resources.py
 from .resources import *
 # Import the code for the dialog
 from .dialog import DesagregaBiomasBRDialog
+# Provedor Processing (caixa de ferramentas, modelos e qgis_process)
+from .processing_provider import DesagregaBiomasBRProvider
 
 
 class DesagregaBiomasBR:
@@ -54,6 +57,9 @@ class DesagregaBiomasBR:
         # Create the dialog instance
         self.dlg = None
 
+        # Provedor Processing (registrado em initProcessing)
+        self.provider = None
+
     # noinspection PyMethodMayBeStatic
     def tr(self, message):
         """Get the translation for a string using Qt translation API.
@@ -139,9 +145,18 @@ class DesagregaBiomasBR:
 
         return action
 
+    def initProcessing(self):
+        """Register the Processing provider (also called by qgis_process, without GUI)."""
+        if self.provider is None:
+            self.provider = DesagregaBiomasBRProvider()
+            QgsApplication.processingRegistry().addProvider(self.provider)
+
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
 
+        # Algoritmos PRODES/DETER/TERRACLASS na caixa de ferramentas Processing
+        self.initProcessing()
+
         # Cria barra de ferramentas simples (sem estilo, só funcional)
         self.toolbar = self.iface.addToolBar(u'DesagregaBiomasBR')
         self.toolbar.setObjectName(u'DesagregaBiomasBRToolbar')
@@ -210,6 +225,11 @@ class DesagregaBiomasBR:
         if self.toolbar:
             self.toolbar.deleteLater()
             self.toolbar = None
+        
+        # Remove o provedor Processing
+        if self.provider:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
 
     def run(self):
         """Run method that performs all the real work"""
@@ -0,0 +1,564 @@
+# -*- coding: utf-8 -*-
+"""
+DesagregaBiomasBR Processing
+Provedor de algoritmos para a caixa de ferramentas Processing, modelos,
+processamento em lote e qgis_process (execução sem interface)
+"""
+
+import os
+import json
+from qgis.PyQt.QtGui import QIcon
+from qgis.core import (QgsProcessingProvider, QgsProcessingAlgorithm, QgsProcessing,
+                       QgsProcessingException, QgsProcessingParameterEnum,
+                       QgsProcessingParameterNumber, QgsProcessingParameterString,
+                       QgsProcessingParameterVectorLayer, QgsProcessingParameterField,
+                       QgsProcessingParameterBoolean, QgsProcessingParameterVectorDestination,
+                       QgsProcessingParameterFolderDestination, QgsProcessingOutputMultipleLayers,
+                       QgsFeatureRequest, QgsSpatialIndex, QgsCoordinateTransform, QgsProject)
+
+from .pipeline import DesagregaBiomasBRPipeline
+
+# Perfis de transferência do WFS (mesmas chaves de wfs_transfer_profiles)
+TRANSFER_PROFILES = ['completo', 'padrao', 'visao_geral']
+
+
+def load_plugin_lists():
+    """Lê o listas.json do plugin (biomas e anos das opções dos algoritmos, sem acesso à rede)"""
+    try:
+        with open(os.path.join(os.path.dirname(__file__), 'listas.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ DEBUG: Falha ao ler listas.json do plugin: {str(e)}")
+        return {}
+
+
+class HeadlessPipeline(DesagregaBiomasBRPipeline):
+    """Etapas do DesagregaBiomasBRPipeline executadas sem o diálogo
+
+    Download WFS, corte, mesclagem e metadados vêm da mesma classe base do
+    diálogo. Notas vão para o feedback do Processing e cancelar aborta o
+    download.
+    """
+
+    def __init__(self, feedback):
+        self.feedback = feedback
+        self.plugin_dir = os.path.dirname(__file__)
+        self.reset_all_variables()
+        self.ibge_shapefile_name = None
+        self.ibge_shapefile_path = None
+        self.init_pipeline_settings()
+        self.background_tasks = False  # O algoritmo já é a tarefa; downloads direto nesta thread
+        self.cut_option = 0
+        self.batch_aois = []  # Áreas de interesse do modo em lote (seleção de corte de cada uma)
+        self.batch_union_layer = None  # Todas as áreas juntas: corte do download único
+
+    def update_notes(self, message, note_type="status"):
+        """Notas do pipeline no log do algoritmo"""
+        if self.in_download_worker():
+            super().update_notes(message, note_type)
+            return
+        self.feedback.pushInfo(message)
+
+    def check_abort_signal(self):
+        """Cancelar no Processing aborta o download"""
+        if self.feedback.isCanceled():
+            self.abort_download = True
+        return self.abort_download
+
+    def load_ibge_layer(self):
+        """Garante o shapefile IBGE carregado (corte por estado/município e TERRACLASS)"""
+        if self.ibge_layer:
+            return
+        if not self.ensure_ibge_shapefile_available() or not self.load_ibge_shapefile():
+            raise QgsProcessingException("Shapefile IBGE de limites não disponível")
+
+    def run(self, output_path, generate_metadata=False):
+        """Executa o tema selecionado e salva em output_path"""
+        self.processing_log = []
+        self.output_filename = self.generate_theme_output_filename()
+
+        if self.selected_theme == "TERRACLASS":
+            self.load_ibge_layer()
+        self.run_theme_stages()
+
+        self.feedback.setProgressText("💾 Salvando arquivo...")
+        format_name = "ESRI Shapefile" if output_path.lower().endswith('.shp') else "GPKG"
+        if not self.save_layer_to_file(self.processing_layers[0], output_path, format_name):
+            raise QgsProcessingException(f"Falha ao salvar {output_path}")
+        self.final_file_path = output_path
+
+        if generate_metadata:
+            metadata_path = f"{os.path.splitext(output_path)[0]}.txt"
+            if self.selected_theme == "TERRACLASS":
+                self.generate_terraclass_metadata_file(metadata_path)
+            else:
+                self.generate_metadata_file(metadata_path)
+
+        self.feedback.setProgress(100)
+
+    def run_theme_stages(self):
+        """Entradas e grafo de etapas do tema (mesmas etapas e memorização do assistente)"""
+        try:
+            self.prepare_theme_stages()
+            completed = self.run_stage_graph()
+        except QgsProcessingException:
+            raise
+        except Exception as e:
+            raise QgsProcessingException(str(e))
+        if not completed:
+            raise QgsProcessingException("Processamento cancelado")
+        self.feedback.setProgress(90)
+
+    def set_batch_ibge_aois(self, geocodes, state=None):
+        """Áreas de interesse a partir de códigos IBGE e/ou de todos os municípios de um estado"""
+        wanted = set(geocodes)
+        aois = {}
+        feature_ids = []
+        for feature in self.ibge_layer.getFeatures():
+            geocode = str(feature['geocodigo'])
+            if geocode in wanted or (state and feature['estado'] == state):
+                feature_ids.append(feature.id())
+                # Município dividido entre biomas aparece em mais de uma feição: uma área por código
+                aois.setdefault(geocode, {
+                    'id': geocode,
+                    'cut_option': 3,
+                    'ibge_state': feature['estado'],
+                    'ibge_municipality': feature['nome']
+                })
+
+        missing = sorted(wanted - set(aois))
+        if missing:
+            raise QgsProcessingException(f"Códigos IBGE não encontrados no shapefile de limites: {', '.join(missing)}")
+        if not aois:
+            raise QgsProcessingException(f"Nenhum município encontrado para o estado {state}")
+
+        self.batch_aois = sorted(aois.values(), key=lambda aoi: aoi['id'])
+        self.batch_union_layer = self.ibge_layer.materialize(QgsFeatureRequest().setFilterFids(feature_ids))
+
+    def set_batch_layer_aois(self, layer, id_field):
+        """Áreas de interesse a partir de uma camada de polígonos (uma área por valor do campo)"""
+        values = layer.uniqueValues(layer.fields().indexOf(id_field))
+        self.batch_aois = [{
+            'id': str(value),
+            'cut_option': 1,
+            'selected_layer': layer,
+            'selected_field': id_field,
+            'selected_element': value
+        } for value in sorted((value for value in values if value is not None), key=str)]
+        self.batch_union_layer = layer
+
+        if not self.batch_aois:
+            raise QgsProcessingException(f"Campo {id_field} sem valores na camada {layer.name()}")
+
+    def run_batch(self, output_folder, extension, generate_metadata=False):
+        """Um download para todas as áreas de interesse e um recorte por área
+        
+        O download (com correção de geometrias) usa a união das áreas como
+        corte, então custa o mesmo que uma execução do assistente. Cada área é
+        recortada da camada baixada com get_cut_layer + clip_layer, lendo só
+        as feições que o índice espacial aponta dentro da sua extensão.
+        Retorna os caminhos dos arquivos salvos.
+        """
+        self.processing_log = []
+        self.cut_option = 1
+        self.selected_layer = self.batch_union_layer
+        self.selected_field = None
+        self.selected_element = None
+        self.run_theme_stages()
+
+        source = self.processing_layers[0]
+        download_log = list(self.processing_log)
+
+        self.feedback.setProgressText(f"🗂️ Criando índice espacial ({source.featureCount()} feições)...")
+        index = QgsSpatialIndex(source.getFeatures())
+
+        format_name = "ESRI Shapefile" if extension == ".shp" else "GPKG"
+        os.makedirs(output_folder, exist_ok=True)
+        saved_files = []
+        used_names = set()
+
+        for n, aoi in enumerate(self.batch_aois):
+            if self.check_abort_signal():
+                raise QgsProcessingException("Processamento cancelado")
+
+            # Seleção de corte da área (mesmos atributos preenchidos pelo assistente)
+            for name, value in aoi.items():
+                if name != 'id':
+                    setattr(self, name, value)
+            self.processing_log = list(download_log)
+
+            aoi_layer = self.get_cut_layer()
+            if not aoi_layer or not aoi_layer.isValid() or aoi_layer.featureCount() == 0:
+                self.feedback.reportError(f"⚠️ Área {aoi['id']} sem geometria de corte - ignorada")
+                continue
+            fixed_aoi_layer = self.auto_fix_geometries(aoi_layer, f"area_{aoi['id']}") or aoi_layer
+
+            extent = fixed_aoi_layer.extent()
+            if fixed_aoi_layer.crs().isValid() and fixed_aoi_layer.crs() != source.crs():
+                extent = QgsCoordinateTransform(fixed_aoi_layer.crs(), source.crs(), QgsProject.instance()).transformBoundingBox(extent)
+
+            candidates = source.materialize(QgsFeatureRequest().setFilterFids(index.intersects(extent)))
+            clipped_layer = self.clip_layer(candidates, fixed_aoi_layer) if candidates.featureCount() else None
+            if clipped_layer is None:
+                # Nenhuma feição na área: arquivo vazio com os mesmos campos
+                clipped_layer = candidates
+                self.add_processing_log("CORTE ESPACIAL", f"{source.featureCount()} feições → 0 feições (área fora dos dados baixados)")
+
+            filename = self.generate_theme_output_filename()
+            if filename in used_names:
+                filename = f"{filename}_{aoi['id']}"
+            used_names.add(filename)
+
+            output_path = os.path.join(output_folder, f"{filename}{extension}")
+            if not self.save_layer_to_file(clipped_layer, output_path, format_name):
+                self.feedback.reportError(f"❌ Falha ao salvar {output_path}")
+                continue
+            self.final_file_path = output_path
+            saved_files.append(output_path)
+
+            if generate_metadata:
+                self.generate_metadata_file(os.path.join(output_folder, f"{filename}.txt"))
+
+            self.feedback.pushInfo(f"✅ {aoi['id']}: {clipped_layer.featureCount()} feições → {os.path.basename(output_path)}")
+            self.feedback.setProgress(90 + 10 * (n + 1) / len(self.batch_aois))
+
+        return saved_files
+
+
+class DesagregaBiomasBRAlgorithm(QgsProcessingAlgorithm):
+    """Base dos algoritmos: bioma, corte, metadados e saída"""
+
+    THEME = None
+    BIOME = 'BIOME'
+    CUT_LAYER = 'CUT_LAYER'
+    CUT_FIELD = 'CUT_FIELD'
+    CUT_VALUE = 'CUT_VALUE'
+    IBGE_STATE = 'IBGE_STATE'
+    IBGE_MUNICIPALITY = 'IBGE_MUNICIPALITY'
+    TRANSFER_PROFILE = 'TRANSFER_PROFILE'
+    METADATA = 'METADATA'
+    OUTPUT = 'OUTPUT'
+
+    def createInstance(self):
+        return type(self)()
+
+    def name(self):
+        return self.THEME.lower()
+
+    def displayName(self):
+        return self.THEME
+
+    def group(self):
+        return 'Dados de biomas'
+
+    def groupId(self):
+        return 'dados_biomas'
+
+    def icon(self):
+        return QIcon(os.path.join(os.path.dirname(__file__), 'icones', 'mapa.png'))
+
+    def flags(self):
+        # Camadas baixadas nas threads são entregues à thread principal (como no assistente)
+        return super().flags() | QgsProcessingAlgorithm.FlagNoThreading
+
+    def biomes(self):
+        return load_plugin_lists().get('biomas', {}).get(self.THEME, [])
+
+    def add_biome_parameter(self):
+        self.addParameter(QgsProcessingParameterEnum(self.BIOME, 'Bioma', options=self.biomes()))
+
+    def add_cut_parameters(self):
+        """Corte por camada (com filtro campo = valor opcional) ou por estado/município IBGE"""
+        self.addParameter(QgsProcessingParameterVectorLayer(
+            self.CUT_LAYER, 'Camada de corte', [QgsProcessing.TypeVectorPolygon], optional=True))
+        self.addParameter(QgsProcessingParameterField(
+            self.CUT_FIELD, 'Campo de filtro da camada de corte', parentLayerParameterName=self.CUT_LAYER, optional=True))
+        self.addParameter(QgsProcessingParameterString(
+            self.CUT_VALUE, 'Valor do campo de filtro', optional=True))
+        self.addParameter(QgsProcessingParameterString(
+            self.IBGE_STATE, 'Estado IBGE (sem camada de corte)', optional=True))
+        self.addParameter(QgsProcessingParameterString(
+            self.IBGE_MUNICIPALITY, 'Município IBGE (com o estado)', optional=True))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.TRANSFER_PROFILE, 'Perfil de transferência WFS (vazio = configuração do plugin)',
+            options=TRANSFER_PROFILES, optional=True))
+
+    def add_output_parameters(self):
+        self.addParameter(QgsProcessingParameterBoolean(self.METADATA, 'Gerar metadados (.txt)', defaultValue=False))
+        self.addParameter(QgsProcessingParameterVectorDestination(self.OUTPUT, f'Saída {self.THEME}'))
+
+    def apply_cut_parameters(self, pipeline, parameters, context):
+        """Traduz os parâmetros de corte para cut_option/selected_layer/ibge_* do pipeline"""
+        cut_layer = self.parameterAsVectorLayer(parameters, self.CUT_LAYER, context)
+        ibge_state = self.parameterAsString(parameters, self.IBGE_STATE, context).strip()
+
+        if cut_layer:
+            pipeline.cut_option = 1
+            pipeline.selected_layer = cut_layer
+            pipeline.selected_field = self.parameterAsString(parameters, self.CUT_FIELD, context) or None
+            pipeline.selected_element = self.parameterAsString(parameters, self.CUT_VALUE, context) or None
+        elif ibge_state:
+            pipeline.load_ibge_layer()
+            pipeline.cut_option = 3
+            pipeline.ibge_state = ibge_state
+            pipeline.ibge_municipality = self.parameterAsString(parameters, self.IBGE_MUNICIPALITY, context).strip() or None
+
+        self.apply_transfer_parameter(pipeline, parameters, context)
+
+    def apply_transfer_parameter(self, pipeline, parameters, context):
+        """Perfil de transferência escolhido (sem escolha: o da configuração do plugin)"""
+        if parameters.get(self.TRANSFER_PROFILE) is not None:
+            pipeline.wfs_transfer_profile = TRANSFER_PROFILES[self.parameterAsEnum(parameters, self.TRANSFER_PROFILE, context)]
+
+    def configure(self, pipeline, parameters, context):
+        """Preenche as seleções no pipeline (equivalente às etapas 2 e 3 do assistente)
+        
+        Aqui ficam as seleções comuns aos temas WFS (corte e perfil de
+        transferência); PRODES e DETER preenchem período/classes e chamam
+        esta. TERRACLASS não declara esses parâmetros e não a chama.
+        """
+        self.apply_cut_parameters(pipeline, parameters, context)
+
+    def create_pipeline(self, parameters, context, feedback):
+        """Pipeline sem interface com tema, bioma e seleções dos parâmetros"""
+        pipeline = HeadlessPipeline(feedback)
+        pipeline.selected_theme = self.THEME
+        biomes = self.biomes()
+        pipeline.selected_biome = biomes[self.parameterAsEnum(parameters, self.BIOME, context)]
+        if pipeline.selected_biome not in pipeline.biome_options.get(self.THEME, biomes):
+            raise QgsProcessingException(f"{self.THEME} não disponível para {pipeline.selected_biome}")
+
+        self.configure(pipeline, parameters, context)
+        return pipeline
+
+    def processAlgorithm(self, parameters, context, feedback):
+        pipeline = self.create_pipeline(parameters, context, feedback)
+        output_path = self.parameterAsOutputLayer(parameters, self.OUTPUT, context)
+
+        try:
+            pipeline.run(output_path, self.parameterAsBool(parameters, self.METADATA, context))
+        finally:
+            pipeline.close_http_session()
+
+        return {self.OUTPUT: output_path}
+
+
+class ProdesAlgorithm(DesagregaBiomasBRAlgorithm):
+    """Desmatamento PRODES (incremental ou acumulado) por bioma e recorte"""
+
+    THEME = 'PRODES'
+    DATA_TYPE = 'DATA_TYPE'
+    START_YEAR = 'START_YEAR'
+    END_YEAR = 'END_YEAR'
+    DATA_TYPES = ['incremental', 'acumulado']
+
+    def shortHelpString(self):
+        return ("Baixa o desmatamento PRODES do bioma no TerraBrasilis (WFS), aplica o corte "
+                "espacial e salva o resultado. No tipo acumulado o ano inicial é o ano base do bioma.")
+
+    def initAlgorithm(self, config=None):
+        self.add_biome_parameter()
+        self.addParameter(QgsProcessingParameterEnum(self.DATA_TYPE, 'Tipo de dados', options=self.DATA_TYPES, defaultValue=0))
+        self.addParameter(QgsProcessingParameterNumber(self.START_YEAR, 'Ano inicial', defaultValue=2020))
+        self.addParameter(QgsProcessingParameterNumber(self.END_YEAR, 'Ano final', defaultValue=2023))
+        self.add_cut_parameters()
+        self.add_output_parameters()
+
+    def configure(self, pipeline, parameters, context):
+        biome = pipeline.selected_biome
+        pipeline.data_type = self.DATA_TYPES[self.parameterAsEnum(parameters, self.DATA_TYPE, context)]
+        pipeline.start_year = self.parameterAsInt(parameters, self.START_YEAR, context)
+        pipeline.end_year = self.parameterAsInt(parameters, self.END_YEAR, context)
+
+        if pipeline.data_type == "acumulado":
+            pipeline.start_year = pipeline.prodes_base_years.get(biome, 2000)
+            available_years = pipeline.prodes_years_acumulado.get(biome, [])
+        else:
+            available_years = pipeline.prodes_years.get(biome, [])
+
+        if pipeline.end_year not in available_years or pipeline.start_year > pipeline.end_year:
+            raise QgsProcessingException(f"Período {pipeline.start_year}-{pipeline.end_year} inválido para PRODES {biome} (anos: {available_years})")
+
+        super().configure(pipeline, parameters, context)
+
+
+class DeterAlgorithm(DesagregaBiomasBRAlgorithm):
+    """Alertas DETER por bioma, período, classes e recorte"""
+
+    THEME = 'DETER'
+    START_YEAR = 'START_YEAR'
+    END_YEAR = 'END_YEAR'
+    CLASSES = 'CLASSES'
+
+    def shortHelpString(self):
+        return ("Baixa os alertas DETER do bioma no TerraBrasilis (WFS), filtra período e classes, "
+                "aplica o corte espacial e salva o resultado. Classes separadas por vírgula; vazio = todas.")
+
+    def initAlgorithm(self, config=None):
+        self.add_biome_parameter()
+        self.addParameter(QgsProcessingParameterNumber(self.START_YEAR, 'Ano inicial', defaultValue=2023))
+        self.addParameter(QgsProcessingParameterNumber(self.END_YEAR, 'Ano final', defaultValue=2024))
+        self.addParameter(QgsProcessingParameterString(self.CLASSES, 'Classes (ex.: DESMATAMENTO_CR,DEGRADACAO)', optional=True))
+        self.add_cut_parameters()
+        self.add_output_parameters()
+
+    def configure(self, pipeline, parameters, context):
+        import datetime
+
+        biome = pipeline.selected_biome
+        pipeline.deter_start_year = self.parameterAsInt(parameters, self.START_YEAR, context)
+        pipeline.deter_end_year = self.parameterAsInt(parameters, self.END_YEAR, context)
+        first_year = int(pipeline.deter_start_dates.get(biome, '2016')[:4])
+        if not first_year <= pipeline.deter_start_year <= pipeline.deter_end_year <= datetime.datetime.now().year:
+            raise QgsProcessingException(f"Período {pipeline.deter_start_year}-{pipeline.deter_end_year} inválido para DETER {biome} (desde {first_year})")
+
+        available_classes = pipeline.deter_classes.get(biome, [])
+        classes = [name.strip().upper() for name in self.parameterAsString(parameters, self.CLASSES, context).split(',') if name.strip()]
+        unknown = [name for name in classes if name not in available_classes]
+        if unknown:
+            raise QgsProcessingException(f"Classes DETER inválidas para {biome}: {', '.join(unknown)} (disponíveis: {', '.join(available_classes)})")
+        pipeline.deter_selected_classes = classes or list(available_classes)
+
+        super().configure(pipeline, parameters, context)
+
+
+class TerraclassAlgorithm(DesagregaBiomasBRAlgorithm):
+    """Uso e cobertura TERRACLASS por estado ou município"""
+
+    THEME = 'TERRACLASS'
+    YEAR = 'YEAR'
+    STATE = 'STATE'
+    MUNICIPALITY = 'MUNICIPALITY'
+
+    def shortHelpString(self):
+        return ("Baixa o mapeamento TERRACLASS do estado (ou do município) e salva o resultado. "
+                "Estado e município com os nomes do shapefile IBGE do plugin.")
+
+    def initAlgorithm(self, config=None):
+        self.add_biome_parameter()
+        self.addParameter(QgsProcessingParameterNumber(self.YEAR, 'Ano', defaultValue=2022))
+        self.addParameter(QgsProcessingParameterString(self.STATE, 'Estado'))
+        self.addParameter(QgsProcessingParameterString(self.MUNICIPALITY, 'Município (vazio = estado inteiro)', optional=True))
+        self.add_output_parameters()
+
+    def configure(self, pipeline, parameters, context):
+        biome = pipeline.selected_biome
+        pipeline.terraclass_year = self.parameterAsInt(parameters, self.YEAR, context)
+        if pipeline.terraclass_year not in pipeline.terraclass_years.get(biome, []):
+            raise QgsProcessingException(f"Ano {pipeline.terraclass_year} indisponível para TERRACLASS {biome} (anos: {pipeline.terraclass_years.get(biome, [])})")
+        pipeline.terraclass_state = self.parameterAsString(parameters, self.STATE, context).strip()
+        pipeline.terraclass_municipality = self.parameterAsString(parameters, self.MUNICIPALITY, context).strip() or None
+        # Sem corte nem perfil de transferência (não é WFS): o recorte é o próprio estado/município do arquivo
+
+
+class DesagregaBiomasBRBatchAlgorithm(DesagregaBiomasBRAlgorithm):
+    """Base dos algoritmos em lote: um download para várias áreas de interesse
+    
+    Substitui os parâmetros de corte e de saída do algoritmo do tema; as
+    seleções do tema (bioma, período, classes) continuam as mesmas.
+    """
+
+    GEOCODES = 'GEOCODES'
+    AOI_STATE = 'AOI_STATE'
+    AOI_LAYER = 'AOI_LAYER'
+    AOI_ID_FIELD = 'AOI_ID_FIELD'
+    FORMAT = 'FORMAT'
+    OUTPUT_FOLDER = 'OUTPUT_FOLDER'
+    OUTPUT_FILES = 'OUTPUT_FILES'
+    FORMATS = [('GeoPackage (.gpkg)', '.gpkg'), ('Shapefile (.shp)', '.shp')]
+
+    def name(self):
+        return f"{self.THEME.lower()}_lote"
+
+    def displayName(self):
+        return f"{self.THEME} em lote (um download, um recorte por área)"
+
+    def shortHelpString(self):
+        return (f"Baixa e corrige o {self.THEME} uma única vez (corte pela união das áreas) e salva um "
+                "arquivo recortado por área de interesse: códigos IBGE separados por vírgula, todos os "
+                "municípios de um estado ou uma camada de polígonos com campo identificador.")
+
+    def add_cut_parameters(self):
+        self.addParameter(QgsProcessingParameterString(
+            self.GEOCODES, 'Códigos IBGE dos municípios (separados por vírgula)', optional=True))
+        self.addParameter(QgsProcessingParameterString(
+            self.AOI_STATE, 'Estado IBGE (todos os municípios)', optional=True))
+        self.addParameter(QgsProcessingParameterVectorLayer(
+            self.AOI_LAYER, 'Camada de áreas de interesse', [QgsProcessing.TypeVectorPolygon], optional=True))
+        self.addParameter(QgsProcessingParameterField(
+            self.AOI_ID_FIELD, 'Campo identificador das áreas', parentLayerParameterName=self.AOI_LAYER, optional=True))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.TRANSFER_PROFILE, 'Perfil de transferência WFS (vazio = configuração do plugin)',
+            options=TRANSFER_PROFILES, optional=True))
+
+    def add_output_parameters(self):
+        self.addParameter(QgsProcessingParameterEnum(
+            self.FORMAT, 'Formato', options=[label for label, extension in self.FORMATS], defaultValue=0))
+        self.addParameter(QgsProcessingParameterBoolean(self.METADATA, 'Gerar metadados (.txt)', defaultValue=False))
+        self.addParameter(QgsProcessingParameterFolderDestination(self.OUTPUT_FOLDER, 'Pasta de saída'))
+        self.addOutput(QgsProcessingOutputMultipleLayers(self.OUTPUT_FILES, 'Arquivos gerados'))
+
+    def apply_cut_parameters(self, pipeline, parameters, context):
+        """Monta as áreas de interesse do pipeline (camada + campo, ou códigos/estado IBGE)"""
+        aoi_layer = self.parameterAsVectorLayer(parameters, self.AOI_LAYER, context)
+        geocodes = [code.strip() for code in self.parameterAsString(parameters, self.GEOCODES, context).split(',') if code.strip()]
+        state = self.parameterAsString(parameters, self.AOI_STATE, context).strip()
+
+        if aoi_layer:
+            id_field = self.parameterAsString(parameters, self.AOI_ID_FIELD, context)
+            if not id_field:
+                raise QgsProcessingException("Informe o campo identificador da camada de áreas de interesse")
+            pipeline.set_batch_layer_aois(aoi_layer, id_field)
+        elif geocodes or state:
+            pipeline.load_ibge_layer()
+            pipeline.set_batch_ibge_aois(geocodes, state)
+        else:
+            raise QgsProcessingException("Informe códigos IBGE, um estado ou uma camada de áreas de interesse")
+
+        self.apply_transfer_parameter(pipeline, parameters, context)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        pipeline = self.create_pipeline(parameters, context, feedback)
+        output_folder = self.parameterAsString(parameters, self.OUTPUT_FOLDER, context)
+        extension = self.FORMATS[self.parameterAsEnum(parameters, self.FORMAT, context)][1]
+        feedback.pushInfo(f"🗂️ {len(pipeline.batch_aois)} área(s) de interesse | um download para todas")
+
+        try:
+            saved_files = pipeline.run_batch(output_folder, extension, self.parameterAsBool(parameters, self.METADATA, context))
+        finally:
+            pipeline.close_http_session()
+
+        return {self.OUTPUT_FOLDER: output_folder, self.OUTPUT_FILES: saved_files}
+
+
+class ProdesBatchAlgorithm(DesagregaBiomasBRBatchAlgorithm, ProdesAlgorithm):
+    """PRODES em lote por município, estado ou camada de áreas"""
+
+
+class DeterBatchAlgorithm(DesagregaBiomasBRBatchAlgorithm, DeterAlgorithm):
+    """DETER em lote por município, estado ou camada de áreas"""
+
+
+class DesagregaBiomasBRProvider(QgsProcessingProvider):
+    """Provedor Processing do DesagregaBiomasBR"""
+
+    def loadAlgorithms(self):
+        for algorithm in (ProdesAlgorithm(), DeterAlgorithm(), TerraclassAlgorithm(),
+                          ProdesBatchAlgorithm(), DeterBatchAlgorithm()):
+            self.addAlgorithm(algorithm)
+
+    def id(self):
+        return 'desagregabiomasbr'
+
+    def name(self):
+        return 'DesagregaBiomasBR'
+
+    def icon(self):
+        return QIcon(os.path.join(os.path.dirname(__file__), 'icones', 'mapa.png'))
+
+    def supportsNonFileBasedOutput(self):
+        # Saída sempre em arquivo (Shapefile ou GeoPackage), como no assistente
+        return False
+
+    def supportedOutputVectorLayerExtensions(self):
+        return ['gpkg', 'shp']